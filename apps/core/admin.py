@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import StudentProfile, Notification, Achievement, UserAchievement
+from .models import StudentProfile, Notification, Achievement, UserAchievement, CalendarEvent
 
 
 class StudentProfileInline(admin.StackedInline):
@@ -42,4 +42,15 @@ class AchievementAdmin(admin.ModelAdmin):
 class UserAchievementAdmin(admin.ModelAdmin):
     list_display = ['user', 'achievement', 'unlocked_at', 'progress']
     list_filter = ['unlocked_at', 'achievement__category']
-    search_fields = ['user__username', 'achievement__code', 'achievement__name']
\ No newline at end of file
+    search_fields = ['user__username', 'achievement__code', 'achievement__name']
+
+@admin.register(CalendarEvent)
+class CalendarEventAdmin(admin.ModelAdmin):
+    list_display = ['data', 'tip', 'titlu', 'materie', 'user', 'class_room', 'grupa_judet']
+    list_filter = ['tip', 'grupa_judet']
+    search_fields = ['titlu', 'materie', 'sursa', 'user__username']
+    date_hierarchy = 'data'
+    readonly_fields = ['sursa']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'class_room')
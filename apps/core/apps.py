@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
-    verbose_name = 'Core - Utilizatori și Dashboard'
\ No newline at end of file
+    verbose_name = 'Core - Utilizatori și Dashboard'
+
+    def ready(self):
+        # Import signals pentru indexul evenimentelor din calendar
+        from . import signals  # noqa: F401
@@ -0,0 +1,311 @@
+"""
+Indexul evenimentelor de calendar (CalendarEvent).
+
+Fiecare eveniment datat (termen de temă, notă, absență, modificare de orar,
+vacanță) are un rând în CalendarEvent, întreținut din semnale. Calendarele
+(lunar din orar, teme, note, privirea de ansamblu) și API-ul JSON citesc
+o lună cu o singură interogare pe indexul (user, data), în loc să interogheze
+fiecare model pe tot intervalul și să grupeze în Python.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.urls import reverse
+
+from apps.schedule.school_year import feb_group, school_vacations, school_year_bounds
+from .models import CalendarEvent, StudentProfile
+
+
+# Tipurile care aparțin mereu unui singur utilizator (nu necesită clasa/județul)
+USER_EVENT_TYPES = {'tema', 'nota', 'absenta'}
+
+COLOR_SCHEDULE_CHANGE = '#fd7e14'
+COLOR_VACATION = '#20c997'
+
+# Modificările fără dată de sfârșit apar până la finalul anului școlar
+OPEN_ENDED_DAYS = 180
+
+
+def _upsert(sursa, **fields):
+    CalendarEvent.objects.update_or_create(sursa=sursa, defaults=fields)
+
+
+def _delete(sursa):
+    CalendarEvent.objects.filter(sursa=sursa).delete()
+
+
+def _grade_color(grade):
+    """Culoarea din Grade.culoare_afisare, tolerantă la notele fără valoare."""
+    if grade.tip == 'nota' and grade.valoare is None:
+        return '#6c757d'
+    return grade.culoare_afisare
+
+
+def change_end(change):
+    """Ultima zi a unei modificări de orar (cele fără sfârșit țin până la finalul anului școlar)."""
+    if change.data_end:
+        return change.data_end
+    end = school_year_bounds()[1]
+    if end < change.data_start:
+        end = change.data_start + timedelta(days=OPEN_ENDED_DAYS)
+    return end
+
+
+# --- Sincronizare per sursă ---
+
+def _homework_fields(homework):
+    return dict(
+        user_id=homework.user_id,
+        class_room=None,
+        tip='tema',
+        subject_id=homework.subject_id,
+        data=homework.deadline,
+        data_sfarsit=None,
+        titlu=homework.titlu,
+        materie=homework.subject.nume,
+        culoare=homework.subject.culoare,
+        url=reverse('homework:detail', args=[homework.pk]),
+        finalizat=homework.finalizata,
+        extra={'prioritate': homework.prioritate},
+    )
+
+
+def sync_homework(homework):
+    _upsert(f'homework:{homework.pk}', **_homework_fields(homework))
+
+
+def _sync_batch(rows):
+    """{sursă: câmpuri} -> o citire, un bulk_update și inserarea celor lipsă."""
+    if not rows:
+        return
+    existing = {e.sursa: e for e in CalendarEvent.objects.filter(sursa__in=list(rows))}
+    for sursa, event in existing.items():
+        for name, value in rows[sursa].items():
+            setattr(event, name, value)
+    CalendarEvent.objects.bulk_update(list(existing.values()), list(next(iter(rows.values()))), batch_size=200)
+    CalendarEvent.objects.bulk_create(
+        [CalendarEvent(sursa=sursa, **fields) for sursa, fields in rows.items() if sursa not in existing]
+    )
+
+
+def sync_homework_batch(homeworks):
+    """Reindexează mai multe teme deodată."""
+    _sync_batch({f'homework:{hw.pk}': _homework_fields(hw) for hw in homeworks})
+
+
+def _grade_fields(grade):
+    return dict(
+        user_id=grade.user_id,
+        class_room=None,
+        tip='nota' if grade.tip == 'nota' else 'absenta',
+        subject_id=grade.subject_id,
+        data=grade.data,
+        data_sfarsit=None,
+        titlu='%.2f' % grade.valoare if grade.tip == 'nota' and grade.valoare is not None else grade.get_tip_display(),
+        materie=grade.subject.nume,
+        culoare=_grade_color(grade),
+        url=reverse('grades:detail', args=[grade.pk]),
+        finalizat=bool(grade.motivata),
+        extra={'tip_nota': grade.tip},
+    )
+
+
+def sync_grade(grade):
+    _upsert(f'grade:{grade.pk}', **_grade_fields(grade))
+
+
+def sync_grade_batch(grades):
+    """Reindexează mai multe note deodată (ex: importul din catalog, salvat cu bulk_create)."""
+    _sync_batch({f'grade:{grade.pk}': _grade_fields(grade) for grade in grades})
+
+
+def sync_schedule_change(change):
+    entry = change.schedule_entry
+    _upsert(
+        f'schedule_change:{change.pk}',
+        user_id=change.user_id,
+        class_room=None,
+        tip='schimbare_orar',
+        subject_id=entry.subject_id,
+        data=change.data_start,
+        data_sfarsit=change_end(change),
+        titlu=change.get_tip_schimbare_display(),
+        materie=entry.subject.nume,
+        culoare=COLOR_SCHEDULE_CHANGE,
+        url=reverse('schedule:changes'),
+        finalizat=False,
+        extra={'zi_saptamana': entry.zi_saptamana, 'numar_ora': entry.numar_ora},
+    )
+
+
+def sync_class_change(change):
+    entry = change.class_entry
+    _upsert(
+        f'class_change:{change.pk}',
+        user=None,
+        class_room_id=change.class_room_id,
+        tip='schimbare_orar',
+        subject=None,
+        data=change.data_start,
+        data_sfarsit=change_end(change),
+        titlu=change.get_tip_schimbare_display(),
+        materie=entry.subject_name,
+        culoare=COLOR_SCHEDULE_CHANGE,
+        url=reverse('schedule:calendar'),
+        finalizat=False,
+        extra={'zi_saptamana': entry.zi_saptamana, 'numar_ora': entry.numar_ora, 'clasa': True},
+    )
+
+
+def delete_for(prefix, pk):
+    _delete(f'{prefix}:{pk}')
+
+
+def delete_batch(prefix, pks):
+    CalendarEvent.objects.filter(sursa__in=[f'{prefix}:{pk}' for pk in pks]).delete()
+
+
+# Un județ reprezentativ pentru fiecare grupă a vacanței din februarie
+FEB_GROUP_JUDET = {'1': 'Cluj', '2': 'București', '3': 'Suceava'}
+
+
+def vacation_rows():
+    """Rândurile globale de vacanță: comune tuturor ('') și, pentru februarie, per grupă."""
+    rows = []
+    for grupa, judet in FEB_GROUP_JUDET.items():
+        for i, (nume, start, end) in enumerate(school_vacations(judet)):
+            mobila = 'februarie' in nume
+            if not mobila and grupa != '2':
+                continue
+            rows.append({
+                'sursa': f'vacation:{grupa}:{i}' if mobila else f'vacation:{i}',
+                'grupa_judet': grupa if mobila else '',
+                'titlu': nume,
+                'data': start,
+                'data_sfarsit': end,
+            })
+    return rows
+
+
+def sync_vacations():
+    for row in vacation_rows():
+        _upsert(
+            row.pop('sursa'),
+            user=None, class_room=None, tip='vacanta', subject=None,
+            materie='', culoare=COLOR_VACATION, url='', finalizat=False, extra={},
+            **row,
+        )
+
+
+def rebuild_user(user):
+    """Reindexează toate sursele personale ale unui utilizator."""
+    from apps.grades.models import Grade
+    from apps.homework.models import Homework
+    from apps.schedule.models import ScheduleChange
+
+    CalendarEvent.objects.filter(user=user).delete()
+    for hw in Homework.objects.filter(user=user).select_related('subject'):
+        sync_homework(hw)
+    for grade in Grade.objects.filter(user=user).select_related('subject'):
+        sync_grade(grade)
+    for change in ScheduleChange.objects.filter(user=user).select_related('schedule_entry__subject'):
+        sync_schedule_change(change)
+
+
+def rebuild_all():
+    """Reconstruiește indexul complet (folosit de comanda rebuild_calendar_events)."""
+    from django.contrib.auth.models import User
+    from apps.schedule.models import ClassScheduleChange
+
+    CalendarEvent.objects.all().delete()
+    for user in User.objects.all():
+        rebuild_user(user)
+    for change in ClassScheduleChange.objects.select_related('class_entry'):
+        sync_class_change(change)
+    sync_vacations()
+    return CalendarEvent.objects.count()
+
+
+# --- Citire ---
+
+def _profile_scope(user):
+    """(class_room_id, grupa februarie) din profilul utilizatorului."""
+    profile = StudentProfile.objects.filter(user=user).values('class_room_id', 'class_room__judet').first()
+    if not profile:
+        return None, feb_group()
+    judet = (profile['class_room__judet'] or '').strip() or None
+    return profile['class_room_id'], feb_group(judet)
+
+
+def events_between(user, start, end, tipuri=None):
+    """
+    Evenimentele care se suprapun cu [start, end]: ale utilizatorului, ale clasei
+    lui și vacanțele grupei lui de județe, într-o singură interogare.
+    """
+    owner = Q(user=user)
+    if tipuri is None or not set(tipuri) <= USER_EVENT_TYPES:
+        class_room_id, grupa = _profile_scope(user)
+        owner |= Q(user__isnull=True, class_room__isnull=True, grupa_judet__in=['', grupa])
+        if class_room_id:
+            owner |= Q(class_room_id=class_room_id)
+
+    qs = CalendarEvent.objects.filter(owner).filter(
+        Q(data__range=(start, end))
+        | Q(data_sfarsit__isnull=False, data__lte=end, data_sfarsit__gte=start)
+    )
+    if tipuri is not None:
+        qs = qs.filter(tip__in=list(tipuri))
+    return list(qs.order_by('data', 'tip', 'pk'))
+
+
+def _days_of(event, start, end):
+    """Zilele din [start, end] în care apare evenimentul (intervalele sunt expandate)."""
+    first = max(event.data, start)
+    last = min(event.data_sfarsit or event.data, end)
+    weekday = (event.extra or {}).get('zi_saptamana')
+    day = first
+    while day <= last:
+        if weekday is None or day.isoweekday() == weekday:
+            yield day
+        day += timedelta(days=1)
+
+
+def events_by_day(user, start, end, tipuri=None):
+    """Map dată -> listă de evenimente pentru intervalul dat."""
+    by_day = {}
+    for event in events_between(user, start, end, tipuri):
+        for day in _days_of(event, start, end):
+            by_day.setdefault(day, []).append(event)
+    return by_day
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def month_events(user, year, month, tipuri=None):
+    """Map număr zi -> listă de evenimente pentru luna dată."""
+    start, end = month_bounds(year, month)
+    return {day.day: events for day, events in events_by_day(user, start, end, tipuri).items()}
+
+
+def serialize(event):
+    return {
+        'type': event.tip,
+        'label': event.titlu,
+        'subject': event.materie,
+        'color': event.culoare,
+        'url': event.url,
+        'done': event.finalizat,
+    }
+
+
+def month_payload(user, year, month, tipuri=None):
+    """Răspunsul JSON al API-ului lunar."""
+    days = month_events(user, year, month, tipuri)
+    return {
+        'year': year,
+        'month': month,
+        'days': {day: [serialize(e) for e in events] for day, events in sorted(days.items())},
+    }
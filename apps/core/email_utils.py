@@ -1,9 +1,11 @@
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
 
 try:
     from sendgrid import SendGridAPIClient
@@ -64,3 +66,29 @@ def send_email(to_emails: List[str], subject: str, html_content: str, from_email
     logger.info('SendGrid API response: status=%s', getattr(response, 'status_code', 'unknown'))
 
 
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = max(1, int(getattr(settings, 'EMAIL_QUEUE_WORKERS', 1)))
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='email')
+    return _executor
+
+
+def _send_logged(*args, **kwargs) -> None:
+    try:
+        send_email(*args, **kwargs)
+    except Exception:
+        logger.exception('Queued email failed')
+
+
+def queue_email(to_emails: List[str], subject: str, html_content: str, from_email: Optional[str] = None) -> None:
+    """Send an email in the background, once the current transaction commits.
+
+    The request does not wait for SMTP/SendGrid; nothing is sent if the transaction rolls back.
+    """
+    transaction.on_commit(
+        lambda: _get_executor().submit(_send_logged, to_emails, subject, html_content, from_email)
+    )
@@ -86,13 +86,14 @@ class StudentProfileForm(forms.ModelForm):
         model = StudentProfile
         fields = [
             'profile_image', 'remove_image', 'rotate_deg', 'crop_square',
-            'clasa', 'class_room', 'scoala', 'telefon_parinte', 'email_parinte',
-            'ore_start', 'durata_ora', 'durata_pauza', 'nr_ore_pe_zi',
+            'clasa', 'class_room', 'orar_legat', 'scoala', 'telefon_parinte', 'email_parinte',
+            'ore_start', 'durata_ora', 'durata_pauza', 'nr_ore_pe_zi', 'buget_studiu_zilnic',
             'reminder_teme', 'reminder_note', 'zile_reminder_teme'
         ]
         labels = {
             'clasa': 'Clasa',
             'class_room': 'Clasă (orar comun)',
+            'orar_legat': 'Orar legat de clasă (fără copie personală)',
             'scoala': 'Școala',
             'telefon_parinte': 'Telefon părinte',
             'email_parinte': 'Email părinte',
@@ -100,6 +101,7 @@ class StudentProfileForm(forms.ModelForm):
             'durata_ora': 'Durata unei ore (minute)',
             'durata_pauza': 'Durata pauzei (minute)',
             'nr_ore_pe_zi': 'Numărul maxim de ore pe zi',
+            'buget_studiu_zilnic': 'Timp de studiu pe zi (minute)',
             'reminder_teme': 'Activează reminder-uri pentru teme',
             'reminder_note': 'Activează reminder-uri pentru note noi',
             'zile_reminder_teme': 'Cu câte zile înainte să anunțe temele',
@@ -112,6 +114,9 @@ class StudentProfileForm(forms.ModelForm):
             'class_room': forms.Select(attrs={
                 'class': 'form-control'
             }),
+            'orar_legat': forms.CheckboxInput(attrs={
+                'class': 'form-check-input'
+            }),
             'scoala': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'ex: Liceul Teoretic "Mihai Eminescu"'
@@ -145,6 +150,12 @@ class StudentProfileForm(forms.ModelForm):
                 'min': '4',
                 'max': '8'
             }),
+            'buget_studiu_zilnic': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '15',
+                'max': '600',
+                'step': '15'
+            }),
             'reminder_teme': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
             }),
@@ -180,7 +191,7 @@ class StudentProfileForm(forms.ModelForm):
             },
             {
                 'title': 'Configurare orar',
-                'fields': ['ore_start', 'durata_ora', 'durata_pauza', 'nr_ore_pe_zi'],
+                'fields': ['ore_start', 'durata_ora', 'durata_pauza', 'nr_ore_pe_zi', 'buget_studiu_zilnic'],
                 'icon': 'fas fa-clock'
             },
             {
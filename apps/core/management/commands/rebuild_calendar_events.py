@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the calendar event index (homework, grades, absences, schedule changes, vacations).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only reindex the personal events of this username')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+        from apps.core import calendar_events
+        from apps.core.models import CalendarEvent
+
+        username = options.get('user')
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"Unknown user: {username}")
+            calendar_events.rebuild_user(user)
+            total = CalendarEvent.objects.filter(user=user).count()
+            self.stdout.write(self.style.SUCCESS(f"Reindexed {total} events for {username}"))
+            return
+
+        total = calendar_events.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt calendar index: {total} events"))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_achievement_userachievement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='orar_legat',
+            field=models.BooleanField(default=False, help_text='Orarul este citit din orarul clasei; se păstrează doar abaterile personale'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.urls import reverse
+
+
+def _grade_color(grade):
+    if grade.tip == 'nota':
+        if grade.valoare is None:
+            return '#6c757d'
+        if grade.valoare >= 9:
+            return '#28a745'
+        if grade.valoare >= 7:
+            return '#ffc107'
+        if grade.valoare >= 5:
+            return '#fd7e14'
+        return '#dc3545'
+    if grade.tip in ('absenta', 'intarziere'):
+        return '#6c757d' if grade.motivata else '#dc3545'
+    return '#6c757d'
+
+
+def build_index(apps, schema_editor):
+    from apps.core.calendar_events import COLOR_SCHEDULE_CHANGE, COLOR_VACATION, change_end, vacation_rows
+
+    CalendarEvent = apps.get_model('core', 'CalendarEvent')
+    Homework = apps.get_model('homework', 'Homework')
+    Grade = apps.get_model('grades', 'Grade')
+    ScheduleChange = apps.get_model('schedule', 'ScheduleChange')
+    ClassScheduleChange = apps.get_model('schedule', 'ClassScheduleChange')
+    grade_types = dict(Grade._meta.get_field('tip').choices)
+    change_types = dict(ScheduleChange._meta.get_field('tip_schimbare').choices)
+
+    rows = []
+    for hw in Homework.objects.select_related('subject').iterator():
+        rows.append(CalendarEvent(
+            sursa=f'homework:{hw.pk}', user_id=hw.user_id, tip='tema', subject_id=hw.subject_id,
+            data=hw.deadline, titlu=hw.titlu, materie=hw.subject.nume, culoare=hw.subject.culoare,
+            url=reverse('homework:detail', args=[hw.pk]), finalizat=hw.finalizata,
+            extra={'prioritate': hw.prioritate},
+        ))
+    for grade in Grade.objects.select_related('subject').iterator():
+        rows.append(CalendarEvent(
+            sursa=f'grade:{grade.pk}', user_id=grade.user_id,
+            tip='nota' if grade.tip == 'nota' else 'absenta', subject_id=grade.subject_id, data=grade.data,
+            titlu='%.2f' % grade.valoare if grade.tip == 'nota' and grade.valoare is not None else grade_types.get(grade.tip, grade.tip),
+            materie=grade.subject.nume, culoare=_grade_color(grade),
+            url=reverse('grades:detail', args=[grade.pk]), finalizat=bool(grade.motivata),
+            extra={'tip_nota': grade.tip},
+        ))
+    for change in ScheduleChange.objects.select_related('schedule_entry__subject').iterator():
+        entry = change.schedule_entry
+        rows.append(CalendarEvent(
+            sursa=f'schedule_change:{change.pk}', user_id=change.user_id, tip='schimbare_orar',
+            subject_id=entry.subject_id, data=change.data_start, data_sfarsit=change_end(change),
+            titlu=change_types.get(change.tip_schimbare, ''), materie=entry.subject.nume,
+            culoare=COLOR_SCHEDULE_CHANGE, url=reverse('schedule:changes'),
+            extra={'zi_saptamana': entry.zi_saptamana, 'numar_ora': entry.numar_ora},
+        ))
+    for change in ClassScheduleChange.objects.select_related('class_entry').iterator():
+        entry = change.class_entry
+        rows.append(CalendarEvent(
+            sursa=f'class_change:{change.pk}', class_room_id=change.class_room_id, tip='schimbare_orar',
+            data=change.data_start, data_sfarsit=change_end(change),
+            titlu=change_types.get(change.tip_schimbare, ''), materie=entry.subject_name,
+            culoare=COLOR_SCHEDULE_CHANGE, url=reverse('schedule:calendar'),
+            extra={'zi_saptamana': entry.zi_saptamana, 'numar_ora': entry.numar_ora, 'clasa': True},
+        ))
+    for row in vacation_rows():
+        rows.append(CalendarEvent(tip='vacanta', culoare=COLOR_VACATION, **row))
+    CalendarEvent.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_classschedulechange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('subjects', '0002_subject_rating'),
+        ('core', '0006_studentprofile_orar_legat'),
+        ('homework', '0002_homework_share_with_class_homework_shared_at_and_more'),
+        ('grades', '0004_alter_semester_options_alter_grade_semestru_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grupa_judet', models.CharField(blank=True, max_length=10)),
+                ('tip', models.CharField(choices=[('tema', 'Temă'), ('nota', 'Notă'), ('absenta', 'Absență'), ('schimbare_orar', 'Modificare orar'), ('vacanta', 'Vacanță')], max_length=20)),
+                ('sursa', models.CharField(help_text='Obiectul din care provine (ex: homework:12)', max_length=50, unique=True)),
+                ('data', models.DateField()),
+                ('data_sfarsit', models.DateField(blank=True, help_text='Pentru evenimente pe mai multe zile', null=True)),
+                ('titlu', models.CharField(max_length=200)),
+                ('materie', models.CharField(blank=True, max_length=100)),
+                ('culoare', models.CharField(default='#4facfe', max_length=7)),
+                ('url', models.CharField(blank=True, max_length=200)),
+                ('finalizat', models.BooleanField(default=False)),
+                ('extra', models.JSONField(blank=True, default=dict)),
+                ('class_room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_events', to='schedule.classroom')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_events', to='subjects.subject')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Eveniment Calendar',
+                'verbose_name_plural': 'Evenimente Calendar',
+                'ordering': ['data'],
+                'indexes': [models.Index(fields=['user', 'data'], name='core_event_user_date_idx'), models.Index(fields=['class_room', 'data'], name='core_event_class_date_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_calendarevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='buget_studiu_zilnic',
+            field=models.PositiveIntegerField(default=120, help_text='Minute de studiu pe zi pentru planificatorul de teme'),
+        ),
+    ]
@@ -4,8 +4,10 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from .tracking import DirtyFieldsMixin
 
-class StudentProfile(models.Model):
+
+class StudentProfile(DirtyFieldsMixin, models.Model):
     """
     Profil extins pentru elev - legat de User-ul default Django
     """
@@ -15,6 +17,11 @@ class StudentProfile(models.Model):
     clasa = models.CharField(max_length=10, help_text="Ex: 6A, 7B, etc.")
     # Legătură opțională la o clasă definită global (cu orar comun)
     class_room = models.ForeignKey('schedule.ClassRoom', on_delete=models.SET_NULL, null=True, blank=True, related_name='students')
+    # Mod „legat”: orarul se citește direct din orarul clasei, fără copie personală
+    orar_legat = models.BooleanField(
+        default=False,
+        help_text="Orarul este citit din orarul clasei; se păstrează doar abaterile personale"
+    )
     scoala = models.CharField(max_length=200, blank=True)
     telefon_parinte = models.CharField(max_length=15, blank=True)
     email_parinte = models.EmailField(blank=True)
@@ -26,6 +33,7 @@ class StudentProfile(models.Model):
     durata_ora = models.IntegerField(default=50, help_text="Durata unei ore în minute")
     durata_pauza = models.IntegerField(default=10, help_text="Durata pauzei în minute")
     nr_ore_pe_zi = models.IntegerField(default=7, help_text="Numărul maxim de ore pe zi")
+    buget_studiu_zilnic = models.PositiveIntegerField(default=120, help_text="Minute de studiu pe zi pentru planificatorul de teme")
 
     # Reminder settings
     reminder_teme = models.BooleanField(default=True, help_text="Notificări pentru teme")
@@ -136,6 +144,54 @@ class UserAchievement(models.Model):
         return f"{self.user.username} - {self.achievement.code} ({status})"
 
 
+class CalendarEvent(models.Model):
+    """
+    Indexul evenimentelor datate (teme, note, absențe, modificări de orar, vacanțe)
+    din care se construiesc toate calendarele. Este întreținut din semnale
+    (vezi calendar_events.py); un eveniment aparține unui utilizator, unei clase
+    (modificările de orar ale clasei) sau tuturor (vacanțele, cu grupa de județe).
+    """
+    EVENT_TYPES = [
+        ('tema', 'Temă'),
+        ('nota', 'Notă'),
+        ('absenta', 'Absență'),
+        ('schimbare_orar', 'Modificare orar'),
+        ('vacanta', 'Vacanță'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='calendar_events')
+    class_room = models.ForeignKey('schedule.ClassRoom', on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='calendar_events')
+    # Pentru vacanțe: '' = toate județele, altfel grupa vacanței din februarie
+    grupa_judet = models.CharField(max_length=10, blank=True)
+
+    tip = models.CharField(max_length=20, choices=EVENT_TYPES)
+    sursa = models.CharField(max_length=50, unique=True, help_text="Obiectul din care provine (ex: homework:12)")
+    subject = models.ForeignKey('subjects.Subject', on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='calendar_events')
+
+    data = models.DateField()
+    data_sfarsit = models.DateField(blank=True, null=True, help_text="Pentru evenimente pe mai multe zile")
+    titlu = models.CharField(max_length=200)
+    materie = models.CharField(max_length=100, blank=True)
+    culoare = models.CharField(max_length=7, default='#4facfe')
+    url = models.CharField(max_length=200, blank=True)
+    finalizat = models.BooleanField(default=False)
+    extra = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        verbose_name = "Eveniment Calendar"
+        verbose_name_plural = "Evenimente Calendar"
+        ordering = ['data']
+        indexes = [
+            models.Index(fields=['user', 'data'], name='core_event_user_date_idx'),
+            models.Index(fields=['class_room', 'data'], name='core_event_class_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tip_display()}: {self.titlu} ({self.data})"
+
+
 # Signals pentru crearea automată a profilului
 @receiver(post_save, sender=User)
 def create_student_profile(sender, instance, created, **kwargs):
@@ -146,6 +202,10 @@ def create_student_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_student_profile(sender, instance, **kwargs):
-    """Salvează profilul student când se salvează user-ul"""
-    if hasattr(instance, 'student_profile'):
+    """
+    Salvează profilul student când se salvează user-ul. Doar dacă profilul a fost
+    încărcat prin acest user (altfel nu putea fi modificat) și, prin DirtyFieldsMixin,
+    doar câmpurile schimbate: autentificarea (last_login) nu mai atinge profilul.
+    """
+    if User.student_profile.is_cached(instance):
         instance.student_profile.save()
\ No newline at end of file
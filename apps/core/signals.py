@@ -0,0 +1,83 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.homework.services import batch_delete_in_progress, homework_batch_changed, homework_changed
+from . import calendar_events
+from .tracking import when_changed
+from .models import CalendarEvent
+
+
+# Expeditorii sunt dați ca „app_label.Model” pentru a evita importurile circulare
+
+@receiver(post_save, sender='homework.Homework')
+@when_changed('user', 'subject', 'deadline', 'titlu', 'finalizata', 'prioritate')
+def index_homework(sender, instance, **kwargs):
+    calendar_events.sync_homework(instance)
+
+
+@receiver(homework_changed)
+def reindex_homework_transition(sender, homework, old, **kwargs):
+    """Tranzițiile de stare (services.py) schimbă doar starea „finalizat” a evenimentului."""
+    if 'finalizata' in old:
+        CalendarEvent.objects.filter(sursa=f'homework:{homework.pk}').update(finalizat=homework.finalizata)
+
+
+@receiver(homework_batch_changed)
+def reindex_homework_batch(sender, homework, transition, old, **kwargs):
+    if transition == 'delete':
+        calendar_events.delete_batch('homework', [hw.pk for hw in homework])
+    elif transition in ('complete', 'reopen', 'reschedule', 'priority'):
+        calendar_events.sync_homework_batch(homework)
+
+
+@receiver(post_delete, sender='homework.Homework')
+def unindex_homework(sender, instance, **kwargs):
+    if not batch_delete_in_progress():
+        calendar_events.delete_for('homework', instance.pk)
+
+
+@receiver(post_save, sender='grades.Grade')
+def index_grade(sender, instance, **kwargs):
+    calendar_events.sync_grade(instance)
+
+
+@receiver(post_delete, sender='grades.Grade')
+def unindex_grade(sender, instance, **kwargs):
+    calendar_events.delete_for('grade', instance.pk)
+
+
+@receiver(post_save, sender='schedule.ScheduleChange')
+def index_schedule_change(sender, instance, **kwargs):
+    calendar_events.sync_schedule_change(instance)
+
+
+@receiver(post_delete, sender='schedule.ScheduleChange')
+def unindex_schedule_change(sender, instance, **kwargs):
+    calendar_events.delete_for('schedule_change', instance.pk)
+
+
+@receiver(post_save, sender='schedule.ClassScheduleChange')
+def index_class_schedule_change(sender, instance, **kwargs):
+    calendar_events.sync_class_change(instance)
+
+
+@receiver(post_delete, sender='schedule.ClassScheduleChange')
+def unindex_class_schedule_change(sender, instance, **kwargs):
+    calendar_events.delete_for('class_change', instance.pk)
+
+
+@receiver(post_save, sender='schedule.ClassScheduleEntry')
+def reindex_class_changes_on_entry_change(sender, instance, created, **kwargs):
+    """Numele materiei din ora clasei apare în evenimentele modificărilor ei."""
+    if not created:
+        for change in instance.changes.all():
+            calendar_events.sync_class_change(change)
+
+
+@receiver(post_save, sender='subjects.Subject')
+def refresh_subject_on_events(sender, instance, created, **kwargs):
+    """Numele (și culoarea, pentru teme) materiei sunt denormalizate în index."""
+    if created:
+        return
+    CalendarEvent.objects.filter(subject=instance).update(materie=instance.nume)
+    CalendarEvent.objects.filter(subject=instance, tip='tema').update(culoare=instance.culoare)
@@ -1 +1,83 @@
- 
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import StudentProfile
+from .tracking import when_changed
+
+
+class DirtyFieldsMixinTests(TestCase):
+    """save() scrie doar câmpurile schimbate; fără schimbări nu scrie și nu trimite semnale."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('elev', password='x')
+        self.profile = StudentProfile.objects.get(user=self.user)
+        self.saves = []
+        post_save.connect(self._on_save, sender=StudentProfile)
+        self.addCleanup(post_save.disconnect, self._on_save, sender=StudentProfile)
+
+    def _on_save(self, sender, instance, **kwargs):
+        self.saves.append(instance.changed_fields())
+
+    def test_save_without_changes_is_a_no_op(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.profile.save()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.saves, [])
+
+    def test_save_writes_only_changed_fields(self):
+        old_school = self.profile.scoala
+        self.profile.clasa = '7B'
+        with CaptureQueriesContext(connection) as queries:
+            self.profile.save()
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertIn('"clasa"', sql)
+        self.assertNotIn('"scoala"', sql)
+        self.assertNotIn('"email_parinte"', sql)
+        # În post_save, changed_fields() descrie încă salvarea curentă
+        self.assertIn('clasa', self.saves[0])
+        self.assertNotIn('scoala', self.saves[0])
+        self.assertEqual(StudentProfile.objects.get(pk=self.profile.pk).clasa, '7B')
+        self.assertEqual(StudentProfile.objects.get(pk=self.profile.pk).scoala, old_school)
+
+    def test_changes_are_forgotten_after_save(self):
+        self.profile.clasa = '7B'
+        self.profile.save()
+        self.assertFalse(self.profile.has_changed())
+        self.assertEqual(self.profile.saved_values('clasa'), {'clasa': '7B'})
+        with CaptureQueriesContext(connection) as queries:
+            self.profile.save()
+        self.assertEqual(len(queries), 0)
+
+    def test_explicit_update_fields_keeps_other_changes_dirty(self):
+        self.profile.clasa = '7B'
+        self.profile.scoala = 'Școala 1'
+        self.profile.save(update_fields=['clasa'])
+        self.assertEqual(list(self.profile.changed_fields()), ['scoala'])
+        stored = StudentProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual((stored.clasa, stored.scoala), ('7B', ''))
+
+    def test_concurrent_write_is_not_overwritten_by_unrelated_save(self):
+        StudentProfile.objects.filter(pk=self.profile.pk).update(scoala='Altă școală')
+        self.profile.clasa = '8C'
+        self.profile.save()
+        self.assertEqual(StudentProfile.objects.get(pk=self.profile.pk).scoala, 'Altă școală')
+
+    def test_when_changed_filters_receivers(self):
+        calls = []
+
+        @when_changed('clasa')
+        def receiver(sender, instance, **kwargs):
+            calls.append(kwargs.get('created'))
+
+        post_save.connect(receiver, sender=StudentProfile, weak=False)
+        self.addCleanup(post_save.disconnect, receiver, sender=StudentProfile)
+        self.profile.scoala = 'Școala 2'
+        self.profile.save()
+        self.assertEqual(calls, [])
+        self.profile.clasa = '9A'
+        self.profile.save()
+        self.assertEqual(calls, [False])
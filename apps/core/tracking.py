@@ -0,0 +1,126 @@
+"""
+Urmărirea câmpurilor modificate („dirty fields”) pe instanțele modelelor.
+
+La încărcarea din baza de date se reține o copie a valorilor citite, fără
+nicio interogare în plus. Pe baza ei:
+- `save()` fără `update_fields` scrie doar câmpurile schimbate, iar dacă nu s-a
+  schimbat nimic nu scrie deloc (și nu trimite semnale);
+- receptorii pre_save/post_save pot afla valorile vechi (`saved_values`) și
+  își pot declara câmpurile de interes (`when_changed`), în loc să recitească
+  rândul la fiecare salvare.
+
+Copia valorilor este actualizată după fiecare salvare, deci în post_save
+`changed_fields()` descrie încă salvarea curentă.
+"""
+import copy
+import functools
+
+from django.db.models.fields.files import FieldFile
+
+
+def _comparable(value):
+    if isinstance(value, FieldFile):
+        return value.name or None
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class DirtyFieldsMixin:
+    """Mixin pentru modele: se pune înaintea lui models.Model."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Folosit și la încărcarea câmpurilor amânate (defer/only)
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._remember_values(fields)
+
+    def _remember_values(self, fields=None):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or fields is None:
+            loaded = self._loaded_values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields):
+                loaded[field.attname] = _comparable(self.__dict__[field.attname])
+
+    @property
+    def is_tracked(self):
+        return not self._state.adding and getattr(self, '_loaded_values', None) is not None
+
+    def changed_fields(self):
+        """{attname: valoarea veche} pentru câmpurile schimbate de la încărcare (sau ultima salvare)."""
+        if not self.is_tracked:
+            return {}
+        changed = {}
+        for field in self._meta.concrete_fields:
+            name = field.attname
+            if name not in self.__dict__:
+                continue  # câmp amânat, neîncărcat
+            if name not in self._loaded_values:
+                changed[name] = None  # valoarea veche nu e cunoscută
+            elif _comparable(self.__dict__[name]) != self._loaded_values[name]:
+                changed[name] = self._loaded_values[name]
+        return changed
+
+    def has_changed(self, *fields):
+        """True dacă s-a schimbat vreunul dintre câmpuri (toate, dacă nu se dau)."""
+        changed = self.changed_fields()
+        if not fields:
+            return bool(changed)
+        return any(self._meta.get_field(name).attname in changed for name in fields)
+
+    def saved_values(self, *fields):
+        """
+        Valorile câmpurilor (attname) așa cum sunt în baza de date, înainte de salvarea
+        curentă; None pentru o instanță nouă. Se citesc din copia reținută la încărcare,
+        iar din baza de date doar pentru instanțele construite manual cu pk.
+        """
+        if self._state.adding or self.pk is None:
+            return None
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is not None and all(name in loaded for name in fields):
+            return {name: loaded[name] for name in fields}
+        return type(self)._base_manager.filter(pk=self.pk).values(*fields).first()
+
+    def mark_saved(self, *fields):
+        """Declară câmpurile ca scrise (ex: după un `.update()` în afara lui save())."""
+        if self.is_tracked:
+            self._remember_values(fields or None)
+
+    def save(self, *args, **kwargs):
+        if self.is_tracked and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            changed = self.changed_fields()
+            update_fields = [f.name for f in self._meta.concrete_fields if f.attname in changed]
+            if update_fields:
+                # auto_now (ex: updated_at) se actualizează doar dacă se scrie ceva
+                update_fields += [
+                    f.name for f in self._meta.concrete_fields
+                    if getattr(f, 'auto_now', False) and f.name not in update_fields
+                ]
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        # Câmpurile schimbate dar nescrise (update_fields explicit) rămân „murdare”
+        self._remember_values(None if update_fields is None or not self.is_tracked else update_fields)
+
+
+def when_changed(*fields):
+    """
+    Decorator pentru receptorii pre_save/post_save: rulează doar la creare sau
+    când s-a schimbat unul dintre câmpuri. Pentru modelele fără DirtyFieldsMixin
+    receptorul rulează mereu.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(sender, instance, **kwargs):
+            tracked = isinstance(instance, DirtyFieldsMixin) and instance.is_tracked
+            if tracked and not kwargs.get('created') and not instance.has_changed(*fields):
+                return None
+            return func(sender, instance, **kwargs)
+        return wrapper
+    return decorator
@@ -26,6 +26,7 @@ urlpatterns = [
     # Statistici și overview
     path('stats/', views.quick_stats_view, name='quick_stats'),
     path('calendar/', views.calendar_overview, name='calendar_overview'),
+    path('calendar/events/', views.calendar_events_api, name='calendar_events_api'),
     # Achievements
     path('achievements/', views.achievements_view, name='achievements'),
 
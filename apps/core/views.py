@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
@@ -8,11 +9,14 @@ from django.utils import timezone
 from datetime import date, timedelta
 
 from .models import StudentProfile, Notification, Achievement, UserAchievement
+from . import calendar_events
 from .forms import StudentProfileForm, UserRegistrationForm
 from apps.subjects.models import Subject
 from apps.homework.models import Homework
+from apps.homework import planner
 from apps.grades.models import Grade, SubjectGradeStats
-from apps.schedule.models import ScheduleEntry
+from apps.schedule.grid import WeekGrid
+from apps.schedule.school_year import school_modules, school_vacations
 from django.conf import settings
 from apps.schedule.models import apply_class_schedule_to_user
 from django.contrib.auth.models import Group, Permission, User
@@ -203,13 +207,14 @@ def dashboard_view(request):
     # Orarul de astăzi
     weekday = today.isoweekday()  # 1=Luni, 7=Duminică
     if weekday <= 5:  # Luni-Vineri
-        today_schedule = ScheduleEntry.objects.filter(
-            user=user,
-            zi_saptamana=weekday
-        ).order_by('numar_ora')
+        today_schedule = WeekGrid.for_request(request).resolver.lessons_on(today)
     else:
         today_schedule = []
 
+    # Planul de studiu: următoarele zile cu blocuri planificate și temele la risc
+    plan_days, plan_at_risk = planner.study_plan(user, days=7, profile=profile, resolver=WeekGrid.for_request(request).resolver)
+    study_plan = [day for day in plan_days if day.blocuri][:2]
+
     # Notificări necitite
     unread_notifications = Notification.objects.filter(
         user=user,
@@ -266,34 +271,7 @@ def dashboard_view(request):
     except Exception:
         pass
 
-    grupa1 = {'Cluj', 'Timiș', 'Bistrița-Năsăud'}  # 9-15 feb
-    grupa2 = {
-        'București', 'Ilfov', 'Sălaj', 'Bihor', 'Arad', 'Iași', 'Hunedoara', 'Brașov',
-        'Caraș-Severin', 'Gorj', 'Vâlcea', 'Argeș', 'Dâmbovița', 'Prahova', 'Buzău',
-        'Tulcea', 'Mehedinți', 'Dolj', 'Olt', 'Teleorman', 'Ialomița', 'Călărași'
-    }  # 16-22 feb
-    grupa3 = {
-        'Satu-Mare', 'Maramureș', 'Suceava', 'Botoșani', 'Alba', 'Sibiu', 'Mureș',
-        'Harghita', 'Neamț', 'Covasna', 'Bacău', 'Vrancea', 'Vaslui', 'Galați',
-        'Brăila', 'Giurgiu', 'Constanța'
-    }  # 23 feb - 1 mar
-
-    end_m3 = date(2026, 2, 13)
-    start_m4 = date(2026, 2, 23)
-    if judet in grupa1:
-        end_m3 = date(2026, 2, 6)
-        start_m4 = date(2026, 2, 16)
-    elif judet in grupa3:
-        end_m3 = date(2026, 2, 20)
-        start_m4 = date(2026, 3, 2)
-
-    modules = [
-        (1, date(2025, 9, 8),  date(2025, 10, 24)),
-        (2, date(2025, 11, 3), date(2025, 12, 19)),
-        (3, date(2026, 1, 8),  end_m3),
-        (4, start_m4,          date(2026, 4, 3)),
-        (5, date(2026, 4, 15), date(2026, 6, 19)),
-    ]
+    modules = school_modules(judet)
 
     current_module = None
     for mnum, mstart, mend in modules:
@@ -331,15 +309,7 @@ def dashboard_view(request):
         }
 
     # Vacanțe (următoarea)
-    vac_feb_start = date(2026, 2, 9) if judet in grupa1 else (date(2026, 2, 16) if judet in grupa2 else (date(2026, 2, 23) if judet in grupa3 else date(2026, 2, 16)))
-    vac_feb_end = date(2026, 2, 15) if judet in grupa1 else (date(2026, 2, 22) if judet in grupa2 else (date(2026, 3, 1) if judet in grupa3 else date(2026, 2, 22)))
-    vacations = [
-        ('Vacanța de toamnă', date(2025, 10, 25), date(2025, 11, 2)),
-        ('Vacanța de iarnă', date(2025, 12, 20), date(2026, 1, 7)),
-        ('Vacanța mobilă din februarie', vac_feb_start, vac_feb_end),
-        ('Vacanța de primăvară', date(2026, 4, 4), date(2026, 4, 14)),
-        ('Vacanța de vară', date(2026, 6, 20), date(2026, 9, 6)),
-    ]
+    vacations = school_vacations(judet)
     next_vacation = None
     for vname, vstart, vend in vacations:
         if vstart > today:
@@ -363,6 +333,8 @@ def dashboard_view(request):
         'profile': profile,
         'stats': stats,
         'urgent_homework': urgent_homework,
+        'study_plan': study_plan,
+        'study_plan_at_risk': plan_at_risk,
         'today_homework': today_homework,
         'recent_grades': recent_grades,
         'recent_absences': recent_absences,
@@ -521,33 +493,11 @@ def calendar_overview(request):
     user = request.user
     today = date.today()
 
-    # Evenimente următoarele 30 zile
-    events = []
-
-    # Teme
-    upcoming_homework = Homework.objects.filter(
-        user=user,
-        finalizata=False,
-        deadline__gte=today,
-        deadline__lte=today + timedelta(days=30)
-    )
-
-    for hw in upcoming_homework:
-        events.append({
-            'date': hw.deadline,
-            'type': 'homework',
-            'title': f"Temă: {hw.titlu}",
-            'subject': hw.subject.nume,
-            'color': hw.subject.culoare,
-            'priority': hw.prioritate,
-            'url': f"/teme/{hw.id}/"
-        })
-
-    # Testele importante (din note programate)
-    # Acest lucru ar putea fi extins cu un model separat pentru teste programate
-
-    # Sortează evenimentele pe dată
-    events.sort(key=lambda x: x['date'])
+    # Evenimente următoarele 30 zile, din indexul calendarului (o singură interogare)
+    events = [
+        e for e in calendar_events.events_between(user, today, today + timedelta(days=30))
+        if not (e.tip == 'tema' and e.finalizat)
+    ]
 
     context = {
         'events': events,
@@ -557,6 +507,21 @@ def calendar_overview(request):
     return render(request, 'core/calendar_overview.html', context)
 
 
+@login_required
+def calendar_events_api(request):
+    """Evenimentele unei luni ca JSON (încărcate leneș de vizualizarea lunară)."""
+    today = date.today()
+    try:
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+        date(year, month, 1)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Lună invalidă'}, status=400)
+
+    tipuri = [t for t in request.GET.get('types', '').split(',') if t] or None
+    return JsonResponse(calendar_events.month_payload(request.user, year, month, tipuri))
+
+
 @login_required
 def roles_overview_view(request):
     """UI simplă pentru administrarea rolurilor și permisiunilor (doar superadmin)."""
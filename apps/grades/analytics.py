@@ -0,0 +1,179 @@
+"""
+Analiza notelor unui utilizator, pentru paginile de statistici (note și materie).
+
+Notele și absențele utilizatorului se citesc o singură dată, ca tablou compact
+pe coloane (materia, ziua ca ordinal, valoarea în sutimi, tipul ca cod), iar
+distribuția, seria lunară, mediile pe materii și absențele se calculează
+dintr-o singură trecere peste el. Atât tabloul, cât și rezultatele stau în
+cache per versiune (GradeVersion), incrementată de semnalele de mai jos la
+orice scriere relevantă.
+"""
+from array import array
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.tracking import when_changed
+from .models import Grade, GradeVersion
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+MONTHS = 6
+RECENT_GRADES = 10
+TIP_CODES = {tip: code for code, (tip, _) in enumerate(Grade.GRADE_TYPES)}
+NOTA = TIP_CODES['nota']
+ABSENTA = TIP_CODES['absenta']
+ABSENTA_MOTIVATA = TIP_CODES['absenta_motivata']
+# Valoarea lipsă (absențe, întârzieri) în coloana de sutimi
+NO_VALUE = -1
+
+
+# --- Versiune ---
+
+def grade_version(user_id):
+    """Versiunea curentă; contorul se creează la prima citire, înaintea oricărei chei de cache."""
+    return GradeVersion.objects.get_or_create(user_id=user_id)[0].version
+
+
+def bump(user_id):
+    """
+    Invalidează analizele utilizatorului. Doar UPDATE: fără contor nu există nimic
+    în cache, iar la ștergerea utilizatorului (cascadă) nu se recreează rândul.
+    """
+    GradeVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+# --- Tabloul pe coloane ---
+
+def _hundredths(value):
+    return NO_VALUE if value is None else int(value * 100)
+
+
+def _decimal(hundredths):
+    return Decimal(hundredths).scaleb(-2)
+
+
+def load_columns(user_id):
+    """Notele și absențele utilizatorului, cronologic, ca dict de array-uri (o singură interogare)."""
+    columns = {'subject': array('q'), 'day': array('l'), 'value': array('h'), 'tip': array('b')}
+    rows = (
+        Grade.objects.filter(user_id=user_id)
+        .order_by('data', 'created_at', 'pk')
+        .values_list('subject_id', 'data', 'valoare', 'tip')
+    )
+    for subject_id, day, value, tip in rows:
+        columns['subject'].append(subject_id)
+        columns['day'].append(day.toordinal())
+        columns['value'].append(_hundredths(value))
+        columns['tip'].append(TIP_CODES.get(tip, NOTA))
+    return columns
+
+
+def columns_for(user_id, version):
+    key = f"grades:analytics:columns:{user_id}:{version}"
+    columns = cache.get(key)
+    if columns is None:
+        columns = load_columns(user_id)
+        cache.set(key, columns, CACHE_TIMEOUT)
+    return columns
+
+
+# --- Calcul ---
+
+def month_starts(count, today):
+    """Primele zile ale ultimelor `count` luni calendaristice, crescător (inclusiv luna curentă)."""
+    index = today.year * 12 + today.month - 1
+    return [date((index - i) // 12, (index - i) % 12 + 1, 1) for i in range(count - 1, -1, -1)]
+
+
+def _average(total, count):
+    return (_decimal(total) / count).quantize(Decimal('0.01')) if count else None
+
+
+def summarize(columns, today=None, subject_id=None, months=MONTHS):
+    """
+    Distribuția, seria lunară, mediile pe materii și absențele, dintr-o singură
+    trecere; doar pentru o materie, dacă se dă `subject_id`.
+    """
+    today = today or date.today()
+    starts = month_starts(months, today)
+    month_index = {(start.year, start.month): i for i, start in enumerate(starts)}
+    first_day = starts[0].toordinal()
+
+    distribution = {i: 0 for i in range(1, 11)}
+    month_totals = [[0, 0] for _ in starts]
+    subjects = {}
+    notes = {'count': 0, 'total': 0, 'max': None, 'min': None}
+    absences = {'total': 0, 'motivated': 0, 'unmotivated': 0}
+    recent = []
+
+    for sid, day, value, tip in zip(columns['subject'], columns['day'], columns['value'], columns['tip']):
+        if subject_id is not None and sid != subject_id:
+            continue
+        if tip == NOTA and value != NO_VALUE:
+            notes['count'] += 1
+            notes['total'] += value
+            notes['max'] = value if notes['max'] is None else max(notes['max'], value)
+            notes['min'] = value if notes['min'] is None else min(notes['min'], value)
+            distribution[min(max(value // 100, 1), 10)] += 1
+            per_subject = subjects.setdefault(sid, [0, 0])
+            per_subject[0] += 1
+            per_subject[1] += value
+            if day >= first_day:
+                d = date.fromordinal(day)
+                i = month_index.get((d.year, d.month))
+                if i is not None:
+                    month_totals[i][0] += 1
+                    month_totals[i][1] += value
+            recent.append((day, value))
+        elif tip in (ABSENTA, ABSENTA_MOTIVATA):
+            absences['total'] += 1
+            absences['motivated' if tip == ABSENTA_MOTIVATA else 'unmotivated'] += 1
+
+    return {
+        'count': notes['count'],
+        'average': _average(notes['total'], notes['count']),
+        'highest': _decimal(notes['max']) if notes['max'] is not None else None,
+        'lowest': _decimal(notes['min']) if notes['min'] is not None else None,
+        'distribution': distribution,
+        'months': [{
+            'month': start.strftime('%b %Y'),
+            'average': _average(total, count) or 0,
+            'count': count,
+        } for start, (count, total) in zip(starts, month_totals)],
+        'subjects': {sid: {'count': count, 'average': _average(total, count)} for sid, (count, total) in subjects.items()},
+        'absences': absences,
+        'recent': [{'valoare': _decimal(value), 'data': date.fromordinal(day)} for day, value in recent[-RECENT_GRADES:]],
+    }
+
+
+def grade_summary(user, subject_id=None, today=None):
+    """Rezumatul notelor utilizatorului, din cache cât timp versiunea nu se schimbă."""
+    today = today or date.today()
+    version = grade_version(user.pk)
+    key = f"grades:analytics:{user.pk}:{version}:{subject_id or 'all'}:{today.isoformat()}"
+    summary = cache.get(key)
+    if summary is None:
+        summary = summarize(columns_for(user.pk, version), today, subject_id)
+        cache.set(key, summary, CACHE_TIMEOUT)
+    return summary
+
+
+# --- Invalidare ---
+
+@receiver(post_save, sender=Grade)
+@when_changed('user', 'subject', 'data', 'valoare', 'tip')
+def invalidate_analytics_on_save(sender, instance: Grade, **kwargs):
+    # changed_fields() descrie încă salvarea curentă (ex: nota mutată la alt utilizator din admin)
+    for user_id in {instance.user_id, instance.changed_fields().get('user_id')} - {None}:
+        bump(user_id)
+
+
+@receiver(post_delete, sender=Grade)
+def invalidate_analytics_on_delete(sender, instance: Grade, **kwargs):
+    bump(instance.user_id)
@@ -8,5 +8,5 @@ class GradesConfig(AppConfig):
     verbose_name = 'Note și Absențe'
 
     def ready(self):
-        # Import signals pentru auto-calculare statistici
-        from . import signals  # noqa: F401
\ No newline at end of file
+        # Import signals pentru auto-calculare statistici și invalidarea analizelor
+        from . import analytics, signals  # noqa: F401
\ No newline at end of file
@@ -492,10 +492,10 @@ class GradeImportForm(forms.Form):
     """Form pentru importul notelor din fișier"""
 
     file = forms.FileField(
-        validators=[FileExtensionValidator(allowed_extensions=['csv', 'xlsx', 'xls'])],
+        validators=[FileExtensionValidator(allowed_extensions=['csv', 'xlsx'])],
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.csv,.xlsx,.xls'
+            'accept': '.csv,.xlsx'
         }),
         label='Fișier import',
         help_text='Format acceptat: CSV sau Excel cu coloane: Materie, Tip, Valoare, Data, Modul, Descriere'
@@ -507,7 +507,7 @@ class GradeImportForm(forms.Form):
             'class': 'form-check-input'
         }),
         label='Suprascrie notele existente',
-        help_text='Dacă o notă cu aceeași dată și materie există, o va actualiza'
+        help_text='Dacă o notă cu aceeași materie, dată și tip există, o va actualiza'
     )
 
     create_subjects = forms.BooleanField(
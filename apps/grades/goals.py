@@ -0,0 +1,85 @@
+"""
+Progresul obiectivelor de note.
+
+Media curentă și numărul de note vin din SubjectGradeStats, iar suma exactă
+a notelor dintr-o subinterogare pe Grade, toate alăturate obiectivelor în
+aceeași interogare (`with_progress`), deci o listă de obiective costă o
+singură interogare indiferent de lungime. Numărul de note necesare se obține
+direct din ecuația mediei, pentru orice notă v peste țintă; se folosește suma
+S a celor k note, nu media rotunjită la două zecimale (8, 8, 9 au media
+stocată 8.33, iar 3·8.33 < 25 ar cere o notă în plus):
+
+    (S + n·v) / (k + n) ≥ ținta  ⇔  n ≥ (k·ținta − S) / (v − ținta)
+
+Starea „atins” se actualizează set-wise (`update_goals`), după fiecare
+scriere a notelor (services.py).
+"""
+import math
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.utils import timezone
+
+from .models import Grade, GradeGoal, SubjectGradeStats
+
+
+def with_progress(goals):
+    """
+    Adnotează obiectivele cu media (`media_curenta`) și numărul de note (`note_curente`)
+    din modul, plus suma exactă a notelor (`suma_note`).
+    """
+    stats = SubjectGradeStats.objects.filter(
+        user=OuterRef('user'), subject=OuterRef('subject'), semester=OuterRef('semester')
+    )
+    total = Grade.objects.filter(
+        user=OuterRef('user'), subject=OuterRef('subject'), semestru=OuterRef('semester__numar'),
+        tip='nota', valoare__isnull=False,
+    ).values('subject').annotate(total=Sum('valoare')).values('total')
+    return goals.annotate(
+        media_curenta=Subquery(stats.values('media')[:1]),
+        note_curente=Subquery(stats.values('numar_note')[:1]),
+        suma_note=Subquery(total[:1]),
+    )
+
+
+def goals_with_progress(user, semester):
+    """Obiectivele utilizatorului pentru modul, cu materia și progresul (o singură interogare)."""
+    if semester is None:
+        return GradeGoal.objects.none()
+    return with_progress(GradeGoal.objects.filter(user=user, semester=semester).select_related('subject'))
+
+
+def grades_needed(total, count, target, value=10):
+    """
+    Câte note de `value` mai trebuie pentru media `target`, pornind de la suma
+    exactă `total` a celor `count` note: 0 dacă e deja atinsă, None dacă nu se
+    poate atinge cu note de `value`, cel puțin 1 fără note.
+    """
+    target, value = Decimal(target), Decimal(value)
+    if total is not None and count and Decimal(total) >= target * count:
+        return 0
+    if value < target or (value == target and count):
+        return None
+    if total is None or not count:
+        return 1
+    return max(1, math.ceil((target * count - Decimal(total)) / (value - target)))
+
+
+def update_goals(user_id, subject_id, semester_id, media):
+    """Obiectivele atinse/pierdute după noua medie a perechii (materie, modul), într-un singur UPDATE."""
+    goals = GradeGoal.objects.filter(user_id=user_id, subject_id=subject_id, semester_id=semester_id)
+    if media is None:
+        goals.filter(atins=True).update(atins=False, data_atins=None, updated_at=timezone.now())
+        return
+    reached = Q(media_dorita__lte=media)
+    # data_atins înaintea lui atins: se citește starea veche a obiectivului
+    goals.update(
+        data_atins=Case(
+            When(reached & Q(atins=True), then=F('data_atins')),
+            When(reached, then=Value(date.today())),
+            default=None,
+        ),
+        atins=Case(When(reached, then=Value(True)), default=Value(False)),
+        updated_at=timezone.now(),
+    )
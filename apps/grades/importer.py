@@ -0,0 +1,258 @@
+"""
+Import în masă al notelor și absențelor din catalog (CSV/XLSX).
+
+Fișierul se citește în flux (openpyxl read-only, prin lectorul importului de
+orar), iar rândurile se validează în memorie. Materiile se potrivesc după nume
+normalizat (fără diacritice, majuscule și spații multiple), apoi după
+abrevieri („Lb. rom.” → „Limba română”) și, la nevoie, aproximativ (difflib);
+fiecare nume distinct se rezolvă o singură dată. Duplicatele se caută cu o
+singură interogare pentru tot lotul, iar notele valide se salvează împreună
+prin services.import_grades. Erorile sunt raportate per rând.
+"""
+import difflib
+import re
+import unicodedata
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from apps.schedule.importer import ImportResult, read_rows
+from apps.subjects.models import Subject
+from . import services
+from .models import Grade, Semester
+
+
+# Coloane acceptate (după normalizare) -> câmp intern
+COLUMN_ALIASES = {
+    'materie': 'subject', 'materia': 'subject', 'disciplina': 'subject', 'subject': 'subject',
+    'tip': 'tip', 'type': 'tip',
+    'valoare': 'valoare', 'nota': 'valoare', 'value': 'valoare', 'grade': 'valoare',
+    'data': 'data', 'date': 'data',
+    'modul': 'semestru', 'modulul': 'semestru', 'semestru': 'semestru', 'module': 'semestru',
+    'evaluare': 'tip_evaluare', 'tip_evaluare': 'tip_evaluare',
+    'descriere': 'descriere', 'observatii': 'descriere', 'description': 'descriere',
+}
+TIP_ALIASES = {
+    'nota': 'nota', 'n': 'nota', 'grade': 'nota',
+    'absenta': 'absenta', 'abs': 'absenta', 'a': 'absenta', 'absenta nemotivata': 'absenta',
+    'absenta motivata': 'absenta_motivata', 'motivata': 'absenta_motivata', 'am': 'absenta_motivata',
+    'intarziere': 'intarziere', 'i': 'intarziere',
+}
+ASSESSMENT_ALIASES = {
+    **{key: key for key, _ in Grade.ASSESSMENT_TYPES},
+    'lucrare': 'test', 'lucrare scrisa': 'test', 'extemporal': 'test',
+    'ascultare': 'oral', 'recitare': 'oral',
+    'tema pentru acasa': 'tema',
+}
+DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y', '%d.%m.%y', '%d-%m-%Y')
+# Pragul de similaritate pentru potrivirea aproximativă a materiilor
+FUZZY_CUTOFF = 0.8
+DEFAULT_COLOR = '#007bff'
+
+
+class GradeImportResult(ImportResult):
+    def __init__(self):
+        super().__init__()
+        self.updated = 0
+        self.matched = {}  # nume din fișier -> materia găsită (doar potrivirile aproximative)
+
+
+def _fold(value):
+    """Numele materiei fără diacritice, cu litere mici și spații simple."""
+    value = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^\w\s.]', ' ', value.lower()).split())
+
+
+def _abbreviates(short, word):
+    """„lb” abreviază „limba”: aceeași inițială, iar literele apar în ordine în cuvânt."""
+    letters = iter(word)
+    return short[:1] == word[:1] and all(ch in letters for ch in short)
+
+
+def _is_abbreviation(name, subject):
+    """„lb. rom.” se potrivește cu „limba romana”: cuvânt cu cuvânt, în ordine."""
+    short = [w.rstrip('.') for w in name.split()]
+    full = subject.replace('.', ' ').split()
+    return len(short) == len(full) and all(w and _abbreviates(w, f) for w, f in zip(short, full))
+
+
+class SubjectMatcher:
+    """Rezolvă numele din catalog la materiile utilizatorului (cu memoizare per nume)."""
+
+    def __init__(self, user, create=True):
+        self.user = user
+        self.create = create
+        self.subjects = {_fold(s.nume): s for s in Subject.objects.filter(user=user)}
+        self.new = {}
+        self.fuzzy = {}
+        self._cache = {}
+
+    def match(self, name):
+        key = _fold(name)
+        if key not in self._cache:
+            self._cache[key] = self._resolve(name, key)
+        return self._cache[key]
+
+    def _resolve(self, name, key):
+        if not key:
+            raise ValueError("Lipsește materia")
+        if key in self.subjects:
+            return key
+        candidates = [k for k in self.subjects if _is_abbreviation(key, k)]
+        if len(candidates) != 1:
+            candidates = difflib.get_close_matches(key, self.subjects, n=1, cutoff=FUZZY_CUTOFF)
+        if candidates:
+            self.fuzzy[name] = self.subjects[candidates[0]].nume
+            return candidates[0]
+        if not self.create:
+            raise ValueError(f"Materia „{name}” nu există")
+        self.new.setdefault(key, Subject(user=self.user, nume=name[:100], culoare=DEFAULT_COLOR, activa=True))
+        return key
+
+    def save_new(self):
+        """Creează materiile noi (bulk) și întoarce {cheie: materie} pentru toate."""
+        if self.new:
+            Subject.objects.bulk_create(self.new.values(), ignore_conflicts=True)
+            self.subjects = {_fold(s.nume): s for s in Subject.objects.filter(user=self.user)}
+        return self.subjects
+
+
+def _parse_tip(data):
+    if 'tip' not in data:
+        return 'nota' if 'valoare' in data else 'absenta'
+    tip = TIP_ALIASES.get(_fold(data['tip']).replace('_', ' ').rstrip('.'))
+    if tip is None:
+        raise ValueError(f"Tip invalid: {data['tip']}")
+    return tip
+
+
+def _parse_value(value):
+    try:
+        number = Decimal(str(value).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"Notă invalidă: {value}")
+    if not Decimal(1) <= number <= Decimal(10):
+        raise ValueError(f"Nota trebuie să fie între 1 și 10: {value}")
+    return number.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Dată invalidă: {value}")
+
+
+def _parse_module(value, day, modules):
+    if value is None:
+        # Modulul început cel mai recent până la dată (în vacanță: modulul abia încheiat)
+        started = [m for m in modules if m.data_inceput <= day]
+        if not started:
+            raise ValueError(f"Data {day:%d.%m.%Y} este înaintea primului modul; completează coloana Modul")
+        return max(started, key=lambda m: m.data_inceput).numar
+    try:
+        numar = int(float(str(value).strip()))
+    except ValueError:
+        raise ValueError(f"Modul invalid: {value}")
+    if not 1 <= numar <= 5:
+        raise ValueError(f"Modulul trebuie să fie între 1 și 5: {value}")
+    return numar
+
+
+def parse_row(data, modules):
+    """Câmpurile notei dintr-un rând (fără materie); ValueError cu mesajul pentru raport."""
+    tip = _parse_tip(data)
+    valoare = _parse_value(data['valoare']) if tip == 'nota' and 'valoare' in data else None
+    if tip == 'nota' and valoare is None:
+        raise ValueError("Notele trebuie să aibă o valoare")
+    if 'data' not in data:
+        raise ValueError("Lipsește data")
+    day = _parse_date(data['data'])
+    if day > date.today():
+        raise ValueError(f"Data {day:%d.%m.%Y} este în viitor")
+    return {
+        'tip': tip,
+        'valoare': valoare,
+        'data': day,
+        'semestru': _parse_module(data.get('semestru'), day, modules),
+        'tip_evaluare': ASSESSMENT_ALIASES.get(_fold(data.get('tip_evaluare', '')), '') if tip == 'nota' else '',
+        'descriere': str(data.get('descriere', '')).strip()[:200],
+        'motivata': tip == 'absenta_motivata',
+    }
+
+
+def _existing_grades(user, subject_ids, days):
+    """Notele existente care pot fi duplicate ale lotului, {(materie, dată, tip): [note]} — o interogare."""
+    existing = {}
+    if not subject_ids:
+        return existing
+    grades = Grade.objects.filter(
+        user=user, subject_id__in=subject_ids, data__gte=min(days), data__lte=max(days),
+    ).select_related('subject').order_by('pk')
+    for grade in grades:
+        existing.setdefault((grade.subject_id, grade.data, grade.tip), []).append(grade)
+    return existing
+
+
+def import_grades(user, uploaded, overwrite_existing=False, create_subjects=True):
+    """
+    Importă notele/absențele utilizatorului din catalog. Rândurile identice cu o
+    notă existentă (sau cu un rând anterior) sunt raportate și sărite; cu
+    `overwrite_existing`, nota existentă cu aceeași materie, dată și tip se actualizează.
+    """
+    result = GradeImportResult()
+    matcher = SubjectMatcher(user, create=create_subjects)
+    modules = list(Semester.objects.filter(user=user)) or list(services.ensure_modules_2025_2026(user))
+    parsed = []
+    for row_no, data in read_rows(uploaded, COLUMN_ALIASES):
+        try:
+            key = matcher.match(str(data.get('subject', '')).strip())
+            fields = parse_row(data, modules)
+        except ValueError as exc:
+            result.error(row_no, str(exc))
+            continue
+        parsed.append((row_no, key, fields))
+    result.matched = matcher.fuzzy
+    if not parsed:
+        return result
+
+    subjects = matcher.save_new()
+    existing = _existing_grades(
+        user,
+        {subjects[key].pk for _, key, _ in parsed},
+        [fields['data'] for *_, fields in parsed],
+    )
+    new_grades, updated, moved_keys, seen = [], {}, [], set()
+    for row_no, key, fields in parsed:
+        subject = subjects[key]
+        identity = (subject.pk, fields['data'], fields['tip'], fields['valoare'])
+        matches = existing.get(identity[:3], [])
+        if identity in seen:
+            result.error(row_no, f"Rând duplicat în fișier ({subject.nume}, {fields['data']:%d.%m.%Y})")
+            continue
+        seen.add(identity)
+        if overwrite_existing and matches:
+            grade = matches[0]
+            if grade.pk in updated:
+                result.error(row_no, f"Nota din {fields['data']:%d.%m.%Y} la {subject.nume} a fost deja actualizată de alt rând")
+                continue
+            moved_keys.append((grade.subject_id, grade.semestru))
+            for name, value in fields.items():
+                setattr(grade, name, value)
+            updated[grade.pk] = grade
+        elif any(g.valoare == fields['valoare'] for g in matches):
+            result.error(row_no, f"Există deja ({subject.nume}, {fields['data']:%d.%m.%Y})")
+        else:
+            new_grades.append(Grade(subject=subject, **fields))
+
+    services.import_grades(user, new_grades, list(updated.values()), moved_keys)
+    result.created = len(new_grades)
+    result.updated = len(updated)
+    result.errors.sort()
+    return result
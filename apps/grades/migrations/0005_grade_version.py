@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('grades', '0004_alter_semester_options_alter_grade_semestru_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grade_version', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Versiune Note',
+                'verbose_name_plural': 'Versiuni Note',
+            },
+        ),
+    ]
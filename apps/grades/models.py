@@ -1,12 +1,15 @@
 from django.db import models
+from django.db.models import Avg, Count, Max, Min, Q, Subquery, Sum
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from apps.subjects.models import Subject
+from apps.core.tracking import DirtyFieldsMixin
 from datetime import date
+from decimal import Decimal
 
 
-class Grade(models.Model):
+class Grade(DirtyFieldsMixin, models.Model):
     """
     Model pentru note și absențe
     """
@@ -228,60 +231,40 @@ class SubjectGradeStats(models.Model):
     def __str__(self):
         return f"{self.subject.nume} - {self.semester} - Media: {self.media or 'N/A'}"
 
+    @staticmethod
+    def compute(user_id, subject_id, numar):
+        """
+        Valorile statisticilor unei materii în modulul `numar`: un singur agregat
+        și, de la 3 note în sus, încă o interogare pentru tendință.
+        """
+        grades = Grade.objects.filter(user_id=user_id, subject_id=subject_id, semestru=numar)
+        notes = Q(tip='nota', valoare__isnull=False)
+        values = grades.aggregate(
+            numar_note=Count('pk', filter=notes),
+            media=Avg('valoare', filter=notes),
+            nota_maxima=Max('valoare', filter=notes),
+            nota_minima=Min('valoare', filter=notes),
+            numar_absente=Count('pk', filter=Q(tip='absenta')),
+            numar_absente_motivate=Count('pk', filter=Q(tip='absenta_motivata')),
+            numar_intarzieri=Count('pk', filter=Q(tip='intarziere')),
+        )
+
+        # Tendința: prima vs. ultima dintre ultimele 3 note (cronologic)
+        values['tendinta'] = 'neconcludenta'
+        if values['numar_note'] >= 3:
+            latest, _, first = grades.filter(notes).order_by('-data', '-created_at').values_list('valoare', flat=True)[:3]
+            if first < latest:
+                values['tendinta'] = 'crescatoare'
+            elif first > latest:
+                values['tendinta'] = 'descrescatoare'
+            else:
+                values['tendinta'] = 'stabila'
+        return values
+
     def calculeaza_statistici(self):
         """Recalculează toate statisticile pentru această materie în semestru"""
-        # Notele din acest semestru
-        note = Grade.objects.filter(
-            user=self.user,
-            subject=self.subject,
-            tip='nota',
-            semestru=self.semester.numar
-        ).exclude(valoare__isnull=True).values_list('valoare', flat=True)
-
-        if note:
-            self.numar_note = len(note)
-            self.media = sum(note) / len(note)
-            self.nota_maxima = max(note)
-            self.nota_minima = min(note)
-
-            # Calculează tendința (pe ultimele 3 note)
-            if len(note) >= 3:
-                ultimele_note = list(note)[-3:]
-                if ultimele_note[0] < ultimele_note[-1]:
-                    self.tendinta = 'crescatoare'
-                elif ultimele_note[0] > ultimele_note[-1]:
-                    self.tendinta = 'descrescatoare'
-                else:
-                    self.tendinta = 'stabila'
-        else:
-            self.numar_note = 0
-            self.media = None
-            self.nota_maxima = None
-            self.nota_minima = None
-            self.tendinta = 'neconcludenta'
-
-        # Absențe și întârzieri
-        self.numar_absente = Grade.objects.filter(
-            user=self.user,
-            subject=self.subject,
-            tip='absenta',
-            semestru=self.semester.numar
-        ).count()
-
-        self.numar_absente_motivate = Grade.objects.filter(
-            user=self.user,
-            subject=self.subject,
-            tip='absenta_motivata',
-            semestru=self.semester.numar
-        ).count()
-
-        self.numar_intarzieri = Grade.objects.filter(
-            user=self.user,
-            subject=self.subject,
-            tip='intarziere',
-            semestru=self.semester.numar
-        ).count()
-
+        for name, value in self.compute(self.user_id, self.subject_id, self.semester.numar).items():
+            setattr(self, name, value)
         self.save()
 
     @property
@@ -350,73 +333,62 @@ class GradeGoal(models.Model):
     def __str__(self):
         return f"{self.subject.nume} - Obiectiv: {self.media_dorita}"
 
+    def _progress(self):
+        """
+        (media, număr note, suma notelor) din adnotările goals.with_progress sau,
+        fără ele, dintr-o singură citire a notelor din modul.
+        """
+        if not hasattr(self, 'suma_note'):
+            stats = Grade.objects.filter(
+                user_id=self.user_id, subject_id=self.subject_id, tip='nota', valoare__isnull=False,
+                semestru=Subquery(Semester.objects.filter(pk=self.semester_id).values('numar')[:1]),
+            ).aggregate(media=Avg('valoare'), numar_note=Count('pk'), suma=Sum('valoare'))
+            media = stats['media']
+            self.media_curenta = Decimal(media).quantize(Decimal('0.01')) if media is not None else None
+            self.note_curente = stats['numar_note']
+            self.suma_note = stats['suma']
+        return self.media_curenta, self.note_curente or 0, self.suma_note
+
     def verifica_obiectiv(self):
         """Verifică dacă obiectivul a fost atins"""
-        try:
-            stats = SubjectGradeStats.objects.get(
-                user=self.user,
-                subject=self.subject,
-                semester=self.semester
-            )
-            if stats.media and stats.media >= self.media_dorita:
-                if not self.atins:
-                    self.atins = True
-                    self.data_atins = date.today()
-                    self.save()
-                return True
-            else:
-                if self.atins:
-                    self.atins = False
-                    self.data_atins = None
-                    self.save()
-                return False
-        except SubjectGradeStats.DoesNotExist:
-            return False
+        from .goals import update_goals
+        media, _, _ = self._progress()
+        update_goals(self.user_id, self.subject_id, self.semester_id, media)
+        self.refresh_from_db(fields=['atins', 'data_atins'])
+        return self.atins
 
     @property
     def diferenta_de_media(self):
         """Calculează diferența față de media actuală"""
-        try:
-            stats = SubjectGradeStats.objects.get(
-                user=self.user,
-                subject=self.subject,
-                semester=self.semester
-            )
-            if stats.media:
-                return float(self.media_dorita) - float(stats.media)
-        except SubjectGradeStats.DoesNotExist:
-            pass
+        media, _, _ = self._progress()
+        if media:
+            return float(self.media_dorita) - float(media)
         return float(self.media_dorita)  # Dacă nu are note încă
 
+    def note_necesare_cu(self, valoare=10):
+        """Câte note de `valoare` sunt necesare pentru a atinge obiectivul (None dacă nu se poate)"""
+        from .goals import grades_needed
+        _, numar, suma = self._progress()
+        return grades_needed(suma, numar, self.media_dorita, valoare)
+
     @property
     def note_necesare(self):
         """Estimează câte note de 10 ar fi necesare pentru a atinge obiectivul"""
-        try:
-            stats = SubjectGradeStats.objects.get(
-                user=self.user,
-                subject=self.subject,
-                semester=self.semester
-            )
-            if stats.media and stats.numar_note > 0:
-                diferenta = self.diferenta_de_media
-                if diferenta <= 0:
-                    return 0
-
-                # Calcul aproximativ: câte note de 10 sunt necesare
-                suma_actuala = float(stats.media) * stats.numar_note
-                note_necesare = 0
-
-                while True:
-                    note_necesare += 1
-                    suma_noua = suma_actuala + 10  # adaugă o notă de 10
-                    media_noua = suma_noua / (stats.numar_note + note_necesare)
-                    if media_noua >= float(self.media_dorita):
-                        break
-                    suma_actuala = suma_noua
-                    if note_necesare > 10:  # limitare pentru a evita loop infinit
-                        break
-
-                return note_necesare
-        except SubjectGradeStats.DoesNotExist:
-            pass
-        return 1  # Estimare minimă
\ No newline at end of file
+        return self.note_necesare_cu(10)
+
+
+class GradeVersion(models.Model):
+    """
+    Versiunea notelor unui utilizator. Incrementată de semnale la orice
+    adăugare/modificare/ștergere; face parte din cheia de cache a analizelor (analytics.py).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='grade_version')
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versiune Note"
+        verbose_name_plural = "Versiuni Note"
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
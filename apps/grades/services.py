@@ -0,0 +1,366 @@
+"""
+Scrierea notelor și absențelor: adăugare (formular sau rapidă), editare,
+ștergere și motivare trec prin același flux, într-o singură tranzacție și cu
+un număr fix de interogări, indiferent de calea de intrare:
+
+1. modulul (Semester) se determină o singură dată per (materie, modul) afectat;
+2. statisticile materiei în modul se recalculează doar pentru perechea afectată
+   (la mutarea unei note: și pentru cea veche), dintr-un singur agregat;
+3. obiectivele perechii se actualizează set-wise, cu un singur UPDATE (goals.py);
+4. notificările se inserează împreună (bulk_create);
+5. achievement-urile se evaluează dintr-un singur agregat;
+6. emailul către părinte se pune în coadă și pleacă după commit.
+
+Importul din catalog (importer.py) folosește aceiași pași, o singură dată
+pentru tot lotul (`import_grades`), fără notificări și emailuri.
+
+Receptorul post_save de achievement-uri (signals.py) nu mai rulează cât timp
+fluxul este activ; scrierile din afara lui (ex: admin) îl declanșează în continuare.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from apps.core import calendar_events
+from apps.core.models import Achievement, Notification, StudentProfile, UserAchievement
+from . import analytics, goals
+from .models import Grade, Semester, SubjectGradeStats
+
+
+ABSENCE_TYPES = ('absenta', 'absenta_motivata')
+# Notele care primesc notificare: (condiție, titlu, mesaj)
+GRADE_NOTIFICATIONS = (
+    (lambda v: v >= 9, 'Notă excelentă!', 'Felicitări! Ai primit {valoare} la {materie}!'),
+    (lambda v: v < 5, 'Atenție la nota slabă', 'Ai primit {valoare} la {materie}. E timpul să lucrezi mai mult!'),
+)
+
+_pipeline = threading.local()
+
+
+@contextmanager
+def _running():
+    previous = getattr(_pipeline, 'active', False)
+    _pipeline.active = True
+    try:
+        yield
+    finally:
+        _pipeline.active = previous
+
+
+def pipeline_active():
+    """Receptorii post_save ai notelor nu fac nimic: fluxul de mai jos face aceiași pași set-wise."""
+    return getattr(_pipeline, 'active', False)
+
+
+# --- Module ---
+
+def ensure_modules_2025_2026(user):
+    """Creează/actualizează modulele 1–5 pentru anul școlar 2025–2026 pentru utilizator.
+    Modulul 3/4 se ajustează în funcție de județul clasei elevului (vacanța mobilă din februarie).
+    Dacă județul lipsește, se folosește varianta mediană (încheiere 13 feb, reluare 23 feb).
+    """
+    # Determină județul (dacă există) din clasa profilului elevului
+    judet = None
+    try:
+        profile = getattr(user, 'student_profile', None)
+        if profile and profile.class_room and profile.class_room.judet:
+            judet = profile.class_room.judet.strip()
+    except Exception:
+        judet = None
+
+    grupa1 = {'Cluj', 'Timiș', 'Bistrița-Năsăud'}  # 9-15 feb
+    grupa2 = {
+        'București', 'Ilfov', 'Sălaj', 'Bihor', 'Arad', 'Iași', 'Hunedoara', 'Brașov',
+        'Caraș-Severin', 'Gorj', 'Vâlcea', 'Argeș', 'Dâmbovița', 'Prahova', 'Buzău',
+        'Tulcea', 'Mehedinți', 'Dolj', 'Olt', 'Teleorman', 'Ialomița', 'Călărași'
+    }  # 16-22 feb
+    grupa3 = {
+        'Satu-Mare', 'Maramureș', 'Suceava', 'Botoșani', 'Alba', 'Sibiu', 'Mureș',
+        'Harghita', 'Neamț', 'Covasna', 'Bacău', 'Vrancea', 'Vaslui', 'Galați',
+        'Brăila', 'Giurgiu', 'Constanța'
+    }  # 23 feb - 1 mar
+
+    # Datele implicite (varianta mediană)
+    end_m3 = date(2026, 2, 13)
+    start_m4 = date(2026, 2, 23)
+    if judet in grupa1:
+        end_m3 = date(2026, 2, 6)
+        start_m4 = date(2026, 2, 16)
+    elif judet in grupa3:
+        end_m3 = date(2026, 2, 20)
+        start_m4 = date(2026, 3, 2)
+
+    modules = [
+        (1, date(2025, 9, 8),  date(2025, 10, 24)),
+        (2, date(2025, 11, 3), date(2025, 12, 19)),
+        (3, date(2026, 1, 8),  end_m3),
+        (4, start_m4,          date(2026, 4, 3)),
+        (5, date(2026, 4, 15), date(2026, 6, 19)),
+    ]
+    for numar, start, end in modules:
+        obj, created = Semester.objects.update_or_create(
+            user=user, an_scolar='2025-2026', numar=numar,
+            defaults={'data_inceput': start, 'data_sfarsit': end}
+        )
+    return Semester.objects.filter(user=user, an_scolar='2025-2026').order_by('numar')
+
+
+def resolve_semester(user, numar):
+    """Modulul cu numărul dat: cel activ, altfel cel mai recent (creează modulele dacă lipsesc)."""
+    semester = Semester.objects.filter(user=user, numar=numar).order_by('-activ', '-an_scolar').first()
+    if semester is None:
+        semester = ensure_modules_2025_2026(user).filter(numar=numar).first()
+    return semester
+
+
+def current_semester(user):
+    """
+    Modulul activ; dacă nu există, cel în desfășurare azi (marcat activ). Modulele
+    se citesc o dată și se creează doar dacă utilizatorul nu are niciunul.
+    """
+    modules = list(Semester.objects.filter(user=user)) or list(ensure_modules_2025_2026(user))
+    semester = next((m for m in modules if m.activ), None)
+    if semester is None:
+        today = date.today()
+        semester = next((m for m in modules if m.data_inceput <= today <= m.data_sfarsit), None)
+        if semester is not None:
+            semester.activ = True
+            semester.save()  # dezactivează celelalte module
+    return semester
+
+
+# --- Pașii fluxului ---
+
+def _refresh_stats(user, subject_id, numar, semester=None):
+    """Statisticile și obiectivele perechii (materie, modul); întoarce media nouă."""
+    semester = semester or resolve_semester(user, numar)
+    if semester is None:
+        return None
+    values = SubjectGradeStats.compute(user.pk, subject_id, numar)
+    lookup = {'user': user, 'subject_id': subject_id, 'semester': semester}
+    if not SubjectGradeStats.objects.filter(**lookup).update(**values, updated_at=timezone.now()):
+        SubjectGradeStats.objects.create(**lookup, **values)
+    goals.update_goals(user.pk, subject_id, semester.pk, values['media'])
+    return values['media']
+
+
+def _unlock(user, codes):
+    """Deblochează achievement-urile încă neobținute dintre `codes`."""
+    if not codes:
+        return
+    unlocked = UserAchievement.objects.filter(user=user, unlocked_at__isnull=False).values('achievement_id')
+    ids = list(
+        Achievement.objects.filter(code__in=codes, is_active=True)
+        .exclude(pk__in=unlocked).values_list('pk', flat=True)
+    )
+    if not ids:
+        return
+    now = timezone.now()
+    UserAchievement.objects.filter(user=user, achievement_id__in=ids, unlocked_at__isnull=True).update(unlocked_at=now)
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(user=user, achievement_id=pk, unlocked_at=now) for pk in ids], ignore_conflicts=True
+    )
+
+
+def check_achievements(grade):
+    """Achievement-urile legate de note și absențe, dintr-un singur agregat."""
+    user = grade.user
+    is_note = grade.tip == 'nota' and grade.valoare is not None
+    today = date.today()
+    stats = Grade.objects.filter(user=user).aggregate(
+        tens=Count('pk', filter=Q(tip='nota', valoare__gte=10)),
+        subject_avg=Avg('valoare', filter=Q(tip='nota', subject_id=grade.subject_id)),
+        recent_absences=Count('pk', filter=Q(tip__in=ABSENCE_TYPES, data__gte=today - timedelta(days=30))),
+    )
+
+    codes = []
+    if is_note and grade.valoare >= 10:
+        # Prima notă de 10
+        if stats['tens'] == 1:
+            codes.append('FIRST_10')
+        # 3 note consecutive de 10 (ultimele 3 note); posibil doar dacă nota curentă e 10
+        if stats['tens'] >= 3:
+            last3 = list(
+                Grade.objects.filter(user=user, tip='nota').order_by('-data', '-created_at')
+                .values_list('valoare', flat=True)[:3]
+            )
+            if len(last3) == 3 and all(v >= 10 for v in last3):
+                codes.append('THREE_10_STREAK')
+    # Media 9+ la o materie
+    if is_note and stats['subject_avg'] is not None and stats['subject_avg'] >= 9:
+        codes.append('SUBJECT_AVG_9')
+    # Absențe: 30 zile fără absențe
+    if stats['recent_absences'] == 0:
+        codes.append('NO_ABSENCES_30D')
+    _unlock(user, codes)
+
+
+def check_import_achievements(user, subject_ids):
+    """Achievement-urile după un import: aceleași condiții, evaluate o dată pentru tot lotul."""
+    today = date.today()
+    stats = Grade.objects.filter(user=user).aggregate(
+        tens=Count('pk', filter=Q(tip='nota', valoare__gte=10)),
+        recent_absences=Count('pk', filter=Q(tip__in=ABSENCE_TYPES, data__gte=today - timedelta(days=30))),
+    )
+    codes = []
+    if stats['tens']:
+        codes.append('FIRST_10')
+    if stats['tens'] >= 3:
+        last3 = list(
+            Grade.objects.filter(user=user, tip='nota').order_by('-data', '-created_at')
+            .values_list('valoare', flat=True)[:3]
+        )
+        if len(last3) == 3 and all(v >= 10 for v in last3):
+            codes.append('THREE_10_STREAK')
+    averages = (
+        Grade.objects.filter(user=user, tip='nota', subject_id__in=subject_ids)
+        .values('subject_id').annotate(media=Avg('valoare')).filter(media__gte=9)
+    )
+    if averages.exists():
+        codes.append('SUBJECT_AVG_9')
+    if stats['recent_absences'] == 0:
+        codes.append('NO_ABSENCES_30D')
+    _unlock(user, codes)
+
+
+def _notifications(grade):
+    if grade.tip != 'nota' or grade.valoare is None:
+        return []
+    return [
+        Notification(
+            user_id=grade.user_id,
+            tip='nota',
+            titlu=titlu,
+            mesaj=mesaj.format(valoare=grade.valoare, materie=grade.subject.nume),
+        )
+        for condition, titlu, mesaj in GRADE_NOTIFICATIONS if condition(grade.valoare)
+    ]
+
+
+def _queue_parent_email(grade):
+    """Email părinte pentru note noi (dacă e activat în profil), trimis după commit."""
+    if grade.tip != 'nota':
+        return
+    try:
+        from apps.core.email_utils import queue_email
+    except Exception:
+        return
+    profile = StudentProfile.objects.filter(user_id=grade.user_id).values('reminder_note', 'email_parinte').first()
+    if not profile or not profile['reminder_note'] or not profile['email_parinte']:
+        return
+    queue_email(
+        to_emails=[profile['email_parinte']],
+        subject=f'Notă nouă la {grade.subject.nume}',
+        html_content=f"""
+        <p>Bună,</p>
+        <p>A fost adăugată o notă nouă pentru elev:</p>
+        <ul>
+          <li>Materie: {grade.subject.nume}</li>
+          <li>Nota: {grade.valoare}</li>
+          <li>Data: {grade.data}</li>
+          <li>Tip evaluare: {grade.get_tip_evaluare_display() or '-'}</li>
+        </ul>
+        """
+    )
+
+
+def _after_write(grade, keys, created=False, achievements=True):
+    """Pașii comuni după scriere: statistici/obiective per pereche afectată, achievement-uri, notificări, email."""
+    for subject_id, numar in dict.fromkeys(keys):
+        _refresh_stats(grade.user, subject_id, numar)
+    if achievements:
+        check_achievements(grade)
+    if created:
+        Notification.objects.bulk_create(_notifications(grade))
+        _queue_parent_email(grade)
+
+
+# --- Punctele de intrare ---
+
+def create_grade(user, grade):
+    """Salvează o notă/absență nouă (ex: din formular, cu commit=False) și aplică fluxul."""
+    grade.user = user
+    with transaction.atomic(), _running():
+        grade.save()
+        _after_write(grade, [(grade.subject_id, grade.semestru)], created=True)
+    return grade
+
+
+def quick_add(user, subject, valoare, tip_evaluare='test', descriere=''):
+    """Adăugare rapidă a unei note în modulul curent."""
+    semester = current_semester(user)
+    grade = Grade(
+        subject=subject,
+        tip='nota',
+        valoare=valoare,
+        tip_evaluare=tip_evaluare,
+        descriere=descriere,
+        semestru=semester.numar if semester else 1,
+    )
+    grade.full_clean(exclude=['user', 'subject'])
+    return create_grade(user, grade)
+
+
+def update_grade(user, grade):
+    """Salvează modificările unei note; la mutarea în altă materie/modul se actualizează ambele perechi."""
+    grade.user = user
+    old = grade.saved_values('subject_id', 'semestru')
+    keys = [(old['subject_id'], old['semestru'])] if old else []
+    keys.append((grade.subject_id, grade.semestru))
+    with transaction.atomic(), _running():
+        grade.save()
+        _after_write(grade, keys)
+    return grade
+
+
+def delete_grade(user, grade):
+    grade.user = user
+    key = (grade.subject_id, grade.semestru)
+    with transaction.atomic(), _running():
+        grade.delete()
+        _after_write(grade, [key], achievements=False)
+
+
+def excuse_absence(user, grade, motiv):
+    """Motivează o absență; motivul se păstrează în notițele personale."""
+    grade.motivata = True
+    grade.tip = 'absenta_motivata'
+    grade.data_motivare = date.today()
+    existing = (grade.note_personale or '').strip()
+    prefix = 'Motivare: '
+    new_note = f"{existing}\n{prefix}{motiv}" if existing else f"{prefix}{motiv}"
+    grade.note_personale = new_note[:500]  # scurtăm la max 500 pentru UI
+    return update_grade(user, grade)
+
+
+def import_grades(user, new_grades, updated_grades=(), keys=()):
+    """
+    Salvează un lot de note (bulk_create/bulk_update) și aplică fluxul o singură
+    dată: statistici și obiective per pereche (materie, modul) afectată, apoi
+    achievement-urile. `keys` adaugă perechile vechi ale notelor mutate.
+    """
+    for grade in new_grades:
+        grade.user = user
+    keys = list(keys) + [(g.subject_id, g.semestru) for g in (*new_grades, *updated_grades)]
+    now = timezone.now()
+    for grade in updated_grades:
+        grade.updated_at = now
+    with transaction.atomic(), _running():
+        Grade.objects.bulk_create(new_grades)
+        if updated_grades:
+            Grade.objects.bulk_update(
+                updated_grades, ['tip', 'valoare', 'tip_evaluare', 'descriere', 'semestru', 'motivata', 'updated_at']
+            )
+        keys = list(dict.fromkeys(keys))
+        semesters = {numar: resolve_semester(user, numar) for numar in {numar for _, numar in keys}}
+        for subject_id, numar in keys:
+            _refresh_stats(user, subject_id, numar, semesters[numar])
+        if new_grades or updated_grades:
+            check_import_achievements(user, {subject_id for subject_id, _ in keys})
+            # bulk_create/bulk_update nu trimit post_save: analizele și calendarul se actualizează aici
+            analytics.bump(user.pk)
+            calendar_events.sync_grade_batch([*new_grades, *updated_grades])
@@ -1 +1,131 @@
- 
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+
+from apps.core.models import CalendarEvent
+from apps.subjects.models import Subject
+from . import analytics, goals, importer, services
+from .models import Grade, GradeGoal, GradeVersion, SubjectGradeStats
+
+
+def csv_file(text):
+    return SimpleUploadedFile('catalog.csv', text.encode('utf-8'))
+
+
+class GradeVersionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('elev', password='x')
+        self.subject = Subject.objects.create(user=self.user, nume='Matematică')
+
+    def test_version_changes_on_write(self):
+        before = analytics.grade_version(self.user.pk)
+        grade = services.create_grade(self.user, Grade(subject=self.subject, tip='nota', valoare=9, semestru=1))
+        self.assertGreater(analytics.grade_version(self.user.pk), before)
+        before = analytics.grade_version(self.user.pk)
+        services.delete_grade(self.user, grade)
+        self.assertGreater(analytics.grade_version(self.user.pk), before)
+
+    def test_deleting_a_user_with_grades(self):
+        services.create_grade(self.user, Grade(subject=self.subject, tip='nota', valoare=9, semestru=1))
+        analytics.grade_version(self.user.pk)
+        User.objects.get(pk=self.user.pk).delete()
+        connection.check_constraints()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(GradeVersion.objects.exists())
+
+
+class GradesNeededTests(TestCase):
+    """Numărul de note necesare pornește de la notele reale, nu de la media rotunjită."""
+
+    def brute_force(self, grades, target, value):
+        grades = list(grades)
+        for n in range(100):
+            if grades and sum(grades) >= target * len(grades):
+                return n
+            grades.append(value)
+        return None
+
+    def test_matches_brute_force_on_grade_lists(self):
+        for grades in ([], [10], [5], [8, 8, 9], [4, 7, 9], [3, 5, 6, 6, 9, 10, 4], [Decimal('9.50'), 7, 8]):
+            grades = [Decimal(g) for g in grades]
+            for target in (Decimal('5'), Decimal('8.50'), Decimal('9'), Decimal('9.50')):
+                for value in (9, 10):
+                    total = sum(grades) if grades else None
+                    self.assertEqual(
+                        goals.grades_needed(total, len(grades), target, value),
+                        self.brute_force(grades, target, Decimal(value)),
+                        (grades, target, value),
+                    )
+
+    def test_goal_uses_exact_sum(self):
+        user = User.objects.create_user('elev', password='x')
+        subject = Subject.objects.create(user=user, nume='Matematică')
+        for value in (8, 8, 9):
+            services.create_grade(user, Grade(subject=subject, tip='nota', valoare=value, semestru=1))
+        semester = SubjectGradeStats.objects.get(user=user, subject=subject).semester
+        GradeGoal.objects.create(user=user, subject=subject, semester=semester, media_dorita=9)
+
+        annotated = goals.goals_with_progress(user, semester).get()
+        self.assertEqual((annotated.media_curenta, annotated.note_necesare), (Decimal('8.33'), 2))
+        plain = GradeGoal.objects.get(user=user)
+        self.assertEqual(plain.note_necesare, 2)
+        self.assertEqual(plain.media_curenta, Decimal('8.33'))
+
+
+class GradeImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('elev', password='x')
+        Subject.objects.create(user=self.user, nume='Limba și literatura română')
+        Subject.objects.create(user=self.user, nume='Matematică')
+
+    def test_all_rows_invalid_writes_nothing(self):
+        result = importer.import_grades(self.user, csv_file(
+            'Materie;Tip;Valoare;Data\nMatematica;nota;11;01.10.2025\nMatematica;x;9;01.10.2025\n;nota;9;01.10.2025\n'
+        ))
+        self.assertEqual(result.created, 0)
+        self.assertEqual([row for row, _ in result.errors], [2, 3, 4])
+        self.assertFalse(Grade.objects.exists())
+
+    def test_import_matches_subjects_updates_stats_and_calendar(self):
+        result = importer.import_grades(self.user, csv_file(
+            'Materie;Tip;Nota;Data;Modul\n'
+            'Lb. și lit. rom.;Notă;9,50;01.10.2025;1\n'
+            'MATEMATICA;Notă;7;02.10.2025;1\n'
+            'Matematica;Notă;10;03.10.2025;1\n'
+            'Matematica;Absență;;03.10.2025;1\n'
+        ))
+        self.assertEqual((result.created, result.errors), (4, []))
+        self.assertEqual(result.matched, {'Lb. și lit. rom.': 'Limba și literatura română'})
+        self.assertEqual(Subject.objects.filter(user=self.user).count(), 2)
+        stats = SubjectGradeStats.objects.get(user=self.user, subject__nume='Matematică')
+        self.assertEqual((stats.numar_note, stats.media, stats.numar_absente), (2, Decimal('8.50'), 1))
+        self.assertEqual(CalendarEvent.objects.filter(sursa__startswith='grade:').count(), 4)
+
+    def test_windows_1250_catalog(self):
+        uploaded = SimpleUploadedFile(
+            'catalog.csv', 'Materie;Tip;Valoare;Data\nMatematică;Notă;8;01.10.2025\n'.encode('cp1250'),
+        )
+        result = importer.import_grades(self.user, uploaded)
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertEqual(Grade.objects.get(user=self.user).subject.nume, 'Matematică')
+
+    def test_reimport_reports_duplicates_and_overwrite_updates(self):
+        data = 'Materie,Tip,Valoare,Data,Modul\nMatematica,nota,7,02.10.2025,1\n'
+        importer.import_grades(self.user, csv_file(data))
+        again = importer.import_grades(self.user, csv_file(data))
+        self.assertEqual((again.created, len(again.errors)), (0, 1))
+
+        result = importer.import_grades(
+            self.user, csv_file(data.replace(',7,', ',4,')), overwrite_existing=True,
+        )
+        self.assertEqual((result.created, result.updated), (0, 1))
+        grade = Grade.objects.get(user=self.user)
+        self.assertEqual(grade.valoare, Decimal('4.00'))
+        self.assertEqual(CalendarEvent.objects.get(sursa=f'grade:{grade.pk}').titlu, '4.00')
+        stats = SubjectGradeStats.objects.get(user=self.user, subject=grade.subject)
+        self.assertEqual(stats.media, Decimal('4.00'))
@@ -10,6 +10,7 @@ urlpatterns = [
     # CRUD note și absențe
     path('list/', views.grades_list_view, name='list'),
     path('create/', views.grade_create_view, name='create'),
+    path('import/', views.grade_import_view, name='import'),
     path('<int:grade_id>/', views.grade_detail_view, name='detail'),
     path('<int:grade_id>/edit/', views.grade_edit_view, name='edit'),
     path('<int:grade_id>/delete/', views.grade_delete_view, name='delete'),
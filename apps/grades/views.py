@@ -1,74 +1,20 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.urls import reverse
 from django.http import JsonResponse
-from django.db.models import Q, Count, Avg, Max, Min
+from django.db.models import Q, Count, Avg
 from django.core.paginator import Paginator
 from datetime import date, timedelta
 import calendar
 import json
 
 from .models import Grade, Semester, SubjectGradeStats, GradeGoal
-from .forms import GradeForm, SemesterForm, GradeGoalForm, GradeFilterForm
+from .forms import GradeForm, SemesterForm, GradeGoalForm, GradeFilterForm, GradeImportForm
+from . import analytics, goals, importer, services
 from apps.subjects.models import Subject
-from apps.core.models import Notification
-from django.conf import settings
-
-try:
-    from apps.core.email_utils import send_email
-except Exception:
-    send_email = None
-
-
-def _ensure_modules_2025_2026(user):
-    """Creează/actualizează modulele 1–5 pentru anul școlar 2025–2026 pentru utilizator.
-    Modulul 3/4 se ajustează în funcție de județul clasei elevului (vacanța mobilă din februarie).
-    Dacă județul lipsește, se folosește varianta mediană (încheiere 13 feb, reluare 23 feb).
-    """
-    # Determină județul (dacă există) din clasa profilului elevului
-    judet = None
-    try:
-        profile = getattr(user, 'student_profile', None)
-        if profile and profile.class_room and profile.class_room.judet:
-            judet = profile.class_room.judet.strip()
-    except Exception:
-        judet = None
-
-    grupa1 = {'Cluj', 'Timiș', 'Bistrița-Năsăud'}  # 9-15 feb
-    grupa2 = {
-        'București', 'Ilfov', 'Sălaj', 'Bihor', 'Arad', 'Iași', 'Hunedoara', 'Brașov',
-        'Caraș-Severin', 'Gorj', 'Vâlcea', 'Argeș', 'Dâmbovița', 'Prahova', 'Buzău',
-        'Tulcea', 'Mehedinți', 'Dolj', 'Olt', 'Teleorman', 'Ialomița', 'Călărași'
-    }  # 16-22 feb
-    grupa3 = {
-        'Satu-Mare', 'Maramureș', 'Suceava', 'Botoșani', 'Alba', 'Sibiu', 'Mureș',
-        'Harghita', 'Neamț', 'Covasna', 'Bacău', 'Vrancea', 'Vaslui', 'Galați',
-        'Brăila', 'Giurgiu', 'Constanța'
-    }  # 23 feb - 1 mar
-
-    # Datele implicite (varianta mediană)
-    end_m3 = date(2026, 2, 13)
-    start_m4 = date(2026, 2, 23)
-    if judet in grupa1:
-        end_m3 = date(2026, 2, 6)
-        start_m4 = date(2026, 2, 16)
-    elif judet in grupa3:
-        end_m3 = date(2026, 2, 20)
-        start_m4 = date(2026, 3, 2)
-
-    modules = [
-        (1, date(2025, 9, 8),  date(2025, 10, 24)),
-        (2, date(2025, 11, 3), date(2025, 12, 19)),
-        (3, date(2026, 1, 8),  end_m3),
-        (4, start_m4,          date(2026, 4, 3)),
-        (5, date(2026, 4, 15), date(2026, 6, 19)),
-    ]
-    for numar, start, end in modules:
-        obj, created = Semester.objects.update_or_create(
-            user=user, an_scolar='2025-2026', numar=numar,
-            defaults={'data_inceput': start, 'data_sfarsit': end}
-        )
-    return Semester.objects.filter(user=user, an_scolar='2025-2026').order_by('numar')
+from apps.core import calendar_events
+from apps.schedule.importer import FileEncodingError
 
 
 @login_required
@@ -78,7 +24,7 @@ def grades_overview_view(request):
 
     today = date.today()
     # Asigură modulele 2025–2026
-    user_modules = _ensure_modules_2025_2026(user)
+    user_modules = services.ensure_modules_2025_2026(user)
 
     # Alege modulul activ pe baza datei curente
     active_semester = None
@@ -120,10 +66,8 @@ def grades_overview_view(request):
         subject_stats.append(stats)
 
     # Obiective de note
-    grade_goals = GradeGoal.objects.filter(
-        user=user,
-        semester=active_semester
-    ).select_related('subject')
+    # Obiective de note, cu media din statisticile modulului (o singură interogare)
+    grade_goals = goals.goals_with_progress(user, active_semester)
 
     # Statistici generale
     avg_val = Grade.objects.filter(user=user, tip='nota').aggregate(avg=Avg('valoare'))['avg'] or 0
@@ -225,81 +169,12 @@ def grade_create_view(request):
     if request.method == 'POST':
         form = GradeForm(data=request.POST, user=request.user)
         if form.is_valid():
-            grade = form.save(commit=False)
-            grade.user = request.user
-            grade.save()
-
-            # Actualizează statisticile pentru materie
-            if grade.tip == 'nota':
-                # Determină obiectul Semester corespunzător numărului din notă
-                semester_obj = Semester.objects.filter(user=request.user, activ=True, numar=grade.semestru).first()
-                if not semester_obj:
-                    semester_obj = Semester.objects.filter(user=request.user, numar=grade.semestru).order_by('-an_scolar').first()
-                if not semester_obj:
-                    # Asigură modulele 2025–2026 și ia modulul corespunzător
-                    user_modules = _ensure_modules_2025_2026(request.user)
-                    semester_obj = user_modules.filter(numar=grade.semestru).first()
-
-                stats, created = SubjectGradeStats.objects.get_or_create(
-                    user=request.user,
-                    subject=grade.subject,
-                    semester=semester_obj
-                )
-                stats.calculeaza_statistici()
-
-                # Verifică obiectivele (mapează corect la obiectul Semester)
-                goals_qs = GradeGoal.objects.filter(
-                    user=request.user,
-                    subject=grade.subject,
-                )
-                if semester_obj:
-                    goals_qs = goals_qs.filter(semester=semester_obj)
-                else:
-                    goals_qs = goals_qs.filter(semester__numar=grade.semestru)
-                for goal in goals_qs:
-                    goal.verifica_obiectiv()
-
-                # Creează notificare pentru note mari/mici
-                if grade.valoare >= 9:
-                    Notification.objects.create(
-                        user=request.user,
-                        tip='nota',
-                        titlu='Notă excelentă!',
-                        mesaj=f'Felicitări! Ai primit {grade.valoare} la {grade.subject.nume}!'
-                    )
-                elif grade.valoare < 5:
-                    Notification.objects.create(
-                        user=request.user,
-                        tip='nota',
-                        titlu='Atenție la nota slabă',
-                        mesaj=f'Ai primit {grade.valoare} la {grade.subject.nume}. E timpul să lucrezi mai mult!'
-                    )
+            # Statistici, obiective, notificări și email părinte: un singur flux (services.py)
+            grade = services.create_grade(request.user, form.save(commit=False))
 
             type_display = grade.get_tip_display()
             messages.success(request, f'{type_display} la {grade.subject.nume} a fost adăugată!')
 
-            # Email părinte pentru note noi (dacă e activat in profil)
-            try:
-                profile = request.user.student_profile
-                parent_email = getattr(profile, 'email_parinte', '')
-                if send_email and profile.reminder_note and parent_email and grade.tip == 'nota':
-                    send_email(
-                        to_emails=[parent_email],
-                        subject=f'Notă nouă la {grade.subject.nume}',
-                        html_content=f"""
-                        <p>Bună,</p>
-                        <p>A fost adăugată o notă nouă pentru elev:</p>
-                        <ul>
-                          <li>Materie: {grade.subject.nume}</li>
-                          <li>Nota: {grade.valoare}</li>
-                          <li>Data: {grade.data}</li>
-                          <li>Tip evaluare: {grade.get_tip_evaluare_display() if hasattr(grade, 'get_tip_evaluare_display') else '-'}</li>
-                        </ul>
-                        """
-                    )
-            except Exception:
-                pass
-
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
                     'success': True,
@@ -376,23 +251,7 @@ def grade_edit_view(request, grade_id):
     if request.method == 'POST':
         form = GradeForm(data=request.POST, instance=grade, user=request.user)
         if form.is_valid():
-            form.save()
-
-            # Recalculează statisticile
-            if grade.tip == 'nota':
-                semester_obj = Semester.objects.filter(user=request.user, activ=True, numar=grade.semestru).first()
-                if not semester_obj:
-                    semester_obj = Semester.objects.filter(user=request.user, numar=grade.semestru).order_by('-an_scolar').first()
-                if semester_obj:
-                    try:
-                        stats = SubjectGradeStats.objects.get(
-                            user=request.user,
-                            subject=grade.subject,
-                            semester=semester_obj
-                        )
-                        stats.calculeaza_statistici()
-                    except SubjectGradeStats.DoesNotExist:
-                        pass
+            services.update_grade(request.user, form.save(commit=False))
 
             messages.success(request, f'{grade.get_tip_display()} a fost actualizată!')
             return redirect('grades:detail', grade_id=grade.id)
@@ -414,26 +273,9 @@ def grade_delete_view(request, grade_id):
     grade = get_object_or_404(Grade, id=grade_id, user=request.user)
 
     if request.method == 'POST':
-        subject = grade.subject
-        semestru = grade.semestru
         grade_type = grade.get_tip_display()
 
-        grade.delete()
-
-        # Recalculează statisticile
-        semester_obj = Semester.objects.filter(user=request.user, activ=True, numar=semestru).first()
-        if not semester_obj:
-            semester_obj = Semester.objects.filter(user=request.user, numar=semestru).order_by('-an_scolar').first()
-        if semester_obj:
-            try:
-                stats = SubjectGradeStats.objects.get(
-                    user=request.user,
-                    subject=subject,
-                    semester=semester_obj
-                )
-                stats.calculeaza_statistici()
-            except SubjectGradeStats.DoesNotExist:
-                pass
+        services.delete_grade(request.user, grade)
 
         messages.success(request, f'{grade_type} a fost ștearsă!')
         return redirect('grades:overview')
@@ -523,14 +365,21 @@ def grade_goals_view(request):
     """Gestionare obiective de note"""
     active_semester = Semester.objects.filter(user=request.user, activ=True).first()
 
-    goals = GradeGoal.objects.filter(
-        user=request.user,
-        semester=active_semester
-    ).select_related('subject') if active_semester else []
+    # Nota cu care se calculează câte note mai sunt necesare (implicit 10)
+    try:
+        target_grade = min(max(int(request.GET.get('nota', 10)), 1), 10)
+    except ValueError:
+        target_grade = 10
+
+    user_goals = list(goals.goals_with_progress(request.user, active_semester))
+    for goal in user_goals:
+        goal.note_necesare_tinta = goal.note_necesare_cu(target_grade)
 
     context = {
-        'goals': goals,
+        'goals': user_goals,
         'active_semester': active_semester,
+        'target_grade': target_grade,
+        'grade_choices': range(1, 11),
     }
 
     return render(request, 'grades/grade_goals.html', context)
@@ -605,60 +454,31 @@ def grades_stats_view(request):
     """Statistici detaliate pentru note"""
     user = request.user
 
-    # Statistici generale
-    all_grades = Grade.objects.filter(user=user, tip='nota')
+    # Toate statisticile dintr-o singură trecere peste notele utilizatorului (analytics.py)
+    summary = analytics.grade_summary(user)
     general_stats = {
-        'total_grades': all_grades.count(),
-        'average': all_grades.aggregate(avg=Avg('valoare'))['avg'] or 0,
-        'highest': all_grades.aggregate(max=Max('valoare'))['max'] or 0,
-        'lowest': all_grades.aggregate(min=Min('valoare'))['min'] or 0,
+        'total_grades': summary['count'],
+        'average': summary['average'] or 0,
+        'highest': summary['highest'] or 0,
+        'lowest': summary['lowest'] or 0,
     }
-
-    # Distribuția notelor
-    grade_distribution = {}
-    for i in range(1, 11):
-        count = all_grades.filter(valoare__gte=i, valoare__lt=i + 1).count()
-        grade_distribution[i] = count
-
-    # Evoluția în timp (ultimele 6 luni)
-    months_data = []
-    today = date.today()
-    for i in range(6):
-        month_date = today.replace(day=1) - timedelta(days=30 * i)
-        month_grades = all_grades.filter(
-            data__year=month_date.year,
-            data__month=month_date.month
-        )
-        avg_grade = month_grades.aggregate(avg=Avg('valoare'))['avg'] or 0
-        months_data.append({
-            'month': month_date.strftime('%b %Y'),
-            'average': round(avg_grade, 2),
-            'count': month_grades.count()
-        })
-
-    months_data.reverse()
+    grade_distribution = summary['distribution']
+    months_data = summary['months']
 
     # Top/bottom materii
     subject_averages = []
     for subject in Subject.objects.filter(user=user, activa=True):
-        subject_grades = all_grades.filter(subject=subject)
-        if subject_grades.exists():
-            avg = subject_grades.aggregate(avg=Avg('valoare'))['avg']
+        stats = summary['subjects'].get(subject.pk)
+        if stats:
             subject_averages.append({
                 'subject': subject,
-                'average': round(avg, 2),
-                'count': subject_grades.count()
+                'average': stats['average'],
+                'count': stats['count']
             })
 
     subject_averages.sort(key=lambda x: x['average'], reverse=True)
 
-    # Absențe
-    all_absences = Grade.objects.filter(user=user, tip__in=['absenta', 'absenta_motivata'])
-    absence_stats = {
-        'total': all_absences.count(),
-        'motivated': all_absences.filter(tip='absenta_motivata').count(),
-        'unmotivated': all_absences.filter(tip='absenta').count(),
-    }
+    absence_stats = summary['absences']
 
     context = {
         'general_stats': general_stats,
@@ -680,22 +500,10 @@ def grade_calendar_view(request):
     month = int(request.GET.get('month', date.today().month))
     year = int(request.GET.get('year', date.today().year))
 
-    # Calculează prima și ultima zi din lună
-    from calendar import monthrange
-    first_day = date(year, month, 1)
-    last_day = date(year, month, monthrange(year, month)[1])
-
-    # Notele din această lună
-    grades_in_month = Grade.objects.filter(
-        user=user,
-        data__range=[first_day, last_day]
-    ).select_related('subject')
+    # Notele și absențele din această lună, din indexul calendarului (map zi -> evenimente)
+    per_day = calendar_events.month_events(user, year, month, ['nota', 'absenta'])
 
-    # Organizează pe zile și construiește săptămânile pentru randare
-    per_day = {}
-    for grade in grades_in_month:
-        d = grade.data.day
-        per_day.setdefault(d, []).append(grade)
+    # Construiește săptămânile pentru randare
 
     cal = calendar.Calendar(firstweekday=0)  # 0=Luni
     weeks = []
@@ -731,13 +539,52 @@ def grade_calendar_view(request):
         'prev_year': prev_year,
         'next_month': next_month,
         'next_year': next_year,
-        'days_in_month': monthrange(year, month)[1],
-        'first_weekday': first_day.weekday(),
+        'days_in_month': calendar.monthrange(year, month)[1],
+        'first_weekday': date(year, month, 1).weekday(),
     }
 
     return render(request, 'grades/calendar.html', context)
 
 
+@login_required
+def grade_import_view(request):
+    """Import în masă al notelor și absențelor din catalog (CSV/XLSX), cu raport per rând."""
+    result = None
+    if request.method == 'POST':
+        form = GradeImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = importer.import_grades(
+                    request.user,
+                    form.cleaned_data['file'],
+                    overwrite_existing=form.cleaned_data['overwrite_existing'],
+                    create_subjects=form.cleaned_data['create_subjects'],
+                )
+            except ImportError:
+                messages.error(request, 'openpyxl nu este instalat')
+            except FileEncodingError as exc:
+                messages.error(request, str(exc))
+            except Exception:
+                messages.error(request, 'Fișierul nu a putut fi citit. Verifică formatul (CSV UTF-8 sau XLSX).')
+            if result is not None:
+                if result.created:
+                    messages.success(request, f'Au fost importate {result.created} note/absențe.')
+                if result.updated:
+                    messages.info(request, f'Au fost actualizate {result.updated} note existente.')
+                if result.errors:
+                    messages.warning(request, f'{len(result.errors)} rânduri nu au fost importate.')
+                if result.ok and not result.matched:
+                    return redirect('grades:list')
+    else:
+        form = GradeImportForm()
+    return render(request, 'grades/import.html', {
+        'form': form,
+        'result': result,
+        'title': 'Importă note din catalog',
+        'back_url': reverse('grades:list'),
+    })
+
+
 @login_required
 def quick_grade_entry(request):
     """Adăugare rapidă notă - AJAX"""
@@ -749,40 +596,7 @@ def quick_grade_entry(request):
             description = request.POST.get('description', '')
 
             subject = Subject.objects.get(id=subject_id, user=request.user)
-
-            # Determină modulul activ (creează module dacă lipsesc)
-            active_semester = Semester.objects.filter(user=request.user, activ=True).first()
-            if not active_semester:
-                user_modules = _ensure_modules_2025_2026(request.user)
-                today = date.today()
-                for m in user_modules:
-                    if m.data_inceput <= today <= m.data_sfarsit:
-                        active_semester = m
-                        break
-                if active_semester:
-                    Semester.objects.filter(user=request.user).update(activ=False)
-                    active_semester.activ = True
-                    active_semester.save()
-            semester_num = active_semester.numar if active_semester else 1
-
-            grade = Grade.objects.create(
-                user=request.user,
-                subject=subject,
-                tip='nota',
-                valoare=grade_value,
-                tip_evaluare=grade_type,
-                descriere=description,
-                semestru=semester_num
-            )
-
-            # Actualizează statisticile
-            if active_semester:
-                stats, created = SubjectGradeStats.objects.get_or_create(
-                    user=request.user,
-                    subject=subject,
-                    semester=active_semester
-                )
-                stats.calculeaza_statistici()
+            grade = services.quick_add(request.user, subject, grade_value, grade_type, description)
 
             return JsonResponse({
                 'success': True,
@@ -812,15 +626,7 @@ def absence_excuse_view(request, grade_id):
             messages.error(request, 'Te rugăm să introduci motivul absenței.')
             return render(request, 'grades/excuse_absence.html', {'grade': grade, 'motiv': ''})
 
-        grade.motivata = True
-        grade.tip = 'absenta_motivata'
-        grade.data_motivare = date.today()
-        # Salvează motivul în note_personale (păstrând ce exista)
-        existing = (grade.note_personale or '').strip()
-        prefix = 'Motivare: '
-        new_note = f"{existing}\n{prefix}{motiv}" if existing else f"{prefix}{motiv}"
-        grade.note_personale = new_note[:500]  # scurtăm la max 500 pentru UI
-        grade.save()
+        services.excuse_absence(request.user, grade, motiv)
 
         messages.success(request, 'Absența a fost motivată!')
 
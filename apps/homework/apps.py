@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class HomeworkConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.homework'
-    verbose_name = 'Teme și Proiecte'
\ No newline at end of file
+    verbose_name = 'Teme și Proiecte'
+
+    def ready(self):
+        # Invalidarea feed-ului de teme partajate și a încărcării claselor, contoarele
+        # zilnice de statistici și efectele secundare ale tranzițiilor de stare
+        from . import feed, rollups, services, workload  # noqa: F401
@@ -0,0 +1,170 @@
+"""
+Feed-ul de teme partajate al unei clase.
+
+Lista temelor partajate cu o clasă este construită o singură dată per versiune
+(ClassHomeworkFeed) și păstrată în cache; toți colegii care deschid feed-ul
+după o partajare citesc aceeași intrare, nu repetă scanarea. Versiunea este
+incrementată de semnalele de mai jos la partajare, retragere, editare sau
+ștergere. Starea fiecărui elev (văzut/făcut) stă într-un singur rând
+SharedHomeworkState per clasă.
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.tracking import when_changed
+from apps.subjects.models import Subject
+from .models import ClassHomeworkFeed, Homework, SharedHomeworkState
+from .services import batch_delete_in_progress, homework_batch_changed, homework_changed
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+# Temele cu deadline trecut rămân în feed încă o săptămână
+DAYS_BACK = 7
+# Câmpurile afișate în feed: doar schimbarea lor invalidează cache-ul
+FEED_FIELDS = ('share_with_class', 'shared_class_room_id', 'titlu', 'descriere', 'deadline',
+               'prioritate', 'subject_id', 'pagini', 'shared_at')
+
+
+def feed_version(class_room_id):
+    version = ClassHomeworkFeed.objects.filter(class_room_id=class_room_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump(class_room_ids, field='version'):
+    """
+    Invalidează feed-urile claselor date (creează contorul la prima modificare).
+    `field='workload_version'` invalidează în schimb încărcarea claselor.
+    """
+    ids = {cid for cid in class_room_ids if cid}
+    if not ids:
+        return
+    ClassHomeworkFeed.objects.filter(class_room_id__in=ids).update(**{field: F(field) + 1}, updated_at=timezone.now())
+    existing = set(ClassHomeworkFeed.objects.filter(class_room_id__in=ids).values_list('class_room_id', flat=True))
+    ClassHomeworkFeed.objects.bulk_create(
+        [ClassHomeworkFeed(class_room_id=cid, version=1) for cid in ids - existing], ignore_conflicts=True
+    )
+
+
+def _build(class_room_id, today):
+    rows = (
+        Homework.objects
+        .filter(shared_class_room_id=class_room_id, share_with_class=True, deadline__gte=today - timedelta(days=DAYS_BACK))
+        .select_related('subject', 'user')
+        .order_by('deadline', '-prioritate', 'pk')
+    )
+    return [{
+        'id': hw.pk,
+        'titlu': hw.titlu,
+        'descriere': hw.descriere,
+        'pagini': hw.pagini,
+        'deadline': hw.deadline,
+        'prioritate': hw.prioritate,
+        'prioritate_display': hw.get_prioritate_display(),
+        'materie': hw.subject.nume,
+        'culoare': hw.subject.culoare,
+        'user_id': hw.user_id,
+        'autor': hw.user.get_full_name() or hw.user.username,
+        'shared_at': hw.shared_at,
+    } for hw in rows]
+
+
+def class_feed(class_room_id, today=None):
+    """Temele partajate cu clasa (listă de dict-uri), din cache cât timp versiunea nu se schimbă."""
+    today = today or date.today()
+    key = f"homework:feed:class:{class_room_id}:{feed_version(class_room_id)}:{today.isoformat()}"
+    items = cache.get(key)
+    if items is None:
+        items = _build(class_room_id, today)
+        cache.set(key, items, CACHE_TIMEOUT)
+    return items
+
+
+def student_state(user, class_room_id):
+    return SharedHomeworkState.objects.filter(user=user, class_room_id=class_room_id).first()
+
+
+def mark_seen(user, class_room_id, items, state=None):
+    """Marchează feed-ul ca văzut; scrie doar dacă a apărut ceva nou de la ultima vizită."""
+    latest = max((i['shared_at'] for i in items if i['shared_at']), default=None)
+    if latest is None or (state and state.seen_at and state.seen_at >= latest):
+        return state
+    state, _ = SharedHomeworkState.objects.update_or_create(
+        user=user, class_room_id=class_room_id, defaults={'seen_at': latest}
+    )
+    return state
+
+
+def toggle_done(user, class_room_id, homework_id, visible_ids):
+    """Bifează/debifează o temă din feed; păstrează doar id-urile încă prezente în feed."""
+    state, _ = SharedHomeworkState.objects.get_or_create(user=user, class_room_id=class_room_id)
+    done = {i for i in state.done_ids if i in visible_ids}
+    done ^= {homework_id}
+    state.done_ids = sorted(done)
+    state.save(update_fields=['done_ids'])
+    return homework_id in done
+
+
+# --- Invalidare ---
+
+@receiver(pre_save, sender=Homework)
+@when_changed(*FEED_FIELDS)
+def _track_feed_fields(sender, instance: Homework, **kwargs):
+    instance._old_feed_fields = instance.saved_values(*FEED_FIELDS)
+
+
+@receiver(post_save, sender=Homework)
+@when_changed(*FEED_FIELDS)
+def invalidate_feed_on_save(sender, instance: Homework, created, **kwargs):
+    old = getattr(instance, '_old_feed_fields', None)
+    was_shared = bool(old and old['share_with_class'])
+    if not was_shared and not instance.share_with_class:
+        return
+    if was_shared and instance.share_with_class and all(old[f] == getattr(instance, f) for f in FEED_FIELDS):
+        return  # ex: progres sau timp lucrat, care nu apar în feed
+    bump({
+        old['shared_class_room_id'] if was_shared else None,
+        instance.shared_class_room_id if instance.share_with_class else None,
+    })
+
+
+@receiver(homework_changed)
+def invalidate_feed_on_transition(sender, homework, old, **kwargs):
+    if homework.share_with_class and any(name in old for name in FEED_FIELDS):
+        bump([homework.shared_class_room_id])
+
+
+@receiver(homework_batch_changed)
+def invalidate_feed_on_batch(sender, homework, transition, old, **kwargs):
+    """Un singur bump pentru toate clasele atinse de lot."""
+    classes = set()
+    for hw in homework:
+        before = old.get(hw.pk, {})
+        if transition != 'delete' and not any(name in before for name in FEED_FIELDS):
+            continue
+        if before.get('share_with_class', hw.share_with_class):
+            classes.add(before.get('shared_class_room_id', hw.shared_class_room_id))
+        if hw.share_with_class:
+            classes.add(hw.shared_class_room_id)
+    bump(classes)
+
+
+@receiver(post_delete, sender=Homework)
+def invalidate_feed_on_delete(sender, instance: Homework, **kwargs):
+    if instance.share_with_class and not batch_delete_in_progress():
+        bump([instance.shared_class_room_id])
+
+
+@receiver(post_save, sender=Subject)
+def invalidate_feed_on_subject_change(sender, instance: Subject, created, **kwargs):
+    """Numele și culoarea materiei apar în feed."""
+    if created:
+        return
+    bump(
+        Homework.objects.filter(subject=instance, share_with_class=True)
+        .values_list('shared_class_room_id', flat=True).distinct()
+    )
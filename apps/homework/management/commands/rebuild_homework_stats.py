@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily homework statistics rollups from homework and work sessions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the rollups of this username')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+        from apps.homework import rollups
+
+        users = None
+        username = options.get('user')
+        if username:
+            users = list(User.objects.filter(username=username))
+            if not users:
+                raise CommandError(f"Unknown user: {username}")
+
+        rows = rollups.rebuild(users=users)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt homework rollups: {rows} daily rows"))
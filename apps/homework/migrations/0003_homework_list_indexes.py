@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homework', '0002_homework_share_with_class_homework_shared_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['user', 'deadline'], name='homework_user_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['shared_class_room', 'share_with_class', 'deadline'], name='homework_shared_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_classschedulechange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('homework', '0003_homework_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassHomeworkFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_room', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='homework_feed', to='schedule.classroom')),
+            ],
+            options={
+                'verbose_name': 'Feed Teme Clasă',
+                'verbose_name_plural': 'Feed-uri Teme Clase',
+            },
+        ),
+        migrations.CreateModel(
+            name='SharedHomeworkState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seen_at', models.DateTimeField(blank=True, null=True)),
+                ('done_ids', models.JSONField(blank=True, default=list, help_text='Id-urile temelor partajate bifate ca făcute')),
+                ('class_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shared_homework_states', to='schedule.classroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shared_homework_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Stare Feed Teme',
+                'verbose_name_plural': 'Stări Feed Teme',
+                'unique_together': {('user', 'class_room')},
+            },
+        ),
+    ]
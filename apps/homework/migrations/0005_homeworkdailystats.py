@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    from apps.homework.rollups import rebuild
+    rebuild(
+        homework_model=apps.get_model('homework', 'Homework'),
+        session_model=apps.get_model('homework', 'HomeworkSession'),
+        stats_model=apps.get_model('homework', 'HomeworkDailyStats'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('subjects', '0002_subject_rating'),
+        ('homework', '0004_class_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeworkDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zi', models.DateField()),
+                ('adaugate', models.IntegerField(default=0, help_text='Teme primite în ziua respectivă')),
+                ('finalizate', models.IntegerField(default=0, help_text='Teme finalizate în ziua respectivă')),
+                ('finalizate_la_timp', models.IntegerField(default=0)),
+                ('minute_finalizate', models.IntegerField(default=0, help_text='Timpul lucrat al temelor finalizate în ziua respectivă')),
+                ('minute_lucrate', models.IntegerField(default=0, help_text='Minute din sesiunile de lucru începute în ziua respectivă')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='homework_daily_stats', to='subjects.subject')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='homework_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Statistică Zilnică Teme',
+                'verbose_name_plural': 'Statistici Zilnice Teme',
+                'unique_together': {('user', 'subject', 'zi')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
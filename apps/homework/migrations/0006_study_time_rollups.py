@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:48
+
+from django.db import migrations, models
+
+
+def rebuild_rollups(apps, schema_editor):
+    from apps.homework.rollups import rebuild
+    rebuild(
+        homework_model=apps.get_model('homework', 'Homework'),
+        session_model=apps.get_model('homework', 'HomeworkSession'),
+        stats_model=apps.get_model('homework', 'HomeworkDailyStats'),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homework', '0005_homeworkdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homeworkdailystats',
+            name='finalizate_cu_estimare',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='homeworkdailystats',
+            name='minute_efective_estimate',
+            field=models.IntegerField(default=0, help_text='Suma timpului lucrat al acestor teme'),
+        ),
+        migrations.AddField(
+            model_name='homeworkdailystats',
+            name='minute_estimate',
+            field=models.IntegerField(default=0, help_text='Suma timpului estimat al acestor teme'),
+        ),
+        migrations.AddField(
+            model_name='homeworkdailystats',
+            name='sesiuni',
+            field=models.IntegerField(default=0, help_text='Sesiuni de lucru încheiate, începute în ziua respectivă'),
+        ),
+        migrations.AddIndex(
+            model_name='homeworkdailystats',
+            index=models.Index(fields=['user', 'zi'], name='homework_stats_user_day_idx'),
+        ),
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
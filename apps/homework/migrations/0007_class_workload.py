@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_class_rooms(apps, schema_editor):
+    Homework = apps.get_model('homework', 'Homework')
+    StudentProfile = apps.get_model('core', 'StudentProfile')
+    Homework.objects.update(class_room_id=models.Subquery(
+        StudentProfile.objects.filter(user_id=models.OuterRef('user_id')).values('class_room_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_studentprofile_buget_studiu'),
+        ('schedule', '0008_classschedulechange'),
+        ('homework', '0006_study_time_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classhomeworkfeed',
+            name='workload_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='homework',
+            name='class_room',
+            field=models.ForeignKey(blank=True, help_text='Clasa elevului (denormalizată din profil)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='student_homework', to='schedule.classroom'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['class_room', 'deadline'], name='homework_class_deadline_idx'),
+        ),
+        migrations.RunPython(backfill_class_rooms, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ from datetime import date, timedelta
 from apps.subjects.models import Subject
 import os
 from apps.schedule.models import ClassRoom
+from apps.core.models import StudentProfile
+from apps.core.tracking import DirtyFieldsMixin
 
 
 def homework_file_upload_path(instance, filename):
@@ -12,7 +14,7 @@ def homework_file_upload_path(instance, filename):
     return f'homework/{instance.homework.id}/{filename}'
 
 
-class Homework(models.Model):
+class Homework(DirtyFieldsMixin, models.Model):
     """
     Model pentru temele de casă
     """
@@ -79,6 +81,16 @@ class Homework(models.Model):
     )
     shared_at = models.DateTimeField(blank=True, null=True)
 
+    # Clasa elevului (denormalizată din profil pentru agregatele pe clasă, vezi workload.py)
+    class_room = models.ForeignKey(
+        ClassRoom,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='student_homework',
+        help_text="Clasa elevului (denormalizată din profil)"
+    )
+
     # Reminder
     reminder_activ = models.BooleanField(default=True)
     zile_reminder = models.PositiveIntegerField(
@@ -98,6 +110,13 @@ class Homework(models.Model):
         verbose_name = "Temă"
         verbose_name_plural = "Teme"
         ordering = ['deadline', '-prioritate']
+        indexes = [
+            # Lista „ale mele” și ramura „partajate cu clasa” a UNION-ului din queries.py
+            models.Index(fields=['user', 'deadline'], name='homework_user_deadline_idx'),
+            models.Index(fields=['shared_class_room', 'share_with_class', 'deadline'], name='homework_shared_idx'),
+            # Încărcarea claselor (workload.py): termenele grupate pe clasă și zi
+            models.Index(fields=['class_room', 'deadline'], name='homework_class_deadline_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject.nume} - {self.titlu}"
@@ -111,7 +130,7 @@ class Homework(models.Model):
 
         # Configurează câmpurile de share
         if self.share_with_class:
-            if not self.shared_class_room:
+            if not self.shared_class_room_id:
                 try:
                     profile = self.user.student_profile
                     if getattr(profile, 'class_room', None):
@@ -124,6 +143,12 @@ class Homework(models.Model):
             # Dacă se dezactivează share, păstrează auditul (shared_at), dar scoate clasa
             self.shared_class_room = self.shared_class_room if self.shared_class_room else None
 
+        # Clasa elevului la creare; schimbările de clasă ulterioare vin din profil (workload.py)
+        if self._state.adding and self.class_room_id is None:
+            self.class_room_id = StudentProfile.objects.filter(user_id=self.user_id).values_list(
+                'class_room_id', flat=True
+            ).first()
+
         super().save(*args, **kwargs)
 
     @property
@@ -242,7 +267,7 @@ class HomeworkFile(models.Model):
         return f"{size:.1f} TB"
 
 
-class HomeworkSession(models.Model):
+class HomeworkSession(DirtyFieldsMixin, models.Model):
     """
     Sesiuni de lucru la o temă (pentru tracking timp)
     """
@@ -284,6 +309,79 @@ class HomeworkSession(models.Model):
             self.save()
 
 
+class HomeworkDailyStats(models.Model):
+    """
+    Contoare zilnice per (utilizator, materie), din care se citesc statisticile temelor.
+    Întreținute incremental din salvările Homework/HomeworkSession (vezi rollups.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='homework_daily_stats')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='homework_daily_stats')
+    zi = models.DateField()
+
+    adaugate = models.IntegerField(default=0, help_text="Teme primite în ziua respectivă")
+    finalizate = models.IntegerField(default=0, help_text="Teme finalizate în ziua respectivă")
+    finalizate_la_timp = models.IntegerField(default=0)
+    minute_finalizate = models.IntegerField(default=0, help_text="Timpul lucrat al temelor finalizate în ziua respectivă")
+    minute_lucrate = models.IntegerField(default=0, help_text="Minute din sesiunile de lucru începute în ziua respectivă")
+    sesiuni = models.IntegerField(default=0, help_text="Sesiuni de lucru încheiate, începute în ziua respectivă")
+
+    # Estimare vs. realitate, doar pentru temele finalizate care aveau timp estimat
+    finalizate_cu_estimare = models.IntegerField(default=0)
+    minute_estimate = models.IntegerField(default=0, help_text="Suma timpului estimat al acestor teme")
+    minute_efective_estimate = models.IntegerField(default=0, help_text="Suma timpului lucrat al acestor teme")
+
+    class Meta:
+        verbose_name = "Statistică Zilnică Teme"
+        verbose_name_plural = "Statistici Zilnice Teme"
+        unique_together = ['user', 'subject', 'zi']
+        indexes = [
+            # Seriile săptămânale/lunare din study_time.py (interval de zile, toate materiile)
+            models.Index(fields=['user', 'zi'], name='homework_stats_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.subject} - {self.zi}"
+
+
+class ClassHomeworkFeed(models.Model):
+    """
+    Versiunile datelor de teme ale unei clase, incrementate de semnale: `version`
+    pentru feed-ul temelor partajate (partajare/retragere/editare), iar
+    `workload_version` pentru încărcarea clasei (termene și timp estimat).
+    Fac parte din cheile de cache.
+    """
+    class_room = models.OneToOneField(ClassRoom, on_delete=models.CASCADE, related_name='homework_feed')
+    version = models.PositiveIntegerField(default=1)
+    workload_version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Feed Teme Clasă"
+        verbose_name_plural = "Feed-uri Teme Clase"
+
+    def __str__(self):
+        return f"{self.class_room} v{self.version}"
+
+
+class SharedHomeworkState(models.Model):
+    """
+    Starea unui elev față de feed-ul clasei, un singur rând per (elev, clasă):
+    ce a văzut (tot ce a fost partajat până la `seen_at`) și ce a bifat ca făcut.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shared_homework_states')
+    class_room = models.ForeignKey(ClassRoom, on_delete=models.CASCADE, related_name='shared_homework_states')
+    seen_at = models.DateTimeField(blank=True, null=True)
+    done_ids = models.JSONField(default=list, blank=True, help_text="Id-urile temelor partajate bifate ca făcute")
+
+    class Meta:
+        verbose_name = "Stare Feed Teme"
+        verbose_name_plural = "Stări Feed Teme"
+        unique_together = ['user', 'class_room']
+
+    def __str__(self):
+        return f"{self.user} - {self.class_room}"
+
+
 class HomeworkReminder(models.Model):
     """
     Reminder-uri pentru teme
@@ -0,0 +1,228 @@
+"""
+Planificatorul de studiu: împarte temele nefinalizate pe zilele până la termen,
+în timpul liber rămas după ore.
+
+Ferestrele de studiu (ziua, ora de început, ora de sfârșit) se calculează din
+orarul efectiv și din vacanțe, o singură dată per versiune a orarului (cache).
+Planul propriu-zis este recalculat la fiecare citire din starea curentă a
+temelor (o interogare) peste ferestrele din cache, deci orice actualizare de
+progres se vede imediat, fără invalidări: algoritmul este un EDF (cel mai
+apropiat termen întâi) ponderat cu prioritatea, liniar în zile × teme.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.schedule import versions
+from apps.schedule.resolver import ScheduleResolver
+from apps.schedule.school_year import days_off
+from .models import Homework, HomeworkDailyStats
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+# Orizontul maxim al planului (zile)
+HORIZON_DAYS = 21
+# Pauza după ultima oră și intervalul zilnic în care se poate învăța
+BREAK_AFTER_SCHOOL = timedelta(minutes=60)
+FREE_DAY_START = time(10, 0)
+STUDY_END = time(21, 0)
+# Dimensiunea blocurilor de studiu (minute)
+MIN_BLOCK = 15
+MAX_BLOCK = 90
+# Estimarea folosită pentru temele fără timp estimat
+DEFAULT_ESTIMATE = {'usoara': 20, 'medie': 40, 'grea': 60}
+# Prioritatea „trage” termenul efectiv mai devreme (zile) și departajează termenele egale
+PRIORITY_SHIFT = {'scazuta': 0, 'normala': 0, 'ridicata': 1, 'urgenta': 2}
+PRIORITY_WEIGHT = {'scazuta': 1, 'normala': 2, 'ridicata': 3, 'urgenta': 4}
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+# --- Ferestre de studiu ---
+
+def _compute_windows(user, start, end, resolver=None):
+    """[(zi, minutul de început, minutul de sfârșit)] din orele efective și zilele libere."""
+    resolver = resolver or ScheduleResolver(user)
+    profile = resolver.profile
+    class_room = getattr(profile, 'class_room', None) if profile else None
+    off = set(days_off(getattr(class_room, 'judet', None) or None))
+
+    last_lesson = {}
+    for lesson in resolver.lessons_between(start, end, include_cancelled=False):
+        if lesson.data in off:
+            continue
+        last_lesson[lesson.data] = max(last_lesson.get(lesson.data, lesson.ora_sfarsit), lesson.ora_sfarsit)
+
+    windows = []
+    day = start
+    while day <= end:
+        if day in last_lesson:
+            begin = _minutes(last_lesson[day]) + int(BREAK_AFTER_SCHOOL.total_seconds() // 60)
+        else:
+            begin = _minutes(FREE_DAY_START)
+        windows.append((day, begin, _minutes(STUDY_END)))
+        day += timedelta(days=1)
+    return windows
+
+
+def study_windows(user, start, days=HORIZON_DAYS, profile=None, resolver=None):
+    """Ferestrele următoarelor `days` zile, din cache cât timp orarul nu se schimbă."""
+    version = versions.version_for_user(user, profile)
+    key = f"homework:planner:windows:{user.pk}:{version.hash}:{start.isoformat()}:{days}"
+    windows = cache.get(key)
+    if windows is None:
+        windows = _compute_windows(user, start, start + timedelta(days=days - 1), resolver)
+        cache.set(key, windows, CACHE_TIMEOUT)
+    return windows
+
+
+# --- Planificare ---
+
+@dataclass
+class PlanItem:
+    pk: int
+    titlu: str
+    materie: str
+    culoare: str
+    deadline: date
+    prioritate: str
+    remaining: int
+    last_day: date
+    key: tuple = ()
+    planned: int = 0
+    late: int = 0
+
+    @property
+    def payload(self):
+        return {'homework_id': self.pk, 'titlu': self.titlu, 'materie': self.materie, 'culoare': self.culoare}
+
+
+@dataclass
+class PlanDay:
+    zi: date
+    capacitate: int
+    blocuri: list = field(default_factory=list)
+
+
+def remaining_minutes(timp_estimat, dificultate, progres):
+    estimate = timp_estimat or DEFAULT_ESTIMATE.get(dificultate, DEFAULT_ESTIMATE['medie'])
+    return max(MIN_BLOCK, math.ceil(estimate * (100 - min(progres, 100)) / 100))
+
+
+def pending_items(user, today):
+    """Temele nefinalizate ale utilizatorului, ca PlanItem (o singură interogare)."""
+    rows = (
+        Homework.objects.filter(user=user, finalizata=False)
+        .values('pk', 'titlu', 'subject__nume', 'subject__culoare', 'deadline', 'prioritate',
+                'timp_estimat', 'dificultate', 'progres')
+    )
+    items = []
+    for row in rows:
+        # Tema se predă la termen, deci se lucrează până în ziua dinainte (restanțele: de azi)
+        last_day = max(row['deadline'] - timedelta(days=1), today)
+        effective = max(row['deadline'] - timedelta(days=PRIORITY_SHIFT.get(row['prioritate'], 0)), today)
+        items.append(PlanItem(
+            pk=row['pk'],
+            titlu=row['titlu'],
+            materie=row['subject__nume'],
+            culoare=row['subject__culoare'],
+            deadline=row['deadline'],
+            prioritate=row['prioritate'],
+            remaining=remaining_minutes(row['timp_estimat'], row['dificultate'], row['progres']),
+            last_day=last_day,
+            key=(effective, -PRIORITY_WEIGHT.get(row['prioritate'], 2), row['deadline'], row['pk']),
+        ))
+    return items
+
+
+def build_plan(items, windows, budget, studied_today=0, now=None):
+    """
+    Împarte minutele rămase pe zile: în fiecare zi, temele sunt luate în ordinea
+    termenului efectiv (termen minus decalajul de prioritate), în blocuri de cel
+    mult MAX_BLOCK minute, cât permit bugetul zilnic și fereastra liberă. În
+    ultima zi înainte de termen o temă poate primi tot restul. Nu citește din baza de date.
+    """
+    items = sorted(items, key=lambda item: item.key)
+    days = []
+    for day, begin, end in windows:
+        spent = 0
+        if now is not None and day == now.date():
+            begin = max(begin, now.hour * 60 + now.minute)
+            spent = studied_today
+        capacity = max(0, min(budget - spent, end - begin))
+        plan_day = PlanDay(zi=day, capacitate=capacity)
+        cursor = begin
+        left = capacity
+        for item in items:
+            if left < MIN_BLOCK:
+                break
+            if item.remaining <= 0:
+                continue
+            cap = item.remaining if day >= item.last_day else MAX_BLOCK
+            chunk = min(item.remaining, cap, left)
+            if chunk < MIN_BLOCK and chunk < item.remaining:
+                continue
+            plan_day.blocuri.append({
+                **item.payload,
+                'inceput': _time(cursor),
+                'sfarsit': _time(cursor + chunk),
+                'minute': chunk,
+            })
+            cursor += chunk
+            left -= chunk
+            item.remaining -= chunk
+            item.planned += chunk
+            if day > item.last_day:
+                item.late += chunk
+        days.append(plan_day)
+
+    at_risk = [
+        {**item.payload, 'deadline': item.deadline, 'minute_intarziate': item.late,
+         'minute_neplanificate': item.remaining}
+        for item in items if item.late or item.remaining
+    ]
+    return days, at_risk
+
+
+def _studied_today(user, today):
+    return HomeworkDailyStats.objects.filter(user=user, zi=today).aggregate(m=Sum('minute_lucrate'))['m'] or 0
+
+
+def budget_for(profile):
+    return profile.buget_studiu_zilnic if profile is not None else 120
+
+
+def study_plan(user, days=HORIZON_DAYS, profile=None, resolver=None, now=None):
+    """Planul pentru următoarele `days` zile: (zile, teme la risc)."""
+    now = timezone.localtime(now or timezone.now())
+    today = now.date()
+    if profile is None:
+        profile = resolver.profile if resolver else getattr(user, 'student_profile', None)
+    items = pending_items(user, today)
+    if not items:
+        return [], []
+    windows = study_windows(user, today, days, profile=profile, resolver=resolver)
+    return build_plan(items, windows, budget_for(profile), _studied_today(user, today), now)
+
+
+def serialize(days, at_risk):
+    """Răspunsul JSON al API-ului (doar zilele cu blocuri)."""
+    def block(b):
+        return {**b, 'inceput': b['inceput'].strftime('%H:%M'), 'sfarsit': b['sfarsit'].strftime('%H:%M')}
+    return {
+        'days': [
+            {'zi': d.zi.isoformat(), 'capacitate': d.capacitate, 'blocuri': [block(b) for b in d.blocuri]}
+            for d in days if d.blocuri
+        ],
+        'at_risk': [{**r, 'deadline': r['deadline'].isoformat()} for r in at_risk],
+    }
@@ -0,0 +1,108 @@
+"""
+Interogări pentru lista de teme.
+
+Setul vizibil („ale mele + partajate cu clasa mea”) este construit ca UNION
+a două interogări indexate, în loc de un OR care împiedică folosirea
+indecșilor. Statisticile se calculează într-un singur `aggregate()`, iar
+sortările după deadline/prioritate pot fi paginate cu cursor (keyset), fără
+OFFSET și fără COUNT.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db.models import Count, Q
+
+from .models import Homework
+
+
+def visible_homework(user, class_room=None):
+    """Temele utilizatorului plus cele partajate cu clasa lui (clasa sau id-ul ei)."""
+    mine = Homework.objects.filter(user=user)
+    if class_room is None:
+        return mine
+    ids = mine.values('pk').order_by().union(
+        Homework.objects.filter(shared_class_room=class_room, share_with_class=True).values('pk').order_by()
+    )
+    return Homework.objects.filter(pk__in=ids)
+
+
+def homework_stats(queryset, today=None):
+    """Cardurile de statistici ale listei, într-o singură interogare."""
+    today = today or date.today()
+    active = Q(finalizata=False)
+    return queryset.order_by().aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=active),
+        completed_today=Count('pk', filter=Q(finalizata=True, data_finalizare__date=today)),
+        overdue=Count('pk', filter=active & Q(deadline__lt=today)),
+        due_today=Count('pk', filter=active & Q(deadline=today)),
+        due_tomorrow=Count('pk', filter=active & Q(deadline=today + timedelta(days=1))),
+    )
+
+
+# Sortările care suportă paginare cu cursor: (ordine, câmpurile cheii)
+KEYSET_ORDERINGS = {
+    'deadline': ('deadline', '-prioritate', 'pk'),
+    'priority': ('-prioritate', 'deadline', 'pk'),
+}
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    next_cursor: str = ''
+    has_previous: bool = False
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _encode_cursor(obj):
+    return f"{obj.deadline.isoformat()}.{obj.prioritate}.{obj.pk}"
+
+
+def _decode_cursor(cursor):
+    """Cursorul „deadline.prioritate.pk”; None dacă e invalid."""
+    try:
+        deadline, prioritate, pk = cursor.split('.')
+        return {'deadline': date.fromisoformat(deadline), 'prioritate': prioritate, 'pk': int(pk)}
+    except (AttributeError, ValueError):
+        return None
+
+
+def _after(ordering, values):
+    """Condiția „după cursor” pentru o ordonare cu direcții mixte."""
+    condition = Q()
+    equal = Q()
+    for name in ordering:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        step = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[name]})
+        condition |= equal & step
+        equal &= Q(**{name: values[name]})
+    return condition
+
+
+def keyset_page(queryset, sort, cursor=None, per_page=15):
+    """
+    O pagină de teme după cursor, pentru sortările din KEYSET_ORDERINGS.
+    Se citește un rând în plus pentru a ști dacă mai urmează o pagină.
+    """
+    ordering = KEYSET_ORDERINGS[sort]
+    queryset = queryset.order_by(*ordering)
+    values = _decode_cursor(cursor) if cursor else None
+    if values:
+        queryset = queryset.filter(_after(ordering, values))
+    rows = list(queryset[:per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(
+        object_list=rows,
+        has_next=has_next,
+        next_cursor=_encode_cursor(rows[-1]) if has_next else '',
+        has_previous=bool(values),
+    )
@@ -0,0 +1,280 @@
+"""
+Statisticile temelor din contoare zilnice (HomeworkDailyStats).
+
+Fiecare temă contribuie la contoarele zilei în care a fost primită
+(`adaugate`) și ale zilei în care a fost finalizată (`finalizate`,
+`finalizate_la_timp`, `minute_finalizate`); fiecare sesiune de lucru, la
+`minute_lucrate` și `sesiuni` din ziua în care a început. La salvare/ștergere se aplică
+doar diferența dintre contribuția veche și cea nouă, deci pagina de
+statistici citește o singură interogare grupată, indiferent de istoric.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractWeekDay
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.tracking import when_changed
+from .models import Homework, HomeworkDailyStats, HomeworkSession
+from .services import batch_delete_in_progress, homework_batch_changed, homework_changed
+
+
+COUNTERS = ('adaugate', 'finalizate', 'finalizate_la_timp', 'minute_finalizate', 'minute_lucrate', 'sesiuni',
+            'finalizate_cu_estimare', 'minute_estimate', 'minute_efective_estimate')
+HOMEWORK_FIELDS = ('user_id', 'subject_id', 'data_primita', 'finalizata', 'data_finalizare', 'deadline', 'timp_lucrat',
+                   'timp_estimat')
+
+
+def _local_day(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def homework_buckets(row):
+    """Contribuția unei teme (dict cu HOMEWORK_FIELDS): {(materie, zi): Counter}."""
+    buckets = defaultdict(Counter)
+    if not row or not row['subject_id']:
+        return buckets
+    buckets[(row['subject_id'], row['data_primita'])]['adaugate'] += 1
+    if row['finalizata'] and row['data_finalizare']:
+        day = _local_day(row['data_finalizare'])
+        counts = buckets[(row['subject_id'], day)]
+        counts['finalizate'] += 1
+        counts['finalizate_la_timp'] += int(day <= row['deadline'])
+        counts['minute_finalizate'] += row['timp_lucrat'] or 0
+        if row['timp_estimat']:
+            counts['finalizate_cu_estimare'] += 1
+            counts['minute_estimate'] += row['timp_estimat']
+            counts['minute_efective_estimate'] += row['timp_lucrat'] or 0
+    return buckets
+
+
+def session_buckets(subject_id, inceput, durata_minute):
+    buckets = defaultdict(Counter)
+    if subject_id and inceput and durata_minute:
+        counts = buckets[(subject_id, _local_day(inceput))]
+        counts['minute_lucrate'] += durata_minute
+        counts['sesiuni'] += 1
+    return buckets
+
+
+def _diff(new, old):
+    delta = defaultdict(Counter)
+    for key, counts in new.items():
+        delta[key].update(counts)
+    for key, counts in old.items():
+        delta[key].subtract(counts)
+    return delta
+
+
+def apply_delta(user_id, delta):
+    """
+    Aplică diferențele pe contoare; rândurile lipsă se creează doar pentru creșteri.
+    Dacă o cerere concurentă creează același rând între UPDATE și INSERT, inserarea
+    (într-un savepoint) eșuează pe unique_together și diferența se aplică prin UPDATE.
+    """
+    with transaction.atomic():
+        for (subject_id, day), counts in delta.items():
+            counts = {k: v for k, v in counts.items() if v}
+            if not counts:
+                continue
+            row = HomeworkDailyStats.objects.filter(user_id=user_id, subject_id=subject_id, zi=day)
+            increments = {name: F(name) + value for name, value in counts.items()}
+            if row.update(**increments) or not any(v > 0 for v in counts.values()):
+                continue
+            try:
+                with transaction.atomic():
+                    HomeworkDailyStats.objects.create(
+                        user_id=user_id, subject_id=subject_id, zi=day,
+                        **{name: max(value, 0) for name, value in counts.items()}
+                    )
+            except IntegrityError:
+                row.update(**increments)
+
+
+def _homework_row(homework):
+    return {name: getattr(homework, name) for name in HOMEWORK_FIELDS}
+
+
+# --- Întreținere incrementală ---
+
+@receiver(pre_save, sender=Homework)
+@when_changed(*HOMEWORK_FIELDS)
+def _track_rollup_fields(sender, instance: Homework, **kwargs):
+    instance._old_rollup_row = instance.saved_values(*HOMEWORK_FIELDS)
+
+
+@receiver(post_save, sender=Homework)
+@when_changed(*HOMEWORK_FIELDS)
+def update_rollups_on_homework_save(sender, instance: Homework, **kwargs):
+    old = getattr(instance, '_old_rollup_row', None)
+    new = _homework_row(instance)
+    if old and old['user_id'] != new['user_id']:
+        apply_delta(old['user_id'], _diff({}, homework_buckets(old)))
+        old = None
+    apply_delta(instance.user_id, _diff(homework_buckets(new), homework_buckets(old)))
+
+    # Minutele sesiunilor urmează tema când i se schimbă materia
+    if old and old['subject_id'] != new['subject_id']:
+        moved = defaultdict(Counter)
+        for s in instance.sessions.values('inceput', 'durata_minute'):
+            for (_, day), counts in session_buckets(old['subject_id'], s['inceput'], s['durata_minute']).items():
+                moved[(new['subject_id'], day)].update(counts)
+                moved[(old['subject_id'], day)].subtract(counts)
+        apply_delta(instance.user_id, moved)
+
+
+@receiver(post_delete, sender=Homework)
+def update_rollups_on_homework_delete(sender, instance: Homework, **kwargs):
+    if batch_delete_in_progress():
+        return
+    apply_delta(instance.user_id, _diff({}, homework_buckets(_homework_row(instance))))
+
+
+@receiver(homework_changed)
+def update_rollups_on_transition(sender, homework, old, session=None, **kwargs):
+    """Tranzițiile din services.py nu trec prin save(): diferența vine din valorile vechi."""
+    new = _homework_row(homework)
+    before = {**new, **{name: value for name, value in old.items() if name in new}}
+    delta = _diff(homework_buckets(new), homework_buckets(before))
+    if session is not None:
+        for key, counts in session_buckets(homework.subject_id, session.inceput, session.durata_minute).items():
+            delta[key].update(counts)
+    apply_delta(homework.user_id, delta)
+
+
+SESSION_FIELDS = ('homework_id', 'inceput', 'durata_minute')
+
+
+@receiver(homework_batch_changed)
+def update_rollups_on_batch(sender, homework, transition, old, **kwargs):
+    """Diferențele tuturor temelor din lot, însumate înainte de scriere."""
+    delta = defaultdict(Counter)
+    for hw in homework:
+        new = _homework_row(hw)
+        if transition == 'delete':
+            changes = _diff({}, homework_buckets(new))
+        else:
+            changes = _diff(homework_buckets(new), homework_buckets({**new, **old.get(hw.pk, {})}))
+        for key, counts in changes.items():
+            delta[key].update(counts)
+    if transition == 'delete':
+        # Evenimentul pleacă înaintea ștergerii: sesiunile lotului se scad aici, dintr-o singură citire
+        subjects = {hw.pk: hw.subject_id for hw in homework}
+        for s in HomeworkSession.objects.filter(homework__in=homework).values('homework_id', 'inceput', 'durata_minute'):
+            for key, counts in session_buckets(subjects[s['homework_id']], s['inceput'], s['durata_minute']).items():
+                delta[key].subtract(counts)
+    if homework:
+        apply_delta(homework[0].user_id, delta)
+
+
+@receiver(pre_save, sender=HomeworkSession)
+@when_changed(*SESSION_FIELDS)
+def _track_session_fields(sender, instance: HomeworkSession, **kwargs):
+    old = instance.saved_values(*SESSION_FIELDS)
+    if old:
+        if old['homework_id'] == instance.homework_id:
+            owner = {'subject_id': instance.homework.subject_id, 'user_id': instance.homework.user_id}
+        else:
+            owner = Homework.objects.filter(pk=old['homework_id']).values('subject_id', 'user_id').first() or {}
+        old['subject_id'], old['user_id'] = owner.get('subject_id'), owner.get('user_id')
+    instance._old_rollup_session = old
+
+
+@receiver(post_save, sender=HomeworkSession)
+@when_changed(*SESSION_FIELDS)
+def update_rollups_on_session_save(sender, instance: HomeworkSession, **kwargs):
+    homework = instance.homework
+    new = session_buckets(homework.subject_id, instance.inceput, instance.durata_minute)
+    old = getattr(instance, '_old_rollup_session', None)
+    if old and old['user_id'] != homework.user_id:
+        apply_delta(old['user_id'], _diff({}, session_buckets(old['subject_id'], old['inceput'], old['durata_minute'])))
+        old = None
+    old_buckets = session_buckets(old['subject_id'], old['inceput'], old['durata_minute']) if old else {}
+    apply_delta(homework.user_id, _diff(new, old_buckets))
+
+
+@receiver(post_delete, sender=HomeworkSession)
+def update_rollups_on_session_delete(sender, instance: HomeworkSession, **kwargs):
+    if batch_delete_in_progress():
+        return
+    row = Homework.objects.filter(pk=instance.homework_id).values('user_id', 'subject_id').first()
+    if row:  # sesiunile sunt șterse înaintea temei (CASCADE), deci tema încă există
+        apply_delta(row['user_id'], _diff({}, session_buckets(row['subject_id'], instance.inceput, instance.durata_minute)))
+
+
+# --- Reconstruire ---
+
+def rebuild(users=None, homework_model=Homework, session_model=HomeworkSession, stats_model=HomeworkDailyStats):
+    """
+    Recalculează contoarele din datele brute (toți utilizatorii sau doar `users`).
+    Modelele pot fi înlocuite cu cele istorice, pentru migrări.
+    """
+    homework = homework_model.objects.all()
+    sessions = session_model.objects.all()
+    stats = stats_model.objects.all()
+    if users is not None:
+        homework = homework.filter(user__in=users)
+        sessions = sessions.filter(homework__user__in=users)
+        stats = stats.filter(user__in=users)
+
+    totals = defaultdict(Counter)
+    for row in homework.values(*HOMEWORK_FIELDS).iterator():
+        for (subject_id, day), counts in homework_buckets(row).items():
+            totals[(row['user_id'], subject_id, day)].update(counts)
+    for row in sessions.values('inceput', 'durata_minute', 'homework__subject_id', 'homework__user_id').iterator():
+        for (subject_id, day), counts in session_buckets(
+                row['homework__subject_id'], row['inceput'], row['durata_minute']).items():
+            totals[(row['homework__user_id'], subject_id, day)].update(counts)
+
+    # Modelul istoric al unei migrări mai vechi poate avea doar o parte din contoare
+    counters = [name for name in COUNTERS if name in {f.name for f in stats_model._meta.get_fields()}]
+    stats.delete()
+    stats_model.objects.bulk_create([
+        stats_model(user_id=user_id, subject_id=subject_id, zi=day, **{name: counts[name] for name in counters})
+        for (user_id, subject_id, day), counts in totals.items()
+    ], batch_size=500)
+    return len(totals)
+
+
+# --- Citire ---
+
+def summary(user):
+    """
+    Statisticile generale, pe materii și pe zilele săptămânii, dintr-o singură
+    interogare grupată pe (materie, zi a săptămânii).
+    """
+    rows = (
+        HomeworkDailyStats.objects.filter(user=user)
+        .annotate(wd=ExtractWeekDay('zi'))
+        .values('subject_id', 'wd')
+        .annotate(**{name: Sum(name) for name in COUNTERS})
+        .order_by()
+    )
+    general = Counter()
+    per_subject = defaultdict(Counter)
+    per_weekday = Counter()
+    for row in rows:
+        counts = {name: row[name] or 0 for name in COUNTERS}
+        general.update(counts)
+        per_subject[row['subject_id']].update(counts)
+        # ExtractWeekDay: 1=Duminică ... 7=Sâmbătă -> 0=Luni ... 6=Duminică
+        per_weekday[(int(row['wd']) + 5) % 7] += counts['finalizate']
+    weekdays = [{'weekday': wd, 'count': count} for wd, count in sorted(per_weekday.items()) if count]
+    return general, per_subject, weekdays
+
+
+def rates(counts):
+    """Rata de finalizare și timpul mediu pentru un set de contoare."""
+    total, completed = counts['adaugate'], counts['finalizate']
+    return {
+        'total': total,
+        'completed': completed,
+        'completion_rate': (completed / max(total, 1)) * 100,
+        'avg_time': counts['minute_finalizate'] / completed if completed else 0,
+        'total_time': counts['minute_finalizate'],
+        'on_time': counts['finalizate_la_timp'],
+        'minutes_worked': counts['minute_lucrate'],
+    }
@@ -0,0 +1,301 @@
+"""
+Tranzițiile de stare ale unei teme: finalizare, redeschidere, progres și
+încheierea unei sesiuni de lucru.
+
+Fiecare tranziție calculează o singură dată starea finală și o scrie cu un
+singur UPDATE pe câmpurile schimbate (timpul lucrat prin F(), fără citire
+prealabilă). UPDATE-ul este condiționat de starea de plecare (de ex. tema încă
+nefinalizată), așa că două cereri concurente nu aplică de două ori aceeași
+tranziție: cea care nu mai schimbă niciun rând întoarce False și nu emite nimic.
+Nu trece prin `save()`, deci nici prin semnalele pre_save/post_save
+care recitesc tema; în locul lor se emite un singur eveniment `homework_changed`
+cu valorile vechi ale câmpurilor schimbate, din care indecșii (calendar,
+statistici, feed) își aplică diferențele, iar notificările își fac treaba.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from apps.core.models import Notification, StudentProfile
+from .models import Homework, HomeworkReminder, HomeworkSession
+
+
+# Argumente: homework (starea nouă), transition ('complete', 'reopen', 'progress', 'session'),
+# old (valorile dinainte ale câmpurilor schimbate), session (sesiunea încheiată, dacă e cazul)
+homework_changed = Signal()
+
+
+def _persist(homework, transition, changes, increments=None, session=None, expected=None):
+    """
+    Scrie tranziția cu un UPDATE condiționat de `expected` (starea de plecare) și
+    emite evenimentul în aceeași tranzacție. False dacă tema nu mai era în starea așteptată.
+    """
+    increments = increments or {}
+    old = {name: getattr(homework, name) for name in (*changes, *increments)}
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Homework.objects.filter(pk=homework.pk, **(expected or {})).update(
+            updated_at=now,
+            **changes,
+            **{name: F(name) + value for name, value in increments.items()},
+        )
+        if not updated:
+            return False
+        homework.updated_at = now
+        for name, value in changes.items():
+            setattr(homework, name, value)
+        for name, value in increments.items():
+            setattr(homework, name, getattr(homework, name) + value)
+        homework.mark_saved('updated_at', *changes, *increments)
+        homework_changed.send(sender=Homework, homework=homework, transition=transition, old=old, session=session)
+    return True
+
+
+def complete(homework):
+    """Marchează tema ca finalizată (progres 100%)."""
+    if homework.finalizata:
+        return False
+    return _persist(
+        homework, 'complete', {'finalizata': True, 'progres': 100, 'data_finalizare': timezone.now()},
+        expected={'finalizata': False},
+    )
+
+
+def reopen(homework):
+    """Redeschide o temă finalizată; progresul scade cu 10%."""
+    if not homework.finalizata:
+        return False
+    return _persist(homework, 'reopen', {
+        'finalizata': False, 'data_finalizare': None, 'progres': max(0, homework.progres - 10),
+    }, expected={'finalizata': True})
+
+
+def toggle_complete(homework):
+    return reopen(homework) if homework.finalizata else complete(homework)
+
+
+def set_progress(homework, progress):
+    """Actualizează progresul (0-100); la 100% tema este finalizată."""
+    progress = max(0, min(100, int(progress)))
+    if progress == 100 and not homework.finalizata:
+        return complete(homework)
+    if progress == homework.progres:
+        return False
+    return _persist(homework, 'progress', {'progres': progress})
+
+
+def end_session(session, progress=None, notes='', difficulties=''):
+    """Încheie sesiunea și adaugă durata ei la timpul lucrat al temei."""
+    if session.sfarsit:
+        return False
+    homework = session.homework
+    progress = homework.progres if progress is None else max(0, min(100, int(progress)))
+    now = timezone.now()
+    minutes = int((now - session.inceput).total_seconds() / 60)
+
+    fields = {
+        'sfarsit': now, 'durata_minute': minutes, 'progres_dupa': progress,
+        'note_sesiune': notes, 'dificultati_sesiune': difficulties,
+    }
+    changes = {'progres': progress} if progress != homework.progres else {}
+    with transaction.atomic():
+        if not HomeworkSession.objects.filter(pk=session.pk, sfarsit__isnull=True).update(**fields):
+            return False
+        for name, value in fields.items():
+            setattr(session, name, value)
+        session.mark_saved(*fields)
+        return _persist(homework, 'session', changes, increments={'timp_lucrat': minutes}, session=session)
+
+
+# --- Operații în masă ---
+
+# Argumente: homework (lista temelor, cu starea nouă), transition (una din BULK_ACTIONS),
+# old ({pk: valorile vechi ale câmpurilor schimbate}). La 'delete' se trimite înaintea
+# ștergerii, în aceeași tranzacție, cât timp sesiunile temelor încă există.
+homework_batch_changed = Signal()
+
+BULK_ACTIONS = ('complete', 'reopen', 'reschedule', 'priority', 'share', 'unshare', 'delete')
+# Amânarea în masă mută termenele cu cel mult un an, în orice direcție
+MAX_RESCHEDULE_DAYS = 365
+
+_batch = threading.local()
+
+
+@contextmanager
+def _deleting_batch():
+    previous = getattr(_batch, 'deleting', False)
+    _batch.deleting = True
+    try:
+        yield
+    finally:
+        _batch.deleting = previous
+
+
+def batch_delete_in_progress():
+    """Receptorii post_delete per temă/sesiune nu fac nimic: indecșii se actualizează din evenimentul lotului."""
+    return getattr(_batch, 'deleting', False)
+
+
+def owned_homework(user, ids):
+    """Temele utilizatorului cu id-urile date, într-o singură interogare; ValueError dacă lipsește vreuna."""
+    try:
+        ids = {int(pk) for pk in ids}
+    except (TypeError, ValueError):
+        raise ValueError('Selecție invalidă.')
+    homeworks = list(Homework.objects.filter(user=user, pk__in=ids).select_related('subject'))
+    if not ids or len(homeworks) != len(ids):
+        raise ValueError('Selecția conține teme inexistente sau care nu îți aparțin.')
+    return homeworks
+
+
+def _bulk_persist(homeworks, transition, changes):
+    """
+    Scrie schimbările ({pk: {câmp: valoare}}) ale tuturor temelor: un singur UPDATE
+    când valorile sunt identice, altfel bulk_update. Trimite un singur eveniment.
+    """
+    changed = [hw for hw in homeworks if changes.get(hw.pk)]
+    if not changed:
+        return []
+    now = timezone.now()
+    old = {}
+    fields = set()
+    for hw in changed:
+        old[hw.pk] = {name: getattr(hw, name) for name in changes[hw.pk]}
+        for name, value in changes[hw.pk].items():
+            setattr(hw, name, value)
+        hw.updated_at = now
+        fields.update(changes[hw.pk])
+
+    first = changes[changed[0].pk]
+    if set(first) == fields and all(changes[hw.pk] == first for hw in changed):
+        Homework.objects.filter(pk__in=[hw.pk for hw in changed]).update(updated_at=now, **first)
+    else:
+        Homework.objects.bulk_update(changed, [*sorted(fields), 'updated_at'], batch_size=200)
+    for hw in changed:
+        hw.mark_saved('updated_at', *changes[hw.pk])
+    homework_batch_changed.send(sender=Homework, homework=changed, transition=transition, old=old)
+    return changed
+
+
+def _refresh_reminders(homeworks):
+    """Mută reminder-ele netrimise după noul deadline (o ștergere și o inserare pentru tot lotul)."""
+    today = date.today()
+    HomeworkReminder.objects.filter(homework__in=homeworks, trimis=False).delete()
+    HomeworkReminder.objects.bulk_create([
+        HomeworkReminder(homework=hw, data_reminder=hw.deadline - timedelta(days=hw.zile_reminder))
+        for hw in homeworks
+        if hw.reminder_activ and not hw.finalizata and hw.deadline - timedelta(days=hw.zile_reminder) >= today
+    ], ignore_conflicts=True)
+
+
+def bulk_delete(homeworks):
+    with _deleting_batch():
+        homework_batch_changed.send(sender=Homework, homework=homeworks, transition='delete', old={})
+        Homework.objects.filter(pk__in=[hw.pk for hw in homeworks]).delete()
+    return homeworks
+
+
+def bulk_apply(user, ids, action, days=None, priority=None):
+    """
+    Aplică o acțiune pe mai multe teme ale utilizatorului, atomic.
+    Întoarce temele efectiv modificate; ValueError pentru parametri invalizi.
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError('Acțiune necunoscută.')
+    with transaction.atomic():
+        homeworks = owned_homework(user, ids)
+        if action == 'delete':
+            return bulk_delete(homeworks)
+
+        now = timezone.now()
+        if action == 'complete':
+            changes = {hw.pk: {'finalizata': True, 'progres': 100, 'data_finalizare': now}
+                       for hw in homeworks if not hw.finalizata}
+        elif action == 'reopen':
+            changes = {hw.pk: {'finalizata': False, 'data_finalizare': None, 'progres': max(0, hw.progres - 10)}
+                       for hw in homeworks if hw.finalizata}
+        elif action == 'reschedule':
+            try:
+                days = int(days)
+            except (TypeError, ValueError):
+                raise ValueError('Numărul de zile este invalid.')
+            if abs(days) > MAX_RESCHEDULE_DAYS:
+                raise ValueError(f'Termenele se pot muta cu cel mult {MAX_RESCHEDULE_DAYS} de zile.')
+            changes = {hw.pk: {'deadline': hw.deadline + timedelta(days=days)} for hw in homeworks} if days else {}
+        elif action == 'priority':
+            if priority not in dict(Homework.PRIORITY_CHOICES):
+                raise ValueError('Prioritate invalidă.')
+            changes = {hw.pk: {'prioritate': priority} for hw in homeworks if hw.prioritate != priority}
+        elif action == 'share':
+            class_room_id = StudentProfile.objects.filter(user=user).values_list('class_room_id', flat=True).first()
+            if not class_room_id:
+                raise ValueError('Nu ai o clasă setată în profil.')
+            changes = {
+                hw.pk: {'share_with_class': True, 'shared_class_room_id': class_room_id, 'shared_at': hw.shared_at or now}
+                for hw in homeworks
+                if not (hw.share_with_class and hw.shared_class_room_id == class_room_id)
+            }
+        else:  # unshare: clasa rămâne pentru audit, ca în Homework.save()
+            changes = {hw.pk: {'share_with_class': False} for hw in homeworks if hw.share_with_class}
+
+        changed = _bulk_persist(homeworks, action, changes)
+        if action in ('reschedule', 'complete', 'reopen') and changed:
+            _refresh_reminders(changed)
+        return changed
+
+
+# --- Efecte secundare ---
+
+@receiver(homework_changed)
+def notify_completion(sender, homework, transition, **kwargs):
+    """Notificare și email către părinte la finalizarea unei teme."""
+    if transition != 'complete':
+        return
+    Notification.objects.create(
+        user_id=homework.user_id,
+        tip='tema',
+        titlu='Temă finalizată!',
+        mesaj=f'Ai finalizat tema "{homework.titlu}" la {homework.subject.nume}.'
+    )
+
+    try:
+        from apps.core.email_utils import send_email
+        profile = StudentProfile.objects.filter(user_id=homework.user_id).values('reminder_teme', 'email_parinte').first()
+        if profile and profile['reminder_teme'] and profile['email_parinte']:
+            send_email(
+                to_emails=[profile['email_parinte']],
+                subject=f'Temă finalizată: {homework.subject.nume}',
+                html_content=f"""
+                <p>Bună,</p>
+                <p>Tema a fost marcată ca finalizată:</p>
+                <ul>
+                  <li>Materie: {homework.subject.nume}</li>
+                  <li>Titlu: {homework.titlu}</li>
+                  <li>Termen: {homework.deadline}</li>
+                  <li>Progres: 100%</li>
+                </ul>
+                """
+            )
+    except Exception:
+        pass
+
+
+@receiver(homework_batch_changed)
+def notify_batch_completion(sender, homework, transition, **kwargs):
+    """O singură notificare pentru un lot de teme finalizate."""
+    if transition != 'complete' or not homework:
+        return
+    if len(homework) == 1:
+        return notify_completion(sender, homework=homework[0], transition='complete')
+    Notification.objects.create(
+        user_id=homework[0].user_id,
+        tip='tema',
+        titlu='Teme finalizate!',
+        mesaj=f'Ai finalizat {len(homework)} teme: ' + ', '.join(hw.titlu for hw in homework[:5])
+              + ('...' if len(homework) > 5 else '')
+    )
@@ -29,12 +29,8 @@ def _unlock(user, code, progress=0, message=None):
 
 @receiver(pre_save, sender=Homework)
 def _track_old_fields(sender, instance: Homework, **kwargs):
-    if instance.pk:
-        try:
-            old = Homework.objects.get(pk=instance.pk)
-            instance._old_finalizata = old.finalizata
-        except Homework.DoesNotExist:
-            instance._old_finalizata = False
+    old = instance.saved_values('finalizata')
+    instance._old_finalizata = bool(old and old['finalizata'])
 
 
 @receiver(post_save, sender=Homework)
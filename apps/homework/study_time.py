@@ -0,0 +1,126 @@
+"""
+Timpul de studiu: serii săptămânale/lunare și acuratețea estimărilor.
+
+Totul se citește din contoarele zilnice HomeworkDailyStats (minute_lucrate,
+sesiuni, minute_estimate...), întreținute de rollups.py la încheierea
+sesiunilor și finalizarea temelor. Costul nu depinde de numărul de sesiuni:
+o serie citește cel mult (zile din interval × materii) rânduri, grupate deja
+în baza de date pe perioadă și materie.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import HomeworkDailyStats
+
+
+PERIODS = {
+    'week': {'trunc': TruncWeek, 'default': 12, 'max': 52},
+    'month': {'trunc': TruncMonth, 'default': 12, 'max': 24},
+}
+
+
+def _shift_month(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def period_starts(period, count, today=None):
+    """Începuturile ultimelor `count` perioade (luni / prima zi a lunii), crescător."""
+    today = today or date.today()
+    if period == 'week':
+        current = today - timedelta(days=today.weekday())
+        return [current - timedelta(weeks=i) for i in range(count - 1, -1, -1)]
+    current = today.replace(day=1)
+    return [_shift_month(current, -i) for i in range(count - 1, -1, -1)]
+
+
+def series(user, period='week', count=None, today=None):
+    """
+    Minutele și sesiunile pe perioadă, totale și pe materii, într-o singură
+    interogare grupată. Perioadele fără activitate apar cu 0.
+    """
+    today = today or date.today()
+    config = PERIODS[period]
+    count = max(1, min(count or config['default'], config['max']))
+    starts = period_starts(period, count, today)
+    index = {start: i for i, start in enumerate(starts)}
+
+    rows = (
+        HomeworkDailyStats.objects
+        .filter(user=user, zi__gte=starts[0], zi__lte=today)
+        .annotate(perioada=config['trunc']('zi'))
+        .values('perioada', 'subject_id', 'subject__nume', 'subject__culoare')
+        .annotate(minute=Sum('minute_lucrate'), nr_sesiuni=Sum('sesiuni'))
+        .order_by()
+    )
+
+    minutes = [0] * count
+    sessions = [0] * count
+    subjects = {}
+    for row in rows:
+        i = index.get(row['perioada'])
+        if i is None or not row['minute']:
+            continue
+        minutes[i] += row['minute']
+        sessions[i] += row['nr_sesiuni'] or 0
+        subject = subjects.setdefault(row['subject_id'], {
+            'subject_id': row['subject_id'],
+            'materie': row['subject__nume'],
+            'culoare': row['subject__culoare'],
+            'minute': [0] * count,
+        })
+        subject['minute'][i] += row['minute']
+
+    return {
+        'period': period,
+        'labels': [start.isoformat() for start in starts],
+        'minute': minutes,
+        'sesiuni': sessions,
+        'materii': sorted(subjects.values(), key=lambda s: -sum(s['minute'])),
+    }
+
+
+def _ratio(estimated, actual):
+    """Timpul efectiv raportat la cel estimat (1.0 = estimare exactă)."""
+    return round(actual / estimated, 2) if estimated else None
+
+
+def estimate_accuracy(user):
+    """Estimat vs. efectiv pentru temele finalizate care aveau timp estimat, pe materii și total."""
+    rows = (
+        HomeworkDailyStats.objects
+        .filter(user=user, finalizate_cu_estimare__gt=0)
+        .values('subject_id', 'subject__nume', 'subject__culoare')
+        .annotate(
+            teme=Sum('finalizate_cu_estimare'),
+            estimat=Sum('minute_estimate'),
+            efectiv=Sum('minute_efective_estimate'),
+        )
+        .order_by('subject__nume')
+    )
+    per_subject = []
+    total = {'teme': 0, 'estimat': 0, 'efectiv': 0}
+    for row in rows:
+        per_subject.append({
+            'subject_id': row['subject_id'],
+            'materie': row['subject__nume'],
+            'culoare': row['subject__culoare'],
+            'teme': row['teme'],
+            'estimat': row['estimat'],
+            'efectiv': row['efectiv'],
+            'raport': _ratio(row['estimat'], row['efectiv']),
+        })
+        for name in total:
+            total[name] += row[name]
+    total['raport'] = _ratio(total['estimat'], total['efectiv'])
+    return {'materii': per_subject, 'total': total}
+
+
+def chart_payload(user, period='week', count=None, today=None):
+    """Răspunsul JSON al API-ului pentru grafice."""
+    return {
+        'series': series(user, period, count, today),
+        'accuracy': estimate_accuracy(user),
+    }
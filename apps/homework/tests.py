@@ -1 +1,219 @@
- 
+from collections import Counter
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.schedule.models import ClassRoom
+from apps.subjects.models import Subject
+from . import rollups, services
+from .models import Homework, HomeworkDailyStats, HomeworkSession
+from .queries import KEYSET_ORDERINGS, keyset_page
+
+
+def make_student(username, class_room=None):
+    user = User.objects.create_user(username, password='x')
+    profile = user.student_profile
+    profile.class_room = class_room
+    profile.approved = True
+    profile.save()
+    return User.objects.get(pk=user.pk)
+
+
+class RollupTests(TestCase):
+    """Contoarele actualizate incremental sunt identice cu cele reconstruite din datele brute."""
+
+    def setUp(self):
+        self.user = make_student('elev')
+        self.math = Subject.objects.create(user=self.user, nume='Matematică')
+        self.physics = Subject.objects.create(user=self.user, nume='Fizică')
+        today = date.today()
+        self.homework = [
+            Homework.objects.create(
+                user=self.user, subject=self.math if i % 2 else self.physics, titlu=f'Tema {i}', descriere='-',
+                data_primita=today - timedelta(days=i), deadline=today + timedelta(days=i - 2), timp_estimat=10 * i,
+            )
+            for i in range(6)
+        ]
+
+    def snapshot(self):
+        counters = HomeworkDailyStats.objects.filter(user=self.user).values_list('subject_id', 'zi', *rollups.COUNTERS)
+        return {(row[0], row[1]): row[2:] for row in counters if any(row[2:])}
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rollups.rebuild(users=[self.user])
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_single_transitions(self):
+        first, second, third = self.homework[:3]
+        services.complete(first)
+        services.set_progress(second, 100)
+        self.assertMatchesRebuild()
+        services.reopen(first)
+        self.assertMatchesRebuild()
+
+        session = HomeworkSession.objects.create(homework=third)
+        HomeworkSession.objects.filter(pk=session.pk).update(inceput=timezone.now() - timedelta(minutes=25))
+        session.refresh_from_db()
+        services.end_session(session, progress=50)
+        self.assertEqual(sum(HomeworkDailyStats.objects.values_list('minute_lucrate', flat=True)), 25)
+        self.assertMatchesRebuild()
+
+        third = Homework.objects.get(pk=third.pk)
+        third.subject = self.math
+        third.data_primita -= timedelta(days=3)
+        third.save()
+        self.assertMatchesRebuild()
+        third.delete()
+        self.assertMatchesRebuild()
+
+    def test_bulk_transitions(self):
+        ids = [hw.pk for hw in self.homework]
+        services.bulk_apply(self.user, ids[:4], 'complete')
+        self.assertMatchesRebuild()
+        services.bulk_apply(self.user, ids[:2], 'reopen')
+        self.assertMatchesRebuild()
+        services.bulk_apply(self.user, ids, 'reschedule', days=3)
+        self.assertMatchesRebuild()
+        services.bulk_apply(self.user, ids[2:5], 'delete')
+        self.assertMatchesRebuild()
+
+    def test_row_created_concurrently_is_incremented(self):
+        day = date.today() + timedelta(days=30)
+        update = QuerySet.update
+        raced = []
+
+        def racing_update(queryset, **kwargs):
+            # Altă cerere inserează rândul imediat după UPDATE-ul fără efect
+            result = update(queryset, **kwargs)
+            if not raced:
+                raced.append(HomeworkDailyStats.objects.create(user=self.user, subject=self.math, zi=day, adaugate=2))
+            return result
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            rollups.apply_delta(self.user.pk, {(self.math.pk, day): Counter(adaugate=1)})
+        self.assertEqual(HomeworkDailyStats.objects.get(user=self.user, subject=self.math, zi=day).adaugate, 3)
+
+
+class TransitionTests(TestCase):
+    """O tranziție aplicată pe o instanță învechită nu se repetă și nu emite evenimentul."""
+
+    def setUp(self):
+        self.user = make_student('elev')
+        subject = Subject.objects.create(user=self.user, nume='Matematică')
+        self.homework = Homework.objects.create(
+            user=self.user, subject=subject, titlu='Tema', descriere='-', deadline=date.today(),
+        )
+        self.events = []
+        services.homework_changed.connect(self._on_change)
+        self.addCleanup(services.homework_changed.disconnect, self._on_change)
+
+    def _on_change(self, sender, transition, **kwargs):
+        self.events.append(transition)
+
+    def test_stale_complete_is_a_no_op(self):
+        stale = Homework.objects.get(pk=self.homework.pk)
+        self.assertTrue(services.complete(self.homework))
+        self.assertFalse(services.complete(stale))
+        self.assertFalse(stale.finalizata)
+        self.assertEqual(self.events, ['complete'])
+
+    def test_session_is_ended_once(self):
+        session = HomeworkSession.objects.create(homework=self.homework)
+        stale = HomeworkSession.objects.get(pk=session.pk)
+        self.assertTrue(services.end_session(session))
+        self.assertFalse(services.end_session(stale))
+        self.assertEqual(self.events, ['session'])
+
+
+class BulkApplyTests(TestCase):
+
+    def test_reschedule_rejects_out_of_range_days(self):
+        user = make_student('elev')
+        subject = Subject.objects.create(user=user, nume='Matematică')
+        homework = Homework.objects.create(user=user, subject=subject, titlu='Tema', descriere='-', deadline=date.today())
+        for days in (10 ** 6, -366, '99999999'):
+            with self.assertRaises(ValueError):
+                services.bulk_apply(user, [homework.pk], 'reschedule', days=days)
+        self.assertEqual(Homework.objects.get(pk=homework.pk).deadline, date.today())
+        services.bulk_apply(user, [homework.pk], 'reschedule', days=-365)
+        self.assertEqual(Homework.objects.get(pk=homework.pk).deadline, date.today() - timedelta(days=365))
+
+
+class KeysetPaginationTests(TestCase):
+    """Paginile consecutive acoperă exact setul ordonat, inclusiv la valori egale ale cheii."""
+
+    def setUp(self):
+        self.user = make_student('elev')
+        subject = Subject.objects.create(user=self.user, nume='Română')
+        priorities = [key for key, _ in Homework.PRIORITY_CHOICES]
+        for i in range(23):
+            Homework.objects.create(
+                user=self.user, subject=subject, titlu=f'Tema {i}', descriere='-',
+                deadline=date.today() + timedelta(days=i % 4), prioritate=priorities[i % len(priorities)],
+            )
+
+    def test_pages_cover_the_ordered_set(self):
+        queryset = Homework.objects.filter(user=self.user)
+        for sort, ordering in KEYSET_ORDERINGS.items():
+            expected = list(queryset.order_by(*ordering).values_list('pk', flat=True))
+            seen, cursor = [], None
+            while True:
+                page = keyset_page(queryset, sort, cursor, per_page=5)
+                seen += [hw.pk for hw in page]
+                if not page.has_next:
+                    break
+                cursor = page.next_cursor
+            self.assertEqual(seen, expected, sort)
+
+    def test_invalid_cursor_starts_from_the_beginning(self):
+        page = keyset_page(Homework.objects.filter(user=self.user), 'deadline', 'not-a-cursor', per_page=5)
+        self.assertFalse(page.has_previous)
+        self.assertEqual(len(page), 5)
+
+
+class ClassWorkloadTests(TestCase):
+    """Harta încărcării nu arată elevilor temele nepartajate ale colegilor."""
+
+    def setUp(self):
+        cache.clear()
+        self.class_room = ClassRoom.objects.create(nume='9A')
+        self.alice = make_student('alice', self.class_room)
+        self.bob = make_student('bob', self.class_room)
+        self.teacher = User.objects.create_user('diriginte', password='x')
+        self.class_room.diriginte = self.teacher
+        self.class_room.save()
+        deadline = date.today() + timedelta(days=1)
+        Homework.objects.create(
+            user=self.alice, subject=Subject.objects.create(user=self.alice, nume='Matematică'),
+            titlu='Secret privat', descriere='-', deadline=deadline, timp_estimat=30,
+        )
+        Homework.objects.create(
+            user=self.bob, subject=Subject.objects.create(user=self.bob, nume='Fizică'),
+            titlu='Tema comună', descriere='-', deadline=deadline, timp_estimat=20, share_with_class=True,
+        )
+
+    def cell_for(self, user):
+        self.client.force_login(user)
+        response = self.client.get('/teme/incarcare/?format=json')
+        self.assertEqual(response.status_code, 200)
+        return next(day for day in response.json()['classes'][0]['zile'] if day['termene'])
+
+    def test_student_sees_counts_and_shared_titles_only(self):
+        cell = self.cell_for(self.bob)
+        self.assertEqual((cell['termene'], cell['minute']), (2, 50))
+        self.assertEqual(cell['teme'], [{'materie': 'Fizică', 'titlu': 'Tema comună'}])
+
+    def test_homeroom_teacher_sees_all_titles(self):
+        cell = self.cell_for(self.teacher)
+        self.assertEqual({t['titlu'] for t in cell['teme']}, {'Secret privat', 'Tema comună'})
+        self.assertTrue(all('elevi' in t for t in cell['teme']))
+
+    def test_other_users_see_no_class(self):
+        self.client.force_login(make_student('outsider'))
+        self.assertEqual(self.client.get('/teme/incarcare/?format=json').status_code, 404)
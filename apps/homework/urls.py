@@ -14,6 +14,7 @@ urlpatterns = [
     # Acțiuni pe teme
     path('<int:homework_id>/toggle-complete/', views.homework_complete_toggle, name='toggle_complete'),
     path('<int:homework_id>/update-progress/', views.homework_update_progress, name='update_progress'),
+    path('bulk/', views.homework_bulk_action, name='bulk_action'),
 
     # Fișiere
     path('<int:homework_id>/files/upload/', views.homework_file_upload_view, name='file_upload'),
@@ -23,7 +24,14 @@ urlpatterns = [
     path('<int:homework_id>/session/start/', views.homework_session_start, name='session_start'),
     path('<int:homework_id>/session/<int:session_id>/end/', views.homework_session_end, name='session_end'),
 
+    # Teme partajate cu clasa
+    path('clasa/', views.class_feed_view, name='class_feed'),
+    path('clasa/<int:homework_id>/done/', views.class_feed_toggle_done, name='class_feed_toggle_done'),
+    path('incarcare/', views.class_workload_view, name='class_workload'),
+
     # Vizualizări speciale
     path('calendar/', views.homework_calendar_view, name='calendar'),
     path('stats/', views.homework_stats_view, name='stats'),
+    path('stats/timp/', views.study_time_api, name='study_time_api'),
+    path('plan/', views.study_plan_api, name='study_plan_api'),
 ]
\ No newline at end of file
@@ -2,19 +2,23 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Sum
 from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import date, timedelta
 import calendar
 import json
+from collections import Counter
 from django.core.serializers.json import DjangoJSONEncoder
 import os
 
 from .models import Homework, HomeworkFile, HomeworkSession, HomeworkReminder
+from .queries import KEYSET_ORDERINGS, homework_stats, keyset_page, visible_homework
+from . import feed, planner, rollups, services, study_time, workload
 from .forms import HomeworkForm, HomeworkFileForm, HomeworkSessionForm, HomeworkFilterForm
 from apps.subjects.models import Subject
-from apps.core.models import Notification
+from apps.core import calendar_events
+from apps.schedule.resolver import ScheduleResolver
 from django.conf import settings
 
 try:
@@ -33,12 +37,10 @@ def homework_list_view(request):
 
     # Queryset de bază: ale mele + share-uite de colegi din aceeași clasă (dacă există)
     try:
-        class_room = getattr(user.student_profile, 'class_room', None)
+        class_room_id = user.student_profile.class_room_id
     except Exception:
-        class_room = None
-    homework_list = Homework.objects.filter(
-        Q(user=user) | Q(share_with_class=True, shared_class_room=class_room)
-    )
+        class_room_id = None
+    homework_list = visible_homework(user, class_room_id)
 
     # Aplicare filtre din form
     if filter_form.is_valid():
@@ -81,39 +83,40 @@ def homework_list_view(request):
                 Q(subject__nume__icontains=search)
             )
 
-    # Sortare
+    # Statistici pentru dashboard (un singur aggregate pe setul filtrat)
+    stats = homework_stats(homework_list)
+    homework_list = homework_list.select_related('subject', 'user', 'shared_class_room')
+
+    # Sortare și paginare: deadline/prioritate cu cursor (fără OFFSET), restul cu Paginator
     sort_by = request.GET.get('sort', 'deadline')
-    if sort_by == 'deadline':
-        homework_list = homework_list.order_by('deadline', '-prioritate')
-    elif sort_by == 'priority':
-        homework_list = homework_list.order_by('-prioritate', 'deadline')
-    elif sort_by == 'subject':
-        homework_list = homework_list.order_by('subject__nume', 'deadline')
-    elif sort_by == 'progress':
-        homework_list = homework_list.order_by('-progres', 'deadline')
+    cursor_page = None
+    if sort_by in KEYSET_ORDERINGS and not request.GET.get('page'):
+        cursor_page = keyset_page(homework_list, sort_by, request.GET.get('after'), per_page=15)
+        page_obj = cursor_page
     else:
-        homework_list = homework_list.order_by('deadline')
-
-    # Paginare
-    paginator = Paginator(homework_list, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    # Statistici pentru dashboard
-    stats = {
-        'total': homework_list.count(),
-        'active': homework_list.filter(finalizata=False).count(),
-        'completed_today': homework_list.filter(finalizata=True, data_finalizare__date=date.today()).count(),
-        'overdue': homework_list.filter(finalizata=False, deadline__lt=date.today()).count(),
-        'due_today': homework_list.filter(finalizata=False, deadline=date.today()).count(),
-        'due_tomorrow': homework_list.filter(finalizata=False, deadline=date.today() + timedelta(days=1)).count(),
-    }
+        if sort_by == 'subject':
+            homework_list = homework_list.order_by('subject__nume', 'deadline')
+        elif sort_by == 'progress':
+            homework_list = homework_list.order_by('-progres', 'deadline')
+        else:
+            homework_list = homework_list.order_by(*KEYSET_ORDERINGS.get(sort_by, ('deadline',)))
+
+        paginator = Paginator(homework_list, 15)
+        paginator.count = stats['total']  # evită încă un COUNT
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+    # Parametrii curenți (filtre, sortare) pentru linkurile de paginare
+    query = request.GET.copy()
+    for key in ('page', 'after'):
+        query.pop(key, None)
 
     context = {
         'page_obj': page_obj,
         'filter_form': filter_form,
         'stats': stats,
         'current_sort': sort_by,
+        'cursor_page': cursor_page,
+        'query_string': query.urlencode(),
     }
 
     return render(request, 'homework/homework_list.html', context)
@@ -122,17 +125,17 @@ def homework_list_view(request):
 @login_required
 def homework_detail_view(request, homework_id):
     """Detalii despre o temă specifică"""
-    # Permite acces dacă e tema mea sau e share-uită cu clasa mea
-    try:
-        class_room = getattr(request.user.student_profile, 'class_room', None)
-    except Exception:
-        class_room = None
     homework = get_object_or_404(
         Homework.objects.select_related('subject', 'user'),
         id=homework_id
     )
+    # Permite acces dacă e tema mea sau e share-uită cu clasa mea (profilul se citește doar pentru colegi)
     if homework.user_id != request.user.id:
-        if not (homework.share_with_class and class_room and homework.shared_class_room_id == getattr(class_room, 'id', None)):
+        try:
+            class_room_id = request.user.student_profile.class_room_id
+        except Exception:
+            class_room_id = None
+        if not (homework.share_with_class and class_room_id and homework.shared_class_room_id == class_room_id):
             return redirect('homework:list')
 
     # Fișiere atașate
@@ -302,51 +305,15 @@ def homework_delete_view(request, homework_id):
 @login_required
 def homework_complete_toggle(request, homework_id):
     """Toggle status finalizat/nefinalizat pentru temă"""
-    homework = get_object_or_404(Homework, id=homework_id, user=request.user)
+    homework = get_object_or_404(Homework.objects.select_related('subject'), id=homework_id, user=request.user)
 
     if request.method == 'POST':
+        # O singură scriere; notificarea/emailul pleacă din evenimentul homework_changed
+        services.toggle_complete(homework)
         if homework.finalizata:
-            # Marchează ca nefinalizată
-            homework.finalizata = False
-            homework.data_finalizare = None
-            homework.progres = max(0, homework.progres - 10)  # Reduce progresul cu 10%
-            message = f'Tema "{homework.titlu}" a fost marcată ca nefinalizată.'
-        else:
-            # Marchează ca finalizată
-            homework.marcheaza_finalizata()
             message = f'Felicitări! Tema "{homework.titlu}" a fost finalizată!'
-
-            # Creează notificare
-            Notification.objects.create(
-                user=request.user,
-                tip='tema',
-                titlu='Temă finalizată!',
-                mesaj=f'Ai finalizat tema "{homework.titlu}" la {homework.subject.nume}.'
-            )
-
-            # Email părinte pentru temă finalizată (dacă e activat în profil)
-            try:
-                profile = request.user.student_profile
-                parent_email = getattr(profile, 'email_parinte', '')
-                if send_email and profile.reminder_teme and parent_email:
-                    send_email(
-                        to_emails=[parent_email],
-                        subject=f'Temă finalizată: {homework.subject.nume}',
-                        html_content=f"""
-                        <p>Bună,</p>
-                        <p>Tema a fost marcată ca finalizată:</p>
-                        <ul>
-                          <li>Materie: {homework.subject.nume}</li>
-                          <li>Titlu: {homework.titlu}</li>
-                          <li>Termen: {homework.deadline}</li>
-                          <li>Progres: 100%</li>
-                        </ul>
-                        """
-                    )
-            except Exception:
-                pass
-
-        homework.save()
+        else:
+            message = f'Tema "{homework.titlu}" a fost marcată ca nefinalizată.'
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
@@ -361,20 +328,50 @@ def homework_complete_toggle(request, homework_id):
     return redirect('homework:detail', homework_id=homework.id)
 
 
+@login_required
+def homework_bulk_action(request):
+    """Acțiuni în masă pe temele selectate, aplicate atomic într-un singur request"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Metodă invalidă'}, status=405)
+
+    action = request.POST.get('action')
+    try:
+        changed = services.bulk_apply(
+            request.user, request.POST.getlist('ids'), action,
+            days=request.POST.get('days'), priority=request.POST.get('priority'),
+        )
+    except ValueError as e:
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        messages.error(request, str(e))
+        return redirect('homework:list')
+
+    labels = {
+        'complete': 'finalizate', 'reopen': 'redeschise', 'reschedule': 'reprogramate',
+        'priority': 'actualizate', 'share': 'partajate cu clasa', 'unshare': 'retrase din clasă',
+        'delete': 'șterse',
+    }
+    message = f'{len(changed)} teme {labels[action]}.'
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'success': True,
+            'action': action,
+            'ids': [hw.pk for hw in changed],
+            'message': message,
+        })
+    messages.success(request, message)
+    return redirect('homework:list')
+
+
 @login_required
 def homework_update_progress(request, homework_id):
     """Actualizare progres temă"""
-    homework = get_object_or_404(Homework, id=homework_id, user=request.user)
+    homework = get_object_or_404(Homework.objects.select_related('subject'), id=homework_id, user=request.user)
 
     if request.method == 'POST':
         try:
             progress = int(request.POST.get('progress', homework.progres))
-            progress = max(0, min(100, progress))  # Între 0 și 100
-
-            homework.progres = progress
-            if progress == 100 and not homework.finalizata:
-                homework.marcheaza_finalizata()
-            homework.save()
+            services.set_progress(homework, progress)
 
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
@@ -383,7 +380,7 @@ def homework_update_progress(request, homework_id):
                     'completed': homework.finalizata
                 })
             else:
-                messages.success(request, f'Progresul a fost actualizat la {progress}%.')
+                messages.success(request, f'Progresul a fost actualizat la {homework.progres}%.')
         except (ValueError, TypeError):
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({'success': False, 'error': 'Progres invalid'})
@@ -496,15 +493,13 @@ def homework_session_end(request, homework_id, session_id):
             except (ValueError, TypeError):
                 new_progress = homework.progres
 
-            # Note despre sesiune
-            session_notes = request.POST.get('session_notes', '')
-            session_difficulties = request.POST.get('session_difficulties', '')
-
-            # Finalizează sesiunea
-            session.progres_dupa = new_progress
-            session.note_sesiune = session_notes
-            session.dificultati_sesiune = session_difficulties
-            session.finalizeaza_sesiune(new_progress)
+            # Finalizează sesiunea (o scriere pe sesiune, una pe temă)
+            session.homework = homework
+            services.end_session(
+                session, new_progress,
+                notes=request.POST.get('session_notes', ''),
+                difficulties=request.POST.get('session_difficulties', ''),
+            )
 
             messages.success(request, f'Sesiunea de {session.durata_minute} minute a fost finalizată!')
 
@@ -518,6 +513,100 @@ def homework_session_end(request, homework_id, session_id):
     return redirect('homework:detail', homework_id=homework.id)
 
 
+def _feed_class_room_id(user):
+    try:
+        return user.student_profile.class_room_id
+    except Exception:
+        return None
+
+
+@login_required
+def class_feed_view(request):
+    """Temele partajate cu clasa mea (feed din cache, cu starea mea văzut/făcut)"""
+    class_room_id = _feed_class_room_id(request.user)
+    if not class_room_id:
+        messages.info(request, 'Setează clasa în profil pentru a vedea temele partajate de colegi.')
+        return redirect('homework:list')
+
+    items = feed.class_feed(class_room_id)
+    state = feed.student_state(request.user, class_room_id)
+    seen_at = state.seen_at if state else None
+    done_ids = set(state.done_ids) if state else set()
+
+    today = date.today()
+    rows = [{
+        **item,
+        'nou': bool(item['shared_at'] and (seen_at is None or item['shared_at'] > seen_at)),
+        'facuta': item['id'] in done_ids,
+        'a_mea': item['user_id'] == request.user.id,
+        'intarziata': item['deadline'] < today,
+    } for item in items]
+    feed.mark_seen(request.user, class_room_id, items, state)
+
+    context = {
+        'rows': rows,
+        'new_count': sum(1 for r in rows if r['nou']),
+        'done_count': sum(1 for r in rows if r['facuta']),
+    }
+    return render(request, 'homework/class_feed.html', context)
+
+
+@login_required
+def class_feed_toggle_done(request, homework_id):
+    """Bifează/debifează ca făcută o temă din feed-ul clasei (doar pentru mine)"""
+    if request.method != 'POST':
+        return redirect('homework:class_feed')
+    class_room_id = _feed_class_room_id(request.user)
+    visible_ids = {item['id'] for item in feed.class_feed(class_room_id)} if class_room_id else set()
+    if homework_id not in visible_ids:
+        return redirect('homework:class_feed')
+
+    done = feed.toggle_done(request.user, class_room_id, homework_id, visible_ids)
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': True, 'done': done})
+    return redirect('homework:class_feed')
+
+
+@login_required
+def class_workload_view(request):
+    """Harta încărcării claselor: termene și minute estimate pe zile (HTML sau ?format=json)"""
+    class_rooms = workload.visible_class_rooms(request.user)
+    class_id = request.GET.get('class', '')
+    if class_id:
+        class_rooms = class_rooms.filter(pk=int(class_id) if class_id.isdigit() else 0)
+    class_rooms = list(class_rooms)
+    wants_json = request.GET.get('format') == 'json'
+    if not class_rooms:
+        if wants_json:
+            return JsonResponse({'error': 'Nicio clasă disponibilă'}, status=404)
+        messages.info(request, 'Setează clasa în profil pentru a vedea încărcarea clasei.')
+        return redirect('homework:list')
+
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else date.today()
+        days = int(request.GET.get('days', workload.DEFAULT_DAYS))
+    except ValueError:
+        if wants_json:
+            return JsonResponse({'error': 'Interval invalid'}, status=400)
+        start, days = date.today(), workload.DEFAULT_DAYS
+    days = max(1, min(days, workload.MAX_DAYS))
+
+    data = workload.for_viewer(workload.class_workload([c.pk for c in class_rooms], start, days), class_rooms, request.user)
+    if wants_json:
+        return JsonResponse(workload.serialize(class_rooms, data))
+
+    context = {
+        'rows': [{'class_room': c, 'cells': data[c.pk]} for c in class_rooms],
+        'day_headers': [start + timedelta(days=i) for i in range(days)],
+        'start': start,
+        'days': days,
+        'prev_start': start - timedelta(days=days),
+        'next_start': start + timedelta(days=days),
+        'today': date.today(),
+    }
+    return render(request, 'homework/class_workload.html', context)
+
+
 @login_required
 def homework_calendar_view(request):
     """Vedere calendar cu toate temele"""
@@ -527,22 +616,8 @@ def homework_calendar_view(request):
     month = int(request.GET.get('month', date.today().month))
     year = int(request.GET.get('year', date.today().year))
 
-    # Calculează prima și ultima zi din lună
-    from calendar import monthrange
-    first_day = date(year, month, 1)
-    last_day = date(year, month, monthrange(year, month)[1])
-
-    # Temele din această lună
-    homework_in_month = Homework.objects.filter(
-        user=user,
-        deadline__range=[first_day, last_day]
-    ).select_related('subject')
-
-    # Organizează temele pe zile (map zi -> listă teme)
-    calendar_data = {}
-    for hw in homework_in_month:
-        d = hw.deadline.day
-        calendar_data.setdefault(d, []).append(hw)
+    # Temele din această lună, din indexul calendarului (map zi -> listă evenimente)
+    calendar_data = calendar_events.month_events(user, year, month, ['tema'])
 
     # Construiește săptămânile pentru afișare (7 zile/linie)
     cal = calendar.Calendar(firstweekday=0)  # 0 = Luni
@@ -586,8 +661,8 @@ def homework_calendar_view(request):
         'prev_year': prev_year,
         'next_month': next_month,
         'next_year': next_year,
-        'days_in_month': monthrange(year, month)[1],
-        'first_weekday': first_day.weekday(),  # 0=Luni, 6=Duminică
+        'days_in_month': calendar.monthrange(year, month)[1],
+        'first_weekday': date(year, month, 1).weekday(),  # 0=Luni, 6=Duminică
     }
 
     return render(request, 'homework/homework_calendar.html', context)
@@ -598,51 +673,37 @@ def homework_stats_view(request):
     """Statistici detaliate despre teme"""
     user = request.user
 
-    # Statistici generale
-    total_homework = Homework.objects.filter(user=user)
-    completed_homework = total_homework.filter(finalizata=True)
-
+    # Toate statisticile din contoarele zilnice (o singură interogare grupată)
+    totals, per_subject, weekday_stats = rollups.summary(user)
+    general = rollups.rates(totals)
     general_stats = {
-        'total': total_homework.count(),
-        'completed': completed_homework.count(),
-        'completion_rate': (completed_homework.count() / max(total_homework.count(), 1)) * 100,
-        'average_time': completed_homework.aggregate(avg=Avg('timp_lucrat'))['avg'] or 0,
-        'total_time': completed_homework.aggregate(sum=Sum('timp_lucrat'))['sum'] or 0,
+        'total': general['total'],
+        'completed': general['completed'],
+        'completion_rate': general['completion_rate'],
+        'average_time': general['avg_time'],
+        'total_time': general['total_time'],
+        'minutes_worked': general['minutes_worked'],
     }
 
     # Statistici pe materii
     subject_stats = []
     subject_stats_js = []
     for subject in Subject.objects.filter(user=user, activa=True):
-        subject_homework = total_homework.filter(subject=subject)
-        subject_completed = subject_homework.filter(finalizata=True)
-
+        stats = rollups.rates(per_subject.get(subject.pk, Counter()))
         subject_stats.append({
             'subject': subject,
-            'total': subject_homework.count(),
-            'completed': subject_completed.count(),
-            'completion_rate': (subject_completed.count() / max(subject_homework.count(), 1)) * 100,
-            'avg_time': subject_completed.aggregate(avg=Avg('timp_lucrat'))['avg'] or 0,
+            'total': stats['total'],
+            'completed': stats['completed'],
+            'completion_rate': stats['completion_rate'],
+            'avg_time': stats['avg_time'],
         })
         subject_stats_js.append({
             'subject_name': subject.nume,
-            'total': subject_homework.count(),
-            'completed': subject_completed.count(),
-            'avg_time': float(subject_completed.aggregate(avg=Avg('timp_lucrat'))['avg'] or 0),
+            'total': stats['total'],
+            'completed': stats['completed'],
+            'avg_time': float(stats['avg_time']),
         })
 
-    # Productivitate pe zile din săptămână (0=Luni..6=Duminică)
-    from django.db.models.functions import ExtractWeekDay
-    # ExtractWeekDay: în SQLite/Django, duminica poate fi 1; normalizăm la 0..6 cu un mapping
-    raw_week = completed_homework.annotate(wd=ExtractWeekDay('data_finalizare')).values('wd').annotate(count=Count('id'))
-    weekday_stats = []
-    for item in raw_week:
-        wd_val = int(item['wd'] or 0)
-        # Django ExtractWeekDay: 1=Duminică ... 7=Sâmbătă
-        normalized = (wd_val + 5) % 7  # 1->6, 2->0, 3->1, ..., 7->5
-        weekday_stats.append({'weekday': normalized, 'count': item['count']})
-    weekday_stats.sort(key=lambda x: x['weekday'])
-
     context = {
         'general_stats': general_stats,
         'subject_stats': subject_stats,
@@ -651,4 +712,29 @@ def homework_stats_view(request):
         'weekday_stats_json': json.dumps(weekday_stats, cls=DjangoJSONEncoder),
     }
 
-    return render(request, 'homework/homework_stats.html', context)
\ No newline at end of file
+    return render(request, 'homework/homework_stats.html', context)
+
+
+@login_required
+def study_time_api(request):
+    """Timpul de studiu pe săptămâni/luni și acuratețea estimărilor, ca JSON pentru grafice."""
+    period = request.GET.get('period', 'week')
+    if period not in study_time.PERIODS:
+        return JsonResponse({'error': 'Perioadă invalidă'}, status=400)
+    try:
+        count = int(request.GET['count']) if request.GET.get('count') else None
+    except ValueError:
+        return JsonResponse({'error': 'Număr de perioade invalid'}, status=400)
+    return JsonResponse(study_time.chart_payload(request.user, period, count))
+
+
+@login_required
+def study_plan_api(request):
+    """Planul de studiu (temele nefinalizate împărțite în timpul liber până la termen) ca JSON"""
+    try:
+        days = int(request.GET.get('days', planner.HORIZON_DAYS))
+    except ValueError:
+        return JsonResponse({'error': 'Număr de zile invalid'}, status=400)
+    days = max(1, min(days, planner.HORIZON_DAYS))
+    plan = planner.study_plan(request.user, days, resolver=ScheduleResolver.for_request(request))
+    return JsonResponse(planner.serialize(*plan))
\ No newline at end of file
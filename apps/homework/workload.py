@@ -0,0 +1,233 @@
+"""
+Încărcarea claselor: câte termene și câte minute estimate cad în fiecare zi
+pentru elevii unei clase (harta pentru diriginți).
+
+Temele poartă clasa elevului (Homework.class_room, denormalizată din profil),
+deci harta uneia sau a tuturor claselor se calculează cu o singură interogare
+grupată pe (clasă, termen) peste indexul homework_class_deadline_idx, fără
+join prin profiluri. Aceeași temă notată de mai mulți elevi (sau preluată din
+feed-ul clasei) se numără o singură dată: rândurile se grupează și după
+materie și titlu, iar timpul estimat este cel mai mare dintre copii.
+
+Elevii văd pe hartă doar numărul termenelor și minutele; titlurile apar doar
+pentru temele partajate cu clasa (share_with_class), fără numărul de elevi.
+Dirigintele clasei și administratorii văd toate temele (`for_viewer`).
+
+Rezultatul se păstrează în cache per clasă și versiune
+(ClassHomeworkFeed.workload_version); versiunea este incrementată de semnalele
+de mai jos doar când se schimbă termenul, estimarea, titlul, materia sau clasa.
+Finalizarea unei teme nu schimbă încărcarea clasei.
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import Lower, Trim
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.models import StudentProfile
+from apps.core.tracking import when_changed
+from apps.schedule.models import ClassRoom
+from apps.subjects.models import Subject
+from . import feed
+from .models import ClassHomeworkFeed, Homework
+from .services import batch_delete_in_progress, homework_batch_changed
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+DEFAULT_DAYS = 14
+MAX_DAYS = 42
+# Câte teme se afișează pe o celulă a hărții
+MAX_TITLES = 3
+# Pragurile (minute estimate) pentru nivelurile de culoare 1..4
+LEVELS = (1, 60, 120, 180)
+# Câmpurile care intră în agregat: doar schimbarea lor invalidează cache-ul
+WORKLOAD_FIELDS = ('class_room_id', 'deadline', 'timp_estimat', 'titlu', 'subject_id')
+
+
+def bump(class_room_ids):
+    feed.bump(class_room_ids, field='workload_version')
+
+
+def workload_versions(class_room_ids):
+    """{id clasă: versiune} într-o singură interogare (0 pentru clasele fără contor)."""
+    versions = dict(
+        ClassHomeworkFeed.objects.filter(class_room_id__in=class_room_ids)
+        .values_list('class_room_id', 'workload_version')
+    )
+    return {cid: versions.get(cid, 0) for cid in class_room_ids}
+
+
+def visible_class_rooms(user):
+    """Clasele a căror încărcare o poate vedea utilizatorul (admin: toate, diriginte: ale lui, elev: a lui)."""
+    qs = ClassRoom.objects.all()
+    if not user.is_superuser:
+        qs = qs.filter(Q(diriginte=user) | Q(students__user=user)).distinct()
+    return qs.order_by('nume')
+
+
+def _level(minutes, count):
+    if not count:
+        return 0
+    return max(1, sum(1 for threshold in LEVELS if minutes >= threshold))
+
+
+def _compute(class_room_ids, start, end):
+    """{id clasă: {zi: celulă}} pentru clasele date, dintr-o singură interogare grupată."""
+    rows = (
+        Homework.objects
+        .filter(class_room_id__in=class_room_ids, deadline__gte=start, deadline__lte=end)
+        .values('class_room_id', 'deadline', cheie_materie=Lower(Trim('subject__nume')), cheie_tema=Lower(Trim('titlu')))
+        .annotate(
+            materie=Min('subject__nume'),
+            titlu=Min('titlu'),
+            minute=Max('timp_estimat'),
+            elevi=Count('user_id', distinct=True),
+            partajate=Count('pk', filter=Q(share_with_class=True)),
+        )
+        .order_by()
+    )
+    result = {cid: {} for cid in class_room_ids}
+    for row in rows:
+        cell = result[row['class_room_id']].setdefault(row['deadline'], {
+            'termene': 0, 'minute': 0, 'fara_estimare': 0, 'teme': [],
+        })
+        cell['termene'] += 1
+        if row['minute']:
+            cell['minute'] += row['minute']
+        else:
+            cell['fara_estimare'] += 1
+        cell['teme'].append({
+            'materie': row['materie'], 'titlu': row['titlu'], 'elevi': row['elevi'],
+            'partajata': bool(row['partajate']),
+        })
+    for days in result.values():
+        for cell in days.values():
+            cell['teme'].sort(key=lambda t: (-t['elevi'], t['materie']))
+    return result
+
+
+def _cells(by_day, start, days):
+    empty = {'termene': 0, 'minute': 0, 'fara_estimare': 0, 'teme': []}
+    cells = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        cell = by_day.get(day, empty)
+        cells.append({'zi': day, **cell, 'nivel': _level(cell['minute'], cell['termene'])})
+    return cells
+
+
+def class_workload(class_room_ids, start=None, days=DEFAULT_DAYS):
+    """
+    {id clasă: [celulă pe zi]} pentru `days` zile de la `start`. Clasele din cache
+    nu se recalculează; toate celelalte se calculează împreună, într-o interogare.
+    """
+    start = start or date.today()
+    days = max(1, min(days, MAX_DAYS))
+    class_room_ids = list(dict.fromkeys(class_room_ids))
+    if not class_room_ids:
+        return {}
+    keys = {
+        cid: f"homework:workload:{cid}:{version}:{start.isoformat()}:{days}"
+        for cid, version in workload_versions(class_room_ids).items()
+    }
+    cached = cache.get_many(keys.values())
+    result = {cid: cached[key] for cid, key in keys.items() if key in cached}
+    missing = [cid for cid in class_room_ids if cid not in result]
+    if missing:
+        computed = _compute(missing, start, start + timedelta(days=days - 1))
+        fresh = {cid: _cells(computed[cid], start, days) for cid in missing}
+        cache.set_many({keys[cid]: cells for cid, cells in fresh.items()}, CACHE_TIMEOUT)
+        result.update(fresh)
+    return {cid: result[cid] for cid in class_room_ids}
+
+
+def for_viewer(workload, class_rooms, user):
+    """
+    Harta așa cum o vede `user`: dirigintele clasei și administratorii văd toate
+    temele; elevii doar temele partajate cu clasa, fără numărul de elevi.
+    """
+    result = {}
+    for class_room in class_rooms:
+        full = user.is_superuser or class_room.diriginte_id == user.pk
+        result[class_room.pk] = [{
+            **cell,
+            'teme': [
+                t if full else {'materie': t['materie'], 'titlu': t['titlu']}
+                for t in cell['teme'] if full or t.get('partajata')
+            ][:MAX_TITLES],
+        } for cell in workload.get(class_room.pk, [])]
+    return result
+
+
+def serialize(class_rooms, workload):
+    """Răspunsul JSON al hărții: o linie per clasă."""
+    return {
+        'classes': [{
+            'id': class_room.pk,
+            'nume': class_room.nume,
+            'zile': [{**cell, 'zi': cell['zi'].isoformat()} for cell in workload.get(class_room.pk, [])],
+        } for class_room in class_rooms],
+    }
+
+
+# --- Invalidare ---
+
+@receiver(pre_save, sender=Homework)
+@when_changed(*WORKLOAD_FIELDS)
+def _track_workload_class(sender, instance: Homework, **kwargs):
+    old = instance.saved_values('class_room_id')
+    instance._old_workload_class_id = old['class_room_id'] if old else None
+
+
+@receiver(post_save, sender=Homework)
+@when_changed(*WORKLOAD_FIELDS)
+def invalidate_workload_on_save(sender, instance: Homework, **kwargs):
+    bump({getattr(instance, '_old_workload_class_id', None), instance.class_room_id})
+
+
+@receiver(homework_batch_changed)
+def invalidate_workload_on_batch(sender, homework, transition, old, **kwargs):
+    """Doar reprogramarea și ștergerea schimbă termenele; un singur bump pentru tot lotul."""
+    if transition in ('reschedule', 'delete'):
+        bump({hw.class_room_id for hw in homework})
+
+
+@receiver(post_delete, sender=Homework)
+def invalidate_workload_on_delete(sender, instance: Homework, **kwargs):
+    if not batch_delete_in_progress():
+        bump([instance.class_room_id])
+
+
+@receiver(pre_save, sender=StudentProfile)
+@when_changed('class_room_id')
+def _track_profile_class(sender, instance: StudentProfile, **kwargs):
+    old = instance.saved_values('class_room_id')
+    instance._old_workload_class_id = old['class_room_id'] if old else None
+
+
+@receiver(post_save, sender=StudentProfile)
+@when_changed('class_room_id')
+def move_homework_with_student(sender, instance: StudentProfile, **kwargs):
+    """Temele elevului trec în noua clasă (un singur UPDATE)."""
+    moved = (
+        Homework.objects.filter(user_id=instance.user_id)
+        .exclude(class_room_id=instance.class_room_id)
+        .update(class_room_id=instance.class_room_id)
+        if instance.class_room_id else
+        Homework.objects.filter(user_id=instance.user_id, class_room__isnull=False).update(class_room_id=None)
+    )
+    if moved:
+        bump({getattr(instance, '_old_workload_class_id', None), instance.class_room_id})
+
+
+@receiver(post_save, sender=Subject)
+def invalidate_workload_on_subject_change(sender, instance: Subject, created, **kwargs):
+    """Numele materiei face parte din cheia de de-duplicare."""
+    if created:
+        return
+    bump(
+        Homework.objects.filter(subject=instance, class_room__isnull=False)
+        .values_list('class_room_id', flat=True).distinct()
+    )
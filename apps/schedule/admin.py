@@ -1,6 +1,9 @@
 # apps/schedule/admin.py
 from django.contrib import admin
-from .models import ScheduleEntry, ScheduleTemplate, ScheduleTemplateEntry, ScheduleChange, ClassRoom, ClassScheduleEntry
+from .models import (
+    ScheduleEntry, ScheduleTemplate, ScheduleTemplateEntry, ScheduleChange, ClassRoom, ClassScheduleEntry,
+    ScheduleOverride, ScheduleFeed, ClassScheduleChange,
+)
 
 
 @admin.register(ScheduleEntry)
@@ -37,10 +40,24 @@ class ScheduleChangeAdmin(admin.ModelAdmin):
     search_fields = ['schedule_entry__subject__nume', 'motiv']
 
 
+@admin.register(ClassScheduleChange)
+class ClassScheduleChangeAdmin(admin.ModelAdmin):
+    list_display = ['class_room', 'class_entry', 'tip_schimbare', 'data_start', 'data_end']
+    list_filter = ['tip_schimbare', 'class_room', 'data_start']
+    search_fields = ['class_room__nume', 'class_entry__subject_name', 'motiv', 'profesor_inlocuitor']
+
+
+@admin.register(ScheduleOverride)
+class ScheduleOverrideAdmin(admin.ModelAdmin):
+    list_display = ['user', 'tip', 'zi_saptamana', 'numar_ora', 'subject', 'sala']
+    list_filter = ['tip', 'zi_saptamana']
+    search_fields = ['user__username', 'subject__nume', 'sala']
+
+
 class ClassScheduleEntryInline(admin.TabularInline):
     model = ClassScheduleEntry
     extra = 5
-    fields = ('zi_saptamana', 'numar_ora', 'ora_inceput', 'ora_sfarsit', 'subject_name', 'subject_color', 'sala', 'tip_ora', 'note')
+    fields = ('zi_saptamana', 'numar_ora', 'ora_inceput', 'ora_sfarsit', 'subject_name', 'subject_color', 'sala', 'profesor', 'tip_ora', 'note')
 
 
 @admin.register(ClassRoom)
@@ -54,4 +71,10 @@ class ClassRoomAdmin(admin.ModelAdmin):
 class ClassScheduleEntryAdmin(admin.ModelAdmin):
     list_display = ['class_room', 'zi_saptamana', 'numar_ora', 'subject_name', 'ora_inceput', 'ora_sfarsit']
     list_filter = ['class_room', 'zi_saptamana', 'tip_ora']
-    search_fields = ['class_room__nume', 'subject_name', 'note', 'sala']
\ No newline at end of file
+    search_fields = ['class_room__nume', 'subject_name', 'note', 'sala']
+
+@admin.register(ScheduleFeed)
+class ScheduleFeedAdmin(admin.ModelAdmin):
+    list_display = ['user', 'class_room', 'created_at', 'last_accessed_at']
+    search_fields = ['user__username', 'class_room__nume']
+    readonly_fields = ['token', 'created_at', 'last_accessed_at']
@@ -8,4 +8,11 @@ class ScheduleConfig(AppConfig):
 
     def ready(self):
         # Înregistrează semnalele pentru sincronizarea orarului
-        from . import signals  # noqa: F401
\ No newline at end of file
+        from . import signals  # noqa: F401
+
+        # Fontul PDF (cu diacritice) se înregistrează o singură dată per proces
+        try:
+            from .exports import register_pdf_fonts
+            register_pdf_fonts()
+        except Exception:
+            pass
@@ -0,0 +1,351 @@
+"""
+Export în masă al orarelor (toți elevii unei clase sau toate clasele), ca arhivă ZIP.
+
+Datele se încarcă în procesul principal și se transformă în snapshot-uri simple;
+randarea (reportlab/openpyxl, CPU-bound) rulează într-un ProcessPoolExecutor.
+Fișierele rezultate sunt scrise pe rând într-o arhivă ZIP transmisă în flux,
+fără a ține toată arhiva în memorie. Exporturile deja prezente în cache (aceeași
+versiune a orarului) nu se mai randează.
+
+Numărul de procese per rulare și numărul de rulări simultane sunt limitate din
+setări (SCHEDULE_BATCH_MAX_WORKERS / SCHEDULE_BATCH_MAX_RUNS), ca exportul să nu
+ocupe toți workerii serverului web. Progresul și locurile de rulare stau în
+cache-ul „shared” (comun proceselor), nu în cel implicit, local fiecărui proces.
+"""
+import os
+import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from . import exports, versions
+from .models import ClassRoom, ClassScheduleEntry, ScheduleEntry
+from .resolver import ScheduleResolver
+
+
+FORMATS = ('pdf', 'xlsx')
+PROGRESS_TIMEOUT = 60 * 60
+RUN_SLOT_TIMEOUT = 60 * 30
+CACHE_ALIAS = 'shared'
+
+
+class BatchBusy(Exception):
+    """Numărul maxim de exporturi simultane a fost atins."""
+
+
+def max_workers():
+    return max(1, int(getattr(settings, 'SCHEDULE_BATCH_MAX_WORKERS', 2)))
+
+
+def max_runs():
+    return max(1, int(getattr(settings, 'SCHEDULE_BATCH_MAX_RUNS', 1)))
+
+
+# --- Progres și limitarea rulărilor ---
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def progress_key(run_id):
+    return f"schedule:batch:{run_id}"
+
+
+def get_progress(run_id):
+    return _cache().get(progress_key(run_id))
+
+
+def _set_progress(run_id, **data):
+    _cache().set(progress_key(run_id), data, PROGRESS_TIMEOUT)
+
+
+def acquire_slot(run_id):
+    """Ocupă un loc de rulare; returnează cheia sau ridică BatchBusy."""
+    for idx in range(max_runs()):
+        key = f"schedule:batch:slot:{idx}"
+        if _cache().add(key, run_id, RUN_SLOT_TIMEOUT):
+            return key
+    raise BatchBusy()
+
+
+def release_slot(key):
+    _cache().delete(key)
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:12]
+
+
+# --- Construirea job-urilor (procesul principal) ---
+
+class Job:
+    """Un fișier din arhivă: conținutul vine din cache (`content`) sau se randează din `snapshot`."""
+
+    def __init__(self, filename, fmt, snapshot=None, content=None, cache_key=None):
+        self.filename = filename
+        self.fmt = fmt
+        self.snapshot = snapshot
+        self.content = content
+        self.cache_key = cache_key
+
+
+def _safe_name(value):
+    return ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in str(value)) or 'fara_nume'
+
+
+def _unique_name(value, pk, taken):
+    """Numele curățat, cu id-ul adăugat când altă înregistrare a primit deja același nume."""
+    name = _safe_name(value)
+    while name in taken:
+        name = f"{name}-{pk}"
+    taken.add(name)
+    return name
+
+
+def _cached_or_snapshot(prefix, variant, version, fmt, make_snapshot):
+    path = exports.cached_path(prefix, variant, version, fmt)
+    if path is not None:
+        try:
+            return {'content': path.read_bytes()}
+        except OSError:
+            pass
+    return {'snapshot': make_snapshot(), 'cache_key': (prefix, variant, version)}
+
+
+def class_jobs(class_rooms, fmt):
+    """Câte un fișier per clasă (orarul comun al clasei)."""
+    class_rooms = list(class_rooms)
+    week_start, variant = exports.week_variant()
+    entries_by_class = defaultdict(list)
+    for entry in (ClassScheduleEntry.objects
+                  .filter(class_room__in=class_rooms)
+                  .order_by('zi_saptamana', 'numar_ora')):
+        entries_by_class[entry.class_room_id].append(entry)
+
+    jobs, taken = [], set()
+    for class_room in class_rooms:
+        version = versions.version_for_class(class_room)
+        result = _cached_or_snapshot(
+            exports.class_prefix(class_room.pk, fmt), variant, version, fmt,
+            lambda: exports.build_snapshot(
+                entries_by_class[class_room.pk], title=f"Orar {class_room.nume}", week_start=week_start,
+            ),
+        )
+        jobs.append(Job(f"{_unique_name(class_room.nume, class_room.pk, taken)}.{fmt}", fmt, **result))
+    return jobs
+
+
+def student_jobs(class_rooms, fmt):
+    """Câte un fișier per elev (orarul efectiv, inclusiv în modul legat), grupate pe clasă."""
+    from apps.core.models import StudentProfile
+
+    class_rooms = list(class_rooms)
+    week_start, variant = exports.week_variant()
+    profiles = list(
+        StudentProfile.objects
+        .filter(class_room__in=class_rooms)
+        .select_related('user', 'class_room')
+        .order_by('class_room__nume', 'user__username')
+    )
+    version_map = versions.versions_for_profiles(profiles)
+
+    # Orele copiate (modul clasic) se încarcă într-o singură interogare
+    copied = defaultdict(list)
+    copy_user_ids = [p.user_id for p in profiles if not p.orar_legat]
+    for entry in (ScheduleEntry.objects
+                  .filter(user_id__in=copy_user_ids)
+                  .select_related('subject')
+                  .order_by('zi_saptamana', 'numar_ora')):
+        copied[entry.user_id].append(entry)
+
+    # Directorul fiecărei clase și numele fișierelor din el sunt unice și după curățare
+    folders, folder_names, file_names = {}, set(), defaultdict(set)
+    for class_room in sorted({p.class_room for p in profiles}, key=lambda c: (c.nume, c.pk)):
+        folders[class_room.pk] = _unique_name(class_room.nume, class_room.pk, folder_names)
+
+    jobs = []
+    for profile in profiles:
+        user = profile.user
+
+        def make_snapshot(profile=profile, user=user):
+            if profile.orar_legat:
+                resolver = ScheduleResolver(user)
+                resolver._profile, resolver._profile_loaded = profile, True
+                entries = resolver.weekly_entries()
+            else:
+                entries = copied[user.pk]
+            title = f"Orar {user.get_full_name() or user.username} ({profile.class_room.nume})"
+            return exports.build_snapshot(entries, title=title, profile=profile, week_start=week_start)
+
+        result = _cached_or_snapshot(
+            exports.user_prefix(user.pk, fmt), variant, version_map[user.pk], fmt, make_snapshot,
+        )
+        folder = folders[profile.class_room_id]
+        filename = f"{folder}/{_unique_name(user.username, user.pk, file_names[folder])}.{fmt}"
+        jobs.append(Job(filename, fmt, **result))
+    return jobs
+
+
+def build_jobs(class_rooms, per='student', fmt='pdf'):
+    if fmt not in FORMATS:
+        raise ValueError(f"Format necunoscut: {fmt}")
+    if per == 'class':
+        return class_jobs(class_rooms, fmt)
+    return student_jobs(class_rooms, fmt)
+
+
+# --- Randare în procese separate ---
+
+def _init_worker(settings_module):
+    """Inițializarea unui proces din pool (necesară la start-ul de tip spawn)."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def render_job(fmt, snapshot):
+    return exports.render(fmt, snapshot)
+
+
+def iter_rendered(jobs, workers=None, on_done=None):
+    """
+    Produce perechi (job, conținut) pe măsură ce sunt gata. Job-urile din cache
+    sunt returnate imediat; restul se randează în pool, cu cel mult 2×workers
+    job-uri în lucru simultan.
+    """
+    pending = []
+    for job in jobs:
+        if job.content is not None:
+            if on_done:
+                on_done(job)
+            yield job, job.content
+        else:
+            pending.append(job)
+    if not pending:
+        return
+
+    workers = min(workers or max_workers(), len(pending))
+    # Conexiunile DB nu trebuie moștenite de procesele copil
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'school_manager.settings'),),
+    ) as pool:
+        queue = iter(pending)
+        in_flight = {}
+
+        def submit_next():
+            job = next(queue, None)
+            if job is not None:
+                in_flight[pool.submit(render_job, job.fmt, job.snapshot)] = job
+
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                content = future.result()
+                if job.cache_key:
+                    exports.store(*job.cache_key, job.fmt, content)
+                if on_done:
+                    on_done(job)
+                yield job, content
+                submit_next()
+
+
+# --- Arhiva ZIP în flux ---
+
+class _ChunkBuffer:
+    """Fișier doar-scriere, fără seek: zipfile scrie în el, iar noi golim bucățile acumulate."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(rendered):
+    """Generator de bucăți de bytes ale arhivei ZIP pentru perechile (job, conținut)."""
+    buf = _ChunkBuffer()
+    with zipfile.ZipFile(buf, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for job, content in rendered:
+            zf.writestr(job.filename, content)
+            chunk = buf.drain()
+            if chunk:
+                yield chunk
+    chunk = buf.drain()
+    if chunk:
+        yield chunk
+
+
+def _run(class_rooms, per, fmt, workers, run_id):
+    try:
+        jobs = build_jobs(class_rooms, per=per, fmt=fmt)
+        state = {'total': len(jobs), 'done': 0}
+        _set_progress(run_id, status='running', **state)
+
+        def on_done(job):
+            state['done'] += 1
+            _set_progress(run_id, status='running', **state)
+
+        yield from stream_zip(iter_rendered(jobs, workers=workers, on_done=on_done))
+        _set_progress(run_id, status='done', **state)
+    except Exception:
+        progress = get_progress(run_id) or {}
+        progress['status'] = 'error'
+        _set_progress(run_id, **progress)
+        raise
+
+
+class BatchRun:
+    """
+    Iterabil cu bucățile arhivei ZIP. Progresul se scrie în cache sub
+    `schedule:batch:<run_id>`; locul de rulare se eliberează la `close()`
+    (apelat de Django la închiderea răspunsului, chiar dacă fluxul nu a pornit).
+    """
+
+    def __init__(self, class_rooms, *, per='student', fmt='pdf', workers=None, run_id=None, slot=None):
+        self.run_id = run_id or new_run_id()
+        self.slot = slot
+        self._gen = _run(class_rooms, per, fmt, workers, self.run_id)
+
+    def __iter__(self):
+        try:
+            yield from self._gen
+        finally:
+            self.close()
+
+    def close(self):
+        self._gen.close()
+        if self.slot:
+            release_slot(self.slot)
+            self.slot = None
+
+
+def class_rooms_for(user, class_id=None):
+    """Clasele pe care le poate exporta utilizatorul (admin: toate, diriginte: ale lui)."""
+    qs = ClassRoom.objects.all()
+    if not user.is_superuser:
+        qs = qs.filter(diriginte=user)
+    if class_id:
+        qs = qs.filter(pk=class_id)
+    return qs.order_by('nume')
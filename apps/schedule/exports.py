@@ -0,0 +1,353 @@
+"""
+Randarea orarului în PDF/XLSX, cu cache pe disc.
+
+Randarea lucrează pe un „snapshot” (dicționar simplu, serializabil), nu pe obiecte
+ORM, astfel încât poate rula și în procese separate (export în masă). Fișierele
+rezultate sunt păstrate pe disc, cu cheia (utilizator/clasă, format, versiunea
+orarului); la o modificare a orarului versiunea se schimbă și fișierele vechi
+sunt șterse.
+"""
+import os
+import re
+from datetime import date, timedelta
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+
+from . import versions
+from .grid import slot_settings, slot_labels
+from .resolver import TIP_ORA_NAMES
+
+
+WEEKDAYS = {1: 'Luni', 2: 'Marți', 3: 'Miercuri', 4: 'Joi', 5: 'Vineri'}
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Fontul cu diacritice se înregistrează o singură dată per proces
+_pdf_font = None
+
+
+def register_pdf_fonts():
+    """Înregistrează DejaVuSans/Arial în reportlab (o dată per proces); returnează numele fontului."""
+    global _pdf_font
+    if _pdf_font is not None:
+        return _pdf_font
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font_registered = 'Helvetica'
+    candidate_paths = []
+    try:
+        base_dir = getattr(settings, 'BASE_DIR', None)
+        if base_dir:
+            candidate_paths.append(str(base_dir / 'static' / 'fonts' / 'DejaVuSans.ttf'))
+    except Exception:
+        pass
+    # Căi comune pe Windows/Linux
+    candidate_paths.extend([
+        'C:/Windows/Fonts/DejaVuSans.ttf',
+        'C:/Windows/Fonts/arial.ttf',
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/truetype/msttcorefonts/Arial.ttf',
+    ])
+    for p in candidate_paths:
+        try:
+            if os.path.exists(p):
+                pdfmetrics.registerFont(TTFont('DejaVuSans', p))
+                font_registered = 'DejaVuSans'
+                break
+        except Exception:
+            continue
+
+    _pdf_font = font_registered
+    return _pdf_font
+
+
+# --- Snapshot (date simple pentru randare) ---
+
+def build_snapshot(entries, *, title='Orar școlar', profile=None, week_start=None):
+    """Transformă orele (ScheduleEntry/EffectiveEntry/Lesson/ClassScheduleEntry) într-un dicționar simplu."""
+    max_hours, start_base, class_duration, break_duration = slot_settings(profile)
+    week_start = week_start or (date.today() - timedelta(days=date.today().weekday()))
+
+    rows = []
+    for e in entries:
+        subject = getattr(e, 'subject', None)
+        rows.append({
+            'zi': e.zi_saptamana,
+            'ora': e.numar_ora,
+            'start': e.ora_inceput.strftime('%H:%M'),
+            'end': e.ora_sfarsit.strftime('%H:%M'),
+            'subject': getattr(e, 'subject_name', None) or subject.nume,
+            'color': getattr(e, 'subject_color', None) or getattr(subject, 'culoare', '#EAEAEA'),
+            'sala': e.sala or '',
+            'tip': TIP_ORA_NAMES.get(e.tip_ora, e.tip_ora),
+        })
+    data_max = max((r['ora'] for r in rows), default=0)
+    max_hours = max(max_hours, data_max)
+
+    time_labels = [
+        (start.strftime('%H:%M'), end.strftime('%H:%M'))
+        for start, end in slot_labels(max_hours, start_base, class_duration, break_duration)
+    ]
+
+    return {
+        'title': title,
+        'week_start': week_start.isoformat(),
+        'max_hours': max_hours,
+        'time_labels': time_labels,
+        'rows': rows,
+    }
+
+
+# --- Randare ---
+
+def render_xlsx(snapshot):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Orar'
+    ws.append(['Zi', 'Ora', 'Început', 'Sfârșit', 'Materie', 'Sala', 'Tip'])
+    for r in snapshot['rows']:
+        ws.append([WEEKDAYS.get(r['zi'], r['zi']), r['ora'], r['start'], r['end'], r['subject'], r['sala'], r['tip']])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def render_pdf(snapshot):
+    """PDF în format A3 landscape, grilă similară cu pagina Orar și cu diacritice."""
+    from reportlab.lib.pagesizes import A3, landscape
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    font_registered = register_pdf_fonts()
+    buf = BytesIO()
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=landscape(A3),
+        leftMargin=24,
+        rightMargin=24,
+        topMargin=24,
+        bottomMargin=24,
+    )
+
+    styles = getSampleStyleSheet()
+    styles['Title'].fontName = font_registered
+    styles['Normal'].fontName = font_registered
+    title = Paragraph(snapshot['title'], styles['Title'])
+    week_start = date.fromisoformat(snapshot['week_start'])
+    week_end = week_start + timedelta(days=4)
+    subtitle = Paragraph(f"Săptămâna {week_start.strftime('%d.%m.%Y')} - {week_end.strftime('%d.%m.%Y')}", styles['Normal'])
+
+    max_hours = snapshot['max_hours']
+    time_labels = snapshot['time_labels']
+    entry_map = {(r['zi'], r['ora']): r for r in snapshot['rows']}
+
+    # Grilă: header + rânduri ore
+    header = ['Oră'] + [WEEKDAYS[d] for d in range(1, 6)]
+    data = [header]
+    for hour_idx in range(1, max_hours + 1):
+        label = time_labels[hour_idx - 1]
+        row = [f"{hour_idx} ( {label[0]} - {label[1]} )"]
+        for day_num in range(1, 6):
+            r = entry_map.get((day_num, hour_idx))
+            if r:
+                cell = f"{r['subject']}\n{r['start']} - {r['end']}" + (f"\nSala {r['sala']}" if r['sala'] else '')
+            else:
+                cell = ''
+            row.append(cell)
+        data.append(row)
+
+    # Conversie hex -> reportlab color
+    def _hex_to_color(hex_str, fallback=colors.lightgrey, alpha=1.0):
+        try:
+            h = (hex_str or '').strip()
+            if h.startswith('#') and len(h) == 7:
+                r = int(h[1:3], 16) / 255.0
+                g = int(h[3:5], 16) / 255.0
+                b = int(h[5:7], 16) / 255.0
+                return colors.Color(r, g, b, alpha=alpha)
+        except Exception:
+            pass
+        return fallback
+
+    # Prima coloană mai îngustă (ore + interval), 5 coloane egale pentru zile
+    page_w, page_h = landscape(A3)
+    usable_w = page_w - (doc.leftMargin + doc.rightMargin)
+    first_col = 120
+    day_col = (usable_w - first_col) / 5.0
+    col_widths = [first_col] + [day_col] * 5
+
+    table = Table(data, colWidths=col_widths, repeatRows=1, hAlign='LEFT')
+
+    style_cmds = [
+        ('FONTNAME', (0, 0), (-1, -1), font_registered),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('LINEBEFORE', (1, 0), (-1, -1), 0.25, colors.grey),
+        ('ROWHEIGHT', (0, 1), (-1, -1), 28),
+    ]
+
+    # Alternare culori pe rânduri (după ore)
+    for ridx in range(1, len(data)):
+        bg = colors.whitesmoke if ridx % 2 == 1 else colors.white
+        style_cmds.append(('BACKGROUND', (0, ridx), (-1, ridx), bg))
+
+    # Colorează celulele care au ore cu culoarea materiei
+    for (day_num, hour_idx), r in entry_map.items():
+        if 1 <= day_num <= 5 and 1 <= hour_idx <= max_hours:
+            style_cmds.append(('BACKGROUND', (day_num, hour_idx), (day_num, hour_idx), _hex_to_color(r['color'], colors.HexColor('#e8f4ff'))))
+
+    table.setStyle(TableStyle(style_cmds))
+
+    story = [title, Spacer(1, 6), subtitle, Spacer(1, 12), table]
+    doc.build(story)
+    return buf.getvalue()
+
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'xlsx': render_xlsx,
+}
+
+
+def render(fmt, snapshot):
+    return RENDERERS[fmt](snapshot)
+
+
+# --- Cache pe disc ---
+
+def cache_dir():
+    path = Path(getattr(settings, 'SCHEDULE_EXPORT_CACHE_DIR', None) or (Path(settings.BASE_DIR) / 'cache' / 'orar'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# <săptămână>[-m]-<hash>.<fmt>, după prefix
+CACHE_NAME = re.compile(r'(?P<week>\d{8})(?P<variant>-m)?-[0-9a-f]+\.\w+')
+
+
+def _superseded(name, keep):
+    """Fișierul `name` e înlocuit de `keep`: aceeași variantă cu altă versiune sau o săptămână trecută."""
+    old, new = CACHE_NAME.fullmatch(name), CACHE_NAME.fullmatch(keep)
+    if not old or not new or name == keep:
+        return False
+    return old['week'] < new['week'] or (old['week'] == new['week'] and old['variant'] == new['variant'])
+
+
+def prune(prefix, keep=None):
+    """
+    Șterge fișierele din cache care încep cu prefix. Cu `keep`, doar pe cele înlocuite
+    de el; cealaltă variantă a săptămânii curente (cu/fără modificări) rămâne.
+    """
+    try:
+        directory = cache_dir()
+        for f in directory.glob(f"{prefix}*"):
+            if keep is None or _superseded(f.name[len(prefix):], keep[len(prefix):]):
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+    except OSError:
+        pass
+
+
+def cached_file(prefix, variant, version, fmt, build):
+    """
+    Returnează conținutul exportului din cache sau îl construiește cu `build()`.
+    Numele fișierului: <prefix><variant>-<hash versiune>.<fmt>.
+    """
+    name = f"{prefix}{variant}-{version.hash}.{fmt}"
+    path = cache_dir() / name
+    try:
+        return path.read_bytes()
+    except OSError:
+        pass
+
+    content = build()
+    tmp = path.with_name(f".{name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    # Versiunile vechi ale aceleiași variante și săptămânile trecute nu mai sunt necesare
+    prune(prefix, keep=name)
+    return content
+
+
+def week_variant(include_changes=False):
+    """(luni din săptămâna curentă, sufixul folosit în numele fișierelor din cache)."""
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    return week_start, f"{week_start:%Y%m%d}{'-m' if include_changes else ''}"
+
+
+def cached_path(prefix, variant, version, fmt):
+    """Calea din cache pentru un export, sau None dacă nu a fost randat încă."""
+    path = cache_dir() / f"{prefix}{variant}-{version.hash}.{fmt}"
+    return path if path.exists() else None
+
+
+def store(prefix, variant, version, fmt, content):
+    """Salvează un export randat în altă parte (ex: într-un proces separat)."""
+    return cached_file(prefix, variant, version, fmt, lambda: content)
+
+
+def user_prefix(user_id, fmt):
+    return f"user-{user_id}-{fmt}-"
+
+
+def class_prefix(class_room_id, fmt):
+    return f"class-{class_room_id}-{fmt}-"
+
+
+def user_export(user, fmt, resolver, include_changes=False):
+    """Exportul (bytes) al orarului efectiv al utilizatorului, servit din cache când se poate."""
+    week_start, variant = week_variant(include_changes)
+    version = versions.version_for_user(user, profile=resolver.profile)
+
+    def build():
+        if include_changes:
+            entries = resolver.lessons_between(week_start, week_start + timedelta(days=4), include_cancelled=False)
+        else:
+            entries = resolver.weekly_entries()
+        return render(fmt, build_snapshot(entries, profile=resolver.profile, week_start=week_start))
+
+    return cached_file(user_prefix(user.pk, fmt), variant, version, fmt, build)
+
+
+def class_snapshot(class_room, week_start=None):
+    from .models import ClassScheduleEntry
+
+    entries = ClassScheduleEntry.objects.filter(class_room=class_room).order_by('zi_saptamana', 'numar_ora')
+    return build_snapshot(list(entries), title=f"Orar {class_room.nume}", week_start=week_start)
+
+
+def class_export(class_room, fmt):
+    week_start, variant = week_variant()
+    version = versions.version_for_class(class_room)
+    return cached_file(
+        class_prefix(class_room.pk, fmt), variant, version, fmt,
+        lambda: render(fmt, class_snapshot(class_room, week_start=week_start)),
+    )
+
+
+def prune_scope(scope):
+    """Șterge exporturile din cache pentru un scope („user:<id>” / „class:<id>”)."""
+    kind, _, pk = scope.partition(':')
+    prune(f"{kind}-{pk}-")
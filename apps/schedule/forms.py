@@ -2,7 +2,11 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 from datetime import time, timedelta
-from .models import ScheduleEntry, ScheduleTemplate, ScheduleChange, ClassRoom, ClassScheduleEntry
+from .models import (
+    ScheduleEntry, ScheduleTemplate, ScheduleChange, ClassRoom, ClassScheduleEntry, ScheduleOverride,
+    ClassScheduleChange,
+)
+from . import occupancy
 from apps.subjects.models import Subject
 
 
@@ -362,6 +366,134 @@ class ScheduleChangeForm(forms.ModelForm):
         return cleaned_data
 
 
+class ClassScheduleChangeForm(forms.ModelForm):
+    """Form pentru modificările aplicate întregii clase (anulare, înlocuitor etc.)"""
+
+    class Meta:
+        model = ClassScheduleChange
+        fields = [
+            'class_entry', 'tip_schimbare', 'data_start', 'data_end',
+            'motiv', 'ora_inceput_noua', 'ora_sfarsit_noua', 'sala_noua',
+            'subject_nou_nume', 'profesor_inlocuitor'
+        ]
+        labels = {
+            'class_entry': 'Ora din orarul clasei',
+            'tip_schimbare': 'Tipul modificării',
+            'data_start': 'De la data',
+            'data_end': 'Până la data (opțional)',
+            'motiv': 'Motivul modificării',
+            'ora_inceput_noua': 'Noua oră de început',
+            'ora_sfarsit_noua': 'Noua oră de sfârșit',
+            'sala_noua': 'Noua sală',
+            'subject_nou_nume': 'Noua materie',
+            'profesor_inlocuitor': 'Profesor înlocuitor',
+        }
+        widgets = {
+            'class_entry': forms.Select(attrs={'class': 'form-control', 'required': True}),
+            'tip_schimbare': forms.Select(attrs={'class': 'form-control', 'required': True}),
+            'data_start': forms.DateInput(attrs={'class': 'form-control', 'type': 'date', 'required': True}),
+            'data_end': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'motiv': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ex: Profesor în concediu, Examen, Sărbătoare'}),
+            'ora_inceput_noua': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'ora_sfarsit_noua': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'sala_noua': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Noua sală'}),
+            'subject_nou_nume': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ex: Matematică'}),
+            'profesor_inlocuitor': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Numele profesorului înlocuitor'}),
+        }
+
+    def __init__(self, *args, class_room=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if class_room is not None:
+            self.fields['class_entry'].queryset = ClassScheduleEntry.objects.filter(
+                class_room=class_room
+            ).order_by('zi_saptamana', 'numar_ora')
+        self.fields['class_entry'].label_from_instance = lambda obj: (
+            f"{obj.get_zi_saptamana_display()} - Ora {obj.numar_ora}: {obj.subject_name} "
+            f"({obj.ora_inceput.strftime('%H:%M')} - {obj.ora_sfarsit.strftime('%H:%M')})"
+        )
+        from datetime import date
+        if not self.instance.pk:
+            self.fields['data_start'].initial = date.today()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        tip_schimbare = cleaned_data.get('tip_schimbare')
+        data_start = cleaned_data.get('data_start')
+        data_end = cleaned_data.get('data_end')
+
+        if data_start and data_end and data_end < data_start:
+            raise ValidationError('Data de sfârșit trebuie să fie după data de început.')
+
+        if tip_schimbare == 'mutata':
+            ora_inceput_noua = cleaned_data.get('ora_inceput_noua')
+            ora_sfarsit_noua = cleaned_data.get('ora_sfarsit_noua')
+            if not ora_inceput_noua or not ora_sfarsit_noua:
+                raise ValidationError('Pentru ore mutate trebuie să specifici noile ore.')
+            if ora_sfarsit_noua <= ora_inceput_noua:
+                raise ValidationError('Ora de sfârșit trebuie să fie după ora de început.')
+        elif tip_schimbare == 'inlocuita':
+            if not cleaned_data.get('subject_nou_nume'):
+                raise ValidationError('Pentru materie înlocuită trebuie să specifici noua materie.')
+        elif tip_schimbare == 'profesor_inlocuitor':
+            if not cleaned_data.get('profesor_inlocuitor'):
+                raise ValidationError('Pentru profesor înlocuitor trebuie să specifici numele.')
+        elif tip_schimbare == 'sala_schimbata':
+            if not cleaned_data.get('sala_noua'):
+                raise ValidationError('Pentru sală schimbată trebuie să specifici noua sală.')
+
+        return cleaned_data
+
+
+class ScheduleOverrideForm(forms.ModelForm):
+    """Form pentru abaterile personale de la orarul clasei (mod „legat”)"""
+
+    class Meta:
+        model = ScheduleOverride
+        fields = ['tip', 'zi_saptamana', 'numar_ora', 'subject', 'ora_inceput', 'ora_sfarsit', 'sala', 'tip_ora', 'note']
+        labels = {
+            'tip': 'Tipul abaterii',
+            'zi_saptamana': 'Ziua',
+            'numar_ora': 'Ora (index)',
+            'subject': 'Materia (pentru ore suplimentare)',
+            'ora_inceput': 'Început',
+            'ora_sfarsit': 'Sfârșit',
+            'sala': 'Sala',
+            'tip_ora': 'Tipul orei',
+            'note': 'Note',
+        }
+        widgets = {
+            'tip': forms.Select(attrs={'class': 'form-control', 'required': True}),
+            'zi_saptamana': forms.Select(attrs={'class': 'form-control', 'required': True}),
+            'numar_ora': forms.NumberInput(attrs={'class': 'form-control', 'min': '1', 'max': '10', 'required': True}),
+            'subject': forms.Select(attrs={'class': 'form-control'}),
+            'ora_inceput': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'ora_sfarsit': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'sala': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ex: A12'}),
+            'tip_ora': forms.Select(attrs={'class': 'form-control'}),
+            'note': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        }
+
+    def __init__(self, user=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        if user:
+            self.instance.user = user
+            self.fields['subject'].queryset = Subject.objects.filter(user=user, activa=True).order_by('nume')
+        self.fields['subject'].empty_label = "--- Selectează materia ---"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        zi_saptamana = cleaned_data.get('zi_saptamana')
+        numar_ora = cleaned_data.get('numar_ora')
+        if zi_saptamana and numar_ora and self.user:
+            existing = ScheduleOverride.objects.filter(user=self.user, zi_saptamana=zi_saptamana, numar_ora=numar_ora)
+            if self.instance.pk:
+                existing = existing.exclude(pk=self.instance.pk)
+            if existing.exists():
+                raise ValidationError('Există deja o abatere pentru această zi și oră.')
+        return cleaned_data
+
+
 class QuickScheduleEntryForm(forms.Form):
     """Form rapid pentru adăugarea orelor din calendar"""
 
@@ -411,10 +543,10 @@ class ScheduleImportForm(forms.Form):
     """Form pentru importul orarului din fișier"""
 
     file = forms.FileField(
-        validators=[FileExtensionValidator(allowed_extensions=['csv', 'xlsx', 'xls'])],
+        validators=[FileExtensionValidator(allowed_extensions=['csv', 'xlsx'])],
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.csv,.xlsx,.xls'
+            'accept': '.csv,.xlsx'
         }),
         label='Fișier orar',
         help_text='Format acceptat: CSV sau Excel cu coloane: Materie, Zi, Ora, Ora_Start, Ora_End, Sala'
@@ -441,6 +573,37 @@ class ScheduleImportForm(forms.Form):
     )
 
 
+class ClassScheduleImportForm(forms.Form):
+    """Form pentru importul orarelor de clasă (una sau mai multe clase) din fișier"""
+
+    file = forms.FileField(
+        validators=[FileExtensionValidator(allowed_extensions=['csv', 'xlsx'])],
+        widget=forms.FileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        }),
+        label='Fișier orar',
+        help_text='CSV sau Excel cu coloane: Clasa, Materie, Zi, Ora, Ora_Start, Ora_End, Sala, Profesor, Culoare'
+    )
+
+    class_room = forms.ModelChoiceField(
+        queryset=ClassRoom.objects.all(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Clasa',
+        help_text='Lasă gol pentru a folosi coloana Clasa din fișier'
+    )
+
+    clear_existing = forms.BooleanField(
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        }),
+        label='Șterge orarul existent al claselor din fișier',
+    )
+
+
 class ScheduleExportForm(forms.Form):
     """Form pentru exportul orarului"""
 
@@ -645,7 +808,7 @@ class ClassScheduleEntryForm(forms.ModelForm):
         model = ClassScheduleEntry
         fields = [
             'zi_saptamana', 'numar_ora', 'ora_inceput', 'ora_sfarsit',
-            'subject_name', 'subject_color', 'sala', 'tip_ora', 'note'
+            'subject_name', 'subject_color', 'sala', 'profesor', 'tip_ora', 'note'
         ]
         labels = {
             'zi_saptamana': 'Ziua',
@@ -655,6 +818,7 @@ class ClassScheduleEntryForm(forms.ModelForm):
             'subject_name': 'Materia',
             'subject_color': 'Culoare',
             'sala': 'Sala',
+            'profesor': 'Profesor',
             'tip_ora': 'Tipul orei',
             'note': 'Note',
         }
@@ -666,6 +830,7 @@ class ClassScheduleEntryForm(forms.ModelForm):
             'subject_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ex: Matematică', 'required': True}),
             'subject_color': forms.TextInput(attrs={'class': 'form-control', 'type': 'color', 'style': 'height: 45px;'}),
             'sala': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ex: A12'}),
+            'profesor': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ex: Popescu Ion'}),
             'tip_ora': forms.Select(attrs={'class': 'form-control'}),
             'note': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
@@ -676,4 +841,20 @@ class ClassScheduleEntryForm(forms.ModelForm):
         end = cleaned.get('ora_sfarsit')
         if start and end and end <= start:
             raise ValidationError('Ora de sfârșit trebuie să fie după ora de început.')
+
+        # Sala și profesorul nu pot fi ocupate de altă clasă în același slot
+        zi = cleaned.get('zi_saptamana')
+        numar_ora = cleaned.get('numar_ora')
+        if zi and numar_ora:
+            found = occupancy.conflicts(
+                zi, numar_ora,
+                sala=cleaned.get('sala', ''),
+                profesor=cleaned.get('profesor', ''),
+                exclude_entry=self.instance.pk,
+            )
+            day = dict(ScheduleEntry.WEEKDAYS).get(zi, zi)
+            for occ in found['sala']:
+                self.add_error('sala', f'Sala {occ.label} este ocupată de clasa {occ.entry.class_room.nume} ({day}, ora {numar_ora}).')
+            for occ in found['profesor']:
+                self.add_error('profesor', f'{occ.label} predă la clasa {occ.entry.class_room.nume} ({day}, ora {numar_ora}).')
         return cleaned
\ No newline at end of file
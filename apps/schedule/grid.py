@@ -0,0 +1,145 @@
+"""
+Grila săptămânală (zi × oră) folosită de calendar, printare, export și dashboard.
+
+Orele se citesc o singură dată prin ScheduleResolver și se păstrează în cache pe
+versiunea orarului (ScheduleVersion), împreună cu etichetele de timp calculate
+din parametrii profilului. Celulele se obțin direct din matrice, fără căutări
+în listă din template.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+
+from . import versions
+from .resolver import ScheduleResolver
+
+
+WEEKDAY_LABELS = ['Luni', 'Marți', 'Miercuri', 'Joi', 'Vineri']
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def slot_settings(profile=None):
+    """Parametrii orelor (max ore, început, durată oră, durată pauză) din profil, cu valori implicite."""
+    max_hours = 8
+    start_base = time(8, 0)
+    class_duration = 50
+    break_duration = 10
+    try:
+        if profile:
+            if getattr(profile, 'nr_ore_pe_zi', None):
+                max_hours = int(profile.nr_ore_pe_zi)
+            if getattr(profile, 'ore_start', None):
+                start_base = profile.ore_start
+            if getattr(profile, 'durata_ora', None):
+                class_duration = int(profile.durata_ora or 50)
+            if getattr(profile, 'durata_pauza', None):
+                break_duration = int(profile.durata_pauza or 10)
+    except Exception:
+        pass
+    return max_hours, start_base, class_duration, break_duration
+
+
+def slot_labels(max_hours, start_base, class_duration, break_duration):
+    """Lista (început, sfârșit) ca obiecte time pentru orele 1..max_hours."""
+    day_start_dt = datetime.combine(date.today(), start_base)
+    slot_total = class_duration + break_duration
+    labels = []
+    for idx in range(max_hours):
+        slot_start_dt = day_start_dt + timedelta(minutes=idx * slot_total)
+        slot_end_dt = slot_start_dt + timedelta(minutes=class_duration)
+        labels.append((slot_start_dt.time(), slot_end_dt.time()))
+    return labels
+
+
+class WeekGrid:
+    """
+    Matricea densă zile (1-5) × ore (1..max_hours) pentru orarul unui utilizator.
+
+    `rows` este gata de iterat în template: fiecare rând are ora, eticheta de timp
+    și câte o celulă per zi ({'day_num', 'entry'}).
+    """
+
+    def __init__(self, entries, profile=None, resolver=None):
+        self.resolver = resolver
+        self.entries = list(entries)
+        settings = slot_settings(profile)
+        data_max = max((e.numar_ora for e in self.entries), default=0)
+        self.max_hours = max(settings[0], data_max)
+        self.start_base, self.class_duration, self.break_duration = settings[1:]
+        self.time_labels = [
+            {'start': start, 'end': end}
+            for start, end in slot_labels(self.max_hours, self.start_base, self.class_duration, self.break_duration)
+        ]
+        self.cells = {(e.zi_saptamana, e.numar_ora): e for e in self.entries}
+
+    @classmethod
+    def for_user(cls, user, resolver=None):
+        """Grila utilizatorului, din cache dacă versiunea orarului nu s-a schimbat."""
+        resolver = resolver or ScheduleResolver(user)
+        profile = resolver.profile
+        version = versions.version_for_user(user, profile=profile)
+        key = f"schedule:grid:user:{user.pk}:{version.hash}"
+        entries = cache.get(key)
+        if entries is None:
+            entries = resolver.weekly_entries()
+            cache.set(key, entries, CACHE_TIMEOUT)
+        else:
+            resolver.prime(entries)
+        return cls(entries, profile=profile, resolver=resolver)
+
+    @classmethod
+    def for_request(cls, request, user=None):
+        """Grila memorată pe request; partajează resolver-ul cererii."""
+        user = user or request.user
+        grids = getattr(request, '_schedule_grids', None)
+        if grids is None:
+            grids = {}
+            request._schedule_grids = grids
+        grid = grids.get(user.pk)
+        if grid is None:
+            grid = cls.for_user(user, resolver=ScheduleResolver.for_request(request, user))
+            grids[user.pk] = grid
+        return grid
+
+    @property
+    def slot_total(self):
+        return self.class_duration + self.break_duration
+
+    @property
+    def hour_slots(self):
+        return list(range(1, self.max_hours + 1))
+
+    def cell(self, zi_saptamana, numar_ora):
+        return self.cells.get((zi_saptamana, numar_ora))
+
+    def entries_by_day(self):
+        by_day = {day_num: [] for day_num in range(1, 6)}
+        for entry in self.entries:
+            by_day.setdefault(entry.zi_saptamana, []).append(entry)
+        return by_day
+
+    def subject_ids(self):
+        return {e.subject_id for e in self.entries}
+
+    @property
+    def rows(self):
+        result = []
+        for hour in self.hour_slots:
+            result.append({
+                'hour': hour,
+                'label': self.time_labels[hour - 1],
+                'cells': [{'day_num': day_num, 'entry': self.cells.get((day_num, hour))} for day_num in range(1, 6)],
+            })
+        return result
+
+    def current_hour(self, now=None):
+        """Numărul orei în curs (sau None în afara programului / în weekend)."""
+        now = now or datetime.now()
+        if not 1 <= now.isoweekday() <= 5:
+            return None
+        day_start = datetime.combine(now.date(), self.start_base)
+        day_end = day_start + timedelta(minutes=self.slot_total * self.max_hours)
+        if day_start <= now <= day_end:
+            minutes_since_start = int((now - day_start).total_seconds() // 60)
+            return min(self.max_hours, (minutes_since_start // self.slot_total) + 1)
+        return None
@@ -0,0 +1,206 @@
+"""
+Export ICS al orarului, ca feed recurent la care se pot abona aplicațiile de calendar.
+
+Fiecare slot din orar devine un singur VEVENT cu RRULE săptămânal, limitat la
+durata anului școlar; zilele de vacanță sunt excluse prin EXDATE, iar modificările
+din orar (ScheduleChange, ClassScheduleChange) sunt emise ca excepții cu RECURRENCE-ID. Rezultatul
+serializat este păstrat în cache pe versiunea orarului.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .resolver import ScheduleResolver, TIP_ORA_NAMES, class_lessons_between
+from .school_year import school_modules, days_off
+from . import versions
+
+
+PRODID = '-//School Manager Orar//ro'
+UID_DOMAIN = 'school-manager'
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _tz():
+    return ZoneInfo(getattr(settings, 'TIME_ZONE', 'Europe/Bucharest') or 'Europe/Bucharest')
+
+
+def _vtimezone(tzid):
+    """VTIMEZONE pentru Europe/Bucharest (EET/EEST), necesar clienților care nu cunosc TZID-ul."""
+    from icalendar import Timezone, TimezoneStandard, TimezoneDaylight
+
+    tz = Timezone()
+    tz.add('tzid', tzid)
+
+    daylight = TimezoneDaylight()
+    daylight.add('dtstart', datetime(1970, 3, 29, 3, 0, 0))
+    daylight.add('rrule', {'freq': 'yearly', 'bymonth': 3, 'byday': '-1su'})
+    daylight.add('tzoffsetfrom', timedelta(hours=2))
+    daylight.add('tzoffsetto', timedelta(hours=3))
+    daylight.add('tzname', 'EEST')
+
+    standard = TimezoneStandard()
+    standard.add('dtstart', datetime(1970, 10, 25, 4, 0, 0))
+    standard.add('rrule', {'freq': 'yearly', 'bymonth': 10, 'byday': '-1su'})
+    standard.add('tzoffsetfrom', timedelta(hours=3))
+    standard.add('tzoffsetto', timedelta(hours=2))
+    standard.add('tzname', 'EET')
+
+    tz.add_component(daylight)
+    tz.add_component(standard)
+    return tz
+
+
+def _subject_name(entry):
+    name = getattr(entry, 'subject_name', None)
+    if name:
+        return name
+    return entry.subject.nume
+
+
+def _first_occurrence(year_start, zi_saptamana):
+    return year_start + timedelta(days=(zi_saptamana - 1 - year_start.weekday()) % 7)
+
+
+def build_calendar(entries, *, name, judet=None, uid_prefix, changed_lessons=(), dtstamp=None):
+    """
+    Construiește calendarul ICS (bytes) pentru lista de ore săptămânale.
+    `changed_lessons` sunt obiecte Lesson cu modificare aplicată (din ScheduleResolver).
+    """
+    from icalendar import Calendar, Event
+
+    tz = _tz()
+    tzid = str(tz.key)
+    modules = school_modules(judet)
+    year_start, year_end = modules[0][1], modules[-1][2]
+    off_days = days_off(judet)
+    dtstamp = dtstamp or timezone.now()
+    # UNTIL trebuie exprimat în UTC când DTSTART are TZID
+    until = datetime.combine(year_end, time(23, 59, 59), tzinfo=tz).astimezone(dt_timezone.utc)
+
+    cal = Calendar()
+    cal.add('prodid', PRODID)
+    cal.add('version', '2.0')
+    cal.add('calscale', 'GREGORIAN')
+    cal.add('method', 'PUBLISH')
+    cal.add('x-wr-calname', name)
+    cal.add('x-wr-timezone', tzid)
+    cal.add_component(_vtimezone(tzid))
+
+    for entry in entries:
+        uid = f"{uid_prefix}-z{entry.zi_saptamana}-o{entry.numar_ora}@{UID_DOMAIN}"
+        first = _first_occurrence(year_start, entry.zi_saptamana)
+
+        ev = Event()
+        ev.add('uid', uid)
+        ev.add('dtstamp', dtstamp)
+        ev.add('summary', _subject_name(entry))
+        ev.add('dtstart', datetime.combine(first, entry.ora_inceput, tzinfo=tz))
+        ev.add('dtend', datetime.combine(first, entry.ora_sfarsit, tzinfo=tz))
+        ev.add('rrule', {'freq': 'weekly', 'until': until})
+        exdates = [
+            datetime.combine(day, entry.ora_inceput, tzinfo=tz)
+            for day in off_days
+            if day.isoweekday() == entry.zi_saptamana
+        ]
+        if exdates:
+            ev.add('exdate', exdates)
+        if entry.sala:
+            ev.add('location', entry.sala)
+        ev.add('description', f"Tip: {TIP_ORA_NAMES.get(entry.tip_ora, entry.tip_ora)}\nNote: {entry.note or ''}")
+        cal.add_component(ev)
+
+    for lesson in changed_lessons:
+        change = lesson.change
+        original = lesson.entry
+        ev = Event()
+        ev.add('uid', f"{uid_prefix}-z{original.zi_saptamana}-o{original.numar_ora}@{UID_DOMAIN}")
+        ev.add('dtstamp', dtstamp)
+        ev.add('recurrence-id', datetime.combine(lesson.data, original.ora_inceput, tzinfo=tz))
+        ev.add('summary', _subject_name(lesson))
+        ev.add('dtstart', datetime.combine(lesson.data, lesson.ora_inceput, tzinfo=tz))
+        ev.add('dtend', datetime.combine(lesson.data, lesson.ora_sfarsit, tzinfo=tz))
+        if lesson.anulata:
+            ev.add('status', 'CANCELLED')
+        if lesson.sala:
+            ev.add('location', lesson.sala)
+        details = [change.get_tip_schimbare_display()]
+        if lesson.profesor_inlocuitor:
+            details.append(f"Profesor înlocuitor: {lesson.profesor_inlocuitor}")
+        if change.motiv:
+            details.append(f"Motiv: {change.motiv}")
+        ev.add('description', '\n'.join(details))
+        cal.add_component(ev)
+
+    return cal.to_ical()
+
+
+def _judet_for_class_room(class_room):
+    judet = getattr(class_room, 'judet', '') if class_room else ''
+    return judet.strip() if judet else None
+
+
+def user_calendar_ics(user, resolver=None, version=None):
+    """ICS-ul orarului efectiv al utilizatorului (cu modificările din tot anul școlar)."""
+    resolver = resolver or ScheduleResolver(user)
+    profile = resolver.profile
+    class_room = getattr(profile, 'class_room', None) if profile and profile.class_room_id else None
+    judet = _judet_for_class_room(class_room)
+    modules = school_modules(judet)
+
+    lessons = resolver.lessons_between(modules[0][1], modules[-1][2])
+    off = set(days_off(judet))
+    changed = [lesson for lesson in lessons if lesson.change is not None and lesson.data not in off]
+
+    return build_calendar(
+        resolver.weekly_entries(),
+        name='Orar școlar',
+        judet=judet,
+        uid_prefix=f"u{user.pk}",
+        changed_lessons=changed,
+        dtstamp=version.last_modified if version else None,
+    )
+
+
+def class_calendar_ics(class_room, version=None):
+    """ICS-ul orarului unei clase (fără abaterile personale ale elevilor, cu modificările clasei)."""
+    judet = _judet_for_class_room(class_room)
+    modules = school_modules(judet)
+    lessons = class_lessons_between(class_room, modules[0][1], modules[-1][2])
+    off = set(days_off(judet))
+    entries = {}
+    for lesson in lessons:
+        entries.setdefault(lesson.entry.pk, lesson.entry)
+    changed = [lesson for lesson in lessons if lesson.change is not None and lesson.data not in off]
+
+    return build_calendar(
+        sorted(entries.values(), key=lambda e: (e.zi_saptamana, e.numar_ora)),
+        name=f"Orar {class_room.nume}",
+        judet=judet,
+        uid_prefix=f"c{class_room.pk}",
+        changed_lessons=changed,
+        dtstamp=version.last_modified if version else None,
+    )
+
+
+def cached_user_ics(user, resolver=None, version=None):
+    """Returnează (bytes, versiune); serializarea se refolosește cât timp versiunea nu se schimbă."""
+    version = version or versions.version_for_user(user)
+    key = f"schedule:ics:user:{user.pk}:{version.hash}"
+    content = cache.get(key)
+    if content is None:
+        content = user_calendar_ics(user, resolver=resolver, version=version)
+        cache.set(key, content, CACHE_TIMEOUT)
+    return content, version
+
+
+def cached_class_ics(class_room, version=None):
+    version = version or versions.version_for_class(class_room)
+    key = f"schedule:ics:class:{class_room.pk}:{version.hash}"
+    content = cache.get(key)
+    if content is None:
+        content = class_calendar_ics(class_room, version=version)
+        cache.set(key, content, CACHE_TIMEOUT)
+    return content, version
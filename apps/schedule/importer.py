@@ -0,0 +1,473 @@
+"""
+Import în masă al orarului (personal sau pe clase) din CSV/XLSX.
+
+Toate rândurile sunt citite și validate în memorie: suprapunerile se verifică
+printr-o parcurgere a intervalelor sortate după ora de început, pe fiecare zi
+(și clasă), cu orele deja existente căutate binar. Erorile sunt raportate
+per rând, iar rândurile valide se inserează cu `bulk_create` într-o singură
+tranzacție. Nimic nu se scrie dacă niciun rând nu e valid; când importul
+înlocuiește orarul existent, o singură eroare oprește tot importul, ca orarul
+(și modificările lui) să nu fie șters pentru un fișier greșit.
+"""
+import codecs
+import csv
+import io
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.subjects.models import Subject
+from . import occupancy, versions
+from .grid import slot_settings, slot_labels
+from .models import ScheduleEntry, ClassRoom, ClassScheduleEntry, link_class_subjects
+from .signals import class_propagation_suspended
+
+
+WEEKDAY_ALIASES = {
+    'luni': 1, 'marti': 2, 'miercuri': 3, 'joi': 4, 'vineri': 5,
+    'l': 1, 'ma': 2, 'mi': 3, 'j': 4, 'v': 5,
+}
+TIP_ORA_ALIASES = {
+    'normal': 'normal', 'ora normala': 'normal',
+    'dirigentie': 'dirigentie', 'ora de dirigentie': 'dirigentie',
+    'optionala': 'optionala', 'ora optionala': 'optionala',
+    'recuperare': 'recuperare', 'ora de recuperare': 'recuperare',
+}
+# Coloane acceptate (după normalizare) -> câmp intern
+COLUMN_ALIASES = {
+    'materie': 'subject', 'materia': 'subject', 'subject': 'subject',
+    'zi': 'zi', 'ziua': 'zi', 'day': 'zi',
+    'ora': 'numar_ora', 'nr': 'numar_ora', 'numar_ora': 'numar_ora', 'hour': 'numar_ora',
+    'ora_start': 'ora_inceput', 'inceput': 'ora_inceput', 'start': 'ora_inceput',
+    'ora_end': 'ora_sfarsit', 'sfarsit': 'ora_sfarsit', 'end': 'ora_sfarsit',
+    'sala': 'sala', 'room': 'sala',
+    'tip': 'tip_ora', 'tip_ora': 'tip_ora',
+    'note': 'note',
+    'culoare': 'culoare', 'color': 'culoare',
+    'clasa': 'clasa', 'class': 'clasa',
+    'profesor': 'profesor', 'prof': 'profesor', 'teacher': 'profesor',
+}
+DEFAULT_COLOR = '#007bff'
+# Codificările încercate pentru CSV: UTF-8 (cu sau fără BOM), apoi Windows-1250 (Excel în română)
+CSV_ENCODINGS = ('utf-8-sig', 'cp1250')
+
+
+class FileEncodingError(ValueError):
+    """Fișierul CSV nu se poate decoda cu niciuna dintre CSV_ENCODINGS."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # (nr. rând, mesaj)
+
+    def error(self, row_no, message):
+        self.errors.append((row_no, message))
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def _rejected(result, valid, clear_existing):
+    """Lotul nu se scrie: niciun rând valid, sau erori când orarul existent ar fi înlocuit."""
+    if not valid:
+        result.error(0, "Niciun rând valid; orarul existent nu a fost modificat.")
+    elif clear_existing and result.errors:
+        result.error(0, "Orarul existent nu a fost înlocuit: corectează rândurile de mai jos "
+                        "sau debifează „Șterge orarul existent” pentru a importa doar rândurile valide.")
+    else:
+        return False
+    result.errors.sort()
+    return True
+
+
+def _normalize(value):
+    value = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode()
+    return value.strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def read_rows(uploaded, aliases=COLUMN_ALIASES):
+    """
+    Produce (nr. rând, dict) din fișierul CSV/XLSX încărcat; antetul este primul
+    rând, iar coloanele se traduc prin `aliases` (folosit și de importul notelor).
+    """
+    name = (getattr(uploaded, 'name', '') or '').lower()
+    if name.endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(uploaded, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            yield from _with_header(rows, aliases)
+        finally:
+            wb.close()
+    else:
+        text = io.TextIOWrapper(uploaded, encoding=csv_encoding(uploaded), newline='')
+        sample = text.read(2048)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from _with_header(csv.reader(text, dialect), aliases)
+
+
+def csv_encoding(uploaded, encodings=CSV_ENCODINGS):
+    """
+    Prima codificare din `encodings` în care se decodează tot fișierul (citit în
+    bucăți, decodorul incremental nu ține fișierul în memorie); FileEncodingError altfel.
+    """
+    for encoding in encodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        uploaded.seek(0)
+        try:
+            for chunk in iter(lambda: uploaded.read(64 * 1024), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        uploaded.seek(0)
+        return encoding
+    raise FileEncodingError("Fișierul CSV nu este în codificarea UTF-8 sau Windows-1250. "
+                            "Salvează-l din Excel ca „CSV UTF-8” și încearcă din nou.")
+
+
+def _with_header(rows, aliases):
+    header = None
+    for idx, row in enumerate(rows, start=1):
+        if header is None:
+            header = [aliases.get(_normalize(col)) for col in row]
+            continue
+        if not any(cell not in (None, '') for cell in row):
+            continue
+        yield idx, {
+            key: cell for key, cell in zip(header, row) if key and cell not in (None, '')
+        }
+
+
+def _parse_day(value):
+    if isinstance(value, (int, float)):
+        day = int(value)
+    else:
+        text = _normalize(value)
+        day = int(text) if text.isdigit() else WEEKDAY_ALIASES.get(text)
+    if day not in (1, 2, 3, 4, 5):
+        raise ValueError(f"Zi invalidă: {value}")
+    return day
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value.time().replace(second=0, microsecond=0)
+    if isinstance(value, time):
+        return value.replace(second=0, microsecond=0)
+    text = str(value).strip()
+    for fmt in ('%H:%M', '%H:%M:%S', '%H.%M'):
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Oră invalidă: {value}")
+
+
+def parse_slot(data, labels):
+    """Zi, număr oră, început și sfârșit; orele lipsă se completează din parametrii profilului."""
+    if 'zi' not in data or 'numar_ora' not in data:
+        raise ValueError("Lipsesc coloanele Zi/Ora")
+    zi = _parse_day(data['zi'])
+    try:
+        numar_ora = int(float(data['numar_ora']))
+    except (TypeError, ValueError):
+        raise ValueError(f"Număr de oră invalid: {data['numar_ora']}")
+    if numar_ora < 1:
+        raise ValueError(f"Număr de oră invalid: {numar_ora}")
+
+    start = _parse_time(data['ora_inceput']) if 'ora_inceput' in data else None
+    end = _parse_time(data['ora_sfarsit']) if 'ora_sfarsit' in data else None
+    if start is None or end is None:
+        if numar_ora > len(labels):
+            raise ValueError("Lipsesc orele de început/sfârșit")
+        start = start or labels[numar_ora - 1][0]
+        end = end or labels[numar_ora - 1][1]
+    if end <= start:
+        raise ValueError("Ora de sfârșit trebuie să fie după ora de început")
+
+    tip = TIP_ORA_ALIASES.get(_normalize(data.get('tip_ora', 'normal')).replace('_', ' '), 'normal')
+    return zi, numar_ora, start, end, tip
+
+
+def find_conflicts(slots):
+    """
+    Suprapuneri între intervale, verificate per grup (ex: zi), fără comparații
+    între toate perechile.
+
+    `slots` conține tupluri (grup, numar_ora, început, sfârșit, ref, eticheta).
+    Rezultatul: {ref: mesaj} pentru intervalele noi care intră în conflict cu o
+    oră existentă sau cu un interval nou anterior (după ora de început). Ref None
+    marchează orele existente, care nu se raportează, dar blochează intervalele
+    noi, indiferent dacă încep înaintea lor sau după.
+    """
+    by_group = defaultdict(lambda: ([], []))
+    for slot in slots:
+        by_group[slot[0]][slot[4] is not None].append(slot)
+
+    conflicts = {}
+    for existing, new in by_group.values():
+        # Orele existente: sortate după început, cu intervalul care se termină cel
+        # mai târziu printre primele i, deci conflictul se află printr-o căutare binară
+        existing.sort(key=lambda s: (s[2], s[3]))
+        starts = [s[2] for s in existing]
+        latest = []
+        for slot in existing:
+            latest.append(slot if not latest or slot[3] > latest[-1][3] else latest[-1])
+        existing_numbers = {}
+        for slot in existing:
+            existing_numbers.setdefault(slot[1], slot)
+
+        new.sort(key=lambda s: (s[2], s[3]))
+        seen_numbers = {}
+        active = None  # intervalul nou acceptat cu cel mai târziu sfârșit de până acum
+        for slot in new:
+            _, numar_ora, start, end, ref, label = slot
+            before = bisect_left(starts, end)
+            blocker = latest[before - 1] if before and latest[before - 1][3] > start else None
+            other = existing_numbers.get(numar_ora) or seen_numbers.get(numar_ora)
+            if other is not None:
+                conflicts[ref] = f"Ora {numar_ora} este deja ocupată de {other[5]}"
+                continue
+            if blocker is None and active is not None and start < active[3]:
+                blocker = active
+            if blocker is not None:
+                conflicts[ref] = (
+                    f"Se suprapune cu {blocker[5]} "
+                    f"({blocker[2].strftime('%H:%M')} - {blocker[3].strftime('%H:%M')})"
+                )
+                continue
+            seen_numbers[numar_ora] = slot
+            if active is None or end > active[3]:
+                active = slot
+    return conflicts
+
+
+def import_user_schedule(user, uploaded, clear_existing=True, create_subjects=True):
+    """Importă orarul personal al utilizatorului. Nimic nu se salvează dacă fișierul nu poate fi citit."""
+    result = ImportResult()
+    profile = getattr(user, 'student_profile', None)
+    if profile and profile.orar_legat and profile.class_room_id:
+        result.error(0, "Orarul este legat de clasă; dezactivează „Orar legat de clasă” pentru un orar personal.")
+        return result
+
+    labels = slot_labels(*slot_settings(profile))
+    subjects = {s.nume.lower(): s for s in Subject.objects.filter(user=user)}
+    new_subjects = {}
+    parsed = []
+    for row_no, data in read_rows(uploaded):
+        try:
+            name = str(data.get('subject', '')).strip()
+            if not name:
+                raise ValueError("Lipsește materia")
+            zi, numar_ora, start, end, tip = parse_slot(data, labels)
+        except ValueError as exc:
+            result.error(row_no, str(exc))
+            continue
+        if name.lower() not in subjects and name.lower() not in new_subjects:
+            if not create_subjects:
+                result.error(row_no, f"Materia „{name}” nu există")
+                continue
+            new_subjects[name.lower()] = Subject(
+                user=user, nume=name, culoare=str(data.get('culoare') or DEFAULT_COLOR), activa=True,
+            )
+        parsed.append((row_no, name, zi, numar_ora, start, end, tip, data))
+
+    slots = [(zi, numar_ora, start, end, row_no, name) for row_no, name, zi, numar_ora, start, end, *_ in parsed]
+    if not clear_existing:
+        slots.extend(
+            (e.zi_saptamana, e.numar_ora, e.ora_inceput, e.ora_sfarsit, None, e.subject.nume)
+            for e in ScheduleEntry.objects.filter(user=user).select_related('subject')
+        )
+    conflicts = find_conflicts(slots)
+    for row_no, message in conflicts.items():
+        result.error(row_no, message)
+
+    valid = [row for row in parsed if row[0] not in conflicts]
+    if _rejected(result, valid, clear_existing):
+        return result
+    with versions.deferred(), transaction.atomic():
+        if clear_existing:
+            ScheduleEntry.objects.filter(user=user).delete()
+        if new_subjects:
+            Subject.objects.bulk_create(new_subjects.values(), ignore_conflicts=True)
+            subjects = {s.nume.lower(): s for s in Subject.objects.filter(user=user)}
+        ScheduleEntry.objects.bulk_create([
+            ScheduleEntry(
+                user=user,
+                subject=subjects[name.lower()],
+                zi_saptamana=zi,
+                numar_ora=numar_ora,
+                ora_inceput=start,
+                ora_sfarsit=end,
+                sala=str(data.get('sala', '') or subjects[name.lower()].sala or '')[:20],
+                note=str(data.get('note', '')),
+                tip_ora=tip,
+            )
+            for row_no, name, zi, numar_ora, start, end, tip, data in valid
+        ])
+        versions.bump_user(user.pk)
+    result.created = len(valid)
+    result.errors.sort()
+    return result
+
+
+def import_class_schedules(uploaded, clear_existing=True, class_room=None):
+    """
+    Importă orarele claselor (coloana Clasa, sau toate rândurile pentru `class_room`)
+    și propagă orele în orarele copiate ale elevilor cu câteva interogări per clasă.
+    """
+    result = ImportResult()
+    class_rooms = {c.nume.lower(): c for c in ClassRoom.objects.all()}
+    labels = slot_labels(*slot_settings(None))
+    parsed = []
+    for row_no, data in read_rows(uploaded):
+        try:
+            if class_room is not None:
+                target = class_room
+            else:
+                target = class_rooms.get(str(data.get('clasa', '')).strip().lower())
+                if target is None:
+                    raise ValueError(f"Clasa „{data.get('clasa', '')}” nu există")
+            name = str(data.get('subject', '')).strip()
+            if not name:
+                raise ValueError("Lipsește materia")
+            zi, numar_ora, start, end, tip = parse_slot(data, labels)
+        except ValueError as exc:
+            result.error(row_no, str(exc))
+            continue
+        parsed.append((row_no, target, name, zi, numar_ora, start, end, tip, data))
+
+    targets = {row[1].pk: row[1] for row in parsed}
+    slots = [
+        ((target.pk, zi), numar_ora, start, end, row_no, name)
+        for row_no, target, name, zi, numar_ora, start, end, *_ in parsed
+    ]
+    if not clear_existing:
+        slots.extend(
+            ((e.class_room_id, e.zi_saptamana), e.numar_ora, e.ora_inceput, e.ora_sfarsit, None, e.subject_name)
+            for e in ClassScheduleEntry.objects.filter(class_room_id__in=list(targets))
+        )
+    conflicts = find_conflicts(slots)
+    for row_no, message in conflicts.items():
+        result.error(row_no, message)
+
+    valid = [row for row in parsed if row[0] not in conflicts]
+    if _rejected(result, valid, clear_existing):
+        return result
+    write_class_entries(
+        list(targets.values()),
+        [
+            ClassScheduleEntry(
+                class_room=target,
+                zi_saptamana=zi,
+                numar_ora=numar_ora,
+                ora_inceput=start,
+                ora_sfarsit=end,
+                subject_name=name,
+                subject_color=str(data.get('culoare') or DEFAULT_COLOR)[:7],
+                sala=str(data.get('sala', ''))[:20],
+                profesor=str(data.get('profesor', ''))[:100],
+                note=str(data.get('note', '')),
+                tip_ora=tip,
+            )
+            for row_no, target, name, zi, numar_ora, start, end, tip, data in valid
+        ],
+        clear_existing=clear_existing,
+    )
+    result.created = len(valid)
+    result.errors.sort()
+    return result
+
+
+def write_class_entries(class_rooms, entries, clear_existing=True):
+    """
+    Salvează în masă ore de clasă (obiecte ClassScheduleEntry nesalvate) și le
+    aplică elevilor, într-o singură tranzacție. Folosit de import și de generatorul de orare.
+    """
+    class_rooms = {c.pk: c for c in class_rooms}
+    by_class = defaultdict(list)
+    with versions.deferred(), transaction.atomic():
+        if clear_existing:
+            _clear_class_schedules(list(class_rooms.values()))
+        created = ClassScheduleEntry.objects.bulk_create(entries)
+        occupancy.index_entries(created)
+        for entry in created:
+            by_class[entry.class_room_id].append(entry)
+        touched_users = set()
+        for class_id, class_entries in by_class.items():
+            touched_users |= _sync_students(class_rooms[class_id], class_entries)
+        versions.bump_many(
+            [versions.class_scope(pk) for pk in class_rooms]
+            + [versions.user_scope(pk) for pk in touched_users]
+        )
+    return created
+
+
+def _clear_class_schedules(class_rooms):
+    """
+    Șterge orarele claselor împreună cu copiile din orarele elevilor (modul clasic),
+    cu câte o interogare per clasă în loc de una per oră.
+    """
+    class_entries = ClassScheduleEntry.objects.filter(class_room__in=class_rooms)
+    slots_by_class = defaultdict(list)
+    for class_room_id, zi, numar_ora in class_entries.values_list('class_room_id', 'zi_saptamana', 'numar_ora'):
+        slots_by_class[class_room_id].append(Q(zi_saptamana=zi, numar_ora=numar_ora))
+    for class_room_id, slots in slots_by_class.items():
+        slot_filter = Q()
+        for q in slots:
+            slot_filter |= q
+        ScheduleEntry.objects.filter(
+            slot_filter,
+            user__student_profile__class_room_id=class_room_id,
+            user__student_profile__orar_legat=False,
+        ).delete()
+    with class_propagation_suspended():
+        class_entries.delete()
+
+
+def _sync_students(class_room, entries):
+    """Aplică orele noi ale clasei elevilor ei (bulk); returnează id-urile utilizatorilor atinși."""
+    profiles = list(class_room.students.select_related('user'))
+    if not profiles:
+        return set()
+    names = [(e.subject_name, e.subject_color) for e in entries]
+    link_class_subjects(class_room, [p.user for p in profiles], subject_names=names)
+
+    copy_users = [p.user for p in profiles if not p.orar_legat]
+    if copy_users:
+        subjects = {
+            (s.user_id, s.nume): s
+            for s in Subject.objects.filter(user__in=copy_users, nume__in={e.subject_name for e in entries})
+        }
+        slot_filter = Q()
+        for e in entries:
+            slot_filter |= Q(zi_saptamana=e.zi_saptamana, numar_ora=e.numar_ora)
+        ScheduleEntry.objects.filter(slot_filter, user__in=copy_users).delete()
+        ScheduleEntry.objects.bulk_create([
+            ScheduleEntry(
+                user=user,
+                subject=subjects[(user.pk, e.subject_name)],
+                zi_saptamana=e.zi_saptamana,
+                numar_ora=e.numar_ora,
+                ora_inceput=e.ora_inceput,
+                ora_sfarsit=e.ora_sfarsit,
+                sala=e.sala,
+                note=e.note,
+                tip_ora=e.tip_ora,
+            )
+            for user in copy_users
+            for e in entries
+        ])
+    return {p.user_id for p in profiles}
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Export timetables (PDF/XLSX) for every student of a class, or for every class, into a ZIP archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_name', help='Class name (ex: 6A); omit together with --all for every class')
+        parser.add_argument('--all', action='store_true', help='Export every class')
+        parser.add_argument('--per', choices=['student', 'class'], default='student')
+        parser.add_argument('--format', choices=['pdf', 'xlsx'], default='pdf')
+        parser.add_argument('--workers', type=int, default=None, help='Render processes (default: SCHEDULE_BATCH_MAX_WORKERS)')
+        parser.add_argument('--output', default=None, help='Output ZIP path (default: orar_<class>_<per>.zip)')
+
+    def handle(self, *args, **options):
+        from apps.schedule import batch_export
+        from apps.schedule.models import ClassRoom
+
+        if not options['class_name'] and not options['all']:
+            raise CommandError('Specify --class <name> or --all.')
+        class_rooms = ClassRoom.objects.order_by('nume')
+        if options['class_name']:
+            class_rooms = class_rooms.filter(nume=options['class_name'])
+        class_rooms = list(class_rooms)
+        if not class_rooms:
+            raise CommandError('No matching class.')
+
+        name = options['class_name'] or 'toate_clasele'
+        output = options['output'] or f"orar_{name}_{options['per']}.zip"
+        run_id = batch_export.new_run_id()
+        try:
+            slot = batch_export.acquire_slot(run_id)
+        except batch_export.BatchBusy:
+            raise CommandError('Another batch export is already running.')
+
+        last_done = -1
+        with open(output, 'wb') as fh:
+            for chunk in batch_export.BatchRun(
+                class_rooms, per=options['per'], fmt=options['format'],
+                workers=options['workers'], run_id=run_id, slot=slot,
+            ):
+                fh.write(chunk)
+                progress = batch_export.get_progress(run_id) or {}
+                if progress.get('done') != last_done:
+                    last_done = progress.get('done')
+                    self.stdout.write(f"{last_done}/{progress.get('total')}")
+
+        progress = batch_export.get_progress(run_id) or {}
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {progress.get('done', 0)} file(s) to {output}"
+        ))
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Generate class timetables from a JSON spec (hours per subject, teachers, rooms, blocked slots).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help='JSON spec file (see apps/schedule/timetable.py Problem.from_spec)')
+        parser.add_argument('--synthetic', type=int, default=None, metavar='N',
+                            help='Benchmark on a synthetic school with N classes instead of --input')
+        parser.add_argument('--budget', type=float, default=10.0, help='Time budget in seconds')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Solve and report, do not write timetables')
+
+    def handle(self, *args, **options):
+        from apps.schedule import timetable
+
+        if options['synthetic']:
+            problem = timetable.synthetic_problem(options['synthetic'], seed=options['seed'] or 0)
+        elif options['input']:
+            try:
+                with open(options['input'], encoding='utf-8') as fh:
+                    problem = timetable.Problem.from_spec(json.load(fh))
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f'Invalid spec: {exc}')
+        else:
+            raise CommandError('Specify --input <spec.json> or --synthetic <N>.')
+
+        solution = timetable.solve(problem, time_budget=options['budget'], seed=options['seed'])
+        classes = len({r.class_name for r in problem.requirements})
+        self.stdout.write(
+            f"{classes} classes, {len(solution.placements)} lessons placed, "
+            f"{len(solution.unplaced)} unplaced, {solution.double_bookings()} hard violations, "
+            f"penalty {solution.penalty}, {solution.elapsed:.2f}s ({solution.iterations} iterations)"
+        )
+        for req in solution.unplaced[:20]:
+            self.stdout.write(self.style.WARNING(f"  unplaced: {req.class_name} {req.subject} ({req.teacher})"))
+
+        if options['dry_run'] or options['synthetic']:
+            return
+        if not solution.complete:
+            raise CommandError('Incomplete timetable; nothing was written. Increase --budget or relax constraints.')
+        created = timetable.save_solution(solution)
+        self.stdout.write(self.style.SUCCESS(f"Saved {len(created)} class schedule entries."))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('subjects', '0002_subject_rating'),
+        ('schedule', '0003_classroom_judet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tip', models.CharField(choices=[('ascunsa', 'Oră ascunsă'), ('sala', 'Sală schimbată'), ('extra', 'Oră suplimentară')], max_length=10)),
+                ('zi_saptamana', models.IntegerField(choices=[(1, 'Luni'), (2, 'Marți'), (3, 'Miercuri'), (4, 'Joi'), (5, 'Vineri')])),
+                ('numar_ora', models.PositiveIntegerField()),
+                ('ora_inceput', models.TimeField(blank=True, null=True)),
+                ('ora_sfarsit', models.TimeField(blank=True, null=True)),
+                ('tip_ora', models.CharField(choices=[('normal', 'Oră normală'), ('dirigentie', 'Ora de dirigentie'), ('optionala', 'Oră opțională'), ('recuperare', 'Oră de recuperare')], default='optionala', max_length=20)),
+                ('sala', models.CharField(blank=True, max_length=20)),
+                ('note', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_overrides', to='subjects.subject')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_overrides', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Abatere Orar',
+                'verbose_name_plural': 'Abateri Orar',
+                'ordering': ['zi_saptamana', 'numar_ora'],
+                'unique_together': {('user', 'zi_saptamana', 'numar_ora')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0005_scheduleversion_schedulefeed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classscheduleentry',
+            name='profesor',
+            field=models.CharField(blank=True, help_text='Numele profesorului care predă ora', max_length=100),
+        ),
+    ]
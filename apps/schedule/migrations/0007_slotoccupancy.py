@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_index(apps, schema_editor):
+    ClassScheduleEntry = apps.get_model('schedule', 'ClassScheduleEntry')
+    SlotOccupancy = apps.get_model('schedule', 'SlotOccupancy')
+    rows = []
+    for entry in ClassScheduleEntry.objects.all().iterator():
+        for kind in ('sala', 'profesor'):
+            label = ' '.join((getattr(entry, kind) or '').split())
+            if label:
+                rows.append(SlotOccupancy(
+                    entry_id=entry.pk, kind=kind, key=label.casefold()[:100], label=label[:100],
+                    zi_saptamana=entry.zi_saptamana, numar_ora=entry.numar_ora,
+                ))
+    SlotOccupancy.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0006_classscheduleentry_profesor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sala', 'Sală'), ('profesor', 'Profesor')], max_length=10)),
+                ('key', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=100)),
+                ('zi_saptamana', models.IntegerField(choices=[(1, 'Luni'), (2, 'Marți'), (3, 'Miercuri'), (4, 'Joi'), (5, 'Vineri')])),
+                ('numar_ora', models.PositiveIntegerField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='schedule.classscheduleentry')),
+            ],
+            options={
+                'verbose_name': 'Ocupare Sală/Profesor',
+                'verbose_name_plural': 'Ocupare Săli/Profesori',
+                'indexes': [models.Index(fields=['kind', 'key', 'zi_saptamana', 'numar_ora'], name='schedule_occ_slot_idx'), models.Index(fields=['kind', 'zi_saptamana', 'numar_ora'], name='schedule_occ_time_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
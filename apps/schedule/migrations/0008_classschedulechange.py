@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schedule', '0007_slotoccupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassScheduleChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tip_schimbare', models.CharField(choices=[('anulata', 'Oră anulată'), ('mutata', 'Oră mutată'), ('inlocuita', 'Materie înlocuită'), ('sala_schimbata', 'Sala schimbată'), ('profesor_inlocuitor', 'Profesor înlocuitor')], max_length=20)),
+                ('data_start', models.DateField(help_text='De la această dată')),
+                ('data_end', models.DateField(blank=True, help_text='Până la această dată (opțional)', null=True)),
+                ('motiv', models.CharField(blank=True, help_text='Motivul schimbării', max_length=200)),
+                ('ora_inceput_noua', models.TimeField(blank=True, null=True)),
+                ('ora_sfarsit_noua', models.TimeField(blank=True, null=True)),
+                ('sala_noua', models.CharField(blank=True, max_length=20)),
+                ('subject_nou_nume', models.CharField(blank=True, max_length=100)),
+                ('profesor_inlocuitor', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('class_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='schedule.classscheduleentry')),
+                ('class_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_changes', to='schedule.classroom')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='class_schedule_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Schimbare Orar Clasă',
+                'verbose_name_plural': 'Schimbări Orar Clasă',
+                'ordering': ['-data_start'],
+                'indexes': [models.Index(fields=['class_room', 'data_start'], name='schedule_cls_change_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from apps.subjects.models import Subject
@@ -61,18 +63,18 @@ class ScheduleEntry(models.Model):
         if self.ora_inceput >= self.ora_sfarsit:
             raise ValidationError("Ora de început trebuie să fie înainte de ora de sfârșit")
 
-        # Verifică să nu se suprapună cu alte ore în aceeași zi
-        conflicting_entries = ScheduleEntry.objects.filter(
+        # Verifică să nu se suprapună cu alte ore în aceeași zi (suprapunerea e filtrată direct în SQL)
+        entry = ScheduleEntry.objects.filter(
             user=self.user,
-            zi_saptamana=self.zi_saptamana
-        ).exclude(pk=self.pk)
-
-        for entry in conflicting_entries:
-            if (self.ora_inceput < entry.ora_sfarsit and self.ora_sfarsit > entry.ora_inceput):
-                raise ValidationError(
-                    f"Se suprapune cu {entry.subject.nume} "
-                    f"({entry.ora_inceput.strftime('%H:%M')} - {entry.ora_sfarsit.strftime('%H:%M')})"
-                )
+            zi_saptamana=self.zi_saptamana,
+            ora_inceput__lt=self.ora_sfarsit,
+            ora_sfarsit__gt=self.ora_inceput,
+        ).exclude(pk=self.pk).select_related('subject').first()
+        if entry is not None:
+            raise ValidationError(
+                f"Se suprapune cu {entry.subject.nume} "
+                f"({entry.ora_inceput.strftime('%H:%M')} - {entry.ora_sfarsit.strftime('%H:%M')})"
+            )
 
     @property
     def durata_minunte(self):
@@ -127,6 +129,7 @@ class ClassScheduleEntry(models.Model):
     subject_color = models.CharField(max_length=7, default='#007bff', help_text="Culoare în format hex (#FF5733)")
 
     sala = models.CharField(max_length=20, blank=True)
+    profesor = models.CharField(max_length=100, blank=True, help_text="Numele profesorului care predă ora")
     note = models.TextField(blank=True)
     tip_ora = models.CharField(
         max_length=20,
@@ -152,11 +155,139 @@ class ClassScheduleEntry(models.Model):
         return f"{self.class_room.nume} - {self.get_zi_saptamana_display()} Ora {self.numar_ora}: {self.subject_name}"
 
 
+class ScheduleOverride(models.Model):
+    """
+    Abatere personală de la orarul clasei, pentru elevii în modul „legat”.
+    Se stochează doar diferențele (oră ascunsă, altă sală, oră opțională în plus),
+    restul orarului fiind citit direct din ClassScheduleEntry.
+    """
+    OVERRIDE_TYPES = [
+        ('ascunsa', 'Oră ascunsă'),
+        ('sala', 'Sală schimbată'),
+        ('extra', 'Oră suplimentară'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='schedule_overrides')
+    tip = models.CharField(max_length=10, choices=OVERRIDE_TYPES)
+
+    zi_saptamana = models.IntegerField(choices=ScheduleEntry.WEEKDAYS)
+    numar_ora = models.PositiveIntegerField()
+
+    # Doar pentru orele suplimentare
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True,
+                                related_name='schedule_overrides')
+    ora_inceput = models.TimeField(blank=True, null=True)
+    ora_sfarsit = models.TimeField(blank=True, null=True)
+    tip_ora = models.CharField(
+        max_length=20,
+        choices=[
+            ('normal', 'Oră normală'),
+            ('dirigentie', 'Ora de dirigentie'),
+            ('optionala', 'Oră opțională'),
+            ('recuperare', 'Oră de recuperare'),
+        ],
+        default='optionala'
+    )
+
+    # Pentru sală schimbată / ore suplimentare
+    sala = models.CharField(max_length=20, blank=True)
+    note = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Abatere Orar"
+        verbose_name_plural = "Abateri Orar"
+        ordering = ['zi_saptamana', 'numar_ora']
+        unique_together = ['user', 'zi_saptamana', 'numar_ora']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_zi_saptamana_display()} Ora {self.numar_ora}: {self.get_tip_display()}"
+
+    def clean(self):
+        if self.tip == 'extra':
+            if not self.subject_id:
+                raise ValidationError("Pentru o oră suplimentară trebuie selectată materia")
+            if self.ora_inceput and self.ora_sfarsit and self.ora_inceput >= self.ora_sfarsit:
+                raise ValidationError("Ora de început trebuie să fie înainte de ora de sfârșit")
+        elif self.tip == 'sala' and not self.sala:
+            raise ValidationError("Pentru sală schimbată trebuie specificată noua sală")
+
+
+def _is_linked_profile(user: User) -> bool:
+    try:
+        return bool(user.student_profile.orar_legat)
+    except Exception:
+        return False
+
+
+# Culoarea materiilor create pentru orele înlocuite din orarul clasei (modificarea reține doar numele)
+CHANGE_SUBJECT_COLOR = '#007bff'
+
+
+def class_change_subjects(class_room: 'ClassRoom'):
+    """(nume, culoare) pentru materiile noi din înlocuirile încă neîncheiate ale clasei."""
+    names = (
+        ClassScheduleChange.objects
+        .filter(Q(data_end__isnull=True) | Q(data_end__gte=timezone.localdate()),
+                class_room=class_room, tip_schimbare='inlocuita')
+        .exclude(subject_nou_nume='')
+        .values_list('subject_nou_nume', flat=True)
+        .distinct()
+    )
+    return [(name, CHANGE_SUBJECT_COLOR) for name in names]
+
+
+def link_class_subjects(class_room: 'ClassRoom', users, subject_names=None) -> None:
+    """
+    Asigură existența materiilor personale (după nume) pentru elevii în modul „legat”.
+    Temele și notele rămân legate de Subject, deci elevul are nevoie de câte o materie
+    per nume distinct, dar nu și de copii ale orelor. Un singur bulk insert pentru toți.
+    Fără `subject_names`: materiile din orarul clasei și din înlocuirile ei în curs.
+    Materiile se creează doar la scriere; ScheduleResolver doar le citește.
+    """
+    if subject_names is None:
+        rows = [
+            *ClassScheduleEntry.objects.filter(class_room=class_room).values_list('subject_name', 'subject_color'),
+            *class_change_subjects(class_room),
+        ]
+    else:
+        rows = subject_names
+    colors = {}
+    for name, color in rows:
+        colors.setdefault(name, color)
+    if not colors:
+        return
+
+    users = list(users)
+    existing = set(
+        Subject.objects.filter(user__in=users, nume__in=list(colors)).values_list('user_id', 'nume')
+    )
+    missing = [
+        Subject(user=u, nume=name, culoare=color, activa=True)
+        for u in users
+        for name, color in colors.items()
+        if (u.id, name) not in existing
+    ]
+    if missing:
+        Subject.objects.bulk_create(missing, ignore_conflicts=True)
+
+
 def apply_class_schedule_to_user(class_room: 'ClassRoom', user: User) -> int:
     """
     Copiază orarul definit la nivelul clasei în orarul utilizatorului dat.
     Returnează numărul de intrări create. Dacă utilizatorul are deja orar, nu suprascrie.
+    În modul „legat” nu se copiază nimic: se creează doar materiile lipsă, iar
+    rezultatul este numărul de ore din orarul clasei.
     """
+    if _is_linked_profile(user):
+        link_class_subjects(class_room, [user])
+        return ClassScheduleEntry.objects.filter(class_room=class_room).count()
+
+    # Înlocuirile clasei se aplică și copiei personale: materiile lor trebuie să existe
+    link_class_subjects(class_room, [user], class_change_subjects(class_room))
+
     # Nu suprascriem dacă are deja orar definit
     if ScheduleEntry.objects.filter(user=user).exists():
         return 0
@@ -219,29 +350,73 @@ class ScheduleTemplate(models.Model):
             ScheduleTemplate.objects.filter(user=self.user).update(activ=False)
         super().save(*args, **kwargs)
 
-    def aplicare_template(self):
-        """Aplică acest template la orarul curent"""
-        # Șterge orarul curent
-        ScheduleEntry.objects.filter(user=self.user).delete()
+    # Câmpurile comparate la aplicare; sloturile sunt identificate prin (zi_saptamana, numar_ora)
+    SLOT_FIELDS = ('subject_id', 'ora_inceput', 'ora_sfarsit', 'sala', 'note', 'tip_ora')
+
+    def salvare_orar(self, entries=None):
+        """Înlocuiește intrările template-ului cu orarul dat (implicit orarul curent al utilizatorului)."""
+        if entries is None:
+            entries = ScheduleEntry.objects.filter(user=self.user)
+        with transaction.atomic():
+            self.template_entries.all().delete()
+            ScheduleTemplateEntry.objects.bulk_create([
+                ScheduleTemplateEntry(
+                    template=self,
+                    zi_saptamana=e.zi_saptamana,
+                    numar_ora=e.numar_ora,
+                    **{f: getattr(e, f) for f in self.SLOT_FIELDS},
+                )
+                for e in entries
+            ])
 
-        # Copiază intrările din template
-        for template_entry in self.template_entries.all():
-            ScheduleEntry.objects.create(
-                user=self.user,
-                subject=template_entry.subject,
-                zi_saptamana=template_entry.zi_saptamana,
-                ora_inceput=template_entry.ora_inceput,
-                ora_sfarsit=template_entry.ora_sfarsit,
-                sala=template_entry.sala,
-                note=template_entry.note,
-                numar_ora=template_entry.numar_ora,
-                tip_ora=template_entry.tip_ora,
+    def aplicare_template(self):
+        """
+        Aplică acest template la orarul curent, modificând doar sloturile diferite.
+        Orele neschimbate (și modificările ScheduleChange atașate lor) rămân neatinse.
+        Returnează numărul de ore create, actualizate și șterse.
+        """
+        from . import versions
+
+        with versions.deferred(), transaction.atomic():
+            current = {
+                (e.zi_saptamana, e.numar_ora): e
+                for e in ScheduleEntry.objects.select_for_update().filter(user=self.user)
+            }
+            to_create, to_update = [], []
+            for t in self.template_entries.all():
+                entry = current.pop((t.zi_saptamana, t.numar_ora), None)
+                if entry is None:
+                    to_create.append(ScheduleEntry(
+                        user=self.user,
+                        zi_saptamana=t.zi_saptamana,
+                        numar_ora=t.numar_ora,
+                        **{f: getattr(t, f) for f in self.SLOT_FIELDS},
+                    ))
+                elif any(getattr(entry, f) != getattr(t, f) for f in self.SLOT_FIELDS):
+                    for f in self.SLOT_FIELDS:
+                        setattr(entry, f, getattr(t, f))
+                    to_update.append(entry)
+
+            # Ce a rămas în `current` nu există în template
+            if current:
+                ScheduleEntry.objects.filter(pk__in=[e.pk for e in current.values()]).delete()
+            if to_update:
+                now = timezone.now()
+                for entry in to_update:
+                    entry.updated_at = now
+                ScheduleEntry.objects.bulk_update(to_update, list(self.SLOT_FIELDS) + ['updated_at'])
+            if to_create:
+                ScheduleEntry.objects.bulk_create(to_create)
+            if to_create or to_update or current:
+                versions.bump_user(self.user_id)
+
+            # Marchează template-ul ca activ (și pe celelalte ca inactive) într-un singur UPDATE
+            ScheduleTemplate.objects.filter(user=self.user).update(
+                activ=Case(When(pk=self.pk, then=Value(True)), default=Value(False)),
             )
+            self.activ = True
 
-        # Marchează template-ul ca activ
-        ScheduleTemplate.objects.filter(user=self.user).update(activ=False)
-        self.activ = True
-        self.save()
+        return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(current)}
 
 
 class ScheduleTemplateEntry(models.Model):
@@ -335,4 +510,139 @@ class ScheduleChange(models.Model):
         if self.data_end and data > self.data_end:
             return False
 
-        return True
\ No newline at end of file
+        return True
+
+
+class ClassScheduleChange(models.Model):
+    """
+    Modificare temporară pentru o oră din orarul clasei (anulare, profesor înlocuitor etc.).
+    Se scrie o singură dată și se aplică la citire tuturor elevilor clasei, indiferent
+    de modul orarului (legat sau copie); o modificare personală (ScheduleChange) pe
+    aceeași oră are prioritate.
+    """
+    class_room = models.ForeignKey(ClassRoom, on_delete=models.CASCADE, related_name='schedule_changes')
+    class_entry = models.ForeignKey(ClassScheduleEntry, on_delete=models.CASCADE, related_name='changes')
+
+    tip_schimbare = models.CharField(max_length=20, choices=ScheduleChange.CHANGE_TYPES)
+
+    data_start = models.DateField(help_text="De la această dată")
+    data_end = models.DateField(blank=True, null=True, help_text="Până la această dată (opțional)")
+
+    motiv = models.CharField(max_length=200, blank=True, help_text="Motivul schimbării")
+
+    ora_inceput_noua = models.TimeField(blank=True, null=True)
+    ora_sfarsit_noua = models.TimeField(blank=True, null=True)
+    sala_noua = models.CharField(max_length=20, blank=True)
+    # Orarul clasei nu are materii per utilizator: materia nouă se reține după nume
+    subject_nou_nume = models.CharField(max_length=100, blank=True)
+    profesor_inlocuitor = models.CharField(max_length=100, blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='class_schedule_changes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Materia personală a elevului pentru `subject_nou_nume`, completată de ScheduleResolver
+    subject_nou = None
+    subject_nou_id = None
+
+    class Meta:
+        verbose_name = "Schimbare Orar Clasă"
+        verbose_name_plural = "Schimbări Orar Clasă"
+        ordering = ['-data_start']
+        indexes = [
+            models.Index(fields=['class_room', 'data_start'], name='schedule_cls_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tip_schimbare_display()} - {self.class_entry.subject_name} ({self.data_start})"
+
+    def save(self, *args, **kwargs):
+        if self.class_entry_id and not self.class_room_id:
+            self.class_room_id = self.class_entry.class_room_id
+        super().save(*args, **kwargs)
+
+    def este_activa(self, data=None):
+        """Verifică dacă schimbarea este activă pentru o anumită dată"""
+        if data is None:
+            data = timezone.localdate()
+        if data < self.data_start:
+            return False
+        if self.data_end and data > self.data_end:
+            return False
+        return True
+
+
+class ScheduleVersion(models.Model):
+    """
+    Contor de versiune pentru orarul unui utilizator („user:<id>”) sau al unei clase
+    („class:<id>”). Este incrementat la fiecare modificare relevantă și folosit ca
+    cheie pentru cache-ul exporturilor (ICS, PDF, XLSX) și pentru ETag/Last-Modified.
+    """
+    scope = models.CharField(max_length=40, unique=True)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versiune Orar"
+        verbose_name_plural = "Versiuni Orar"
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+
+
+class ScheduleFeed(models.Model):
+    """
+    Token secret pentru abonarea la orar (ICS) din aplicațiile de calendar.
+    Un feed aparține fie unui utilizator, fie unei clase.
+    """
+    token = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='schedule_feeds')
+    class_room = models.ForeignKey(ClassRoom, on_delete=models.CASCADE, null=True, blank=True, related_name='schedule_feeds')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Feed Orar (ICS)"
+        verbose_name_plural = "Feed-uri Orar (ICS)"
+
+    def __str__(self):
+        owner = self.user.username if self.user_id else (self.class_room.nume if self.class_room_id else '-')
+        return f"Feed ICS - {owner}"
+
+    @staticmethod
+    def generate_token():
+        import secrets
+        return secrets.token_urlsafe(32)
+
+
+class SlotOccupancy(models.Model):
+    """
+    Index de ocupare pentru orarele claselor: câte un rând per (sală sau profesor, zi, oră).
+    Sala și profesorul sunt text liber, așa că cheia este forma normalizată
+    (fără spații în plus, litere mici). Este întreținut la fiecare scriere a
+    orarului de clasă (vezi occupancy.py) și permite verificarea suprapunerilor
+    între clase cu o singură căutare în index.
+    """
+    KINDS = [
+        ('sala', 'Sală'),
+        ('profesor', 'Profesor'),
+    ]
+
+    entry = models.ForeignKey(ClassScheduleEntry, on_delete=models.CASCADE, related_name='occupancy')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    key = models.CharField(max_length=100)
+    label = models.CharField(max_length=100)
+    zi_saptamana = models.IntegerField(choices=ScheduleEntry.WEEKDAYS)
+    numar_ora = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Ocupare Sală/Profesor"
+        verbose_name_plural = "Ocupare Săli/Profesori"
+        indexes = [
+            models.Index(fields=['kind', 'key', 'zi_saptamana', 'numar_ora'], name='schedule_occ_slot_idx'),
+            models.Index(fields=['kind', 'zi_saptamana', 'numar_ora'], name='schedule_occ_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.label} - {self.get_zi_saptamana_display()} Ora {self.numar_ora}"
@@ -0,0 +1,141 @@
+"""
+Indexul de ocupare al sălilor și profesorilor în orarele claselor.
+
+Fiecare ClassScheduleEntry cu sală și/sau profesor are rânduri SlotOccupancy
+cheie (tip, nume normalizat, zi, oră). Rândurile se actualizează din semnale la
+salvarea unei ore și în masă după importuri/generare (`index_entries`); la
+ștergerea orei dispar prin CASCADE. Verificarea unei suprapuneri, sălile libere
+dintr-un slot și raportul de utilizare citesc doar indexul, fără a parcurge
+orarele tuturor claselor.
+"""
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .grid import WEEKDAY_LABELS, slot_settings
+from .models import ClassScheduleEntry, SlotOccupancy
+
+
+def normalize(value):
+    """Cheia de comparație pentru text liber: spații reduse, litere mici."""
+    return ' '.join((value or '').split()).casefold()[:100]
+
+
+def _rows_for(entry):
+    rows = []
+    for kind in ('sala', 'profesor'):
+        label = ' '.join((getattr(entry, kind) or '').split())
+        if label:
+            rows.append(SlotOccupancy(
+                entry_id=entry.pk,
+                kind=kind,
+                key=normalize(label),
+                label=label[:100],
+                zi_saptamana=entry.zi_saptamana,
+                numar_ora=entry.numar_ora,
+            ))
+    return rows
+
+
+def sync_entry(entry):
+    """Reindexează o singură oră de clasă (după salvare)."""
+    SlotOccupancy.objects.filter(entry_id=entry.pk).delete()
+    rows = _rows_for(entry)
+    if rows:
+        SlotOccupancy.objects.bulk_create(rows)
+
+
+def index_entries(entries):
+    """Indexează în masă ore de clasă nou create (ex: după bulk_create)."""
+    rows = []
+    for entry in entries:
+        rows.extend(_rows_for(entry))
+    SlotOccupancy.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def rebuild(class_rooms=None):
+    """Reconstruiește indexul (pentru toate clasele sau doar pentru cele date)."""
+    entries = ClassScheduleEntry.objects.all()
+    existing = SlotOccupancy.objects.all()
+    if class_rooms is not None:
+        entries = entries.filter(class_room__in=class_rooms)
+        existing = existing.filter(entry__class_room__in=class_rooms)
+    existing.delete()
+    return index_entries(entries.only('pk', 'sala', 'profesor', 'zi_saptamana', 'numar_ora'))
+
+
+def conflicts(zi_saptamana, numar_ora, sala='', profesor='', exclude_entry=None):
+    """
+    Orele altor clase care ocupă aceeași sală sau același profesor în slotul dat.
+    Returnează {'sala': [SlotOccupancy...], 'profesor': [...]} (listele goale = liber).
+    """
+    keys = {kind: normalize(value) for kind, value in (('sala', sala), ('profesor', profesor)) if normalize(value)}
+    result = {'sala': [], 'profesor': []}
+    if not keys:
+        return result
+    qs = SlotOccupancy.objects.filter(
+        zi_saptamana=zi_saptamana, numar_ora=numar_ora, kind__in=list(keys), key__in=list(keys.values()),
+    ).select_related('entry__class_room')
+    if exclude_entry is not None:
+        qs = qs.exclude(entry_id=exclude_entry)
+    for occ in qs:
+        if keys.get(occ.kind) == occ.key:
+            result[occ.kind].append(occ)
+    return result
+
+
+def known_rooms():
+    """{cheie: nume afișat} pentru toate sălile folosite în orarele claselor."""
+    rooms = {}
+    for key, label in SlotOccupancy.objects.filter(kind='sala').values_list('key', 'label').order_by('key', 'label'):
+        rooms.setdefault(key, label)
+    return rooms
+
+
+def free_rooms(zi_saptamana, numar_ora, rooms=None):
+    """Sălile (dintre cele cunoscute sau cele date) nefolosite de nicio clasă în slotul dat."""
+    if rooms is None:
+        rooms = known_rooms()
+    else:
+        rooms = {normalize(name): name for name in rooms if normalize(name)}
+    busy = set(SlotOccupancy.objects.filter(
+        kind='sala', zi_saptamana=zi_saptamana, numar_ora=numar_ora,
+    ).values_list('key', flat=True))
+    return sorted((label for key, label in rooms.items() if key not in busy), key=str.casefold)
+
+
+def utilization(kind='sala', max_hours=None):
+    """
+    Raportul de utilizare per sală (sau profesor): ore ocupate pe săptămână,
+    procent din sloturile disponibile (5 zile × max_hours), numărul de clase și
+    ocuparea pe zile. Sortat descrescător după ore.
+    """
+    max_hours = max_hours or slot_settings(None)[0]
+    total_slots = len(WEEKDAY_LABELS) * max_hours
+    labels = {}
+    per_day = defaultdict(lambda: [0] * len(WEEKDAY_LABELS))
+    for key, label, zi, count in (SlotOccupancy.objects
+                                  .filter(kind=kind)
+                                  .values_list('key', 'label', 'zi_saptamana')
+                                  .annotate(n=Count('id'))):
+        labels.setdefault(key, label)
+        if 1 <= zi <= len(WEEKDAY_LABELS):
+            per_day[key][zi - 1] += count
+    classes = dict(SlotOccupancy.objects
+                   .filter(kind=kind)
+                   .values_list('key')
+                   .annotate(n=Count('entry__class_room', distinct=True)))
+
+    report = []
+    for key, label in labels.items():
+        hours = sum(per_day[key])
+        report.append({
+            'nume': label,
+            'ore': hours,
+            'procent': round(100 * hours / total_slots, 1) if total_slots else 0,
+            'clase': classes.get(key, 0),
+            'pe_zile': per_day[key],
+        })
+    report.sort(key=lambda row: (-row['ore'], row['nume'].casefold()))
+    return report
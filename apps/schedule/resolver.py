@@ -0,0 +1,471 @@
+"""
+Orarul efectiv al unui utilizator.
+
+Toate vederile care afișează orarul (calendar, astăzi, print, export, dashboard)
+citesc prin ScheduleResolver, indiferent dacă elevul are o copie personală a
+orarului (ScheduleEntry) sau este în modul „legat” de orarul clasei
+(ClassScheduleEntry + ScheduleOverride).
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+
+from apps.subjects.models import Subject
+from .models import (
+    ScheduleEntry, ClassScheduleEntry, ScheduleOverride, ScheduleChange, ClassScheduleChange,
+)
+
+
+WEEKDAY_NAMES = dict(ScheduleEntry.WEEKDAYS)
+TIP_ORA_NAMES = dict(ScheduleEntry._meta.get_field('tip_ora').choices)
+
+
+class EffectiveEntry:
+    """
+    O oră din orarul efectiv, construită din orarul clasei și abaterile personale.
+    Expune aceleași atribute ca ScheduleEntry, astfel încât template-urile și
+    exporturile nu trebuie să distingă între cele două moduri.
+    """
+
+    def __init__(self, *, subject, zi_saptamana, numar_ora, ora_inceput, ora_sfarsit,
+                 sala='', note='', tip_ora='normal', class_entry_id=None, override_id=None):
+        # Nu există un rând ScheduleEntry personal în spate
+        self.id = None
+        self.pk = None
+        self.subject = subject
+        self.subject_id = subject.id
+        self.zi_saptamana = zi_saptamana
+        self.numar_ora = numar_ora
+        self.ora_inceput = ora_inceput
+        self.ora_sfarsit = ora_sfarsit
+        self.sala = sala
+        self.note = note
+        self.tip_ora = tip_ora
+        self.class_entry_id = class_entry_id
+        self.override_id = override_id
+        self.is_linked = True
+
+    def __repr__(self):
+        return f"<EffectiveEntry zi={self.zi_saptamana} ora={self.numar_ora} {self.subject.nume}>"
+
+    def get_zi_saptamana_display(self):
+        return WEEKDAY_NAMES.get(self.zi_saptamana, self.zi_saptamana)
+
+    def get_tip_ora_display(self):
+        return TIP_ORA_NAMES.get(self.tip_ora, self.tip_ora)
+
+    @property
+    def durata_minute(self):
+        start = datetime.combine(datetime.today(), self.ora_inceput)
+        end = datetime.combine(datetime.today(), self.ora_sfarsit)
+        return int((end - start).total_seconds() / 60)
+
+
+class ChangeIndex:
+    """
+    Index pe intervalele (data_start, data_end) ale modificărilor, grupat pe oră.
+    Pentru fiecare cheie păstrează modificările sortate după data de început, astfel
+    încât modificarea activă la o dată se găsește prin căutare binară.
+    """
+
+    def __init__(self, changes, key):
+        grouped = defaultdict(list)
+        for change in changes:
+            grouped[key(change)].append(change)
+        self._changes = {}
+        self._starts = {}
+        for k, items in grouped.items():
+            items.sort(key=lambda c: (c.data_start, c.pk or 0))
+            self._changes[k] = items
+            self._starts[k] = [c.data_start for c in items]
+
+    def __bool__(self):
+        return bool(self._changes)
+
+    def active(self, key, day):
+        """Modificarea cea mai recentă (după data de început) care acoperă ziua dată."""
+        starts = self._starts.get(key)
+        if not starts:
+            return None
+        items = self._changes[key]
+        for i in range(bisect_right(starts, day) - 1, -1, -1):
+            change = items[i]
+            if change.data_end is None or change.data_end >= day:
+                return change
+        return None
+
+
+class Lesson:
+    """
+    O oră concretă, la o dată anume, cu modificarea din orar (dacă există) aplicată.
+    Păstrează atributele unei intrări din orar, deci poate fi folosită direct în
+    template-urile existente.
+    """
+
+    def __init__(self, data, entry, change=None):
+        self.data = data
+        self.entry = entry
+        self.change = change
+        self.current_change = change
+
+        self.id = entry.id
+        self.zi_saptamana = entry.zi_saptamana
+        self.numar_ora = entry.numar_ora
+        self.subject = entry.subject
+        self.subject_id = entry.subject_id
+        self.ora_inceput = entry.ora_inceput
+        self.ora_sfarsit = entry.ora_sfarsit
+        self.sala = entry.sala
+        self.note = entry.note
+        self.tip_ora = entry.tip_ora
+        self.profesor_inlocuitor = ''
+        self.anulata = False
+
+        if change is not None:
+            self._apply(change)
+
+    def _apply(self, change):
+        tip = change.tip_schimbare
+        if tip == 'anulata':
+            self.anulata = True
+        elif tip == 'mutata':
+            self.ora_inceput = change.ora_inceput_noua or self.ora_inceput
+            self.ora_sfarsit = change.ora_sfarsit_noua or self.ora_sfarsit
+        elif tip == 'inlocuita':
+            self._replace_subject(change)
+        elif tip == 'profesor_inlocuitor':
+            self.profesor_inlocuitor = change.profesor_inlocuitor
+        # Sala nouă poate însoți orice tip de modificare
+        if change.sala_noua:
+            self.sala = change.sala_noua
+
+    def _replace_subject(self, change):
+        if change.subject_nou_id:
+            self.subject = change.subject_nou
+            self.subject_id = change.subject_nou_id
+
+    def __repr__(self):
+        return f"<Lesson {self.data} ora={self.numar_ora} {self.subject.nume}{' (anulată)' if self.anulata else ''}>"
+
+    def get_zi_saptamana_display(self):
+        return WEEKDAY_NAMES.get(self.zi_saptamana, self.zi_saptamana)
+
+    def get_tip_ora_display(self):
+        return TIP_ORA_NAMES.get(self.tip_ora, self.tip_ora)
+
+    @property
+    def start(self):
+        return datetime.combine(self.data, self.ora_inceput)
+
+    @property
+    def end(self):
+        return datetime.combine(self.data, self.ora_sfarsit)
+
+    @property
+    def durata_minute(self):
+        return int((self.end - self.start).total_seconds() / 60)
+
+
+class ClassLesson(Lesson):
+    """O oră concretă din orarul clasei (ClassScheduleEntry), cu modificarea clasei aplicată."""
+
+    def __init__(self, data, entry, change=None):
+        self.data = data
+        self.entry = entry
+        self.change = change
+        self.current_change = change
+
+        self.id = entry.id
+        self.zi_saptamana = entry.zi_saptamana
+        self.numar_ora = entry.numar_ora
+        self.subject_name = entry.subject_name
+        self.subject_color = entry.subject_color
+        self.ora_inceput = entry.ora_inceput
+        self.ora_sfarsit = entry.ora_sfarsit
+        self.sala = entry.sala
+        self.note = entry.note
+        self.tip_ora = entry.tip_ora
+        self.profesor = entry.profesor
+        self.profesor_inlocuitor = ''
+        self.anulata = False
+
+        if change is not None:
+            self._apply(change)
+
+    def _replace_subject(self, change):
+        if change.subject_nou_nume:
+            self.subject_name = change.subject_nou_nume
+
+    def __repr__(self):
+        return f"<ClassLesson {self.data} ora={self.numar_ora} {self.subject_name}{' (anulată)' if self.anulata else ''}>"
+
+
+def class_changes_between(class_room_id, start, end):
+    """Modificările clasei care se suprapun cu intervalul [start, end] (o interogare, pe index)."""
+    return list(
+        ClassScheduleChange.objects.filter(
+            Q(data_end__isnull=True) | Q(data_end__gte=start),
+            class_room_id=class_room_id,
+            data_start__lte=end,
+        ).select_related('class_entry')
+    )
+
+
+def class_lessons_between(class_room, start, end):
+    """Orele concrete ale clasei în intervalul [start, end], cu modificările clasei aplicate."""
+    entries = list(
+        ClassScheduleEntry.objects.filter(class_room=class_room).order_by('zi_saptamana', 'numar_ora')
+    )
+    index = ChangeIndex(class_changes_between(class_room.pk, start, end), key=lambda c: c.class_entry_id)
+    by_day = defaultdict(list)
+    for entry in entries:
+        by_day[entry.zi_saptamana].append(entry)
+    lessons = []
+    day = start
+    while day <= end:
+        for entry in by_day.get(day.isoweekday(), ()):
+            change = index.active(entry.id, day) if index else None
+            lessons.append(ClassLesson(day, entry, change))
+        day += timedelta(days=1)
+    return lessons
+
+
+class ScheduleResolver:
+    """
+    Rezolvă orarul săptămânal al unui utilizator cu un număr fix de interogări.
+    Rezultatele sunt păstrate pe instanță; folosește `for_request` pentru a
+    partaja aceeași instanță între toate componentele unei cereri.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._profile = None
+        self._profile_loaded = False
+        self._weekly = None
+        self._changes = None
+        self._changes_range = None
+        self._changes_list = []
+        self._class_changes = None
+        self._class_slots = {}
+        self._lessons = {}
+
+    @classmethod
+    def for_request(cls, request, user=None):
+        """Returnează resolver-ul memorat pe request (unul per utilizator)."""
+        user = user or request.user
+        cache = getattr(request, '_schedule_resolvers', None)
+        if cache is None:
+            cache = {}
+            request._schedule_resolvers = cache
+        resolver = cache.get(user.pk)
+        if resolver is None:
+            resolver = cls(user)
+            cache[user.pk] = resolver
+        return resolver
+
+    @property
+    def profile(self):
+        if not self._profile_loaded:
+            try:
+                self._profile = self.user.student_profile
+            except Exception:
+                self._profile = None
+            self._profile_loaded = True
+        return self._profile
+
+    @property
+    def is_linked(self):
+        profile = self.profile
+        return bool(profile and profile.orar_legat and profile.class_room_id)
+
+    def weekly_entries(self):
+        """Toate orele din săptămână, ordonate după (zi, oră)."""
+        if self._weekly is None:
+            if self.is_linked:
+                self._weekly = self._linked_entries()
+            else:
+                self._weekly = list(
+                    ScheduleEntry.objects.filter(user=self.user)
+                    .select_related('subject')
+                    .order_by('zi_saptamana', 'numar_ora')
+                )
+        return self._weekly
+
+    def prime(self, entries):
+        """Folosește orele săptămânale deja încărcate (ex: din cache-ul grilei)."""
+        self._weekly = list(entries)
+
+    def entries_for_day(self, zi_saptamana):
+        return [e for e in self.weekly_entries() if e.zi_saptamana == zi_saptamana]
+
+    def entries_by_day(self):
+        """Dicționar {zi: [ore]} pentru zilele 1-5."""
+        by_day = {day_num: [] for day_num in range(1, 6)}
+        for entry in self.weekly_entries():
+            by_day.setdefault(entry.zi_saptamana, []).append(entry)
+        return by_day
+
+    def subject_ids(self):
+        return {e.subject_id for e in self.weekly_entries()}
+
+    def changes_between(self, start, end):
+        """Indexul modificărilor care se suprapun cu intervalul [start, end]."""
+        if self._changes is None or not (self._changes_range[0] <= start and end <= self._changes_range[1]):
+            changes = list(
+                ScheduleChange.objects.filter(
+                    Q(data_end__isnull=True) | Q(data_end__gte=start),
+                    user=self.user,
+                    data_start__lte=end,
+                ).select_related('schedule_entry__subject', 'subject_nou')
+            )
+            class_changes = self._load_class_changes(start, end)
+            self._changes = ChangeIndex(changes, key=lambda c: c.schedule_entry_id)
+            self._class_changes = ChangeIndex(class_changes, key=lambda c: c.class_entry_id)
+            # Copiile personale (modul clasic) nu au legătură cu ora clasei: se potrivesc după slot și materie
+            self._class_slots = {
+                (c.class_entry.zi_saptamana, c.class_entry.numar_ora, c.class_entry.subject_name): c.class_entry_id
+                for c in class_changes
+            }
+            self._changes_list = sorted(changes + class_changes, key=lambda c: (c.data_start, c.created_at))
+            self._changes_range = (start, end)
+        return self._changes
+
+    def _load_class_changes(self, start, end):
+        profile = self.profile
+        if not (profile and profile.class_room_id):
+            return []
+        changes = class_changes_between(profile.class_room_id, start, end)
+        names = {c.subject_nou_nume for c in changes if c.tip_schimbare == 'inlocuita' and c.subject_nou_nume}
+        if names:
+            # Materiile se creează la scriere (signals.py); fără materie, ora își păstrează materia inițială
+            subjects = {s.nume: s for s in Subject.objects.filter(user=self.user, nume__in=names)}
+            for change in changes:
+                subject = subjects.get(change.subject_nou_nume)
+                if change.tip_schimbare == 'inlocuita' and subject is not None:
+                    change.subject_nou = subject
+                    change.subject_nou_id = subject.id
+        return changes
+
+    def _class_change(self, entry, day):
+        """Modificarea clasei activă în ziua dată pentru ora elevului (dacă ora vine din orarul clasei)."""
+        if not self._class_changes:
+            return None
+        class_entry_id = getattr(entry, 'class_entry_id', None)
+        if class_entry_id is None and getattr(entry, 'subject', None) is not None:
+            class_entry_id = self._class_slots.get((entry.zi_saptamana, entry.numar_ora, entry.subject.nume))
+        if class_entry_id is None:
+            return None
+        return self._class_changes.active(class_entry_id, day)
+
+    def active_changes(self, start, end):
+        """Lista modificărilor active în interval (pentru afișare)."""
+        self.changes_between(start, end)
+        return [
+            c for c in self._changes_list
+            if c.data_start <= end and (c.data_end is None or c.data_end >= start)
+        ]
+
+    def lessons_between(self, start, end, include_cancelled=True):
+        """
+        Orele concrete din intervalul [start, end], cu modificările aplicate.
+        Numărul de interogări nu depinde de lungimea intervalului.
+        """
+        key = (start, end)
+        if key not in self._lessons:
+            by_day = self.entries_by_day()
+            index = self.changes_between(start, end)
+            lessons = []
+            day = start
+            while day <= end:
+                for entry in by_day.get(day.isoweekday(), ()):
+                    change = index.active(entry.id, day) if (index and entry.id) else None
+                    if change is None:
+                        # Modificarea personală are prioritate față de cea a clasei
+                        change = self._class_change(entry, day)
+                    lessons.append(Lesson(day, entry, change))
+                day += timedelta(days=1)
+            self._lessons[key] = lessons
+        lessons = self._lessons[key]
+        if include_cancelled:
+            return lessons
+        return [lesson for lesson in lessons if not lesson.anulata]
+
+    def lessons_on(self, day, include_cancelled=True):
+        return self.lessons_between(day, day, include_cancelled=include_cancelled)
+
+    def _linked_entries(self):
+        class_entries = list(
+            ClassScheduleEntry.objects.filter(class_room_id=self.profile.class_room_id)
+            .order_by('zi_saptamana', 'numar_ora')
+        )
+        overrides = {
+            (o.zi_saptamana, o.numar_ora): o
+            for o in ScheduleOverride.objects.filter(user=self.user).select_related('subject')
+        }
+
+        names = {e.subject_name for e in class_entries}
+        # Materiile se creează la scriere (signals.py, importul); orele fără materie se omit
+        subjects = {s.nume: s for s in Subject.objects.filter(user=self.user, nume__in=names)}
+
+        result = []
+        for ce in class_entries:
+            override = overrides.pop((ce.zi_saptamana, ce.numar_ora), None)
+            if override is not None and override.tip == 'ascunsa':
+                continue
+            subject = subjects.get(ce.subject_name)
+            if subject is None:
+                continue
+            sala = ce.sala
+            if override is not None and override.tip == 'sala':
+                sala = override.sala
+            entry = EffectiveEntry(
+                subject=subject,
+                zi_saptamana=ce.zi_saptamana,
+                numar_ora=ce.numar_ora,
+                ora_inceput=ce.ora_inceput,
+                ora_sfarsit=ce.ora_sfarsit,
+                sala=sala,
+                note=ce.note,
+                tip_ora=ce.tip_ora,
+                class_entry_id=ce.id,
+                override_id=override.id if override is not None else None,
+            )
+            if override is not None and override.tip == 'extra' and override.subject_id:
+                # Ora opțională înlocuiește slotul clasei doar pentru acest elev
+                entry = self._extra_entry(override, fallback=ce)
+            result.append(entry)
+
+        # Ore suplimentare în sloturi libere din orarul clasei
+        for override in overrides.values():
+            if override.tip == 'extra' and override.subject_id:
+                result.append(self._extra_entry(override))
+
+        result.sort(key=lambda e: (e.zi_saptamana, e.numar_ora))
+        return result
+
+    def _extra_entry(self, override, fallback=None):
+        return EffectiveEntry(
+            subject=override.subject,
+            zi_saptamana=override.zi_saptamana,
+            numar_ora=override.numar_ora,
+            ora_inceput=override.ora_inceput or (fallback.ora_inceput if fallback else self._slot_time(override.numar_ora)[0]),
+            ora_sfarsit=override.ora_sfarsit or (fallback.ora_sfarsit if fallback else self._slot_time(override.numar_ora)[1]),
+            sala=override.sala,
+            note=override.note,
+            tip_ora=override.tip_ora,
+            override_id=override.id,
+        )
+
+    def _slot_time(self, numar_ora):
+        """Intervalul orar al slotului calculat din parametrii profilului."""
+        from datetime import date, time, timedelta
+        profile = self.profile
+        base = getattr(profile, 'ore_start', None) or time(8, 0)
+        durata = getattr(profile, 'durata_ora', None) or 50
+        pauza = getattr(profile, 'durata_pauza', None) or 10
+        offset = max(0, int(numar_ora) - 1) * (durata + pauza)
+        start_dt = datetime.combine(date.today(), base) + timedelta(minutes=offset)
+        end_dt = start_dt + timedelta(minutes=durata)
+        return start_dt.time(), end_dt.time()
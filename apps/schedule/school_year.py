@@ -0,0 +1,98 @@
+"""
+Structura anului școlar (module și vacanțe), ajustată după județ.
+
+Vacanța mobilă din februarie diferă pe grupe de județe, deci și sfârșitul
+modulului 3 / începutul modulului 4. Datele sunt folosite de dashboard
+(progres modul, următoarea vacanță) și de feed-ul ICS (RRULE + EXDATE).
+"""
+from datetime import date, timedelta
+
+
+# Grupe de județe pentru vacanța mobilă din februarie 2026
+GRUPA_FEB_1 = {'Cluj', 'Timiș', 'Bistrița-Năsăud'}  # 9-15 feb
+GRUPA_FEB_2 = {
+    'București', 'Ilfov', 'Sălaj', 'Bihor', 'Arad', 'Iași', 'Hunedoara', 'Brașov',
+    'Caraș-Severin', 'Gorj', 'Vâlcea', 'Argeș', 'Dâmbovița', 'Prahova', 'Buzău',
+    'Tulcea', 'Mehedinți', 'Dolj', 'Olt', 'Teleorman', 'Ialomița', 'Călărași'
+}  # 16-22 feb
+GRUPA_FEB_3 = {
+    'Satu-Mare', 'Maramureș', 'Suceava', 'Botoșani', 'Alba', 'Sibiu', 'Mureș',
+    'Harghita', 'Neamț', 'Covasna', 'Bacău', 'Vrancea', 'Vaslui', 'Galați',
+    'Brăila', 'Giurgiu', 'Constanța'
+}  # 23 feb - 1 mar
+
+
+def feb_group(judet=None):
+    """Grupa ('1', '2', '3') vacanței din februarie; județele necunoscute urmează grupa 2."""
+    if judet in GRUPA_FEB_1:
+        return '1'
+    if judet in GRUPA_FEB_3:
+        return '3'
+    return '2'
+
+
+def school_modules(judet=None):
+    """Lista (număr, început, sfârșit) a modulelor 2025-2026 pentru județul dat."""
+    end_m3 = date(2026, 2, 13)
+    start_m4 = date(2026, 2, 23)
+    if judet in GRUPA_FEB_1:
+        end_m3 = date(2026, 2, 6)
+        start_m4 = date(2026, 2, 16)
+    elif judet in GRUPA_FEB_3:
+        end_m3 = date(2026, 2, 20)
+        start_m4 = date(2026, 3, 2)
+
+    return [
+        (1, date(2025, 9, 8),  date(2025, 10, 24)),
+        (2, date(2025, 11, 3), date(2025, 12, 19)),
+        (3, date(2026, 1, 8),  end_m3),
+        (4, start_m4,          date(2026, 4, 3)),
+        (5, date(2026, 4, 15), date(2026, 6, 19)),
+    ]
+
+
+def school_vacations(judet=None):
+    """Lista (nume, început, sfârșit) a vacanțelor 2025-2026 pentru județul dat."""
+    if judet in GRUPA_FEB_1:
+        vac_feb = (date(2026, 2, 9), date(2026, 2, 15))
+    elif judet in GRUPA_FEB_3:
+        vac_feb = (date(2026, 2, 23), date(2026, 3, 1))
+    else:
+        vac_feb = (date(2026, 2, 16), date(2026, 2, 22))
+
+    return [
+        ('Vacanța de toamnă', date(2025, 10, 25), date(2025, 11, 2)),
+        ('Vacanța de iarnă', date(2025, 12, 20), date(2026, 1, 7)),
+        ('Vacanța mobilă din februarie', vac_feb[0], vac_feb[1]),
+        ('Vacanța de primăvară', date(2026, 4, 4), date(2026, 4, 14)),
+        ('Vacanța de vară', date(2026, 6, 20), date(2026, 9, 6)),
+    ]
+
+
+def school_year_bounds(judet=None):
+    """Prima și ultima zi de curs din anul școlar."""
+    modules = school_modules(judet)
+    return modules[0][1], modules[-1][2]
+
+
+def is_school_day(day, judet=None, modules=None):
+    """True dacă ziua este zi lucrătoare în interiorul unui modul."""
+    if day.isoweekday() > 5:
+        return False
+    for _, start, end in (modules or school_modules(judet)):
+        if start <= day <= end:
+            return True
+    return False
+
+
+def days_off(judet=None):
+    """Zilele lucrătoare din anul școlar care nu sunt zile de curs (vacanțe, pauze între module)."""
+    modules = school_modules(judet)
+    start, end = modules[0][1], modules[-1][2]
+    result = []
+    day = start
+    while day <= end:
+        if day.isoweekday() <= 5 and not is_school_day(day, modules=modules):
+            result.append(day)
+        day += timedelta(days=1)
+    return result
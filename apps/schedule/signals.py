@@ -1,23 +1,61 @@
+import threading
+from contextlib import contextmanager
+
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
-from .models import ClassScheduleEntry, ScheduleEntry, ClassRoom, apply_class_schedule_to_user
+from .models import (
+    ClassScheduleEntry, ScheduleEntry, ScheduleOverride, ScheduleChange, ClassScheduleChange, ClassRoom,
+    CHANGE_SUBJECT_COLOR, apply_class_schedule_to_user, link_class_subjects,
+)
+from . import occupancy, versions
 from apps.core.models import StudentProfile
+from apps.core.tracking import when_changed
 from apps.subjects.models import Subject
 
 
+_propagation = threading.local()
+
+
+@contextmanager
+def class_propagation_suspended():
+    """
+    Dezactivează replicarea per oră a orarului de clasă către elevi, pentru
+    operațiile în masă care sincronizează singure orarele elevilor (ex: importul).
+    """
+    previous = getattr(_propagation, 'suspended', False)
+    _propagation.suspended = True
+    try:
+        yield
+    finally:
+        _propagation.suspended = previous
+
+
+def _propagation_suspended():
+    return getattr(_propagation, 'suspended', False)
+
+
 @receiver(post_save, sender=ClassScheduleEntry)
 def propagate_class_schedule_entry_to_users(sender, instance: ClassScheduleEntry, created, **kwargs):
     """Replica automat intrarea de orar a clasei la toți utilizatorii din acea clasă.
     Creează/actualizează intrarea per utilizator folosind cheia (user, zi_saptamana, numar_ora).
     """
+    if _propagation_suspended():
+        return
     try:
-        profiles = instance.class_room.students.select_related('user').all()
+        profiles = list(instance.class_room.students.select_related('user').all())
     except Exception:
         profiles = []
 
+    # Elevii în modul „legat” citesc direct din orarul clasei: le trebuie doar materia
+    linked_users = [p.user for p in profiles if p.orar_legat]
+    if linked_users:
+        link_class_subjects(instance.class_room, linked_users, [(instance.subject_name, instance.subject_color)])
+
     for profile in profiles:
+        if profile.orar_legat:
+            continue
         # Mapare/creare materie pentru utilizator după nume și culoare din clasa globală
         subject, _ = Subject.objects.get_or_create(
             user=profile.user,
@@ -41,10 +79,21 @@ def propagate_class_schedule_entry_to_users(sender, instance: ClassScheduleEntry
         )
 
 
+@receiver(post_save, sender=ClassScheduleChange)
+def link_class_change_subject(sender, instance: ClassScheduleChange, **kwargs):
+    """Materia nouă a unei ore înlocuite se creează pentru toți elevii clasei (legat sau copie)."""
+    if instance.tip_schimbare != 'inlocuita' or not instance.subject_nou_nume:
+        return
+    users = User.objects.filter(student_profile__class_room_id=instance.class_room_id)
+    link_class_subjects(instance.class_room, users, [(instance.subject_nou_nume, CHANGE_SUBJECT_COLOR)])
+
+
 @receiver(post_delete, sender=ClassScheduleEntry)
 def remove_class_schedule_entry_from_users(sender, instance: ClassScheduleEntry, **kwargs):
     """Șterge din orarul utilizatorilor intrarea corespunzătoare când se șterge din orarul clasei."""
-    users = User.objects.filter(student_profile__class_room=instance.class_room)
+    if _propagation_suspended():
+        return
+    users = User.objects.filter(student_profile__class_room=instance.class_room, student_profile__orar_legat=False)
     ScheduleEntry.objects.filter(
         user__in=users,
         zi_saptamana=instance.zi_saptamana,
@@ -52,18 +101,26 @@ def remove_class_schedule_entry_from_users(sender, instance: ClassScheduleEntry,
     ).delete()
 
 
+# Câmpurile din profil care influențează orarul efectiv
+PROFILE_SCHEDULE_FIELDS = ('class_room_id', 'orar_legat', 'ore_start', 'durata_ora', 'durata_pauza', 'nr_ore_pe_zi')
+
+
 @receiver(pre_save, sender=StudentProfile)
+@when_changed(*PROFILE_SCHEDULE_FIELDS)
 def _track_old_class_room(sender, instance: StudentProfile, **kwargs):
-    """Reține class_room vechi pentru a detecta schimbarea în post_save."""
-    if instance.pk:
-        try:
-            old = StudentProfile.objects.get(pk=instance.pk)
-            instance._old_class_room_id = old.class_room_id
-        except StudentProfile.DoesNotExist:
-            instance._old_class_room_id = None
+    """Reține valorile vechi (din copia de la încărcare) pentru a detecta schimbarea în post_save."""
+    old = instance.saved_values(*PROFILE_SCHEDULE_FIELDS)
+    instance._old_schedule_fields = old
+    if old is None:
+        instance._old_class_room_id = None
+        instance._old_orar_legat = instance.orar_legat
+    else:
+        instance._old_class_room_id = old['class_room_id']
+        instance._old_orar_legat = old['orar_legat']
 
 
 @receiver(post_save, sender=StudentProfile)
+@when_changed('class_room_id', 'orar_legat')
 def handle_student_class_room_change(sender, instance: StudentProfile, created, **kwargs):
     """Când elevul primește/își schimbă clasa:
     - La creare: dacă are clasă setată, copiază orarul clasei dacă nu există deja intrări.
@@ -78,12 +135,65 @@ def handle_student_class_room_change(sender, instance: StudentProfile, created,
         return
 
     old_class_room_id = getattr(instance, '_old_class_room_id', None)
-    if old_class_room_id != instance.class_room_id:
-        # Curăță orarul existent
+    old_orar_legat = getattr(instance, '_old_orar_legat', instance.orar_legat)
+    if old_class_room_id != instance.class_room_id or old_orar_legat != instance.orar_legat:
+        # Curăță orarul existent (copia personală și abaterile față de vechea clasă)
         ScheduleEntry.objects.filter(user=instance.user).delete()
+        ScheduleOverride.objects.filter(user=instance.user).delete()
         # Aplică orarul noii clase, dacă e setată
         if instance.class_room_id:
             try:
                 apply_class_schedule_to_user(instance.class_room, instance.user)
             except Exception:
                 pass
+
+
+# --- Versiunea orarului (invalidează cache-ul exporturilor) ---
+
+@receiver([post_save, post_delete], sender=ScheduleEntry)
+@receiver([post_save, post_delete], sender=ScheduleChange)
+@receiver([post_save, post_delete], sender=ScheduleOverride)
+def bump_user_schedule_version(sender, instance, **kwargs):
+    versions.bump_user(instance.user_id)
+
+
+@receiver(post_save, sender=Subject)
+def bump_schedule_version_on_subject_change(sender, instance: Subject, created, **kwargs):
+    """Numele/culoarea materiei apar în exporturi."""
+    if not created:
+        versions.bump_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=ClassScheduleEntry)
+def bump_class_schedule_version(sender, instance: ClassScheduleEntry, **kwargs):
+    versions.bump_class(instance.class_room_id)
+
+
+@receiver([post_save, post_delete], sender=ClassScheduleChange)
+def bump_class_version_on_class_change(sender, instance: ClassScheduleChange, **kwargs):
+    """Modificările clasei apar în orarul efectiv al tuturor elevilor (versiunea lor include clasa)."""
+    versions.bump_class(instance.class_room_id)
+
+
+@receiver(post_save, sender=ClassScheduleEntry)
+def index_class_schedule_entry(sender, instance: ClassScheduleEntry, **kwargs):
+    """Ține la zi indexul de ocupare săli/profesori (ștergerea se face prin CASCADE)."""
+    occupancy.sync_entry(instance)
+
+
+@receiver(post_save, sender=ClassRoom)
+def bump_class_version_on_classroom_change(sender, instance: ClassRoom, created, **kwargs):
+    """Județul clasei determină vacanța din februarie (EXDATE în feed)."""
+    if not created:
+        versions.bump_class(instance.pk)
+
+
+@receiver(post_save, sender=StudentProfile)
+@when_changed(*PROFILE_SCHEDULE_FIELDS)
+def bump_user_version_on_profile_change(sender, instance: StudentProfile, created, **kwargs):
+    """Clasa, modul „legat” și parametrii orelor schimbă orarul efectiv."""
+    if created:
+        return
+    old = getattr(instance, '_old_schedule_fields', None)
+    if old is None or any(old[f] != getattr(instance, f) for f in PROFILE_SCHEDULE_FIELDS):
+        versions.bump_user(instance.user_id)
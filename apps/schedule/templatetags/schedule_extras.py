@@ -62,27 +62,6 @@ def add_minutes(value, minutes):
     return time_cls(new_dt.hour, new_dt.minute)
 
 
-@register.filter
-def get_hours(entries):
-    """
-    Returnează lista numerelor de oră (numar_ora) dintr-o listă/queryset de intrări de orar.
-    Permite în template: {% if hour not in day_data.entries|get_hours %}
-    """
-    try:
-        return [getattr(e, 'numar_ora', None) for e in entries]
-    except Exception:
-        return []
-
-
-@register.filter
-def get_item(mapping, key):
-    """Accesează mapping[key] în template-urile Django (fallback la listă goală)."""
-    try:
-        return mapping.get(key, [])
-    except Exception:
-        return []
-
-
 @register.filter
 def index(sequence, position):
     """Returnează elementul de pe poziția dată dintr-o listă/tuplu."""
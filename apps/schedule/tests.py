@@ -1 +1,221 @@
- 
+import random
+import tempfile
+from datetime import date, time, timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.subjects.models import Subject
+from . import batch_export, exports, importer, timetable
+from .models import ClassRoom, ClassScheduleChange, ClassScheduleEntry, ScheduleEntry
+from .resolver import ScheduleResolver
+
+
+def csv_file(text):
+    return SimpleUploadedFile('orar.csv', text.encode('utf-8'))
+
+
+def overlaps(a, b):
+    return a[1] == b[1] or (a[2] < b[3] and b[2] < a[3])
+
+
+class FindConflictsTests(SimpleTestCase):
+    """Parcurgerea sortată dă același rezultat ca verificarea tuturor perechilor."""
+
+    def random_slots(self, rnd, count):
+        slots = []
+        for ref in range(count):
+            start = rnd.randrange(8 * 60, 14 * 60, 10)
+            end = start + rnd.choice((30, 50, 60, 100))
+            slots.append((
+                rnd.randint(1, 3), rnd.randint(1, 8), time(start // 60, start % 60),
+                time(end // 60, end % 60), ref if rnd.random() < 0.8 else None, f'ora {ref}',
+            ))
+        return slots
+
+    def test_matches_pairwise_check(self):
+        rnd = random.Random(7)
+        for _ in range(200):
+            slots = self.random_slots(rnd, rnd.randint(1, 15))
+            conflicts = importer.find_conflicts(slots)
+            kept = [s for s in slots if s[4] not in conflicts]
+            for i, a in enumerate(kept):
+                for b in kept[i + 1:]:
+                    if a[0] == b[0] and (a[4] is not None or b[4] is not None):
+                        self.assertFalse(overlaps(a, b), (a, b))
+            for s in slots:
+                if s[4] in conflicts:
+                    self.assertTrue(any(k[0] == s[0] and overlaps(k, s) for k in kept), s)
+
+    def test_existing_slots_are_never_reported(self):
+        existing = (1, 1, time(8), time(8, 50), None, 'existentă')
+        new = (1, 1, time(8), time(8, 50), 2, 'nouă')
+        self.assertEqual(importer.find_conflicts([new, existing]), {2: 'Ora 1 este deja ocupată de existentă'})
+
+
+class ScheduleImportTests(TestCase):
+
+    def setUp(self):
+        # Recitit din baza de date, ca request.user (profilul nou are ore_start ca text)
+        self.user = User.objects.get(pk=User.objects.create_user('admin', password='x', is_superuser=True).pk)
+        self.subject = Subject.objects.create(user=self.user, nume='Matematică')
+        ScheduleEntry.objects.create(
+            user=self.user, subject=self.subject, zi_saptamana=1, numar_ora=1,
+            ora_inceput=time(8), ora_sfarsit=time(8, 50),
+        )
+
+    def test_all_rows_invalid_keeps_existing_schedule(self):
+        result = importer.import_user_schedule(self.user, csv_file('Materie,Zi,Ora\nMatematică,Sâmbătă,1\n,Luni,2\n'))
+        self.assertEqual(result.created, 0)
+        self.assertFalse(result.ok)
+        self.assertEqual(ScheduleEntry.objects.filter(user=self.user).count(), 1)
+
+    def test_errors_abort_a_replacing_import(self):
+        result = importer.import_user_schedule(self.user, csv_file('Materie,Zi,Ora\nMatematică,Marți,2\nMatematică,Sâmbătă,1\n'))
+        self.assertEqual(result.created, 0)
+        self.assertEqual(
+            list(ScheduleEntry.objects.filter(user=self.user).values_list('zi_saptamana', 'numar_ora')), [(1, 1)],
+        )
+
+    def test_errors_without_clearing_import_valid_rows(self):
+        result = importer.import_user_schedule(
+            self.user, csv_file('Materie,Zi,Ora\nMatematică,Marți,2\nMatematică,Luni,1\n'), clear_existing=False,
+        )
+        self.assertEqual((result.created, [row for row, _ in result.errors]), (1, [3]))
+        self.assertEqual(ScheduleEntry.objects.filter(user=self.user).count(), 2)
+
+    def test_valid_file_replaces_schedule(self):
+        result = importer.import_user_schedule(self.user, csv_file('Materie,Zi,Ora\nMatematică,Marți,2\n'))
+        self.assertTrue(result.ok)
+        self.assertEqual(
+            list(ScheduleEntry.objects.filter(user=self.user).values_list('zi_saptamana', 'numar_ora')), [(2, 2)],
+        )
+
+    def test_windows_1250_file_is_decoded(self):
+        uploaded = SimpleUploadedFile('orar.csv', 'Materie,Zi,Ora\nMatematică,Marţi,2\n'.encode('cp1250'))
+        result = importer.import_user_schedule(self.user, uploaded)
+        self.assertTrue(result.ok)
+        self.assertEqual(
+            list(ScheduleEntry.objects.filter(user=self.user).values_list('subject__nume', 'zi_saptamana')),
+            [('Matematică', 2)],
+        )
+
+    def test_undecodable_file_is_reported(self):
+        uploaded = SimpleUploadedFile('orar.csv', b'Materie,Zi,Ora\n\x81\x98,Luni,2\n')
+        with self.assertRaises(importer.FileEncodingError):
+            importer.import_user_schedule(self.user, uploaded)
+        self.assertEqual(ScheduleEntry.objects.filter(user=self.user).count(), 1)
+
+    def test_class_import_with_conflicts_keeps_class_schedule(self):
+        class_room = ClassRoom.objects.create(nume='9A')
+        ClassScheduleEntry.objects.create(
+            class_room=class_room, zi_saptamana=1, numar_ora=1, ora_inceput=time(8), ora_sfarsit=time(8, 50),
+            subject_name='Fizică',
+        )
+        result = importer.import_class_schedules(
+            csv_file('Clasa,Materie,Zi,Ora\n9A,Chimie,Luni,1\n9A,Biologie,Luni,1\n'),
+        )
+        self.assertEqual(result.created, 0)
+        self.assertEqual(list(class_room.schedule_entries.values_list('subject_name', flat=True)), ['Fizică'])
+
+
+class SolverTests(SimpleTestCase):
+
+    def test_small_school_is_solved_without_double_bookings(self):
+        problem = timetable.synthetic_problem(n_classes=4, seed=1)
+        solution = timetable.solve(problem, time_budget=5.0, seed=1)
+        self.assertTrue(solution.complete)
+        self.assertEqual(solution.double_bookings(), 0)
+        hours = sum(r.hours for r in problem.requirements)
+        self.assertEqual(len(solution.placements), hours)
+
+    def test_blocked_slots_are_respected(self):
+        requirements = [timetable.Requirement('5A', 'Matematică', 4, teacher='Prof. A')]
+        blocked = [(1, 1), (1, 2), (2, 1)]
+        problem = timetable.Problem(requirements, hours_per_day=3, blocked_teachers={'Prof. A': blocked})
+        solution = timetable.solve(problem, time_budget=2.0, seed=0)
+        self.assertTrue(solution.complete)
+        self.assertFalse({(p.day, p.hour) for p in solution.placements} & set(blocked))
+
+
+class ExportCacheTests(SimpleTestCase):
+
+    def test_prune_keeps_the_other_variant_of_the_week(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        names = ['20261012-aaaa.pdf', '20261012-m-bbbb.pdf', '20261019-cccc.pdf', '20261019-m-dddd.pdf',
+                 '20261019-m-eeee.pdf']
+        for name in names:
+            Path(directory.name, 'user-1-pdf-' + name).write_bytes(b'-')
+        Path(directory.name, 'user-10-pdf-20261012-aaaa.pdf').write_bytes(b'-')
+        with override_settings(SCHEDULE_EXPORT_CACHE_DIR=directory.name):
+            exports.prune('user-1-pdf-', keep='user-1-pdf-20261019-m-eeee.pdf')
+        self.assertEqual(
+            sorted(path.name for path in Path(directory.name).iterdir()),
+            ['user-1-pdf-20261019-cccc.pdf', 'user-1-pdf-20261019-m-eeee.pdf', 'user-10-pdf-20261012-aaaa.pdf'],
+        )
+
+
+class BatchExportNameTests(TestCase):
+
+    def test_class_files_are_unique_after_sanitizing(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        first, second = ClassRoom.objects.create(nume='9 A'), ClassRoom.objects.create(nume='9_A')
+        with override_settings(SCHEDULE_EXPORT_CACHE_DIR=directory.name):
+            names = [job.filename for job in batch_export.class_jobs([first, second], 'pdf')]
+        self.assertEqual(names, ['9_A.pdf', f'9_A-{second.pk}.pdf'])
+
+
+class ClassChangeSubjectTests(TestCase):
+    """Materiile orelor înlocuite se creează la scriere; rezolvarea orarului doar citește."""
+
+    def setUp(self):
+        self.class_room = ClassRoom.objects.create(nume='9A')
+        self.entry = ClassScheduleEntry.objects.create(
+            class_room=self.class_room, zi_saptamana=1, numar_ora=1, ora_inceput=time(8), ora_sfarsit=time(8, 50),
+            subject_name='Fizică',
+        )
+        self.students = []
+        for username, linked in (('legat', True), ('copie', False)):
+            user = User.objects.create_user(username, password='x')
+            profile = user.student_profile
+            profile.class_room = self.class_room
+            profile.orar_legat = linked
+            profile.save()
+            self.students.append(User.objects.get(pk=user.pk))
+
+    def replace(self, name):
+        monday = date.today() - timedelta(days=date.today().weekday())
+        ClassScheduleChange.objects.create(
+            class_room=self.class_room, class_entry=self.entry, tip_schimbare='inlocuita',
+            data_start=monday, subject_nou_nume=name,
+        )
+        return monday
+
+    def test_replacement_subject_is_created_on_write(self):
+        monday = self.replace('Chimie')
+        for user in self.students:
+            self.assertTrue(Subject.objects.filter(user=user, nume='Chimie').exists())
+            lesson, = ScheduleResolver(user).lessons_on(monday)
+            self.assertEqual(lesson.subject.nume, 'Chimie')
+
+    def test_resolver_does_not_create_missing_subjects(self):
+        monday = self.replace('Chimie')
+        Subject.objects.filter(nume__in=['Fizică', 'Chimie'], user=self.students[0]).delete()
+        Subject.objects.filter(nume='Chimie', user=self.students[1]).delete()
+        count = Subject.objects.count()
+        self.assertEqual(ScheduleResolver(self.students[0]).lessons_on(monday), [])
+        lesson, = ScheduleResolver(self.students[1]).lessons_on(monday)
+        self.assertEqual(lesson.subject.nume, 'Fizică')
+        self.assertEqual(Subject.objects.count(), count)
+
+    def test_new_student_gets_current_replacement_subjects(self):
+        self.replace('Chimie')
+        user = User.objects.create_user('nou', password='x')
+        profile = user.student_profile
+        profile.class_room = self.class_room
+        profile.save()
+        self.assertTrue(Subject.objects.filter(user=user, nume='Chimie').exists())
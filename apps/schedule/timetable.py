@@ -0,0 +1,598 @@
+"""
+Generator automat de orare pentru clase (pur Python, fără dependențe externe).
+
+Intrarea descrie, pentru fiecare clasă, materiile cu numărul de ore pe săptămână
+și profesorul, plus sălile (cu capacitate) și sloturile blocate pentru clase,
+profesori sau săli. Rezolvarea are două etape, ambele limitate de bugetul de timp:
+
+1. Construcție: fiecare oră este plasată în slotul cel mai ieftin; dacă nu există
+   un slot liber, se alege cel cu cele mai puține conflicte, iar orele care intră
+   în conflict sunt scoase și replanificate (căutare înainte iterată).
+2. Îmbunătățire: căutare locală (mutări și interschimbări de ore) care păstrează
+   constrângerile tari și scade penalizarea: ferestre în orarul clasei/profesorului,
+   început târziu, aceeași materie de prea multe ori pe zi, materii grele în aceeași zi.
+
+Rezultatul se salvează prin `save_solution`, care scrie ClassScheduleEntry în masă
+(vezi importer.write_class_entries).
+"""
+import math
+import random
+import time as time_mod
+from collections import Counter, deque
+
+
+DEFAULT_COLOR = '#007bff'
+
+# Ponderi pentru penalizare (cu cât mai mic scorul, cu atât mai bun orarul)
+W_CLASS_GAP = 10
+W_LATE_START = 2
+W_REPEAT = 8
+W_HEAVY = 3
+W_TEACHER_GAP = 1
+
+
+class Requirement:
+    """O materie a unei clase: numărul de ore pe săptămână, profesorul și sălile permise."""
+
+    def __init__(self, class_name, subject, hours, teacher='', heavy=False, rooms=None, color=DEFAULT_COLOR):
+        self.class_name = class_name
+        self.subject = subject
+        self.hours = int(hours)
+        self.teacher = teacher or ''
+        self.heavy = bool(heavy)
+        self.rooms = list(rooms) if rooms else None
+        self.color = color or DEFAULT_COLOR
+
+    def __repr__(self):
+        return f"<Requirement {self.class_name} {self.subject} x{self.hours}>"
+
+
+class Problem:
+    """
+    Datele de intrare ale generatorului.
+
+    `rooms`: {nume sală: capacitate}; dacă lipsește, sălile nu sunt alocate.
+    `class_sizes`: {clasă: număr elevi}, folosit pentru capacitatea sălilor.
+    `blocked_*`: {nume: [(zi, oră), ...]} cu zi 1-5 și oră 1..hours_per_day.
+    """
+
+    def __init__(self, requirements, *, days=5, hours_per_day=7, rooms=None, class_sizes=None,
+                 blocked_classes=None, blocked_teachers=None, blocked_rooms=None):
+        self.requirements = list(requirements)
+        self.days = days
+        self.hours_per_day = hours_per_day
+        self.rooms = dict(rooms or {})
+        self.class_sizes = dict(class_sizes or {})
+        self.blocked_classes = blocked_classes or {}
+        self.blocked_teachers = blocked_teachers or {}
+        self.blocked_rooms = blocked_rooms or {}
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Construiește problema dintr-un dicționar (ex: JSON):
+        {"hours_per_day": 7,
+         "rooms": [{"name": "A1", "capacity": 30}],
+         "teachers": {"Popescu": {"blocked": [[1, 1]]}},
+         "classes": [{"name": "5A", "size": 28, "blocked": [[5, 7]],
+                      "subjects": [{"name": "Matematică", "hours": 4, "teacher": "Popescu",
+                                    "heavy": true, "rooms": ["A1"], "color": "#ff0000"}]}]}
+        """
+        requirements = []
+        class_sizes = {}
+        blocked_classes = {}
+        for klass in spec.get('classes', []):
+            name = klass['name']
+            if klass.get('size'):
+                class_sizes[name] = int(klass['size'])
+            if klass.get('blocked'):
+                blocked_classes[name] = [tuple(slot) for slot in klass['blocked']]
+            for subject in klass.get('subjects', []):
+                requirements.append(Requirement(
+                    name, subject['name'], subject.get('hours', 1),
+                    teacher=subject.get('teacher', ''),
+                    heavy=subject.get('heavy', False),
+                    rooms=subject.get('rooms'),
+                    color=subject.get('color'),
+                ))
+        rooms = {}
+        blocked_rooms = {}
+        for room in spec.get('rooms', []):
+            rooms[room['name']] = int(room.get('capacity') or 0)
+            if room.get('blocked'):
+                blocked_rooms[room['name']] = [tuple(slot) for slot in room['blocked']]
+        blocked_teachers = {
+            name: [tuple(slot) for slot in data.get('blocked', [])]
+            for name, data in (spec.get('teachers') or {}).items()
+        }
+        return cls(
+            requirements,
+            days=int(spec.get('days', 5)),
+            hours_per_day=int(spec.get('hours_per_day', 7)),
+            rooms=rooms,
+            class_sizes=class_sizes,
+            blocked_classes=blocked_classes,
+            blocked_teachers=blocked_teachers,
+            blocked_rooms=blocked_rooms,
+        )
+
+
+class Placement:
+    def __init__(self, requirement, day, hour, room=''):
+        self.requirement = requirement
+        self.day = day
+        self.hour = hour
+        self.room = room
+
+    def __repr__(self):
+        return f"<Placement {self.requirement.class_name} {self.requirement.subject} z{self.day} o{self.hour} {self.room}>"
+
+
+class Solution:
+    def __init__(self, placements, unplaced, penalty, elapsed, iterations):
+        self.placements = placements
+        self.unplaced = unplaced  # lista de Requirement (câte una per oră neplasată)
+        self.penalty = penalty
+        self.elapsed = elapsed
+        self.iterations = iterations
+
+    @property
+    def complete(self):
+        return not self.unplaced
+
+    def double_bookings(self):
+        """Numărul de suprapuneri (clasă, profesor sau sală în același slot); 0 pentru o soluție validă."""
+        seen = Counter()
+        for p in self.placements:
+            r = p.requirement
+            seen[('c', r.class_name, p.day, p.hour)] += 1
+            if r.teacher:
+                seen[('t', r.teacher, p.day, p.hour)] += 1
+            if p.room:
+                seen[('r', p.room, p.day, p.hour)] += 1
+        return sum(n - 1 for n in seen.values() if n > 1)
+
+
+class Solver:
+    """Rezolvă o problemă în limita bugetului de timp (secunde); `seed` face rezultatul reproductibil."""
+
+    def __init__(self, problem, time_budget=10.0, seed=None, patience=20000):
+        self.problem = problem
+        self.time_budget = time_budget
+        self.patience = patience
+        self.random = random.Random(seed)
+        self._prepare()
+
+    # --- Pregătire: indici numerici pentru clase, profesori, săli, sloturi ---
+
+    def _prepare(self):
+        p = self.problem
+        self.H = p.hours_per_day
+        self.S = p.days * p.hours_per_day
+
+        def slot_index(day, hour):
+            return (int(day) - 1) * self.H + (int(hour) - 1)
+
+        classes = sorted({r.class_name for r in p.requirements})
+        teachers = sorted({r.teacher for r in p.requirements if r.teacher})
+        self.class_names = classes
+        self.teacher_names = teachers
+        self.room_names = sorted(p.rooms, key=lambda name: (p.rooms[name], name))
+        class_idx = {name: i for i, name in enumerate(classes)}
+        teacher_idx = {name: i for i, name in enumerate(teachers)}
+        room_idx = {name: i for i, name in enumerate(self.room_names)}
+
+        def blocked(mapping, index):
+            result = [set() for _ in index]
+            for name, slots in mapping.items():
+                if name in index:
+                    result[index[name]] = {slot_index(d, h) for d, h in slots}
+            return result
+
+        self.class_blocked = blocked(p.blocked_classes, class_idx)
+        self.teacher_blocked = blocked(p.blocked_teachers, teacher_idx)
+        self.room_blocked = blocked(p.blocked_rooms, room_idx)
+
+        # Unități: câte una pentru fiecare oră din cerințe
+        self.units = []
+        self.max_per_day = {}
+        for req in p.requirements:
+            c = class_idx[req.class_name]
+            t = teacher_idx.get(req.teacher, -1)
+            if self.room_names:
+                size = p.class_sizes.get(req.class_name, 0)
+                candidates = req.rooms if req.rooms else self.room_names
+                rooms = tuple(
+                    room_idx[name] for name in self.room_names
+                    if name in candidates and p.rooms[name] >= size
+                )
+            else:
+                rooms = None
+            key = (c, req.subject)
+            self.max_per_day[key] = max(1, math.ceil(req.hours / p.days))
+            for _ in range(req.hours):
+                self.units.append((req, c, t, rooms, req.heavy, key))
+
+        U = len(self.units)
+        self.slot_of = [-1] * U
+        self.room_of = [-1] * U
+        self.class_at = [[-1] * self.S for _ in classes]
+        self.teacher_at = [[-1] * self.S for _ in teachers]
+        self.room_at = [[-1] * self.S for _ in self.room_names]
+
+        teacher_load = Counter(u[2] for u in self.units)
+        self.order = sorted(
+            range(U),
+            key=lambda u: (
+                -teacher_load[self.units[u][2]] if self.units[u][2] >= 0 else 0,
+                len(self.units[u][3]) if self.units[u][3] is not None else 10 ** 6,
+                -self.units[u][0].hours,
+            ),
+        )
+
+    # --- Operații pe stare ---
+
+    def _assign(self, u, s, r):
+        _, c, t, _, _, _ = self.units[u]
+        self.slot_of[u] = s
+        self.room_of[u] = r
+        self.class_at[c][s] = u
+        if t >= 0:
+            self.teacher_at[t][s] = u
+        if r >= 0:
+            self.room_at[r][s] = u
+
+    def _unassign(self, u):
+        s = self.slot_of[u]
+        if s < 0:
+            return
+        _, c, t, _, _, _ = self.units[u]
+        r = self.room_of[u]
+        self.class_at[c][s] = -1
+        if t >= 0:
+            self.teacher_at[t][s] = -1
+        if r >= 0:
+            self.room_at[r][s] = -1
+        self.slot_of[u] = -1
+        self.room_of[u] = -1
+
+    def _free_room(self, rooms, s, ignore=()):
+        """Prima sală permisă, liberă și neblocată în slotul s (cele mai mici încap primele)."""
+        for r in rooms:
+            if s in self.room_blocked[r]:
+                continue
+            occupant = self.room_at[r][s]
+            if occupant < 0 or occupant in ignore:
+                return r
+        return -1
+
+    def _feasible(self, u, s, ignore=()):
+        """(ok, sală) pentru plasarea lui u în s, ignorând unitățile din `ignore`."""
+        _, c, t, rooms, _, _ = self.units[u]
+        if s in self.class_blocked[c]:
+            return False, -1
+        occupant = self.class_at[c][s]
+        if occupant >= 0 and occupant not in ignore:
+            return False, -1
+        if t >= 0:
+            if s in self.teacher_blocked[t]:
+                return False, -1
+            occupant = self.teacher_at[t][s]
+            if occupant >= 0 and occupant not in ignore:
+                return False, -1
+        if rooms is None:
+            return True, -1
+        r = self._free_room(rooms, s, ignore)
+        return r >= 0, r
+
+    # --- Penalizare ---
+
+    def _class_day_penalty(self, c, d):
+        row = self.class_at[c][d * self.H:(d + 1) * self.H]
+        hours = [h for h, u in enumerate(row) if u >= 0]
+        if not hours:
+            return 0
+        first, last = hours[0], hours[-1]
+        penalty = W_CLASS_GAP * (last - first + 1 - len(hours)) + W_LATE_START * first
+        subjects = Counter()
+        heavy = 0
+        for h in hours:
+            unit = self.units[row[h]]
+            subjects[unit[5]] += 1
+            if unit[4]:
+                heavy += 1
+        for key, count in subjects.items():
+            if count > self.max_per_day[key]:
+                penalty += W_REPEAT * (count - self.max_per_day[key])
+        penalty += W_HEAVY * heavy * (heavy - 1) // 2
+        return penalty
+
+    def _teacher_day_penalty(self, t, d):
+        row = self.teacher_at[t][d * self.H:(d + 1) * self.H]
+        hours = [h for h, u in enumerate(row) if u >= 0]
+        if not hours:
+            return 0
+        return W_TEACHER_GAP * (hours[-1] - hours[0] + 1 - len(hours))
+
+    def penalty(self):
+        days = self.problem.days
+        total = sum(self._class_day_penalty(c, d) for c in range(len(self.class_names)) for d in range(days))
+        total += sum(self._teacher_day_penalty(t, d) for t in range(len(self.teacher_names)) for d in range(days))
+        return total
+
+    def _local_penalty(self, keys):
+        total = 0
+        for kind, idx, d in keys:
+            total += self._class_day_penalty(idx, d) if kind == 'c' else self._teacher_day_penalty(idx, d)
+        return total
+
+    def _affected(self, units_slots):
+        keys = set()
+        for u, s in units_slots:
+            _, c, t, _, _, _ = self.units[u]
+            d = s // self.H
+            keys.add(('c', c, d))
+            if t >= 0:
+                keys.add(('t', t, d))
+        return keys
+
+    # --- Etapa 1: construcție cu eliminarea conflictelor ---
+
+    def _placement_cost(self, u, s):
+        """Cost estimativ (penalizare locală) pentru plasarea lui u în s."""
+        _, c, _, _, heavy, key = self.units[u]
+        d, h = divmod(s, self.H)
+        row = self.class_at[c][d * self.H:(d + 1) * self.H]
+        cost = W_LATE_START * h
+        same = 0
+        heavy_count = 0
+        adjacent = False
+        busy = False
+        for hh, other in enumerate(row):
+            if other < 0:
+                continue
+            busy = True
+            if abs(hh - h) == 1:
+                adjacent = True
+            unit = self.units[other]
+            if unit[5] == key:
+                same += 1
+            if unit[4]:
+                heavy_count += 1
+        if same >= self.max_per_day[key]:
+            cost += W_REPEAT * 2
+        if heavy:
+            cost += W_HEAVY * heavy_count
+        if busy and not adjacent:
+            cost += W_CLASS_GAP
+        return cost
+
+    def _construct(self, deadline):
+        queue = deque(self.order)
+        evictions = Counter()
+        iterations = 0
+        slots = list(range(self.S))
+        max_iterations = 50 * len(self.units) + 1000
+        while queue and iterations < max_iterations and time_mod.monotonic() < deadline:
+            iterations += 1
+            u = queue.popleft()
+            _, c, t, rooms, _, _ = self.units[u]
+            self.random.shuffle(slots)
+            best = None
+            for s in slots:
+                if s in self.class_blocked[c] or (t >= 0 and s in self.teacher_blocked[t]):
+                    continue
+                conflicts = set()
+                occupant = self.class_at[c][s]
+                if occupant >= 0:
+                    conflicts.add(occupant)
+                if t >= 0 and self.teacher_at[t][s] >= 0:
+                    conflicts.add(self.teacher_at[t][s])
+                r = -1
+                if rooms is not None:
+                    r = self._free_room(rooms, s, conflicts)
+                    if r < 0:
+                        # Nicio sală liberă: eliberează sala permisă cu ocupantul cel mai puțin „mutat”
+                        options = [
+                            rr for rr in rooms
+                            if s not in self.room_blocked[rr] and self.room_at[rr][s] >= 0
+                        ]
+                        if not options:
+                            continue
+                        r = min(options, key=lambda rr: evictions[self.room_at[rr][s]])
+                        conflicts.add(self.room_at[r][s])
+                cost = self._placement_cost(u, s) + sum(1000 + 200 * evictions[x] for x in conflicts)
+                if best is None or cost < best[0]:
+                    best = (cost, s, r, conflicts)
+                    if cost == 0:
+                        break
+            if best is None:
+                # Nu există niciun slot permis pentru această oră
+                continue
+            _, s, r, conflicts = best
+            for x in conflicts:
+                self._unassign(x)
+                evictions[x] += 1
+                queue.append(x)
+            self._assign(u, s, r)
+        return iterations
+
+    # --- Etapa 2: căutare locală ---
+
+    def _improve(self, deadline):
+        placed = [u for u in range(len(self.units)) if self.slot_of[u] >= 0]
+        if not placed:
+            return 0
+        iterations = 0
+        since_improvement = 0
+        current = self.penalty()
+        while time_mod.monotonic() < deadline and since_improvement < self.patience and current > 0:
+            iterations += 1
+            since_improvement += 1
+            u = self.random.choice(placed)
+            s_old, r_old = self.slot_of[u], self.room_of[u]
+            _, c, _, _, _, _ = self.units[u]
+            d_old = s_old // self.H
+            s_new = self.random.randrange(self.S)
+            if s_new == s_old:
+                continue
+            v = self.class_at[c][s_new]
+            if v < 0:
+                # Mutare simplă
+                ok, r_new = self._feasible(u, s_new)
+                if not ok:
+                    continue
+                keys = self._affected([(u, s_old), (u, s_new)])
+                before = self._local_penalty(keys)
+                self._unassign(u)
+                self._assign(u, s_new, r_new)
+                delta = self._local_penalty(keys) - before
+                if delta <= 0:
+                    current += delta
+                    if delta < 0:
+                        since_improvement = 0
+                else:
+                    self._unassign(u)
+                    self._assign(u, s_old, r_old)
+            else:
+                # Interschimbare cu ora clasei din slotul țintă
+                r_v = self.room_of[v]
+                keys = self._affected([(u, s_old), (u, s_new), (v, s_old), (v, s_new)])
+                before = self._local_penalty(keys)
+                self._unassign(u)
+                self._unassign(v)
+                ok_u, r_u = self._feasible(u, s_new)
+                if ok_u:
+                    self._assign(u, s_new, r_u)
+                    ok_v, r_v2 = self._feasible(v, s_old)
+                    if ok_v:
+                        self._assign(v, s_old, r_v2)
+                        delta = self._local_penalty(keys) - before
+                        if delta <= 0:
+                            current += delta
+                            if delta < 0:
+                                since_improvement = 0
+                            continue
+                        self._unassign(v)
+                    self._unassign(u)
+                self._assign(u, s_old, r_old)
+                self._assign(v, s_new, r_v)
+        return iterations
+
+    # --- Rezultat ---
+
+    def solve(self):
+        started = time_mod.monotonic()
+        deadline = started + self.time_budget
+        iterations = self._construct(deadline)
+        iterations += self._improve(deadline)
+
+        placements = []
+        unplaced = []
+        for u, unit in enumerate(self.units):
+            req = unit[0]
+            s = self.slot_of[u]
+            if s < 0:
+                unplaced.append(req)
+                continue
+            d, h = divmod(s, self.H)
+            room = self.room_names[self.room_of[u]] if self.room_of[u] >= 0 else ''
+            placements.append(Placement(req, d + 1, h + 1, room))
+        placements.sort(key=lambda p: (p.requirement.class_name, p.day, p.hour))
+        return Solution(placements, unplaced, self.penalty(), time_mod.monotonic() - started, iterations)
+
+
+def solve(problem, time_budget=10.0, seed=None):
+    return Solver(problem, time_budget=time_budget, seed=seed).solve()
+
+
+def save_solution(solution, create_classes=True, profile=None):
+    """
+    Scrie soluția în orarele claselor (înlocuiește orarul existent al claselor din soluție).
+    Orele de început/sfârșit se calculează din parametrii impliciți (sau ai profilului dat).
+    """
+    from .grid import slot_settings, slot_labels
+    from .importer import write_class_entries
+    from .models import ClassRoom, ClassScheduleEntry
+
+    names = sorted({p.requirement.class_name for p in solution.placements})
+    class_rooms = {c.nume: c for c in ClassRoom.objects.filter(nume__in=names)}
+    for name in names:
+        if name not in class_rooms and create_classes:
+            class_rooms[name] = ClassRoom.objects.create(nume=name)
+
+    max_hours, start_base, class_duration, break_duration = slot_settings(profile)
+    max_hour = max((p.hour for p in solution.placements), default=0)
+    labels = slot_labels(max(max_hours, max_hour), start_base, class_duration, break_duration)
+
+    entries = []
+    for p in solution.placements:
+        class_room = class_rooms.get(p.requirement.class_name)
+        if class_room is None:
+            continue
+        start, end = labels[p.hour - 1]
+        entries.append(ClassScheduleEntry(
+            class_room=class_room,
+            zi_saptamana=p.day,
+            numar_ora=p.hour,
+            ora_inceput=start,
+            ora_sfarsit=end,
+            subject_name=p.requirement.subject,
+            subject_color=p.requirement.color[:7],
+            sala=p.room[:20],
+            profesor=p.requirement.teacher[:100],
+        ))
+    return write_class_entries(list(class_rooms.values()), entries, clear_existing=True)
+
+
+# --- Problemă sintetică pentru benchmark ---
+
+SYNTHETIC_SUBJECTS = [
+    # (nume, ore/săptămână, grea, tip sală)
+    ('Limba română', 4, True, None),
+    ('Matematică', 4, True, None),
+    ('Limba engleză', 2, False, None),
+    ('Limba franceză', 2, False, None),
+    ('Fizică', 2, True, 'lab'),
+    ('Chimie', 2, True, 'lab'),
+    ('Biologie', 2, False, None),
+    ('Istorie', 2, False, None),
+    ('Geografie', 2, False, None),
+    ('Informatică', 2, False, 'it'),
+    ('Educație fizică', 2, False, 'sport'),
+    ('Religie', 1, False, None),
+    ('Educație muzicală', 1, False, None),
+    ('Educație plastică', 1, False, None),
+    ('Dirigenție', 1, False, None),
+]
+
+
+def synthetic_problem(n_classes=30, hours_per_day=7, seed=0, teacher_hours=18):
+    """O școală artificială: n clase × 30 ore, profesori cu ~teacher_hours ore, săli comune, laboratoare, sală de sport."""
+    rnd = random.Random(seed)
+    classes = [f"{5 + i // 8}{'ABCDEFGH'[i % 8]}" for i in range(n_classes)]
+    class_sizes = {name: rnd.randint(22, 30) for name in classes}
+
+    general = [f"S{i + 1}" for i in range(max(4, math.ceil(n_classes * 0.8)))]
+    rooms = {name: 30 for name in general}
+    special = {
+        'lab': [f"Lab{i + 1}" for i in range(max(1, math.ceil(n_classes * 4 / 32)))],
+        'it': [f"IT{i + 1}" for i in range(max(1, math.ceil(n_classes * 2 / 30)))],
+        'sport': [f"Sport{i + 1}" for i in range(max(1, math.ceil(n_classes * 2 / 30)))],
+    }
+    for names in special.values():
+        rooms.update({name: 30 for name in names})
+
+    requirements = []
+    for subject, hours, heavy, room_kind in SYNTHETIC_SUBJECTS:
+        per_teacher = max(1, teacher_hours // hours)
+        for i, class_name in enumerate(classes):
+            if subject == 'Dirigenție':
+                teacher = f"Diriginte {class_name}"
+            else:
+                teacher = f"Prof. {subject} {i // per_teacher + 1}"
+            requirements.append(Requirement(
+                class_name, subject, hours, teacher=teacher, heavy=heavy,
+                rooms=special[room_kind] if room_kind else general,
+            ))
+    return Problem(requirements, hours_per_day=hours_per_day, rooms=rooms, class_sizes=class_sizes)
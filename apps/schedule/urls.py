@@ -23,14 +23,23 @@ urlpatterns = [
     path('changes/create/', views.schedule_change_create_view, name='change_create'),
     path('changes/<int:change_id>/delete/', views.schedule_change_delete_view, name='change_delete'),
 
+    # Abateri personale de la orarul clasei (mod „legat”)
+    path('overrides/', views.schedule_overrides_view, name='overrides'),
+    path('overrides/<int:override_id>/delete/', views.schedule_override_delete_view, name='override_delete'),
+
     # Vizualizări speciale
     path('print/', views.schedule_print_view, name='print'),
     path('today/', views.schedule_today_view, name='today'),
     # Export
     path('export/', views.schedule_export_view, name='export'),
+    path('import/', views.schedule_import_view, name='import'),
     path('year/2025-2026/', views.school_year_2025_2026_view, name='school_year_2025_2026'),
+    # Abonare calendar (ICS)
+    path('feed/', views.schedule_feed_manage_view, name='feed_manage'),
+    path('feed/<str:token>.ics', views.schedule_feed_view, name='feed'),
 
     # AJAX endpoints
+    path('api/lessons/', views.schedule_lessons_api, name='lessons_api'),
     path('quick-edit/', views.schedule_quick_edit_view, name='quick_edit'),
 
     # Clase și orar pe clasă (admin intern)
@@ -43,4 +52,11 @@ urlpatterns = [
     path('classes/<int:class_id>/schedule/<int:entry_id>/edit/', views.class_schedule_entry_edit_view, name='class_schedule_entry_edit'),
     path('classes/<int:class_id>/schedule/<int:entry_id>/delete/', views.class_schedule_entry_delete_view, name='class_schedule_entry_delete'),
     path('classes/<int:class_id>/schedule/import-from-user/', views.class_schedule_import_from_user, name='class_schedule_import_from_user'),
+    path('classes/<int:class_id>/schedule/feed/', views.class_schedule_feed_view, name='class_schedule_feed'),
+    path('classes/<int:class_id>/changes/', views.class_schedule_changes_view, name='class_schedule_changes'),
+    path('classes/<int:class_id>/changes/<int:change_id>/delete/', views.class_schedule_change_delete_view, name='class_schedule_change_delete'),
+    path('classes/import/', views.class_schedule_import_view, name='class_import'),
+    path('classes/export/', views.class_batch_export_view, name='class_batch_export'),
+    path('classes/export/<str:run_id>/progress/', views.class_batch_export_progress, name='class_batch_export_progress'),
+    path('classes/rooms/', views.room_occupancy_view, name='room_occupancy'),
 ]
\ No newline at end of file
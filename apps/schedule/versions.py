@@ -0,0 +1,146 @@
+"""
+Versiunile orarului, folosite drept chei de cache pentru exporturi.
+
+Fiecare utilizator și fiecare clasă au un contor (ScheduleVersion) incrementat de
+semnale la orice modificare a orarului. Versiunea efectivă a unui utilizator
+combină contorul propriu cu cel al clasei, deoarece în modul „legat” orarul se
+citește direct din orarul clasei.
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ScheduleVersion
+
+
+def user_scope(user_id):
+    return f"user:{user_id}"
+
+
+def class_scope(class_room_id):
+    return f"class:{class_room_id}"
+
+
+_state = threading.local()
+
+
+@contextmanager
+def deferred():
+    """
+    Amână incrementările din blocul curent (ex: ștergeri în masă care declanșează
+    semnale per rând) și le aplică o singură dată, la ieșire.
+    """
+    outer = getattr(_state, 'pending', None)
+    if outer is not None:
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+    finally:
+        pending, _state.pending = _state.pending, None
+        bump_many(pending)
+
+
+def bump(scope):
+    """Incrementează versiunea pentru scope (creează contorul la prima modificare)."""
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        pending.add(scope)
+        return
+    updated = ScheduleVersion.objects.filter(scope=scope).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        ScheduleVersion.objects.get_or_create(scope=scope)
+    # Exporturile randate pentru versiunea veche nu mai sunt valide
+    from .exports import prune_scope
+    prune_scope(scope)
+
+
+def bump_many(scopes):
+    """Ca `bump`, pentru mai multe scope-uri deodată (după operații în masă fără semnale)."""
+    scopes = set(scopes)
+    if not scopes:
+        return
+    ScheduleVersion.objects.filter(scope__in=scopes).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    existing = set(ScheduleVersion.objects.filter(scope__in=scopes).values_list('scope', flat=True))
+    ScheduleVersion.objects.bulk_create(
+        [ScheduleVersion(scope=scope, version=1) for scope in scopes - existing], ignore_conflicts=True
+    )
+    from .exports import prune_scope
+    for scope in scopes:
+        prune_scope(scope)
+
+
+def bump_user(user_id):
+    if user_id:
+        bump(user_scope(user_id))
+
+
+def bump_class(class_room_id):
+    if class_room_id:
+        bump(class_scope(class_room_id))
+
+
+class VersionInfo:
+    """Versiunea agregată a unui set de scope-uri: tag stabil + momentul ultimei modificări."""
+
+    def __init__(self, scopes, rows):
+        self.scopes = scopes
+        versions = {row.scope: row for row in rows}
+        parts = []
+        last = None
+        for scope in scopes:
+            row = versions.get(scope)
+            parts.append(f"{scope}={row.version if row else 0}")
+            if row and (last is None or row.updated_at > last):
+                last = row.updated_at
+        self.tag = ';'.join(parts)
+        self.last_modified = last
+        self.hash = hashlib.sha1(self.tag.encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def etag(self):
+        return f'"{self.hash}"'
+
+
+def _version_for(scopes):
+    rows = ScheduleVersion.objects.filter(scope__in=scopes)
+    return VersionInfo(scopes, list(rows))
+
+
+def version_for_user(user, profile=None):
+    """Versiunea orarului efectiv al utilizatorului (o singură interogare)."""
+    if profile is None:
+        try:
+            profile = user.student_profile
+        except Exception:
+            profile = None
+    scopes = [user_scope(user.pk)]
+    if profile is not None and profile.class_room_id:
+        scopes.append(class_scope(profile.class_room_id))
+    return _version_for(scopes)
+
+
+def version_for_class(class_room):
+    return _version_for([class_scope(class_room.pk)])
+
+
+def versions_for_profiles(profiles):
+    """Versiunile orarului pentru mai mulți elevi deodată: {user_id: VersionInfo}, o singură interogare."""
+    scopes_by_user = {}
+    all_scopes = set()
+    for profile in profiles:
+        scopes = [user_scope(profile.user_id)]
+        if profile.class_room_id:
+            scopes.append(class_scope(profile.class_room_id))
+        scopes_by_user[profile.user_id] = scopes
+        all_scopes.update(scopes)
+    rows = list(ScheduleVersion.objects.filter(scope__in=all_scopes))
+    return {user_id: VersionInfo(scopes, rows) for user_id, scopes in scopes_by_user.items()}
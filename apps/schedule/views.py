@@ -1,31 +1,39 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Count
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.db.models import Q, Count, Avg
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import date, time, datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
 
-from .models import ScheduleEntry, ScheduleTemplate, ScheduleTemplateEntry, ScheduleChange, ClassRoom, ClassScheduleEntry
+from .models import (
+    ScheduleEntry, ScheduleTemplate, ScheduleChange, ClassRoom, ClassScheduleEntry,
+    ScheduleOverride, ScheduleFeed, ClassScheduleChange,
+)
+from .resolver import ScheduleResolver
+from .grid import WeekGrid, WEEKDAY_LABELS, slot_settings
+from . import exports, versions, batch_export, importer, occupancy
 from apps.homework.models import Homework
 from .forms import (
     ScheduleEntryForm, ScheduleTemplateForm, ScheduleChangeForm, ScheduleImportForm,
-    ClassRoomForm, ClassScheduleEntryForm
+    ClassRoomForm, ClassScheduleEntryForm, ScheduleOverrideForm, ClassScheduleImportForm, ClassScheduleChangeForm
 )
 from django.core.exceptions import PermissionDenied
 from apps.subjects.models import Subject
 from apps.core.models import Notification
 from apps.grades.models import Grade
 from django.http import HttpResponse
-from django.conf import settings
 
 
 def _propagate_class_entry_to_users(entry: ClassScheduleEntry):
     """Actualizează/creează intrarea din orar pentru toți elevii din clasa entry.class_room."""
     try:
-        profiles = entry.class_room.students.select_related('user').all()
+        profiles = entry.class_room.students.select_related('user').filter(orar_legat=False)
     except Exception:
         profiles = []
     for profile in profiles:
@@ -49,93 +57,61 @@ def _propagate_class_entry_to_users(entry: ClassScheduleEntry):
         )
 
 
+def _current_week_bounds():
+    """Luni și vineri din săptămâna curentă."""
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    return week_start, week_start + timedelta(days=4)
+
+
 @login_required
 def schedule_calendar_view(request):
     """Vedere principală calendar cu orarul săptămânal"""
     user = request.user
+    grid = WeekGrid.for_request(request)
+    resolver = grid.resolver
+    weekdays = WEEKDAY_LABELS
+    entries_by_day = grid.entries_by_day()
 
-    # Obține intrările din orar pentru fiecare zi
-    schedule_data = {}
-    weekdays = ['Luni', 'Marți', 'Miercuri', 'Joi', 'Vineri']
-
-    for day_num in range(1, 6):  # 1-5 (Luni-Vineri)
-        day_name = weekdays[day_num - 1]
-        entries = ScheduleEntry.objects.filter(
-            user=user,
-            zi_saptamana=day_num
-        ).order_by('numar_ora').select_related('subject')
-
-        schedule_data[day_name] = {
-            'day_num': day_num,
-            'entries': list(entries)
-        }
-
-    # Atașează temele nefinalizate per materie pentru a fi afișate în orar
+    # Atașează temele nefinalizate și media per materie pentru a fi afișate în orar
     pending_map = {}
     pending_homework = Homework.objects.filter(user=user, finalizata=False).select_related('subject')
     for hw in pending_homework:
         pending_map.setdefault(hw.subject_id, []).append(hw)
 
-    for day in schedule_data.values():
-        for entry in day['entries']:
-            # listă de Homework atașată fiecărei intrări din orar
-            entry.pending_homework = pending_map.get(entry.subject_id, [])
-
-    # Materii distincte pentru filtre (evită duplicatele)
-    # Subiecte unice folosite în orar (bazat pe subject_id)
-    subject_ids_qs = ScheduleEntry.objects.filter(user=user).values_list('subject_id', flat=True).distinct()
-    subject_rows = Subject.objects.filter(id__in=subject_ids_qs).values('nume', 'culoare').order_by('nume')
-    subject_filters = [{'name': row['nume'], 'color': row['culoare']} for row in subject_rows]
+    subject_ids = grid.subject_ids()
+    averages = dict(
+        Grade.objects.filter(subject_id__in=subject_ids, tip='nota')
+        .values_list('subject_id')
+        .annotate(media=Avg('valoare'))
+    )
+    for entry in grid.entries:
+        # listă de Homework atașată fiecărei intrări din orar
+        entry.pending_homework = pending_map.get(entry.subject_id, [])
+        entry.media = averages.get(entry.subject_id)
+
+    # Materii distincte pentru filtre (din orele deja încărcate)
+    subjects = {e.subject_id: e.subject for e in grid.entries}
+    subject_filters = sorted(
+        ({'name': s.nume, 'color': s.culoare} for s in subjects.values()),
+        key=lambda f: f['name'],
+    )
 
     # Număr de materii distincte per zi a săptămânii (pentru vizualizarea lunară)
-    weekday_subject_counts = {}
-    for day_num in range(1, 6):
-        day_name = weekdays[day_num - 1]
-        unique_subject_ids = {entry.subject_id for entry in schedule_data.get(day_name, {}).get('entries', [])}
-        weekday_subject_counts[day_num] = len(unique_subject_ids)
+    weekday_subject_counts = {
+        day_num: len({entry.subject_id for entry in entries_by_day.get(day_num, [])})
+        for day_num in range(1, 6)
+    }
     # weekend (Sâmbătă=6, Duminică=7)
     weekday_subject_counts[6] = 0
     weekday_subject_counts[7] = 0
 
-    # Calculează orele disponibile și parametrii în funcție de profil
-    max_hours = 8
-    start_base = time(8, 0)
-    class_duration = 50
-    break_duration = 10
-    try:
-        if hasattr(user, 'student_profile') and user.student_profile:
-            if getattr(user.student_profile, 'nr_ore_pe_zi', None):
-                max_hours = user.student_profile.nr_ore_pe_zi
-            if getattr(user.student_profile, 'ore_start', None):
-                start_base = user.student_profile.ore_start
-            if getattr(user.student_profile, 'durata_ora', None):
-                class_duration = int(user.student_profile.durata_ora or 50)
-            if getattr(user.student_profile, 'durata_pauza', None):
-                break_duration = int(user.student_profile.durata_pauza or 10)
-    except Exception:
-        pass
-
-    hour_slots = list(range(1, max_hours + 1))
-
-    # Etichete de timp pentru fiecare oră pe baza profilului
-    time_labels = []
-    day_start_dt = datetime.combine(date.today(), start_base)
-    slot_total = class_duration + break_duration
-    for idx in range(max_hours):
-        slot_start_dt = day_start_dt + timedelta(minutes=idx * slot_total)
-        slot_end_dt = slot_start_dt + timedelta(minutes=class_duration)
-        time_labels.append({'start': slot_start_dt.time(), 'end': slot_end_dt.time()})
-
     # Verifică modificări pentru săptămâna curentă
     today = date.today()
     week_start = today - timedelta(days=today.weekday())  # Luni
     week_end = week_start + timedelta(days=4)  # Vineri
 
-    current_changes = ScheduleChange.objects.filter(
-        Q(data_end__isnull=True) | Q(data_end__gte=week_start),
-        user=user,
-        data_start__lte=week_end
-    ).select_related('schedule_entry', 'subject_nou')
+    current_changes = resolver.active_changes(week_start, week_end)
 
     # Informații despre săptămâna curentă
     week_info = {
@@ -148,47 +124,37 @@ def schedule_calendar_view(request):
     # Statistici rapide
     # Busiest day weighted by subject rating
     busy_scores = {}
-    for day_name, data in schedule_data.items():
+    for day_num, day_entries in entries_by_day.items():
         score = 0
-        for entry in data['entries']:
+        for entry in day_entries:
             try:
                 score += getattr(entry.subject, 'rating', 3) or 3
             except Exception:
                 score += 3
-        busy_scores[day_name] = score
+        busy_scores[weekdays[day_num - 1]] = score
 
     stats = {
-        'total_hours_per_week': sum(len(day['entries']) for day in schedule_data.values()),
-        'subjects_count': ScheduleEntry.objects.filter(user=user).values('subject').distinct().count(),
+        'total_hours_per_week': len(grid.entries),
+        'subjects_count': len(subject_ids),
         'busiest_day': max(busy_scores, key=busy_scores.get) if busy_scores else None,
     }
 
     # Ora curentă pentru highlight în UI (în funcție de profil)
-    current_hour = None
-    now = datetime.now()
-    if 1 <= now.isoweekday() <= 5:
-        day_start = datetime.combine(now.date(), start_base)
-        day_end = day_start + timedelta(minutes=slot_total * max_hours)
-        if day_start <= now <= day_end:
-            minutes_since_start = int((now - day_start).total_seconds() // 60)
-            current_hour = min(max_hours, (minutes_since_start // slot_total) + 1)
+    current_hour = grid.current_hour()
 
     # Orele de azi (pentru secțiunea "Orele de astăzi")
     today_classes = []
     if 1 <= today.isoweekday() <= 5:
-        today_classes = list(ScheduleEntry.objects.filter(
-            user=user,
-            zi_saptamana=today.isoweekday()
-        ).order_by('numar_ora').select_related('subject'))
+        today_classes = resolver.lessons_on(today, include_cancelled=False)
 
         # atașează și pentru lista de azi
         for entry in today_classes:
             entry.pending_homework = pending_map.get(entry.subject_id, [])
 
     context = {
-        'schedule_data': schedule_data,
-        'hour_slots': hour_slots,
-        'time_labels': time_labels,
+        'grid': grid,
+        'hour_slots': grid.hour_slots,
+        'time_labels': grid.time_labels,
         'week_info': week_info,
         'stats': stats,
         'weekdays': weekdays,
@@ -196,55 +162,22 @@ def schedule_calendar_view(request):
         'today_classes': today_classes,
         'subject_filters': subject_filters,
         # Parametri pentru UI/JS
-        'start_hour': start_base.hour,
-        'start_minute': start_base.minute,
-        'duration_min': class_duration,
-        'break_min': break_duration,
-        'max_hours': max_hours,
+        'start_hour': grid.start_base.hour,
+        'start_minute': grid.start_base.minute,
+        'duration_min': grid.class_duration,
+        'break_min': grid.break_duration,
+        'max_hours': grid.max_hours,
         'weekday_subject_counts_json': json.dumps(weekday_subject_counts),
     }
 
-    # Month events for client-side month view
+    # Luna afișată de vizualizarea lunară; evenimentele ei sunt încărcate leneș
+    # de client din API-ul calendarului (core:calendar_events_api)
+    today_local = date.today()
     try:
-        from calendar import monthrange
-        today_local = date.today()
-        year = int(request.GET.get('year', today_local.year))
-        month = int(request.GET.get('month', today_local.month))
-        first_day = date(year, month, 1)
-        last_day = date(year, month, monthrange(year, month)[1])
-
-        month_events = {}
-        # Homework
-        for hw in Homework.objects.filter(user=user, deadline__range=[first_day, last_day]).select_related('subject'):
-            day_num = hw.deadline.day
-            month_events.setdefault(day_num, []).append({
-                'type': 'homework',
-                'label': f"{hw.titlu}",
-                'subject': hw.subject.nume,
-                'color': '#ff6b6b',
-                'url': f"/teme/{hw.id}/"
-            })
-        # Grades/Absences
-        for gr in Grade.objects.filter(user=user, data__range=[first_day, last_day]).select_related('subject'):
-            day_num = gr.data.day
-            label = ''
-            if gr.tip == 'nota':
-                label = f"{gr.valoare}"
-            else:
-                label = gr.get_tip_display()
-            month_events.setdefault(day_num, []).append({
-                'type': 'grade',
-                'label': label,
-                'subject': gr.subject.nume,
-                'color': '#f9ca24',
-                'url': f"/note/{gr.id}/"
-            })
-
-        context['month_events_json'] = json.dumps(month_events)
-        context['month_current'] = month
-        context['year_current'] = year
-    except Exception:
-        context['month_events_json'] = '[]'
+        context['year_current'] = int(request.GET.get('year', today_local.year))
+        context['month_current'] = int(request.GET.get('month', today_local.month))
+    except ValueError:
+        context['year_current'], context['month_current'] = today_local.year, today_local.month
 
     return render(request, 'schedule/calendar.html', context)
 
@@ -399,6 +332,79 @@ def schedule_entry_delete_view(request, entry_id):
     return render(request, 'schedule/entry_delete.html', context)
 
 
+def _run_import(request, run):
+    """Rulează importul și transformă rezultatul în mesaje; returnează ImportResult sau None."""
+    try:
+        result = run()
+    except ImportError:
+        messages.error(request, 'openpyxl nu este instalat')
+        return None
+    except importer.FileEncodingError as exc:
+        messages.error(request, str(exc))
+        return None
+    except Exception:
+        messages.error(request, 'Fișierul nu a putut fi citit. Verifică formatul (CSV UTF-8 sau XLSX).')
+        return None
+    if result.created:
+        messages.success(request, f'Au fost importate {result.created} ore.')
+    if result.errors:
+        messages.warning(request, f'{len(result.errors)} rânduri nu au fost importate.')
+    return result
+
+
+@login_required
+def schedule_import_view(request):
+    """Import în masă al orarului personal din CSV/XLSX (doar superadmin)."""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    result = None
+    if request.method == 'POST':
+        form = ScheduleImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            result = _run_import(request, lambda: importer.import_user_schedule(
+                request.user,
+                form.cleaned_data['file'],
+                clear_existing=form.cleaned_data['clear_existing'],
+                create_subjects=form.cleaned_data['create_subjects'],
+            ))
+            if result is not None and result.ok:
+                return redirect('schedule:calendar')
+    else:
+        form = ScheduleImportForm()
+    return render(request, 'schedule/import.html', {
+        'form': form,
+        'result': result,
+        'title': 'Importă orarul',
+        'back_url': reverse('schedule:calendar'),
+    })
+
+
+@login_required
+def class_schedule_import_view(request):
+    """Import în masă al orarelor de clasă (una sau mai multe clase) din CSV/XLSX (doar superadmin)."""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    result = None
+    if request.method == 'POST':
+        form = ClassScheduleImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            result = _run_import(request, lambda: importer.import_class_schedules(
+                form.cleaned_data['file'],
+                clear_existing=form.cleaned_data['clear_existing'],
+                class_room=form.cleaned_data['class_room'],
+            ))
+            if result is not None and result.ok:
+                return redirect('schedule:classes')
+    else:
+        form = ClassScheduleImportForm(initial={'class_room': request.GET.get('class')})
+    return render(request, 'schedule/import.html', {
+        'form': form,
+        'result': result,
+        'title': 'Importă orare de clasă',
+        'back_url': reverse('schedule:classes'),
+    })
+
+
 @login_required
 def schedule_templates_view(request):
     """Lista template-urilor de orar"""
@@ -423,20 +429,8 @@ def schedule_template_create_view(request):
             template.user = request.user
             template.save()
 
-            # Copiază orarul curent în template dacă există
-            current_entries = ScheduleEntry.objects.filter(user=request.user)
-            for entry in current_entries:
-                ScheduleTemplateEntry.objects.create(
-                    template=template,
-                    subject=entry.subject,
-                    zi_saptamana=entry.zi_saptamana,
-                    ora_inceput=entry.ora_inceput,
-                    ora_sfarsit=entry.ora_sfarsit,
-                    sala=entry.sala,
-                    note=entry.note,
-                    numar_ora=entry.numar_ora,
-                    tip_ora=entry.tip_ora
-                )
+            # Copiază orarul curent în template (un singur bulk insert)
+            template.salvare_orar()
 
             messages.success(request, f'Template-ul "{template.nume}" a fost creat cu orarul curent!')
             return redirect('schedule:templates')
@@ -459,10 +453,14 @@ def schedule_template_apply_view(request, template_id):
     template = get_object_or_404(ScheduleTemplate, id=template_id, user=request.user)
 
     if request.method == 'POST':
-        # Confirmă aplicarea template-ului
-        template.aplicare_template()
+        # Confirmă aplicarea template-ului (doar sloturile diferite sunt modificate)
+        stats = template.aplicare_template()
 
-        messages.success(request, f'Template-ul "{template.nume}" a fost aplicat cu succes!')
+        messages.success(
+            request,
+            f'Template-ul "{template.nume}" a fost aplicat cu succes! '
+            f'({stats["created"]} ore adăugate, {stats["updated"]} modificate, {stats["deleted"]} șterse)'
+        )
         return redirect('schedule:calendar')
 
     # Informații pentru confirmare
@@ -590,76 +588,59 @@ def schedule_change_delete_view(request, change_id):
 
 
 @login_required
-def schedule_print_view(request):
-    """Versiune pentru printare a orarului"""
-    user = request.user
+def schedule_overrides_view(request):
+    """Abaterile personale de la orarul clasei (mod „legat”)"""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    if request.method == 'POST':
+        form = ScheduleOverrideForm(user=request.user, data=request.POST)
+        if form.is_valid():
+            try:
+                override = form.save(commit=False)
+                override.user = request.user
+                override.full_clean()
+                override.save()
+                messages.success(request, f'Abaterea a fost adăugată pentru {override.get_zi_saptamana_display()}, ora {override.numar_ora}!')
+                return redirect('schedule:overrides')
+            except ValidationError as e:
+                form.add_error(None, e)
+    else:
+        form = ScheduleOverrideForm(user=request.user)
 
-    # Orarul complet
-    schedule_data = {}
-    weekdays = ['Luni', 'Marți', 'Miercuri', 'Joi', 'Vineri']
+    overrides = ScheduleOverride.objects.filter(user=request.user).select_related('subject')
 
-    for day_num in range(1, 6):
-        day_name = weekdays[day_num - 1]
-        entries = ScheduleEntry.objects.filter(
-            user=user,
-            zi_saptamana=day_num
-        ).order_by('numar_ora').select_related('subject')
-
-        schedule_data[day_name] = list(entries)
-
-    # Informații student + parametrizare oră/pausă
-    profile = getattr(user, 'student_profile', None)
-    max_hours = 8
-    start_base = time(8, 0)
-    class_duration = 50
-    break_duration = 10
-    try:
-        if profile:
-            if getattr(profile, 'nr_ore_pe_zi', None):
-                max_hours = int(profile.nr_ore_pe_zi)
-            if getattr(profile, 'ore_start', None):
-                start_base = profile.ore_start
-            if getattr(profile, 'durata_ora', None):
-                class_duration = int(profile.durata_ora or 50)
-            if getattr(profile, 'durata_pauza', None):
-                break_duration = int(profile.durata_pauza or 10)
-    except Exception:
-        pass
+    context = {
+        'form': form,
+        'overrides': overrides,
+        'is_linked': ScheduleResolver.for_request(request).is_linked,
+    }
 
-    # Fallback: dacă există o oră mai mare în date, folosește acea limită
-    try:
-        data_max = 0
-        for day_entries in schedule_data.values():
-            for e in day_entries:
-                if getattr(e, 'numar_ora', 0) and int(e.numar_ora) > data_max:
-                    data_max = int(e.numar_ora)
-        if data_max > 0:
-            max_hours = max(max_hours, data_max)
-    except Exception:
-        pass
+    return render(request, 'schedule/overrides.html', context)
 
-    # Etichete de timp pentru rândurile din tabelul compact
-    time_labels = []
-    try:
-        from datetime import datetime as dt
-        day_start_dt = dt.combine(date.today(), start_base)
-        slot_total = class_duration + break_duration
-        for idx in range(max_hours):
-            slot_start_dt = day_start_dt + timedelta(minutes=idx * slot_total)
-            slot_end_dt = slot_start_dt + timedelta(minutes=class_duration)
-            time_labels.append({'start': slot_start_dt.time(), 'end': slot_end_dt.time()})
-    except Exception:
-        # fallback gol dacă apare vreo problemă
-        time_labels = []
+
+@login_required
+def schedule_override_delete_view(request, override_id):
+    """Ștergere abatere personală"""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    override = get_object_or_404(ScheduleOverride, id=override_id, user=request.user)
+    if request.method == 'POST':
+        override.delete()
+        messages.success(request, 'Abaterea a fost ștearsă!')
+    return redirect('schedule:overrides')
+
+
+@login_required
+def schedule_print_view(request):
+    """Versiune pentru printare a orarului"""
+    grid = WeekGrid.for_request(request)
 
     context = {
-        'schedule_data': schedule_data,
-        'weekdays': weekdays,
-        'profile': profile,
+        'grid': grid,
+        'weekdays': WEEKDAY_LABELS,
+        'profile': grid.resolver.profile,
         'print_date': date.today(),
-        'max_hours': max_hours,
-        'time_labels': time_labels,
-        'hour_slots': list(range(1, max_hours + 1)),
+        'max_hours': grid.max_hours,
     }
 
     return render(request, 'schedule/print.html', context)
@@ -668,34 +649,12 @@ def schedule_print_view(request):
 @login_required
 def schedule_today_view(request):
     """Orarul de astăzi - widget pentru dashboard"""
-    user = request.user
     today = date.today()
     weekday = today.isoweekday()
 
     if weekday <= 5:  # Luni-Vineri
-        entries = ScheduleEntry.objects.filter(
-            user=user,
-            zi_saptamana=weekday
-        ).order_by('numar_ora').select_related('subject')
-
-        # Verifică modificări pentru astăzi
-        changes = ScheduleChange.objects.filter(
-            Q(data_end__isnull=True) | Q(data_end__gte=today),
-            user=user,
-            data_start__lte=today
-        ).select_related('schedule_entry')
-
-        # Aplică modificările la intrări
-        modified_entries = []
-        for entry in entries:
-            entry_changes = [c for c in changes if c.schedule_entry == entry]
-            if entry_changes:
-                # Folosește ultima modificare
-                change = entry_changes[-1]
-                entry.current_change = change
-            modified_entries.append(entry)
-
-        entries = modified_entries
+        # Orele de azi cu modificările aplicate (fiecare are `current_change`)
+        entries = WeekGrid.for_request(request).resolver.lessons_on(today)
     else:
         entries = []
 
@@ -712,6 +671,45 @@ def schedule_today_view(request):
     return render(request, 'schedule/today_widget.html', context)
 
 
+@login_required
+def schedule_lessons_api(request):
+    """Orele concrete dintr-un interval de date, cu modificările aplicate (JSON)."""
+    today = date.today()
+    try:
+        start = date.fromisoformat(request.GET.get('start') or '')
+    except ValueError:
+        start = today - timedelta(days=today.weekday())
+    try:
+        end = date.fromisoformat(request.GET.get('end') or '')
+    except ValueError:
+        end = start + timedelta(days=6)
+    if end < start or (end - start).days > 366:
+        return JsonResponse({'success': False, 'error': 'Interval invalid (maxim un an)'}, status=400)
+
+    lessons = ScheduleResolver.for_request(request).lessons_between(start, end)
+    return JsonResponse({
+        'success': True,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'lessons': [
+            {
+                'date': lesson.data.isoformat(),
+                'hour': lesson.numar_ora,
+                'start': lesson.ora_inceput.strftime('%H:%M'),
+                'end': lesson.ora_sfarsit.strftime('%H:%M'),
+                'subject': lesson.subject.nume,
+                'color': lesson.subject.culoare,
+                'room': lesson.sala,
+                'type': lesson.tip_ora,
+                'cancelled': lesson.anulata,
+                'substitute_teacher': lesson.profesor_inlocuitor,
+                'change': lesson.change.tip_schimbare if lesson.change else None,
+            }
+            for lesson in lessons
+        ],
+    })
+
+
 @login_required
 def schedule_quick_edit_view(request):
     """Editor rapid pentru orar - AJAX"""
@@ -801,11 +799,18 @@ def schedule_export_view(request):
     if fmt not in ['csv', 'xlsx', 'pdf', 'ical', 'ics', 'excel']:
         fmt = 'csv'
 
-    entries = ScheduleEntry.objects.filter(user=request.user).select_related('subject').order_by('zi_saptamana', 'numar_ora')
+    # Orele săptămânale vin din grila păstrată în cache pe versiunea orarului
+    resolver = WeekGrid.for_request(request).resolver
+    include_changes = request.GET.get('include_changes') in ('1', 'true', 'on')
 
     weekdays = {1: 'Luni', 2: 'Marți', 3: 'Miercuri', 4: 'Joi', 5: 'Vineri'}
 
     if fmt in ['csv']:
+        if include_changes:
+            # Orele din săptămâna curentă cu modificările active aplicate
+            entries = resolver.lessons_between(*_current_week_bounds(), include_cancelled=False)
+        else:
+            entries = resolver.weekly_entries()
         lines = ["Zi,Ora,Inceput,Sfarsit,Materie,Sala,Tip"]
         for e in entries:
             lines.append(
@@ -816,238 +821,24 @@ def schedule_export_view(request):
         response['Content-Disposition'] = 'attachment; filename="orar.csv"'
         return response
 
-    if fmt in ['xlsx', 'excel']:
-        # XLSX cu openpyxl
-        try:
-            from openpyxl import Workbook
-        except Exception:
-            return HttpResponse('openpyxl nu este instalat', status=500)
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Orar'
-        ws.append(['Zi', 'Ora', 'Început', 'Sfârșit', 'Materie', 'Sala', 'Tip'])
-        for e in entries:
-            ws.append([
-                weekdays.get(e.zi_saptamana, e.zi_saptamana),
-                e.numar_ora,
-                e.ora_inceput.strftime('%H:%M'),
-                e.ora_sfarsit.strftime('%H:%M'),
-                e.subject.nume,
-                e.sala or '',
-                e.get_tip_ora_display(),
-            ])
-        from io import BytesIO
-        buf = BytesIO()
-        wb.save(buf)
-        buf.seek(0)
-        response = HttpResponse(buf.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="orar.xlsx"'
-        return response
-
-    if fmt == 'pdf':
-        # PDF în format A3 landscape, grilă similară cu pagina Orar și cu diacritice
-        try:
-            from reportlab.lib.pagesizes import A3, landscape
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-        except Exception:
-            return HttpResponse('reportlab nu este instalat', status=500)
-
-        from io import BytesIO
-        buf = BytesIO()
-
-        doc = SimpleDocTemplate(
-            buf,
-            pagesize=landscape(A3),
-            leftMargin=24,
-            rightMargin=24,
-            topMargin=24,
-            bottomMargin=24,
-        )
-
-        # Înregistrare font cu diacritice (căutăm DejaVuSans/Arial)
-        font_registered = 'Helvetica'
-        candidate_paths = []
-        try:
-            base_dir = getattr(settings, 'BASE_DIR', None)
-            if base_dir:
-                candidate_paths.append(str(base_dir / 'static' / 'fonts' / 'DejaVuSans.ttf'))
-        except Exception:
-            pass
-        # Căi comune pe Windows/Linux
-        candidate_paths.extend([
-            'C:/Windows/Fonts/DejaVuSans.ttf',
-            'C:/Windows/Fonts/arial.ttf',
-            '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-            '/usr/share/fonts/truetype/msttcorefonts/Arial.ttf',
-        ])
-        for p in candidate_paths:
-            try:
-                import os
-                if os.path.exists(p):
-                    pdfmetrics.registerFont(TTFont('DejaVuSans', p))
-                    font_registered = 'DejaVuSans'
-                    break
-            except Exception:
-                continue
-
-        styles = getSampleStyleSheet()
-        styles['Title'].fontName = font_registered
-        styles['Normal'].fontName = font_registered
-        title = Paragraph('Orar școlar', styles['Title'])
-        # Informații săptămână
-        from datetime import date, timedelta
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=4)
-        subtitle = Paragraph(f"Săptămâna {week_start.strftime('%d.%m.%Y')} - {week_end.strftime('%d.%m.%Y')}", styles['Normal'])
-
-        # Parametri orar (identic cu UI)
-        max_hours = 8
-        start_base = time(8, 0)
-        class_duration = 50
-        break_duration = 10
+    if fmt in ['xlsx', 'excel', 'pdf']:
+        # XLSX (openpyxl) / PDF A3 (reportlab), servite din cache-ul pe disc cât timp orarul nu se schimbă
+        fmt = 'xlsx' if fmt == 'excel' else fmt
         try:
-            if hasattr(request.user, 'student_profile') and request.user.student_profile:
-                prof = request.user.student_profile
-                if getattr(prof, 'nr_ore_pe_zi', None):
-                    max_hours = int(prof.nr_ore_pe_zi)
-                if getattr(prof, 'ore_start', None):
-                    start_base = prof.ore_start
-                if getattr(prof, 'durata_ora', None):
-                    class_duration = int(prof.durata_ora or 50)
-                if getattr(prof, 'durata_pauza', None):
-                    break_duration = int(prof.durata_pauza or 10)
-        except Exception:
-            pass
-
-        # Etichete timp pe rânduri
-        from datetime import datetime as dt
-        slot_total = class_duration + break_duration
-        time_labels = []
-        day_start_dt = dt.combine(today, start_base)
-        for idx in range(max_hours):
-            slot_start_dt = day_start_dt + timedelta(minutes=idx * slot_total)
-            slot_end_dt = slot_start_dt + timedelta(minutes=class_duration)
-            time_labels.append((slot_start_dt.time(), slot_end_dt.time()))
-
-        # Harta intrări (zi, oră)
-        entry_map = {}
-        for e in entries:
-            entry_map[(e.zi_saptamana, e.numar_ora)] = e
-
-        # Grilă: header + rânduri ore
-        header = ['Oră'] + [weekdays[d] for d in range(1, 6)]
-        data = [header]
-        for hour_idx in range(1, max_hours + 1):
-            label = time_labels[hour_idx - 1]
-            row = [f"{hour_idx} ( {label[0].strftime('%H:%M')} - {label[1].strftime('%H:%M')} )"]
-            for day_num in range(1, 6):
-                e = entry_map.get((day_num, hour_idx))
-                if e:
-                    subj = e.subject
-                    cell = f"{subj.nume}\n{e.ora_inceput.strftime('%H:%M')} - {e.ora_sfarsit.strftime('%H:%M')}" + (f"\nSala {e.sala}" if e.sala else '')
-                else:
-                    cell = ''
-                row.append(cell)
-            data.append(row)
-
-        # Conversie hex -> reportlab color
-        def _hex_to_color(hex_str, fallback=colors.lightgrey, alpha=1.0):
-            try:
-                h = (hex_str or '').strip()
-                if h.startswith('#') and len(h) == 7:
-                    r = int(h[1:3], 16) / 255.0
-                    g = int(h[3:5], 16) / 255.0
-                    b = int(h[5:7], 16) / 255.0
-                    c = colors.Color(r, g, b, alpha=alpha)
-                    return c
-            except Exception:
-                pass
-            return fallback
-
-        # Lățimi coloane (A3 landscape)
-        # Prima coloană mai îngustă (ore + interval), 5 coloane egale pentru zile
-        page_w, page_h = landscape(A3)
-        usable_w = page_w - (doc.leftMargin + doc.rightMargin)
-        first_col = 120
-        day_col = (usable_w - first_col) / 5.0
-        col_widths = [first_col] + [day_col] * 5
-
-        table = Table(data, colWidths=col_widths, repeatRows=1, hAlign='LEFT')
-
-        # Stiluri tabel
-        style_cmds = [
-            ('FONTNAME', (0, 0), (-1, -1), font_registered),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('ALIGN', (0, 1), (0, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-            ('LINEBEFORE', (1, 0), (-1, -1), 0.25, colors.grey),
-            ('ROWHEIGHT', (0, 1), (-1, -1), 28),
-        ]
-
-        # Alternare culori pe rânduri (după ore)
-        for ridx in range(1, len(data)):
-            bg = colors.whitesmoke if ridx % 2 == 1 else colors.white
-            style_cmds.append(('BACKGROUND', (0, ridx), (-1, ridx), bg))
-
-        # Colorează celulele care au ore cu culoarea materiei (translucid)
-        for hour_idx in range(1, max_hours + 1):
-            row_idx = hour_idx  # în data, header e pe rândul 0
-            for day_num in range(1, 6):
-                e = entry_map.get((day_num, hour_idx))
-                if e:
-                    subj_color = getattr(e.subject, 'culoare', '#EAEAEA')
-                    style_cmds.append(('BACKGROUND', (day_num, row_idx), (day_num, row_idx), _hex_to_color(subj_color, colors.HexColor('#e8f4ff'))))
-
-        table.setStyle(TableStyle(style_cmds))
-
-        story = [title, Spacer(1, 6), subtitle, Spacer(1, 12), table]
-        doc.build(story)
-        buf.seek(0)
-        response = HttpResponse(buf.read(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="orar.pdf"'
+            content = exports.user_export(request.user, fmt, resolver, include_changes=include_changes)
+        except ImportError:
+            return HttpResponse('openpyxl nu este instalat' if fmt == 'xlsx' else 'reportlab nu este instalat', status=500)
+        response = HttpResponse(content, content_type=exports.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="orar.{fmt}"'
         return response
 
     if fmt in ['ical', 'ics']:
-        # ICS cu icalendar
+        # ICS recurent (RRULE pe tot anul școlar, EXDATE pentru vacanțe), servit din cache
         try:
-            from icalendar import Calendar, Event
-        except Exception:
+            from .ics import cached_user_ics
+            ics_bytes, _ = cached_user_ics(request.user, resolver=resolver)
+        except ImportError:
             return HttpResponse('icalendar nu este instalat', status=500)
-        from datetime import datetime, date, timedelta
-        from pytz import timezone
-        tz = timezone('Europe/Bucharest')
-        cal = Calendar()
-        cal.add('prodid', '-//School Manager Orar//ro')
-        cal.add('version', '2.0')
-
-        # Creează evenimente pentru săptămâna curentă (Luni-Vineri)
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-        for e in entries:
-            # Map zi săptămână la data din săptămâna curentă
-            event_date = week_start + timedelta(days=(e.zi_saptamana - 1))
-            start_dt = tz.localize(datetime.combine(event_date, e.ora_inceput))
-            end_dt = tz.localize(datetime.combine(event_date, e.ora_sfarsit))
-            ev = Event()
-            ev.add('summary', f"{e.subject.nume}")
-            ev.add('dtstart', start_dt)
-            ev.add('dtend', end_dt)
-            if e.sala:
-                ev.add('location', e.sala)
-            ev.add('description', f"Tip: {e.get_tip_ora_display()}\nNote: {e.note or ''}")
-            cal.add_component(ev)
-
-        ics_bytes = cal.to_ical()
         response = HttpResponse(ics_bytes, content_type='text/calendar; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename="orar.ics"'
         return response
@@ -1056,6 +847,68 @@ def schedule_export_view(request):
     return HttpResponse('Format neacceptat', status=400)
 
 
+def schedule_feed_view(request, token):
+    """
+    Feed ICS la care se abonează aplicațiile de calendar (fără autentificare, pe baza
+    token-ului secret). Răspunde cu 304 cât timp versiunea orarului nu s-a schimbat.
+    """
+    feed = get_object_or_404(
+        ScheduleFeed.objects.select_related('user__student_profile', 'class_room'),
+        token=token,
+    )
+    if feed.user_id:
+        version = versions.version_for_user(feed.user)
+    elif feed.class_room_id:
+        version = versions.version_for_class(feed.class_room)
+    else:
+        return HttpResponse('Feed invalid', status=404)
+
+    last_modified = int(version.last_modified.timestamp()) if version.last_modified else None
+    not_modified = get_conditional_response(request, etag=version.etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    from .ics import cached_user_ics, cached_class_ics
+    if feed.user_id:
+        content, _ = cached_user_ics(feed.user, version=version)
+    else:
+        content, _ = cached_class_ics(feed.class_room, version=version)
+
+    # Marchează accesul cel mult o dată pe zi (evită un UPDATE la fiecare sondare)
+    now = timezone.now()
+    if not feed.last_accessed_at or now - feed.last_accessed_at > timedelta(days=1):
+        ScheduleFeed.objects.filter(pk=feed.pk).update(last_accessed_at=now)
+
+    response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
+    response['ETag'] = version.etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=3600'
+    response['Content-Disposition'] = 'inline; filename="orar.ics"'
+    return response
+
+
+@login_required
+def schedule_feed_manage_view(request):
+    """Afișează (și regenerează la cerere) link-ul de abonare ICS al utilizatorului."""
+    feed = ScheduleFeed.objects.filter(user=request.user).first()
+    if request.method == 'POST' or feed is None:
+        if feed is None:
+            feed = ScheduleFeed(user=request.user)
+        feed.token = ScheduleFeed.generate_token()
+        feed.save()
+        if request.method == 'POST':
+            messages.success(request, 'Link-ul de abonare a fost regenerat. Link-ul vechi nu mai funcționează.')
+            return redirect('schedule:feed_manage')
+
+    context = {
+        'feed': feed,
+        'feed_url': request.build_absolute_uri(reverse('schedule:feed', args=[feed.token])),
+    }
+
+    return render(request, 'schedule/feed.html', context)
+
+
 def render_schedule_entry_html(entry):
     """Helper function pentru a renda HTML-ul unei intrări"""
     # Aceasta ar putea fi implementată cu un template fragment
@@ -1131,10 +984,96 @@ def class_schedule_view(request, class_id):
     for day_num in range(1, 6):
         entries = ClassScheduleEntry.objects.filter(class_room=classroom, zi_saptamana=day_num).order_by('numar_ora')
         data[weekdays[day_num - 1]] = list(entries)
+    feed = ScheduleFeed.objects.filter(class_room=classroom).first()
     return render(request, 'schedule/class_schedule.html', {
         'classroom': classroom,
         'schedule_data': data,
         'weekdays': weekdays,
+        'feed_url': request.build_absolute_uri(reverse('schedule:feed', args=[feed.token])) if feed else None,
+    })
+
+
+@login_required
+def class_schedule_feed_view(request, class_id):
+    """Creează/regenerează feed-ul ICS al clasei (doar superadmin)."""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    classroom = get_object_or_404(ClassRoom, id=class_id)
+    if request.method == 'POST':
+        feed = ScheduleFeed.objects.filter(class_room=classroom).first() or ScheduleFeed(class_room=classroom)
+        feed.token = ScheduleFeed.generate_token()
+        feed.save()
+        messages.success(request, f'Link-ul de abonare pentru clasa {classroom.nume} a fost generat.')
+    return redirect('schedule:class_schedule', class_id=classroom.id)
+
+
+@login_required
+def class_batch_export_view(request):
+    """
+    Arhivă ZIP cu orarele tuturor elevilor (per=student) sau ale claselor (per=class).
+    Superadminul poate exporta orice clasă; dirigintele doar clasele lui.
+    """
+    class_id = request.GET.get('class')
+    per = request.GET.get('per', 'student')
+    fmt = request.GET.get('format', 'pdf').lower()
+    if fmt == 'excel':
+        fmt = 'xlsx'
+    if fmt not in batch_export.FORMATS or per not in ('student', 'class'):
+        return HttpResponse('Parametri invalizi', status=400)
+    if not class_id and not request.user.is_superuser:
+        raise PermissionDenied
+
+    class_rooms = list(batch_export.class_rooms_for(request.user, class_id))
+    if not class_rooms:
+        raise PermissionDenied
+
+    run_id = batch_export.new_run_id()
+    try:
+        slot = batch_export.acquire_slot(run_id)
+    except batch_export.BatchBusy:
+        return HttpResponse('Un alt export în masă rulează deja. Încearcă din nou în câteva minute.', status=429)
+
+    name = class_rooms[0].nume if class_id else 'toate_clasele'
+    response = StreamingHttpResponse(
+        batch_export.BatchRun(class_rooms, per=per, fmt=fmt, run_id=run_id, slot=slot),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="orar_{name}_{per}.zip"'
+    response['X-Batch-Run-Id'] = run_id
+    return response
+
+
+@login_required
+def class_batch_export_progress(request, run_id):
+    """Progresul unui export în masă (JSON: total, done, status)."""
+    progress = batch_export.get_progress(run_id)
+    if progress is None:
+        return JsonResponse({'status': 'unknown'}, status=404)
+    return JsonResponse(progress)
+
+
+@login_required
+def room_occupancy_view(request):
+    """Utilizarea sălilor și a profesorilor în orarele claselor + sălile libere într-un slot."""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    max_hours = slot_settings(None)[0]
+    try:
+        zi = int(request.GET.get('zi', 0))
+        ora = int(request.GET.get('ora', 0))
+    except ValueError:
+        zi = ora = 0
+    free = None
+    if 1 <= zi <= 5 and ora >= 1:
+        free = occupancy.free_rooms(zi, ora)
+    return render(request, 'schedule/room_occupancy.html', {
+        'rooms': occupancy.utilization('sala', max_hours),
+        'teachers': occupancy.utilization('profesor', max_hours),
+        'weekdays': WEEKDAY_LABELS,
+        'hours': range(1, max_hours + 1),
+        'zi': zi,
+        'ora': ora,
+        'free_rooms': free,
     })
 
 
@@ -1218,6 +1157,50 @@ def class_schedule_entry_delete_view(request, class_id, entry_id):
     return render(request, 'schedule/entry_delete.html', {'entry': entry})
 
 
+@login_required
+def class_schedule_changes_view(request, class_id):
+    """Modificările orarului clasei (anulări, înlocuiri), aplicate tuturor elevilor dintr-o singură scriere."""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    classroom = get_object_or_404(ClassRoom, id=class_id)
+    if request.method == 'POST':
+        form = ClassScheduleChangeForm(request.POST, class_room=classroom)
+        if form.is_valid():
+            change = form.save(commit=False)
+            change.class_room = classroom
+            change.created_by = request.user
+            change.save()
+            messages.success(request, f'Modificarea a fost aplicată pentru clasa {classroom.nume}!')
+            return redirect('schedule:class_schedule_changes', class_id=classroom.id)
+    else:
+        form = ClassScheduleChangeForm(class_room=classroom)
+        entry_id = request.GET.get('entry')
+        if entry_id:
+            form.initial['class_entry'] = entry_id
+
+    today = date.today()
+    changes = (ClassScheduleChange.objects
+               .filter(Q(data_end__isnull=True) | Q(data_end__gte=today), class_room=classroom)
+               .select_related('class_entry')
+               .order_by('data_start'))
+    return render(request, 'schedule/class_changes.html', {
+        'classroom': classroom,
+        'form': form,
+        'changes': changes,
+    })
+
+
+@login_required
+def class_schedule_change_delete_view(request, class_id, change_id):
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    change = get_object_or_404(ClassScheduleChange, id=change_id, class_room_id=class_id)
+    if request.method == 'POST':
+        change.delete()
+        messages.success(request, 'Modificarea a fost ștearsă!')
+    return redirect('schedule:class_schedule_changes', class_id=class_id)
+
+
 @login_required
 def school_year_2025_2026_view(request):
     """Structura anului școlar 2025-2026 (module, vacanțe, excepții)."""
@@ -2,7 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse, FileResponse
-from django.db.models import Count, Avg
+from django.db.models import Count, Avg, Q
 from django.core.paginator import Paginator
 from django.conf import settings
 from django.views.decorators.http import require_POST
@@ -11,10 +11,12 @@ import re
 import os
 
 from .models import Subject, SubjectFile, SubjectNote
+from django.utils import timezone
 from django.utils.text import get_valid_filename
 from .forms import SubjectForm, SubjectFileForm, SubjectNoteForm
 from apps.homework.models import Homework
 from apps.grades.models import Grade
+from apps.grades.analytics import grade_summary
 
 
 @login_required
@@ -451,42 +453,33 @@ def subject_stats_view(request, subject_id):
     """Statistici detaliate pentru o materie"""
     subject = get_object_or_404(Subject, id=subject_id, user=request.user)
 
-    # Note și statistici
-    grades = subject.grade_set.filter(tip='nota').order_by('data')
+    # Note, distribuție și absențe dintr-o singură trecere (cache per versiunea notelor)
+    summary = grade_summary(request.user, subject_id=subject.pk)
     grade_stats = {
-        'total': grades.count(),
-        'media': grades.aggregate(avg=Avg('valoare'))['avg'],
-        'maxima': grades.aggregate(max=models.Max('valoare'))['max'],
-        'minima': grades.aggregate(min=models.Min('valoare'))['min'],
+        'total': summary['count'],
+        'media': summary['average'],
+        'maxima': summary['highest'],
+        'minima': summary['lowest'],
     }
-
-    # Distribuția notelor
-    grade_distribution = {}
-    for i in range(1, 11):
-        count = grades.filter(valoare__gte=i, valoare__lt=i + 1).count()
-        grade_distribution[i] = count
+    grade_distribution = summary['distribution']
 
     # Progresul în timp (ultimele 10 note)
-    recent_grades = list(grades.values('valoare', 'data')[-10:])
+    recent_grades = summary['recent']
 
     # Absențe
-    absences = subject.grade_set.filter(tip__in=['absenta', 'absenta_motivata'])
     absence_stats = {
-        'total': absences.count(),
-        'motivate': absences.filter(tip='absenta_motivata').count(),
-        'nemotivate': absences.filter(tip='absenta').count(),
+        'total': summary['absences']['total'],
+        'motivate': summary['absences']['motivated'],
+        'nemotivate': summary['absences']['unmotivated'],
     }
 
-    # Teme
-    homework_stats = {
-        'total': subject.homework_set.count(),
-        'finalizate': subject.homework_set.filter(finalizata=True).count(),
-        'active': subject.homework_set.filter(finalizata=False).count(),
-        'intarziate': subject.homework_set.filter(
-            finalizata=False,
-            deadline__lt=timezone.now().date()
-        ).count(),
-    }
+    # Teme (un singur agregat)
+    homework_stats = subject.homework_set.aggregate(
+        total=Count('id'),
+        finalizate=Count('id', filter=Q(finalizata=True)),
+        active=Count('id', filter=Q(finalizata=False)),
+        intarziate=Count('id', filter=Q(finalizata=False, deadline__lt=timezone.now().date())),
+    )
 
     context = {
         'subject': subject,
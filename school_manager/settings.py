@@ -130,6 +130,25 @@ try:
 except Exception:
     pass
 
+# Cache-ul implicit rămâne în memoria procesului; „shared” (în baza de date) e comun
+# tuturor proceselor (progresul și locurile de rulare ale exportului în masă).
+# Tabela se creează cu `python manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache_shared',
+    },
+}
+
+# Cache pe disc pentru exporturile de orar (PDF/XLSX), cheie pe versiunea orarului
+SCHEDULE_EXPORT_CACHE_DIR = config('SCHEDULE_EXPORT_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'orar'))
+# Export în masă: procese de randare per rulare și rulări simultane
+SCHEDULE_BATCH_MAX_WORKERS = config('SCHEDULE_BATCH_MAX_WORKERS', default=2, cast=int)
+SCHEDULE_BATCH_MAX_RUNS = config('SCHEDULE_BATCH_MAX_RUNS', default=1, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -196,4 +215,6 @@ EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='apikey')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')  # de regulă API key-ul
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=SENDGRID_FROM_EMAIL)
-SERVER_EMAIL = config('SERVER_EMAIL', default=DEFAULT_FROM_EMAIL)
\ No newline at end of file
+SERVER_EMAIL = config('SERVER_EMAIL', default=DEFAULT_FROM_EMAIL)
+# Firele care trimit emailurile puse în coadă (queue_email)
+EMAIL_QUEUE_WORKERS = config('EMAIL_QUEUE_WORKERS', default=1, cast=int)
\ No newline at end of file
@@ -43,15 +43,44 @@
             const monthNav = document.getElementById('monthNav');
             if (!weekRadio || !monthRadio || !weekSection || !monthSection) return;
 
-            const renderMonth = () => {
-                // Build month grid using values from dataset or URL params
+            // Events are fetched lazily from the calendar API, once per month
+            const monthCache = {};
+            const fetchMonth = (year, m1) => {
+                const key = year + '-' + m1;
+                if (!monthCache[key]) {
+                    const apiUrl = new URL(monthSection.dataset.eventsUrl || '/calendar/events/', window.location.origin);
+                    apiUrl.searchParams.set('year', year);
+                    apiUrl.searchParams.set('month', m1);
+                    monthCache[key] = fetch(apiUrl, { credentials: 'same-origin' })
+                        .then(r => r.ok ? r.json() : { days: {} })
+                        .then(data => data.days || {})
+                        .catch(() => { delete monthCache[key]; return {}; });
+                }
+                return monthCache[key];
+            };
+
+            const currentMonth = () => {
                 const dsYear = parseInt(monthSection.dataset.year || '0', 10);
                 const dsMonth = parseInt(monthSection.dataset.month || '0', 10); // 1..12
                 const url = new URL(window.location);
-                const y = parseInt(url.searchParams.get('year') || dsYear || (new Date().getFullYear()), 10);
+                const year = parseInt(url.searchParams.get('year') || dsYear || (new Date().getFullYear()), 10);
                 const m1 = parseInt(url.searchParams.get('month') || dsMonth || (new Date().getMonth() + 1), 10); // 1..12
-                const year = y;
-                const month = m1 - 1; // 0..11
+                return { year, m1 };
+            };
+
+            const renderMonth = () => {
+                const { year, m1 } = currentMonth();
+                const label = document.getElementById('monthLabel');
+                if (label) label.textContent = m1 + '/' + year;
+                return fetchMonth(year, m1).then(days => {
+                    // A newer month may have been requested meanwhile
+                    const now = currentMonth();
+                    if (now.year !== year || now.m1 !== m1) return;
+                    drawMonth(year, m1 - 1, days);
+                });
+            };
+
+            const drawMonth = (year, month, monthEvents) => {
                 const first = new Date(year, month, 1);
                 const last = new Date(year, month + 1, 0);
                 const firstWeekday = (first.getDay() + 6) % 7; // 0=Luni
@@ -75,7 +104,7 @@
                     num.textContent = d;
                     const events = document.createElement('div');
                     events.className = 'day-events';
-                    const dayEvents = (window.SCHEDULE_MONTH_EVENTS || {})[d] || [];
+                    const dayEvents = monthEvents[d] || [];
                     // group count by subject
                     const subjCount = {};
                     dayEvents.forEach(ev => {
@@ -99,6 +128,7 @@
                     monthSection.appendChild(cell);
                 }
             };
+            this.renderMonth = renderMonth;
 
             const update = () => {
                 if (monthRadio.checked) {
@@ -135,9 +165,10 @@
         },
 
         navigateMonth: function(delta) {
+            const monthSection = document.getElementById('monthCalendar');
             const url = new URL(window.location);
-            const currentMonth = parseInt(url.searchParams.get('month') || (monthSection.dataset.month || (new Date().getMonth() + 1)), 10);
-            const currentYear = parseInt(url.searchParams.get('year') || (monthSection.dataset.year || (new Date().getFullYear())), 10);
+            const currentMonth = parseInt(url.searchParams.get('month') || (monthSection?.dataset.month || (new Date().getMonth() + 1)), 10);
+            const currentYear = parseInt(url.searchParams.get('year') || (monthSection?.dataset.year || (new Date().getFullYear())), 10);
             let m = currentMonth + delta;
             let y = currentYear;
             if (m < 1) { m = 12; y -= 1; }
@@ -146,7 +177,9 @@
             url.searchParams.set('year', y);
             // preserve view=month flag so page stays in monthly view
             url.searchParams.set('view', 'month');
-            window.location.assign(url.toString());
+            // No page reload: only the month's events are fetched
+            window.history.replaceState({}, '', url);
+            if (this.renderMonth) this.renderMonth();
         },
 
         showEntryDetails: function(entryId) {